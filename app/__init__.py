@@ -21,6 +21,7 @@ from .routes.leads import leads_bp
 from .routes.accounting import accounting_bp
 from .routes.investors import investors_bp
 from .routes.collection_sheets import collection_sheets_bp
+from .routes.search import search_bp
 from .routes.bank_reconciliation import (bank_reconciliation_bp,
                                          bank_reconciliation_compat_bp,
                                          bank_reconciliation_legacy_bp)
@@ -50,7 +51,8 @@ def create_app():
         app,
         resources={r"/*": {"origins": configured_origins}},
         supports_credentials=True,
-        allow_headers=["Authorization", "Content-Type"],
+        allow_headers=["Authorization", "Content-Type", "If-None-Match"],
+        expose_headers=["X-Next-Cursor", "ETag"],
         methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
     )
 
@@ -114,6 +116,7 @@ def create_app():
     app.register_blueprint(accounting_bp)
     app.register_blueprint(investors_bp)
     app.register_blueprint(collection_sheets_bp)
+    app.register_blueprint(search_bp)
     app.register_blueprint(bank_reconciliation_bp)
     app.register_blueprint(bank_reconciliation_legacy_bp)
     app.register_blueprint(bank_reconciliation_compat_bp)
@@ -607,12 +610,14 @@ def create_app():
         from datetime import date as date_cls
         from .models import Loan, Payment
         from .accounting import post_loan_disbursement, post_loan_payment, AccountingError
+        from .portfolio_import import LEGACY_PAYMENT_TYPE, OPENING_ACCRUAL_MODE
 
         start = date_cls.fromisoformat(date_from) if date_from else None
         end = date_cls.fromisoformat(date_to) if date_to else None
         summary = {"created": 0, "skipped": 0, "failed": 0, "mismatches": 0}
 
-        loans = Loan.query
+        # Imported portfolios are booked through their opening journals.
+        loans = Loan.query.filter(Loan.historical_accrual_mode != OPENING_ACCRUAL_MODE)
         if loan_id:
             loans = loans.filter_by(id=loan_id)
         if start:
@@ -620,7 +625,7 @@ def create_app():
         if end:
             loans = loans.filter(Loan.start_date <= end)
 
-        payments = Payment.query
+        payments = Payment.query.filter(Payment.transaction_type != LEGACY_PAYMENT_TYPE)
         if payment_id:
             payments = payments.filter_by(id=payment_id)
         if start:
@@ -672,11 +677,12 @@ def create_app():
         from datetime import date as date_cls
         from .models import Loan, AccountingAccount, AccountingJournalEntry
         from .accounting import post_loan_disbursement, AccountingError, money, resolve_system_account
+        from .portfolio_import import OPENING_ACCRUAL_MODE
 
         start = date_cls.fromisoformat(date_from) if date_from else None
         end = date_cls.fromisoformat(date_to) if date_to else None
         summary = {"created": 0, "skipped": 0, "failed": 0, "mismatched": 0}
-        query = Loan.query.filter(Loan.status.in_(["Active", "ACTIVE"]))
+        query = Loan.query.filter(Loan.status.in_(["Active", "ACTIVE", "OVERDUE"]), Loan.historical_accrual_mode != OPENING_ACCRUAL_MODE)
         if loan_id:
             query = query.filter_by(id=loan_id)
         if start:
@@ -716,11 +722,12 @@ def create_app():
         from datetime import date as date_cls
         from .models import Payment, AccountingAccount, AccountingJournalEntry
         from .accounting import post_loan_payment, AccountingError, money
+        from .portfolio_import import LEGACY_PAYMENT_TYPE
 
         start = date_cls.fromisoformat(date_from) if date_from else None
         end = date_cls.fromisoformat(date_to) if date_to else None
         summary = {"created": 0, "skipped": 0, "failed": 0, "mismatched": 0}
-        query = Payment.query
+        query = Payment.query.filter(Payment.transaction_type != LEGACY_PAYMENT_TYPE)
         if payment_id:
             query = query.filter_by(id=payment_id)
         if start:
@@ -784,6 +791,168 @@ def create_app():
         if summary.get("errors"):
             raise click.ClickException("Some accruals failed")
 
+    @app.cli.command("classify-overdue-loans")
+    @click.option("--as-of-date", default=None, help="Classify as of YYYY-MM-DD; defaults to today.")
+    @click.option("--apply", "apply_changes", is_flag=True, default=False, help="Persist status changes. Dry-run is the default.")
+    def classify_overdue_loans_cli(as_of_date, apply_changes):
+        """Move loans between ACTIVE and OVERDUE by days past due; suitable for a nightly scheduled job."""
+        from datetime import date as date_cls
+        from .overdue_classification import classify_overdue_loans
+        summary = classify_overdue_loans(date_cls.fromisoformat(as_of_date) if as_of_date else None)
+        if apply_changes:
+            db.session.commit()
+        else:
+            db.session.rollback()
+        click.echo({"mode": "apply" if apply_changes else "dry-run", **summary})
+
+    @app.cli.command("disburse-applications")
+    @click.option("--application-id", "application_ids", type=int, multiple=True, help="Application to disburse; repeat for a batch.")
+    @click.option("--all-approved", is_flag=True, default=False, help="Disburse every APPROVED application.")
+    @click.option("--user-id", type=int, required=True, help="Admin user recorded as the disbursing user.")
+    @click.option("--disbursement-date", default=None, help="YYYY-MM-DD; defaults to today.")
+    @click.option("--funding-account-id", type=int, default=None, help="Defaults to the DEFAULT_DISBURSEMENT_ACCOUNT setting.")
+    @click.option("--mode", type=click.Choice(["all_or_nothing", "best_effort"]), default="all_or_nothing", show_default=True)
+    def disburse_applications_cli(application_ids, all_approved, user_id, disbursement_date, funding_account_id, mode):
+        """Disburse many APPROVED loan applications in one transaction."""
+        from datetime import date as date_cls
+        from .accounting import AccountingError
+        from .models import AccountingAccount, LoanApplication
+        from .routes.loan_applications import STATUS_APPROVED, disburse_applications
+        if bool(application_ids) == all_approved:
+            raise click.ClickException("Specify --application-id or --all-approved")
+        if all_approved:
+            application_ids = [r[0] for r in db.session.query(LoanApplication.id).filter(LoanApplication.status == STATUS_APPROVED).order_by(LoanApplication.id)]
+            if not application_ids:
+                raise click.ClickException("No APPROVED applications to disburse")
+        funding_account = None
+        if funding_account_id is not None:
+            funding_account = db.session.get(AccountingAccount, funding_account_id)
+            if funding_account is None:
+                raise click.ClickException(f"Funding account {funding_account_id} not found")
+        try:
+            report = disburse_applications(application_ids, user_id, mode=mode, funding_account=funding_account,
+                                           disbursement_date=date_cls.fromisoformat(disbursement_date) if disbursement_date else None)
+        except (ValueError, AccountingError) as exc:
+            db.session.rollback()
+            raise click.ClickException(str(exc))
+        if report["disbursed"]:
+            db.session.commit()
+        else:
+            db.session.rollback()
+        click.echo({key: value for key, value in report.items() if key != "items"})
+        for item in report["items"]:
+            if item["status"] != "DISBURSED":
+                click.echo(item)
+
+    @app.cli.command("import-portfolio")
+    @click.option("--customers", "customers_path", type=click.Path(exists=True, dir_okay=False), default=None, help="Customer CSV.")
+    @click.option("--loans", "loans_path", type=click.Path(exists=True, dir_okay=False), default=None, help="Loan CSV.")
+    @click.option("--payments", "payments_path", type=click.Path(exists=True, dir_okay=False), default=None, help="Historical payment CSV.")
+    @click.option("--cutover-date", default=None, help="YYYY-MM-DD the opening balances are stated at.")
+    @click.option("--user-id", type=int, default=None, help="User recorded as creator and collector.")
+    @click.option("--contra-account-code", default=None, help="Opening balance contra account; defaults to retained earnings.")
+    @click.option("--batch-id", type=int, default=None, help="Resume a staged batch instead of loading files.")
+    @click.option("--batch-size", type=int, default=1000, show_default=True)
+    @click.option("--apply", "apply_changes", is_flag=True, default=False, help="Persist the import. Dry-run is the default.")
+    def import_portfolio(customers_path, loans_path, payments_path, cutover_date, user_id, contra_account_code, batch_id, batch_size, apply_changes):
+        """Stage, validate and bulk-promote a legacy portfolio from CSV files."""
+        from contextlib import ExitStack
+        from datetime import date as date_cls
+        from .accounting import AccountingError
+        from .models import AccountingAccount, PortfolioImportBatch
+        from .portfolio_import import PortfolioImportError, batch_report, run_import, stage_files, validate_batch
+
+        if batch_id:
+            batch = db.session.get(PortfolioImportBatch, batch_id)
+            if batch is None:
+                raise click.ClickException(f"Import batch {batch_id} not found")
+        else:
+            if not loans_path or not cutover_date or not user_id:
+                raise click.ClickException("--loans, --cutover-date and --user-id are required for a new import")
+            contra = AccountingAccount.query.filter_by(account_code=contra_account_code).first() if contra_account_code else None
+            if contra_account_code and contra is None:
+                raise click.ClickException(f"Account {contra_account_code} not found")
+            with ExitStack() as files:
+                streams = [files.enter_context(open(path, newline="", encoding="utf-8-sig")) if path else None
+                           for path in (customers_path, loans_path, payments_path)]
+                batch = stage_files(*streams, date_cls.fromisoformat(cutover_date), user_id, contra_account=contra, batch_size=batch_size)
+            validate_batch(batch)
+            if apply_changes:
+                # Keep the staged rows and their errors even if promotion fails.
+                db.session.commit()
+        try:
+            if not batch.error_count:
+                run_import(batch, batch_size, checkpoint=db.session.commit if apply_changes else None)
+        except (PortfolioImportError, AccountingError) as exc:
+            db.session.rollback()
+            raise click.ClickException(f"Import batch {batch.id} stopped: {exc}")
+        report = batch_report(batch)
+        if apply_changes:
+            db.session.commit()
+        else:
+            db.session.rollback()
+        click.echo(report)
+
+    @app.cli.command("import-payments")
+    @click.option("--file", "file_path", type=click.Path(exists=True, dir_okay=False), required=True, help="Payment CSV.")
+    @click.option("--user-id", type=int, required=True, help="User recorded as collector and journal author.")
+    @click.option("--payment-method", default="BANK_TRANSFER", show_default=True, help="Method for rows without a payment_method.")
+    @click.option("--collection-account-code", default=None, help="Receiving account; defaults to the method's system account.")
+    @click.option("--results", "results_path", type=click.Path(dir_okay=False, writable=True), default=None, help="Write the per-row result CSV here.")
+    @click.option("--apply", "apply_changes", is_flag=True, default=False, help="Persist the receipts. Dry-run is the default.")
+    def import_payments_command(file_path, user_id, payment_method, collection_account_code, results_path, apply_changes):
+        """Match, de-duplicate and post a bank or mobile-money receipt file."""
+        from .accounting import AccountingError
+        from .models import AccountingAccount
+        from .payment_import import PaymentImportError, import_payments, read_csv, results_csv
+
+        account = AccountingAccount.query.filter_by(account_code=collection_account_code).first() if collection_account_code else None
+        if collection_account_code and account is None:
+            raise click.ClickException(f"Account {collection_account_code} not found")
+        with open(file_path, newline="", encoding="utf-8-sig") as stream:
+            rows = read_csv(stream)
+        try:
+            summary, results = import_payments(rows, user_id, payment_method, account, first_row_no=2)
+        except (PaymentImportError, AccountingError) as exc:
+            db.session.rollback()
+            raise click.ClickException(str(exc))
+        if apply_changes:
+            db.session.commit()
+        else:
+            db.session.rollback()
+        if results_path:
+            with open(results_path, "w", newline="", encoding="utf-8") as out:
+                out.write(results_csv(results))
+        click.echo(summary)
+
+    @app.cli.command("reverse-payments")
+    @click.option("--payment-id", "payment_ids", type=int, multiple=True, help="Receipt to reverse; repeatable.")
+    @click.option("--deposit-batch-id", type=int, default=None, help="Reverse every receipt of this (already reversed) deposit batch.")
+    @click.option("--reason", required=True)
+    @click.option("--reversal-date", default=None, help="YYYY-MM-DD; defaults to today.")
+    @click.option("--user-id", type=int, default=None)
+    @click.option("--apply", "apply_changes", is_flag=True, default=False, help="Persist the reversals. Dry-run is the default.")
+    def reverse_payments_command(payment_ids, deposit_batch_id, reason, reversal_date, user_id, apply_changes):
+        """Reverse a set of receipts in one transaction."""
+        from datetime import date as date_cls
+        from .accounting import AccountingError, payments_to_reverse, reverse_payments_bulk
+
+        payments = payments_to_reverse(list(payment_ids), deposit_batch_id)
+        missing = sorted(set(payment_ids) - {p.id for p in payments})
+        if missing or not payments:
+            raise click.ClickException(f"Payments not found: {missing or 'no receipts selected'}")
+        try:
+            reversals = reverse_payments_bulk(payments, date_cls.fromisoformat(reversal_date) if reversal_date else date_cls.today(), reason, user_id)
+        except AccountingError as exc:
+            db.session.rollback()
+            raise click.ClickException(str(exc))
+        report = {"reversed": len(payments), "reversal_journal_ids": [rev.id for rev in reversals], "applied": apply_changes}
+        if apply_changes:
+            db.session.commit()
+        else:
+            db.session.rollback()
+        click.echo(report)
+
     @app.cli.command("repair-loan-ledger")
     @click.option("--loan-id", type=int, default=None)
     @click.option("--all", "all_loans", is_flag=True, default=False)
@@ -835,7 +1004,7 @@ def create_app():
                 proposed = current
                 reason = "status is protected from automatic settlement repair"
             else:
-                proposed = "SETTLED" if (balances["principal_outstanding"] <= Decimal("0.01") and balances["contractual_interest_outstanding"] <= Decimal("0.01")) else "ACTIVE"
+                proposed = "SETTLED" if (balances["principal_outstanding"] <= Decimal("0.01") and balances["contractual_interest_outstanding"] <= Decimal("0.01")) else ("OVERDUE" if (current or "").strip().upper() == "OVERDUE" else "ACTIVE")
                 reason = "contractual principal and interest are within 0.01 tolerance" if proposed == "SETTLED" else "contractual balance remains"
             reports.append({"loan_id": loan.id, "current_status": current, "proposed_status": proposed,
                             **{key: str(value.quantize(Decimal("0.01"))) for key, value in balances.items()},
@@ -899,6 +1068,94 @@ def create_app():
                     **{key: f"{value:.2f}" for key, value in balances.items()},
                     "settled_at": loan.settled_at.isoformat() if loan.settled_at else None})
 
+    @app.cli.command("reconcile-collector-clearing-balances")
+    @click.option("--preview", "preview_mode", is_flag=True, default=False, help="Report drift from the receipt aggregate.")
+    @click.option("--post", "post_mode", is_flag=True, default=False, help="Rewrite drifted maintained balances.")
+    def reconcile_collector_clearing_balances(preview_mode, post_mode):
+        """Verify maintained collector clearing balances against posted receipts."""
+        from .accounting import verify_collector_clearing_balances
+        if preview_mode == post_mode:
+            raise click.ClickException("Specify exactly one of --preview or --post")
+        report = verify_collector_clearing_balances(repair=post_mode)
+        if post_mode:
+            db.session.commit()
+        click.echo({"mode": "post" if post_mode else "preview", **report})
+
+    @app.cli.command("rebuild-collector-performance")
+    @click.option("--date-from", default=None, help="First collection date (YYYY-MM-DD); defaults to 30 days before --date-to.")
+    @click.option("--date-to", default=None, help="Last collection date (YYYY-MM-DD); defaults to today.")
+    @click.option("--collector-id", type=int, default=None, help="Limit the rebuild to one collector.")
+    def rebuild_collector_performance_command(date_from, date_to, collector_id):
+        """Rebuild collector daily performance rollups from receipts, deposits and the ledger."""
+        from datetime import date as date_cls
+        from .collector_performance import default_range, rebuild_collector_performance
+        try:
+            start, end = default_range(date_cls.fromisoformat(date_from) if date_from else None,
+                                       date_cls.fromisoformat(date_to) if date_to else None)
+        except ValueError:
+            raise click.ClickException("Dates must be ISO formatted (YYYY-MM-DD)")
+        if start > end:
+            raise click.ClickException("--date-from must be on or before --date-to")
+        report = rebuild_collector_performance(start, end, collector_id)
+        db.session.commit()
+        click.echo(report)
+
+    @app.cli.command("rebuild-loan-search-index")
+    @click.option("--batch-size", type=int, default=1000, show_default=True, help="Loans tokenized per bulk insert.")
+    @click.option("--missing-only", is_flag=True, default=False, help="Only loans without token rows (deploy step).")
+    def rebuild_loan_search_index(batch_size, missing_only):
+        """Rebuild the prefix-token loan search table used when pg_trgm is unavailable."""
+        from .loan_search import index_missing, rebuild_index, uses_trigram_index
+        if missing_only and uses_trigram_index():
+            click.echo("Loan search uses pg_trgm indexes; no tokens to build.")
+            return
+        report = (index_missing if missing_only else rebuild_index)(max(1, batch_size))
+        db.session.commit()
+        click.echo(report)
+
+    @app.cli.command("rebuild-loan-list-view")
+    @click.option("--batch-size", type=int, default=1000, show_default=True, help="Loans refreshed per bulk insert.")
+    def rebuild_loan_list_view(batch_size):
+        """Rebuild the loan_list_view read model behind the admin loan list."""
+        from .loan_list_view import rebuild_view
+        report = rebuild_view(max(1, batch_size))
+        db.session.commit()
+        click.echo(report)
+
+    @app.cli.command("backfill-customer-identity")
+    @click.option("--preview", "preview_mode", is_flag=True, default=False, help="Report rows whose normalized phone/NIC would change.")
+    @click.option("--post", "post_mode", is_flag=True, default=False, help="Write normalized phone/NIC columns.")
+    @click.option("--batch-size", type=int, default=1000, show_default=True)
+    def backfill_customer_identity(preview_mode, post_mode, batch_size):
+        """Populate customers.nic_canonical, mobile_e164 and guarantor_mobile_e164."""
+        from .customer_identity import backfill_identity
+        if preview_mode == post_mode:
+            raise click.ClickException("Specify exactly one of --preview or --post")
+        report = backfill_identity(max(1, batch_size), apply=post_mode)
+        if post_mode:
+            db.session.commit()
+        click.echo({"mode": "post" if post_mode else "preview", **report})
+
+    @app.cli.command("rebuild-search-index")
+    @click.option("--entity-type", "entity_types", multiple=True, help="Limit to CUSTOMER, LEAD, LOAN, LOAN_APPLICATION, PAYMENT or JOURNAL.")
+    @click.option("--batch-size", type=int, default=1000, show_default=True)
+    @click.option("--missing-only", is_flag=True, default=False, help="Only entity types whose documents do not match their rows (deploy step).")
+    def rebuild_search_index(entity_types, batch_size, missing_only):
+        """Rebuild search_documents (and the token fallback) for global /search."""
+        from .global_search import SOURCES, rebuild_index, unindexed_entity_types
+        entity_types = [t.upper() for t in entity_types]
+        unknown = sorted(set(entity_types) - set(SOURCES))
+        if unknown:
+            raise click.ClickException(f"Unknown entity types: {', '.join(unknown)}")
+        if missing_only:
+            entity_types = [t for t in unindexed_entity_types() if not entity_types or t in entity_types]
+            if not entity_types:
+                click.echo("Search index is up to date.")
+                return
+        report = rebuild_index(entity_types or None, max(1, batch_size))
+        db.session.commit()
+        click.echo(report)
+
     return app
 
 
@@ -6,7 +6,9 @@ from decimal import Decimal, ROUND_HALF_UP
 from io import StringIO
 
 from flask import current_app
-from sqlalchemy import func, text
+from sqlalchemy import bindparam, case, func, insert, text, update
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 
 from .extensions import db
 from .models import (
@@ -22,12 +24,17 @@ from .models import (
     PaymentAllocation,
     CustomerCreditBalance,
     CollectionDepositAllocation,
+    CollectorClearingBalance,
     AccountingPeriod,
     LoanApplication,
     User,
     DisbursementChargeType,
     LoanDisbursementDeduction,
 )
+from .collector_performance import mark_payment
+from .allocation_cursor import advance as advance_allocation_cursor, open_entries, rewind as rewind_allocation_cursor
+from .loan_locks import lock_loan, lock_loans
+from .loan_schedule import materialize_due, materialize_for_payment, pending_schedule_totals, stored_entries
 
 CENT = Decimal("0.01")
 ACCOUNT_TYPES = {"ASSET", "LIABILITY", "EQUITY", "INCOME", "EXPENSE"}
@@ -316,6 +323,18 @@ def generate_journal_number(journal_date):
         next_no = (AccountingJournalEntry.query.count() or 0) + 1
     return f"{prefix}{int(next_no):04d}"
 
+def generate_journal_numbers(journal_date, count):
+    """``count`` consecutive journal numbers for ``journal_date``, reserved with one statement."""
+    prefix = f"GROW-JV-{journal_date:%Y%m%d}-"
+    if db.session.bind and db.session.bind.dialect.name == "postgresql":
+        seq_name = "accounting_journal_number_seq"
+        db.session.execute(text(f"create sequence if not exists {seq_name}"))
+        values = db.session.execute(text(f"select nextval('{seq_name}') from generate_series(1, :n)"), {"n": count}).scalars().all()
+    else:
+        first = (AccountingJournalEntry.query.count() or 0) + 1
+        values = range(first, first + count)
+    return [f"{prefix}{int(value):04d}" for value in values]
+
 def create_account(data, user_id=None):
     typ = data.get("account_type")
     normal = data.get("normal_balance")
@@ -679,7 +698,7 @@ def _backfill_metadata(issue_type, loan=None, payment=None):
 
 def reconciliation_issues():
     issues=[]
-    for loan in Loan.query.filter(Loan.status.in_(["Active","ACTIVE"])).all():
+    for loan in Loan.query.filter(Loan.status.in_(["Active","ACTIVE","OVERDUE"])).all():
         journals=AccountingJournalEntry.query.filter_by(reference_type="LOAN_DISBURSEMENT", reference_id=str(loan.id)).all()
         if not journals:
             item=_issue("MISSING_DISBURSEMENT_JOURNAL", "WARNING", "LOAN", loan.id, loan.loan_number, "Active loan has no posted disbursement journal.", "LOAN", loan.id, **_backfill_metadata("MISSING_DISBURSEMENT_JOURNAL", loan=loan))
@@ -961,12 +980,7 @@ def validate_journal(entry):
         if line.debit > 0 and line.credit > 0: raise ValidationError("invalid_journal_line", line_no=line.line_no, message="Debit and credit cannot both be positive on one line.")
         if line.debit <= 0 and line.credit <= 0: raise ValidationError("blank_journal_line", line_no=line.line_no, message="Zero-value journal lines cannot be posted.")
         has_debit = has_debit or line.debit > 0; has_credit = has_credit or line.credit > 0
-        account = line.account or AccountingAccount.query.get(line.account_id)
-        if not is_active_account(account) or not is_posting_account(account): raise ValidationError("invalid_account", line_no=line.line_no, message="The selected account is not available for posting.")
-        if getattr(account, "requires_customer", False) and not line.customer_id: raise ValidationError("customer_required", line_no=line.line_no, field="customer_id", message="Customer is required for the selected account.")
-        if getattr(account, "requires_loan", False) and not line.loan_id: raise ValidationError("loan_required", line_no=line.line_no, field="loan_id", message="Loan is required for the selected account.")
-        if not getattr(account, "allows_customer", True) and line.customer_id: raise ValidationError("customer_not_allowed", line_no=line.line_no, field="customer_id", message="Customer is not allowed for the selected account.")
-        if not getattr(account, "allows_loan", True) and line.loan_id: raise ValidationError("loan_not_allowed", line_no=line.line_no, field="loan_id", message="Loan is not allowed for the selected account.")
+        _validate_line_account(line, line.account or AccountingAccount.query.get(line.account_id))
         if line.customer_id and not Customer.query.get(line.customer_id): raise ValidationError("invalid_customer", line_no=line.line_no, field="customer_id", message="The selected customer does not exist.")
         if line.loan_id:
             loan = Loan.query.get(line.loan_id)
@@ -976,6 +990,52 @@ def validate_journal(entry):
     if not has_debit or not has_credit: raise ValidationError("journal_not_balanced", message="Journal must include at least one debit and one credit line.")
     return entry
 
+def _validate_line_account(line, account):
+    if not is_active_account(account) or not is_posting_account(account): raise ValidationError("invalid_account", line_no=line.line_no, message="The selected account is not available for posting.")
+    if getattr(account, "requires_customer", False) and not line.customer_id: raise ValidationError("customer_required", line_no=line.line_no, field="customer_id", message="Customer is required for the selected account.")
+    if getattr(account, "requires_loan", False) and not line.loan_id: raise ValidationError("loan_required", line_no=line.line_no, field="loan_id", message="Loan is required for the selected account.")
+    if not getattr(account, "allows_customer", True) and line.customer_id: raise ValidationError("customer_not_allowed", line_no=line.line_no, field="customer_id", message="Customer is not allowed for the selected account.")
+    if not getattr(account, "allows_loan", True) and line.loan_id: raise ValidationError("loan_not_allowed", line_no=line.line_no, field="loan_id", message="Loan is not allowed for the selected account.")
+
+def post_journals_bulk(specs, user_id=None):
+    """Create and post many system journals with one flush.
+
+    Each spec carries ``create_draft_journal``'s arguments plus ``loan_id`` and
+    ``customer_id``.  Lines must reference existing customers/loans (callers
+    build them from loaded rows), so only the accounts are looked up, once.
+    Returns the entries in spec order; an existing idempotency key returns its
+    journal unchanged.
+    """
+    keys = [spec["idempotency_key"] for spec in specs]
+    existing = {e.idempotency_key: e for e in AccountingJournalEntry.query.filter(AccountingJournalEntry.idempotency_key.in_(keys)).all()} if keys else {}
+    pending = [spec for spec in specs if spec["idempotency_key"] not in existing]
+    dates = sorted({spec["journal_date"] for spec in pending})
+    for journal_date in dates:
+        require_open_accounting_period(journal_date)
+    account_ids = {raw["account_id"] for spec in pending for raw in spec["lines"]}
+    accounts = {a.id: a for a in AccountingAccount.query.filter(AccountingAccount.id.in_(account_ids)).all()} if account_ids else {}
+    numbers = {d: iter(generate_journal_numbers(d, sum(1 for spec in pending if spec["journal_date"] == d))) for d in dates}
+    now, created = datetime.utcnow(), {}
+    for spec in pending:
+        lines = [_line_from_payload(raw, i) for i, raw in enumerate(spec["lines"], 1)]
+        total_debit = money(sum((line.debit for line in lines), Decimal("0.00"))); total_credit = money(sum((line.credit for line in lines), Decimal("0.00")))
+        if len(lines) < 2 or total_debit <= 0 or total_debit != total_credit:
+            raise ValidationError("journal_not_balanced", message="Total debit must equal total credit.", total_debit=float(total_debit), total_credit=float(total_credit), difference=float(abs(total_debit-total_credit)))
+        for line in lines:
+            if (line.debit > 0) == (line.credit > 0): raise ValidationError("invalid_journal_line", line_no=line.line_no, message="Each journal line must be either a debit or a credit.")
+            _validate_line_account(line, accounts.get(line.account_id))
+        reference_id = spec.get("reference_id")
+        created[spec["idempotency_key"]] = AccountingJournalEntry(
+            journal_no=next(numbers[spec["journal_date"]]), journal_date=spec["journal_date"], accounting_date=spec["journal_date"],
+            description=spec["description"], reference_type=spec["reference_type"], reference_id=str(reference_id) if reference_id is not None else None,
+            source_type=spec["reference_type"], source_id=int(reference_id) if reference_id is not None and str(reference_id).isdigit() else None,
+            source_module=spec.get("source_module"), created_by_id=user_id, idempotency_key=spec["idempotency_key"], loan_id=spec.get("loan_id"),
+            customer_id=spec.get("customer_id"), status="POSTED", posted_at=now, posted_by_id=user_id, total_debit=total_debit, total_credit=total_credit, lines=lines)
+    db.session.add_all(created.values()); db.session.flush()
+    for entry in created.values():
+        log_audit("JOURNAL_POST", "AccountingJournalEntry", entry.id, user_id, {"journal_no": entry.journal_no, "total_debit": str(entry.total_debit), "total_credit": str(entry.total_credit)})
+    return [existing.get(key) or created[key] for key in keys]
+
 def post_journal(entry, user_id=None):
     if entry.status == "POSTED": return entry
     if entry.status not in {"DRAFT", "POSTED"}: raise ValidationError("journal_not_postable", message="Only draft journals can be posted.")
@@ -1445,7 +1505,7 @@ def require_open_accounting_period(accounting_date):
     return True
 
 def _loan_active_for_accrual(loan):
-    return str(loan.status).upper() in {"ACTIVE", "APPROVED", "STAFF_APPROVED"}
+    return str(loan.status).upper() in {"ACTIVE", "OVERDUE", "APPROVED", "STAFF_APPROVED"}
 
 def accrue_due_loan_interest(as_of_date, loan_id=None, historical=False, requested_by=None):
     if isinstance(as_of_date, str):
@@ -1459,6 +1519,7 @@ def accrue_due_loan_interest(as_of_date, loan_id=None, historical=False, request
     )
     if loan_id:
         query = query.filter(LoanLedger.loan_id == loan_id)
+    materialize_due(as_of_date, loan_id)
     for ledger in query.order_by(LoanLedger.due_date, LoanLedger.id).all():
         loan = ledger.loan
         if not _loan_active_for_accrual(loan):
@@ -1496,6 +1557,7 @@ def accrue_delay_interest(through_date, loan_id=None, preview=False, requested_b
     result = {"processed_installments": 0, "total_delay_interest_accrued": Decimal("0.00"), "journal_ids": [], "skipped": []}
     query = LoanLedger.query.join(Loan).filter(LoanLedger.due_date < through_date)
     if loan_id: query = query.filter(LoanLedger.loan_id == loan_id)
+    materialize_due(through_date, loan_id)
     receivable, income = resolve_system_account("DELAY_INTEREST_RECEIVABLE"), resolve_system_account("DELAY_INTEREST_INCOME")
     for ledger in query.order_by(LoanLedger.due_date, LoanLedger.id):
         loan = ledger.loan
@@ -1533,34 +1595,50 @@ def accrue_delay_interest(through_date, loan_id=None, preview=False, requested_b
     return result
 
 def allocate_payment(loan, amount, paid_date):
+    # A compact schedule only stores the installments this receipt can reach.
+    materialize_for_payment(loan, amount, paid_date)
     if str(getattr(loan, "interest_accounting_method", LOAN_ACCRUAL_METHOD)) == LOAN_ACCRUAL_METHOD:
         accrue_due_loan_interest(paid_date, loan.id, historical=True)
     # Ordinary receipts never settle delay interest.  That receivable can only
     # be collected by an explicit reconciliation action.
     remaining = money(amount); principal=interest=penalty=unapplied=Decimal("0.00")
-    allocations=[]
-    for e in sorted(loan.ledger_entries, key=lambda x: (x.due_date, x.installment_no)):
+    allocations=[]; visited=[]; writes=[]
+    # Installments before the loan's allocation cursor are already settled, so
+    # the waterfall starts there instead of at installment 1.
+    for e in open_entries(loan):
         if remaining <= 0: break
+        visited.append(e)
+        touched = False
         # Contractual schedule interest is due regardless of whether a
         # background accrual journal has been posted; allocation is a customer
         # waterfall, not an accounting-accrual decision.
         interest_base = Decimal(e.interest_amount)
-        interest_due = money(interest_base - Decimal(e.interest_paid or 0))
-        pay = min(remaining, interest_due); e.interest_paid = money(Decimal(e.interest_paid or 0)+pay); interest += pay; remaining -= pay
-        if pay: allocations.append((e, "INTEREST", pay))
-        principal_due = money(Decimal(e.principal_amount) - Decimal(e.principal_paid or 0))
-        pay = min(remaining, principal_due); e.principal_paid = money(Decimal(e.principal_paid or 0)+pay); principal += pay; remaining -= pay
-        if pay: allocations.append((e, "PRINCIPAL", pay))
-        e.paid_amount = money(Decimal(e.principal_paid or 0)+Decimal(e.interest_paid or 0))
-        contractual_paid = (money(e.principal_paid) >= money(e.principal_amount)
-                              and money(e.interest_paid) >= money(e.interest_amount))
-        e.status = "PAID" if contractual_paid else ("PARTIAL" if e.paid_amount > 0 else "PENDING")
-        if pay or any(a[0] is e for a in allocations):
-            e.last_payment_date = paid_date
-        # Never replace a historical settlement date with a later loan receipt.
-        if contractual_paid and e.paid_date is None:
-            e.paid_date = paid_date
+        interest_paid = Decimal(e.interest_paid or 0)
+        interest_due = money(interest_base - interest_paid)
+        pay = min(remaining, interest_due); interest_paid = money(interest_paid+pay); interest += pay; remaining -= pay
+        if pay: allocations.append((e, "INTEREST", pay)); touched = True
+        principal_paid = Decimal(e.principal_paid or 0)
+        principal_due = money(Decimal(e.principal_amount) - principal_paid)
+        pay = min(remaining, principal_due); principal_paid = money(principal_paid+pay); principal += pay; remaining -= pay
+        if pay: allocations.append((e, "PRINCIPAL", pay)); touched = True
+        paid_amount = money(principal_paid+interest_paid)
+        contractual_paid = (principal_paid >= money(e.principal_amount)
+                              and interest_paid >= money(e.interest_amount))
+        values = {"principal_paid": principal_paid, "interest_paid": interest_paid, "paid_amount": paid_amount,
+                  "status": "PAID" if contractual_paid else ("PARTIAL" if paid_amount > 0 else "PENDING"),
+                  "last_payment_date": paid_date if touched else e.last_payment_date,
+                  # Never replace a historical settlement date with a later loan receipt.
+                  "paid_date": paid_date if contractual_paid and e.paid_date is None else e.paid_date}
+        if any(getattr(e, key) != value for key, value in values.items()):
+            writes.append((e, values))
+    # Every changed row carries the same columns, so the whole receipt is one
+    # executemany UPDATE instead of one statement per installment at flush.
+    if writes:
+        db.session.execute(update(LoanLedger), [{"id": e.id, **values} for e, values in writes])
+        for e, values in writes:
+            for key, value in values.items(): set_committed_value(e, key, value)
     if remaining > 0: unapplied = remaining
+    advance_allocation_cursor(loan, visited)
     loan._pending_allocations = allocations + ([(None, "UNAPPLIED", unapplied)] if unapplied else [])
     return money(principal), money(interest), money(penalty), money(unapplied)
 
@@ -1589,10 +1667,11 @@ def recalculate_and_settle_loan(loan_id, effective_date, triggering_payment_id=N
         raise AccountingError("Loan not found")
     if isinstance(effective_date, str):
         effective_date = date.fromisoformat(effective_date)
-    entries = list(loan.ledger_entries)
+    entries = stored_entries(loan)
+    pending = pending_schedule_totals(loan)
     from .loan_status import update_loan_settlement_status
-    principal = money(sum((Decimal(e.principal_amount or 0) - Decimal(e.principal_paid or 0) for e in entries), Decimal("0")))
-    interest = money(sum((Decimal(e.interest_amount or 0) - Decimal(e.interest_paid or 0) - Decimal(e.waived_interest_amount or 0) for e in entries), Decimal("0")))
+    principal = money(pending["principal"] + sum((Decimal(e.principal_amount or 0) - Decimal(e.principal_paid or 0) for e in entries), Decimal("0")))
+    interest = money(pending["interest"] + sum((Decimal(e.interest_amount or 0) - Decimal(e.interest_paid or 0) - Decimal(e.waived_interest_amount or 0) for e in entries), Decimal("0")))
     penalty = money(sum((Decimal(e.delay_interest_accrued or 0) - Decimal(e.delay_interest_paid or 0) for e in entries), Decimal("0")))
     # Never expose negative components, including legacy rows that were over-applied.
     principal, interest, penalty = max(principal, Decimal("0")), max(interest, Decimal("0")), max(penalty, Decimal("0"))
@@ -1689,14 +1768,19 @@ def _charge_to_dict(line):
     tax_account = _account_to_preview_dict(tax) if tax else None
     return {"charge_type_id":ct.id,"code":ct.code,"name":ct.name,"amount":line["gross_amount"],"description":line["description"],"gross_amount":line["gross_amount"],"tax_amount":line["tax_amount"],"net_charge_amount":line["net_charge_amount"],"calculation_method":line["calculation_method"],"rate":line["rate"] if line.get("rate") is not None else None,"accounting_treatment":line["accounting_treatment"],"destination_account":destination_account,"tax_account":tax_account}
 
-def calculate_disbursement_charges(principal_amount, selected_charges, allow_exceeding_principal=None, allow_zero_net=None):
-    principal=money(principal_amount)
-    if principal <= 0: raise AccountingError("gross principal must be greater than zero")
+def _charge_type_id(value):
+    try: return int(value)
+    except (TypeError, ValueError): return None
+
+def prepare_disbursement_charges(selected_charges, allow_exceeding_principal=None, allow_zero_net=None):
+    """Resolve the charge catalog, accounts and settings once for any number of principals."""
     allow_exceeding_principal = setting_bool("allow_deductions_exceeding_principal", False) if allow_exceeding_principal is None else allow_exceeding_principal
     allow_zero_net = setting_bool("allow_zero_net_disbursement", False) if allow_zero_net is None else allow_zero_net
-    lines=[]; subtotal=tax_total=total=Decimal("0.00")
+    ids = {_charge_type_id(raw.get("charge_type_id")) for raw in selected_charges or []} - {None}
+    catalog = {ct.id: ct for ct in DisbursementChargeType.query.filter(DisbursementChargeType.id.in_(ids)).all()} if ids else {}
+    plan = []
     for raw in selected_charges or []:
-        ct=DisbursementChargeType.query.get(raw.get("charge_type_id"))
+        ct=catalog.get(_charge_type_id(raw.get("charge_type_id")))
         if not ct or not ct.active: raise AccountingError("unsupported charge type")
         if ct.code == "DOC_FEE" and (ct.default_amount is None or money(ct.default_amount) <= 0): raise AccountingError("Documentation Charge default amount is invalid")
         if ct.included_in_principal: raise AccountingError("capitalized disbursement charges are not enabled for this workflow")
@@ -1704,30 +1788,44 @@ def calculate_disbursement_charges(principal_amount, selected_charges, allow_exc
         rate=raw.get("rate", ct.default_rate)
         if ct.calculation_method=="PERCENTAGE_OF_PRINCIPAL":
             if rate is None or Decimal(str(rate)) < 0: raise AccountingError("invalid rate")
-            gross=money(principal*Decimal(str(rate))/Decimal("100"))
-        elif ct.calculation_method=="FIXED_AMOUNT": gross=money(raw.get("amount", ct.default_amount))
-        elif ct.calculation_method=="MANUAL_AMOUNT": gross=money(raw.get("amount"))
-        else: raise AccountingError("unsupported charge type")
-        if gross < 0: raise AccountingError("negative charge amounts are not allowed")
+        elif ct.calculation_method not in {"FIXED_AMOUNT", "MANUAL_AMOUNT"}: raise AccountingError("unsupported charge type")
         dest=_destination_account_for_charge(ct); tax_method=raw.get("tax_method") or ct.tax_method or get_setting("default_charge_tax_method", "NO_TAX")
         if tax_method not in TAX_METHODS: raise AccountingError("unsupported tax method")
         tax_rate=Decimal(str(raw.get("tax_rate", ct.tax_rate or 0)))
         if tax_rate < 0: raise AccountingError("invalid tax rate")
         tax_acct=ct.tax_payable_account or (resolve_system_account("default_tax_payable_account") if tax_method != "NO_TAX" and tax_rate > 0 else None)
+        plan.append({"raw": raw, "charge_type": ct, "rate": rate, "destination_account": dest, "tax_method": tax_method, "tax_rate": tax_rate, "tax_account": tax_acct})
+    require_setting = AccountingSetting.query.filter_by(setting_key="require_documentation_charge").first()
+    require_doc = setting_bool("require_documentation_charge", True) if require_setting else False
+    return {"charges": plan, "require_doc": require_doc, "allow_exceeding_principal": allow_exceeding_principal, "allow_zero_net": allow_zero_net}
+
+def apply_disbursement_charges(principal_amount, prepared):
+    """Charge lines and net disbursement for one principal from ``prepare_disbursement_charges``; no queries."""
+    principal=money(principal_amount)
+    if principal <= 0: raise AccountingError("gross principal must be greater than zero")
+    lines=[]; subtotal=tax_total=total=Decimal("0.00")
+    for item in prepared["charges"]:
+        raw, ct, rate, tax_method, tax_rate = item["raw"], item["charge_type"], item["rate"], item["tax_method"], item["tax_rate"]
+        if ct.calculation_method=="PERCENTAGE_OF_PRINCIPAL": gross=money(principal*Decimal(str(rate))/Decimal("100"))
+        elif ct.calculation_method=="FIXED_AMOUNT": gross=money(raw.get("amount", ct.default_amount))
+        else: gross=money(raw.get("amount"))
+        if gross < 0: raise AccountingError("negative charge amounts are not allowed")
         if tax_method=="TAX_INCLUSIVE" and tax_rate>0: net=money(gross/(Decimal("1")+tax_rate/Decimal("100"))); tax=money(gross-net)
         elif tax_method=="TAX_EXCLUSIVE" and tax_rate>0: net=gross; tax=money(gross*tax_rate/Decimal("100")); gross=money(net+tax)
         else: net=gross; tax=Decimal("0.00")
         subtotal+=net; tax_total+=tax; total+=gross
-        lines.append({"charge_type":ct,"description":raw.get("description") or ct.name,"gross_amount":gross,"tax_amount":tax,"net_charge_amount":net,"calculation_method":ct.calculation_method,"rate":Decimal(str(rate)) if rate is not None else None,"accounting_treatment":ct.accounting_treatment,"destination_account":dest,"tax_account":tax_acct})
-    require_setting = AccountingSetting.query.filter_by(setting_key="require_documentation_charge").first()
-    require_doc = setting_bool("require_documentation_charge", True) if require_setting else False
-    if require_doc and not any(l["charge_type"].code == "DOC_FEE" and l["gross_amount"] > 0 for l in lines):
+        lines.append({"charge_type":ct,"description":raw.get("description") or ct.name,"gross_amount":gross,"tax_amount":tax,"net_charge_amount":net,"calculation_method":ct.calculation_method,"rate":Decimal(str(rate)) if rate is not None else None,"accounting_treatment":ct.accounting_treatment,"destination_account":item["destination_account"],"tax_account":item["tax_account"]})
+    if prepared["require_doc"] and not any(l["charge_type"].code == "DOC_FEE" and l["gross_amount"] > 0 for l in lines):
         raise AccountingError("Documentation Charge is required for this loan.")
     net_disb=money(principal-total)
-    if total > principal and not allow_exceeding_principal: raise AccountingError("total deductions cannot exceed gross principal")
-    if net_disb <= 0 and not allow_zero_net: raise AccountingError("net disbursed amount must be greater than zero")
+    if total > principal and not prepared["allow_exceeding_principal"]: raise AccountingError("total deductions cannot exceed gross principal")
+    if net_disb <= 0 and not prepared["allow_zero_net"]: raise AccountingError("net disbursed amount must be greater than zero")
     return {"charge_lines":lines,"charges":[_charge_to_dict(l) for l in lines],"subtotal_before_tax":money(subtotal),"tax_amount":money(tax_total),"total_deductions":money(total),"total_disbursement_deductions":money(total),"net_disbursement":net_disb,"net_disbursed_amount":net_disb}
 
+def calculate_disbursement_charges(principal_amount, selected_charges, allow_exceeding_principal=None, allow_zero_net=None):
+    if money(principal_amount) <= 0: raise AccountingError("gross principal must be greater than zero")
+    return apply_disbursement_charges(principal_amount, prepare_disbursement_charges(selected_charges, allow_exceeding_principal, allow_zero_net))
+
 def preview_loan_disbursement(loan, charges=None, funding_account=None, disbursement_date=None):
     principal=money(getattr(loan,"gross_principal_amount",None) or loan.principal_amount); funding_account=validate_funding_account(funding_account or resolve_system_account("DEFAULT_DISBURSEMENT_ACCOUNT")); result=calculate_disbursement_charges(principal, charges or [])
     loan_receivable = resolve_system_account("LOAN_PRINCIPAL_RECEIVABLE")
@@ -1875,6 +1973,11 @@ def _default_disbursement_charges():
         return [{"charge_type_id": doc.id, "amount": doc.default_amount}]
     return []
 
+def required_disbursement_charges():
+    """Charges applied when a disbursement does not select any: the documentation fee, if it is required."""
+    require_setting = AccountingSetting.query.filter_by(setting_key="require_documentation_charge").first()
+    return _default_disbursement_charges() if require_setting and setting_bool("require_documentation_charge", True) else []
+
 def post_loan_disbursement(loan, user_id=None, funding_key="DEFAULT_DISBURSEMENT_ACCOUNT", funding_account=None, disbursement_date=None, charges=None, loan_application_id=None, transaction_method=None, reference=None, remarks=None):
     existing = AccountingJournalEntry.query.filter_by(idempotency_key=f"LOAN_DISBURSEMENT:{loan.id}").first()
     if existing:
@@ -1885,11 +1988,19 @@ def post_loan_disbursement(loan, user_id=None, funding_key="DEFAULT_DISBURSEMENT
     funding_account = validate_funding_account(funding_account or resolve_system_account(funding_key))
     journal_date = disbursement_date or loan.start_date or date.today(); require_open_accounting_period(journal_date)
     if charges is None:
-        require_setting = AccountingSetting.query.filter_by(setting_key="require_documentation_charge").first()
-        charges = _default_disbursement_charges() if require_setting and setting_bool("require_documentation_charge", True) else []
+        charges = required_disbursement_charges()
     preview = preview_loan_disbursement(loan, charges, funding_account, journal_date)
-    net = money(preview["net_disbursed_amount"]); deductions = money(preview["total_disbursement_deductions"])
-    lines = [{"account_id": resolve_system_account("LOAN_PRINCIPAL_RECEIVABLE").id, "debit": gross, "customer_id": loan.customer_id, "loan_id": loan.id}]
+    lines = _disbursement_journal_lines(loan, gross, preview, funding_account, resolve_system_account("LOAN_PRINCIPAL_RECEIVABLE"))
+    entry = create_draft_journal(journal_date, "Loan disbursement", lines, "LOAN_DISBURSEMENT", loan.id, "LOANS", user_id, f"LOAN_DISBURSEMENT:{loan.id}")
+    entry.loan_id = loan.id; entry.customer_id = loan.customer_id; entry.accounting_date = journal_date
+    posted = post_journal(entry, user_id)
+    _record_disbursement(loan, gross, preview, posted, user_id, loan_application_id, transaction_method, reference, remarks)
+    _accrue_backdated_disbursement(loan, journal_date, user_id)
+    return posted
+
+def _disbursement_journal_lines(loan, gross, preview, funding_account, receivable_account):
+    net = money(preview["net_disbursed_amount"])
+    lines = [{"account_id": receivable_account.id, "debit": gross, "customer_id": loan.customer_id, "loan_id": loan.id}]
     if net > 0: lines.append({"account_id": funding_account.id, "credit": net, "customer_id": loan.customer_id, "loan_id": loan.id})
     grouped={}
     for c in preview["charge_lines"]:
@@ -1897,38 +2008,74 @@ def post_loan_disbursement(loan, user_id=None, funding_key="DEFAULT_DISBURSEMENT
         if c["tax_amount"]>0: grouped[c["tax_account"].id]=grouped.get(c["tax_account"].id, Decimal("0.00"))+c["tax_amount"]
     for account_id, amount in grouped.items():
         if money(amount)>0: lines.append({"account_id":account_id,"credit":money(amount),"customer_id":loan.customer_id,"loan_id":loan.id})
-    entry = create_draft_journal(journal_date, "Loan disbursement", lines, "LOAN_DISBURSEMENT", loan.id, "LOANS", user_id, f"LOAN_DISBURSEMENT:{loan.id}")
-    entry.loan_id = loan.id; entry.customer_id = loan.customer_id; entry.accounting_date = journal_date
-    posted = post_journal(entry, user_id); loan.disbursement_journal_id = posted.id
-    for c in preview["charge_lines"]:
-        db.session.add(LoanDisbursementDeduction(loan_id=loan.id, loan_application_id=loan_application_id, charge_type_id=c["charge_type"].id, description=c["description"], gross_amount=c["gross_amount"], tax_amount=c["tax_amount"], net_charge_amount=c["net_charge_amount"], calculation_method=c["calculation_method"], rate=c["rate"], accounting_treatment=c["accounting_treatment"], destination_account_id=c["destination_account"].id, tax_account_id=c["tax_account"].id if c.get("tax_account") else None, status="POSTED", journal_entry_id=posted.id, created_by=user_id))
+    return lines
+
+def _record_disbursement(loan, gross, preview, posted, user_id, loan_application_id, transaction_method, reference, remarks):
+    net = money(preview["net_disbursed_amount"]); deductions = money(preview["total_disbursement_deductions"])
+    loan.disbursement_journal_id = posted.id
+    db.session.add_all([LoanDisbursementDeduction(loan_id=loan.id, loan_application_id=loan_application_id, charge_type_id=c["charge_type"].id, description=c["description"], gross_amount=c["gross_amount"], tax_amount=c["tax_amount"], net_charge_amount=c["net_charge_amount"], calculation_method=c["calculation_method"], rate=c["rate"], accounting_treatment=c["accounting_treatment"], destination_account_id=c["destination_account"].id, tax_account_id=c["tax_account"].id if c.get("tax_account") else None, status="POSTED", journal_entry_id=posted.id, created_by=user_id) for c in preview["charge_lines"]])
     loan.total_disbursement_deductions=deductions; loan.net_disbursed_amount=net; loan.disbursement_charge_count=len(preview["charge_lines"]); loan.disbursement_deductions_posted=bool(preview["charge_lines"])
     log_audit("DISBURSEMENT_CHARGES_POSTED", "Loan", loan.id, user_id, {"gross_principal_amount": str(gross), "total_deductions": str(deductions), "net_disbursed_amount": str(net), "transaction_method": transaction_method, "reference": reference, "remarks": remarks})
+
+def _accrue_backdated_disbursement(loan, journal_date, user_id):
     mode = getattr(loan, "historical_accrual_mode", None) or get_setting("backdated_loan_accounting_mode", "AUTO")
     if journal_date < date.today() and mode == "AUTO":
         as_of = min(date.today(), loan.maturity_date or loan.end_date or date.today())
         accrue_due_loan_interest(as_of, loan.id, historical=True, requested_by=user_id)
-    return posted
+
+def post_loan_disbursements_bulk(items, user_id=None, funding_account=None, disbursement_date=None, transaction_method=None, reference=None, remarks=None):
+    """Post the disbursement journals of many new loans; the batch form of ``post_loan_disbursement``.
+
+    ``items`` are ``(loan, charges, loan_application_id)`` with ``charges`` from
+    ``apply_disbursement_charges``.  Accounts are resolved once and the journals,
+    lines and deductions are written with one flush each.
+    """
+    journal_date = disbursement_date or date.today(); require_open_accounting_period(journal_date)
+    funding_account = validate_funding_account(funding_account or resolve_system_account("DEFAULT_DISBURSEMENT_ACCOUNT"))
+    receivable = resolve_system_account("LOAN_PRINCIPAL_RECEIVABLE")
+    specs = []
+    for loan, charges, _ in items:
+        gross = money(loan.gross_principal_amount or loan.principal_amount)
+        loan.gross_principal_amount = gross; loan.principal_amount = gross
+        specs.append({"journal_date": journal_date, "description": "Loan disbursement", "lines": _disbursement_journal_lines(loan, gross, charges, funding_account, receivable),
+                      "reference_type": "LOAN_DISBURSEMENT", "reference_id": loan.id, "source_module": "LOANS", "idempotency_key": f"LOAN_DISBURSEMENT:{loan.id}",
+                      "loan_id": loan.id, "customer_id": loan.customer_id})
+    journals = post_journals_bulk(specs, user_id)
+    for (loan, charges, application_id), posted in zip(items, journals):
+        _record_disbursement(loan, loan.gross_principal_amount, charges, posted, user_id, application_id, transaction_method, reference, remarks)
+    for loan, _, _ in items:
+        _accrue_backdated_disbursement(loan, journal_date, user_id)
+    return journals
 
 # Collector collection accounting
 COLLECTION_METHODS = {"CASH_COLLECTOR", "BANK_TRANSFER", "CASH_OFFICE", "CHEQUE", "MOBILE_TRANSFER", "OTHER"}
 COLLECTOR_DEPOSIT_STATUSES = {"NOT_APPLICABLE", "UNDEPOSITED", "PARTIALLY_DEPOSITED", "DEPOSITED", "REVERSED"}
 
 
-def _number(prefix, model, field, for_date):
+def _numbers(prefix, model, field, for_date, count):
     stem = f"{prefix}-{for_date:%Y%m%d}-"
     try:
         db.session.execute(text("select pg_advisory_xact_lock(hashtext(:p))"), {"p": stem})
     except Exception:
         pass
     last = db.session.query(func.max(getattr(model, field))).filter(getattr(model, field).like(stem + "%")).scalar()
-    return f"{stem}{(int(last.rsplit('-', 1)[1]) + 1 if last else 1):04d}"
+    first = int(last.rsplit('-', 1)[1]) + 1 if last else 1
+    return [f"{stem}{n:04d}" for n in range(first, first + count)]
+
+
+def _number(prefix, model, field, for_date):
+    return _numbers(prefix, model, field, for_date, 1)[0]
 
 
 def generate_receipt_number(payment_date):
     return _number("GROW-RCPT", Payment, "receipt_number", payment_date)
 
 
+def generate_receipt_numbers(payment_date, count):
+    """``count`` consecutive receipt numbers for ``payment_date`` from one lookup."""
+    return _numbers("GROW-RCPT", Payment, "receipt_number", payment_date, count)
+
+
 def generate_deposit_number(deposit_date):
     from .models import CollectionDepositBatch
     return _number("GROW-DEP", CollectionDepositBatch, "deposit_number", deposit_date)
@@ -2068,14 +2215,84 @@ def post_loan_payment(payment, user_id=None, receipt_account=None):
     payment.collection_method = method; payment.collection_account_id = receipt_account.id
     payment.receipt_number = payment.receipt_number or generate_receipt_number(pay_date)
     payment.bank_reference = payment.bank_reference or payment.transaction_reference
+    clearing_before = clearing_contribution(payment)
     payment.deposit_status = "UNDEPOSITED" if method == "CASH_COLLECTOR" else "NOT_APPLICABLE"
-    for ledger, typ, amt in getattr(loan, "_pending_allocations", []):
-        db.session.add(PaymentAllocation(payment_id=payment.id, loan_id=loan.id, ledger_id=ledger.id if ledger else None, allocation_type=typ, amount=money(amt)))
+    track_collector_clearing(payment, clearing_before)
+    allocation_rows = [{"payment_id": payment.id, "loan_id": loan.id, "ledger_id": ledger.id if ledger else None, "allocation_type": typ, "amount": money(amt)}
+                       for ledger, typ, amt in getattr(loan, "_pending_allocations", [])]
+    if allocation_rows: db.session.execute(insert(PaymentAllocation), allocation_rows)
     recalculate_and_settle_loan(loan.id, pay_date, payment.id, user_id)
     return posted
 
 
 
+def post_loan_payments_bulk(items, user_id=None, receipt_account=None):
+    """Post the journals of many new receipts; the batch form of ``post_loan_payment``.
+
+    ``items`` are ``(payment, allocations)`` with ``allocations`` the
+    ``loan._pending_allocations`` taken right after that receipt's
+    ``allocate_payment``.  System and receipt accounts are resolved once,
+    receipt numbers are reserved per date with one lookup, and the journals and
+    allocation rows are written with one flush each.  Settlement is re-evaluated
+    after each loan's last receipt and after every receipt that overpays.
+    """
+    resolved, validated = {}, {}
+
+    def system_account(key):
+        if key not in resolved: resolved[key] = resolve_system_account(key)
+        return resolved[key]
+
+    specs, posting = [], []
+    for payment, allocations in items:
+        total = money(payment.amount_collected); principal=money(payment.principal_paid); interest=money(payment.interest_paid); penalty=money(payment.penalty_paid); other=money(payment.other_fee_paid)
+        if money(principal+interest+penalty+other) != total: raise AccountingError("Payment allocation does not match amount collected")
+        method = (payment.collection_method or payment.payment_method or "CASH_OFFICE").upper()
+        if method == "CASH": method = "CASH_OFFICE"
+        if method == "BANK": method = "BANK_TRANSFER"
+        pay_date = payment.accounting_date or payment.payment_date or payment.collection_date
+        loan = payment.loan
+        if pay_date < loan.start_date:
+            raise AccountingError("Payment date cannot be before loan disbursement date")
+        account = receipt_account or system_account("DEFAULT_CASH_COLLECTION_ACCOUNT" if method == "CASH_OFFICE" else "DEFAULT_BANK_COLLECTION_ACCOUNT")
+        cache_key = (account.id, method, payment.collector_id)
+        if cache_key not in validated: validated[cache_key] = validate_collection_account(account, method, payment.collector_id)
+        account = validated[cache_key]
+        lines=[{"account_id": account.id, "debit": total, "customer_id": loan.customer_id, "loan_id": loan.id, "payment_id": payment.id}]
+        acct_method = getattr(loan, "interest_accounting_method", LOAN_ACCRUAL_METHOD)
+        is_overpayment = other > 0 and money(loan.total_paid - total) > 0
+        for key, amt in [("DELAY_INTEREST_RECEIVABLE" if acct_method == LOAN_ACCRUAL_METHOD else "DELAY_INTEREST_INCOME", penalty), ("INTEREST_RECEIVABLE" if acct_method == LOAN_ACCRUAL_METHOD else "LOAN_INTEREST_INCOME", interest), ("LOAN_PRINCIPAL_RECEIVABLE", principal)]:
+            if amt > 0: lines.append({"account_id": system_account(key).id, "credit": amt, "customer_id": loan.customer_id, "loan_id": loan.id, "payment_id": payment.id})
+        if other > 0:
+            if is_overpayment and "CUSTOMER_ADVANCE" not in resolved: resolved["CUSTOMER_ADVANCE"] = customer_advance_account()
+            lines.append({"account_id": (resolved["CUSTOMER_ADVANCE"] if is_overpayment else system_account("UNAPPLIED_CUSTOMER_FUNDS")).id, "credit": other, "customer_id": loan.customer_id, "loan_id": loan.id, "payment_id": payment.id})
+        customer_name = loan.customer.full_name if loan.customer else "Customer"
+        specs.append({"journal_date": pay_date, "description": f"Loan payment – {loan.loan_number} – {customer_name}", "lines": lines, "reference_type": "LOAN_PAYMENT",
+                      "reference_id": payment.id, "source_module": "PAYMENTS", "idempotency_key": f"LOAN_PAYMENT:{payment.id}", "loan_id": loan.id, "customer_id": loan.customer_id})
+        posting.append((payment, allocations, method, pay_date, account))
+    journals = post_journals_bulk(specs, user_id)
+
+    dates = sorted({pay_date for _, _, _, pay_date, _ in posting})
+    receipt_numbers = {d: iter(generate_receipt_numbers(d, sum(1 for p in posting if p[3] == d and not p[0].receipt_number))) for d in dates}
+    allocation_rows, last_receipt = [], {}
+    for (payment, allocations, method, pay_date, account), posted in zip(posting, journals):
+        log_audit("PAYMENT_JOURNAL_CREATE", "Payment", payment.id, user_id, {"journal_id": posted.id, "amount": f"{money(payment.amount_collected):.2f}"})
+        payment.journal_id = posted.id; payment.payment_date = pay_date; payment.accounting_date = pay_date
+        payment.collection_method = method; payment.collection_account_id = account.id
+        payment.receipt_number = payment.receipt_number or next(receipt_numbers[pay_date])
+        payment.bank_reference = payment.bank_reference or payment.transaction_reference
+        clearing_before = clearing_contribution(payment)
+        payment.deposit_status = "UNDEPOSITED" if method == "CASH_COLLECTOR" else "NOT_APPLICABLE"
+        track_collector_clearing(payment, clearing_before)
+        allocation_rows.extend({"payment_id": payment.id, "loan_id": payment.loan_id, "ledger_id": ledger.id if ledger else None, "allocation_type": typ, "amount": money(amt)}
+                               for ledger, typ, amt in allocations)
+        last_receipt[payment.loan_id] = payment
+    if allocation_rows: db.session.execute(insert(PaymentAllocation), allocation_rows)
+    for payment, _, _, pay_date, _ in posting:
+        if money(payment.other_fee_paid) > 0 or last_receipt[payment.loan_id] is payment:
+            recalculate_and_settle_loan(payment.loan_id, pay_date, payment.id, user_id)
+    return journals
+
+
 def repair_unposted_payment(payment_id, requested_by=None):
     payment = Payment.query.get(payment_id)
     if not payment:
@@ -2113,11 +2330,85 @@ def _payment_deposit_status(payment):
     return "UNDEPOSITED" if dep == 0 else "DEPOSITED" if dep >= amt else "PARTIALLY_DEPOSITED"
 
 
+def clearing_contribution(payment):
+    """Return the (collections, deposits) a receipt adds to its collector's clearing balance."""
+    if not payment.collector_id or payment.reversed_at or (payment.deposit_status or "NOT_APPLICABLE") == "NOT_APPLICABLE":
+        return Decimal("0.00"), Decimal("0.00")
+    amount = money(payment.amount_collected)
+    # A reconciled collection sheet clears the full receipt, including expense-funded cash.
+    return amount, amount if payment.collection_clearance_status == "CLEARED" else money(payment.deposited_amount)
+
+
+def collector_clearing_aggregate(collector_ids=None, as_of_date=None):
+    """Per-collector (collections, deposits) from receipts in one GROUP BY; the verification source."""
+    deposits = case((Payment.collection_clearance_status == "CLEARED", Payment.amount_collected), else_=Payment.deposited_amount)
+    q = db.session.query(Payment.collector_id, func.coalesce(func.sum(Payment.amount_collected), 0), func.coalesce(func.sum(deposits), 0)).filter(
+        Payment.collector_id.isnot(None), Payment.reversed_at.is_(None), Payment.deposit_status != "NOT_APPLICABLE")
+    if collector_ids is not None: q = q.filter(Payment.collector_id.in_(list(collector_ids)))
+    if as_of_date: q = q.filter(Payment.collection_date <= as_of_date)
+    return {collector_id: (money(c), money(d)) for collector_id, c, d in q.group_by(Payment.collector_id).all()}
+
+
+def adjust_collector_clearing(collector_id, collections=Decimal("0"), deposits=Decimal("0")):
+    """Apply a movement to the maintained balance inside the caller's transaction."""
+    if not collector_id or (not money(collections) and not money(deposits)):
+        return
+    row = db.session.get(CollectorClearingBalance, collector_id, with_for_update=True, populate_existing=True)
+    if row is None:
+        # First maintained movement: seed from receipts, which already include this change.
+        c, d = collector_clearing_aggregate([collector_id]).get(collector_id, (Decimal("0.00"), Decimal("0.00")))
+        db.session.add(CollectorClearingBalance(collector_id=collector_id, collections=c, deposits=d))
+        return
+    row.collections = money(Decimal(row.collections or 0) + collections)
+    row.deposits = money(Decimal(row.deposits or 0) + deposits)
+
+
+def track_collector_clearing(payment, before):
+    """Record the change in a receipt's clearing contribution since ``before``."""
+    after = clearing_contribution(payment)
+    adjust_collector_clearing(payment.collector_id, after[0] - before[0], after[1] - before[1])
+    mark_payment(payment)
+
+
+def verify_collector_clearing_balances(repair=False):
+    """Compare maintained balances with the receipt aggregate; optionally repair drift."""
+    actual = collector_clearing_aggregate()
+    rows = {row.collector_id: row for row in CollectorClearingBalance.query.all()}
+    mismatches = []
+    for collector_id in sorted(set(actual) | set(rows)):
+        c, d = actual.get(collector_id, (Decimal("0.00"), Decimal("0.00")))
+        row = rows.get(collector_id)
+        stored = (money(row.collections), money(row.deposits)) if row else None
+        if stored == (c, d): continue
+        mismatches.append({"collector_id": collector_id, "stored_collections": f"{stored[0]:.2f}" if stored else None,
+                           "stored_deposits": f"{stored[1]:.2f}" if stored else None,
+                           "collections": f"{c:.2f}", "deposits": f"{d:.2f}"})
+        if repair:
+            row = row or CollectorClearingBalance(collector_id=collector_id)
+            row.collections, row.deposits = c, d
+            db.session.add(row)
+    return {"checked": len(set(actual) | set(rows)), "mismatches": mismatches, "repaired": bool(repair and mismatches)}
+
+
+def collector_clearing_positions(collector_ids):
+    """Maintained (collections, deposits) per collector, aggregated only where no balance row exists yet."""
+    collector_ids = list(collector_ids)
+    positions = {row.collector_id: (money(row.collections), money(row.deposits))
+                 for row in CollectorClearingBalance.query.filter(CollectorClearingBalance.collector_id.in_(collector_ids)).all()}
+    missing = [cid for cid in collector_ids if cid not in positions]
+    if missing: positions.update(collector_clearing_aggregate(missing))
+    return positions
+
+
 def collector_cash_position(collector_id, as_of_date=None):
-    q = Payment.query.filter(Payment.collector_id == collector_id, Payment.reversed_at.is_(None), Payment.deposit_status != "NOT_APPLICABLE")
+    if as_of_date is None:
+        collections, deposits = collector_clearing_positions([collector_id]).get(collector_id, (Decimal("0.00"), Decimal("0.00")))
+    else:
+        collections, deposits = collector_clearing_aggregate([collector_id], as_of_date).get(collector_id, (Decimal("0.00"), Decimal("0.00")))
+    q = Payment.query.filter(Payment.collector_id == collector_id, Payment.reversed_at.is_(None), Payment.deposit_status != "NOT_APPLICABLE",
+                             Payment.collection_clearance_status != "CLEARED", Payment.amount_collected - Payment.deposited_amount > Decimal("0.01"))
     if as_of_date: q = q.filter(Payment.collection_date <= as_of_date)
-    payments = q.all(); collections=sum((money(p.amount_collected) for p in payments), Decimal("0.00")); deposits=sum((money(p.amount_collected) if p.collection_clearance_status == "CLEARED" else money(p.deposited_amount) for p in payments), Decimal("0.00"))
-    return {"collections": money(collections), "deposits": money(deposits), "adjustments": Decimal("0.00"), "closing_balance": money(collections-deposits), "undeposited_payments": [p for p in payments if p.collection_clearance_status != "CLEARED" and money(p.undeposited_amount) > Decimal("0.01")]}
+    return {"collections": collections, "deposits": deposits, "adjustments": Decimal("0.00"), "closing_balance": money(collections-deposits), "undeposited_payments": q.order_by(Payment.collection_date, Payment.id).all()}
 
 
 def _validation_payload(exc):
@@ -2155,18 +2446,20 @@ def _parse_deposit_date(value):
     return parsed
 
 
-def _active_deposited_amount(payment_id):
-    """Return allocations which still consume the payment's bankable balance."""
+def _active_deposited_amounts(payment_ids):
+    """Return, per payment, allocations which still consume its bankable balance."""
     from .models import CollectionDepositBatch
 
-    value = db.session.query(func.coalesce(func.sum(CollectionDepositAllocation.allocated_amount), 0)).join(
+    if not payment_ids:
+        return {}
+    rows = db.session.query(CollectionDepositAllocation.payment_id, func.coalesce(func.sum(CollectionDepositAllocation.allocated_amount), 0)).join(
         CollectionDepositBatch,
         CollectionDepositBatch.id == CollectionDepositAllocation.deposit_batch_id,
     ).filter(
-        CollectionDepositAllocation.payment_id == payment_id,
+        CollectionDepositAllocation.payment_id.in_(list(payment_ids)),
         CollectionDepositBatch.status != "REVERSED",
-    ).scalar()
-    return money(value)
+    ).group_by(CollectionDepositAllocation.payment_id).all()
+    return {payment_id: money(value) for payment_id, value in rows}
 
 
 def _partial_deposits_allowed():
@@ -2237,7 +2530,7 @@ def validate_collection_deposit_payload(data, *, lock_payments=False):
     allocations = data.get("allocations") or []
     if not isinstance(allocations, list):
         raise ValidationError("allocations must be a list")
-    seen = set(); total = Decimal("0.00"); rows = []
+    seen = set(); total = Decimal("0.00"); rows = []; requested = []
     allow_partial_deposits = _partial_deposits_allowed()
     earliest_payment_date = None
     for idx, raw in enumerate(allocations):
@@ -2250,10 +2543,16 @@ def validate_collection_deposit_payload(data, *, lock_payments=False):
         amt = money(raw.get("amount"))
         if amt <= 0:
             raise ValidationError("Allocation amount must be greater than zero", payment_id=payment_id)
-        payment_query = Payment.query.filter_by(id=payment_id)
-        if lock_payments:
-            payment_query = payment_query.with_for_update()
-        payment = payment_query.populate_existing().one_or_none()
+        requested.append((payment_id, amt))
+    # One ordered lock statement and one grouped lookup for the whole deposit;
+    # ascending ids keep concurrent deposits from deadlocking each other.
+    payment_query = Payment.query.filter(Payment.id.in_(seen)).order_by(Payment.id)
+    if lock_payments:
+        payment_query = payment_query.with_for_update()
+    payments = {payment.id: payment for payment in payment_query.populate_existing().all()}
+    deposited = _active_deposited_amounts(seen)
+    for payment_id, amt in requested:
+        payment = payments.get(payment_id)
         if not payment:
             raise ValidationError("Payment not found", payment_id=payment_id)
         payment_date = payment.accounting_date or payment.payment_date or payment.collection_date
@@ -2268,7 +2567,7 @@ def validate_collection_deposit_payload(data, *, lock_payments=False):
             raise ValidationError("Payment must be posted with a journal before deposit", payment_id=payment_id)
         if payment.reversed_at or payment.deposit_status in ("NOT_APPLICABLE", "REVERSED"):
             raise ValidationError("Payment is not depositable", payment_id=payment_id)
-        already_deposited = _active_deposited_amount(payment.id)
+        already_deposited = deposited.get(payment.id, money(0))
         amount_collected = money(payment.amount_collected)
         remaining = money(amount_collected - already_deposited)
         if payment.collection_clearance_status == "CLEARED" or remaining <= Decimal("0.00"):
@@ -2330,11 +2629,14 @@ def create_collection_deposit(data, user_id=None):
         bank_reference=data.get("bank_reference"), deposit_slip_reference=data.get("deposit_slip_reference"), remarks=data.get("remarks"),
         created_by=user_id, status="POSTED")
     db.session.add(batch); db.session.flush()
+    db.session.execute(insert(CollectionDepositAllocation), [
+        {"deposit_batch_id": batch.id, "payment_id": row["payment"].id, "allocated_amount": row["amount"]} for row in validated["rows"]])
+    db.session.expire(batch, ["allocations"])
     for row in validated["rows"]:
-        p = row["payment"]; amt = row["amount"]
-        db.session.add(CollectionDepositAllocation(deposit_batch_id=batch.id, payment_id=p.id, allocated_amount=amt))
-        p.deposited_amount = money(row["already_deposited"] + amt)
-        p.deposit_status = _payment_deposit_status(p)
+        p = row["payment"]
+        p.deposited_amount = money(row["already_deposited"] + row["amount"])
+        p.deposit_status = _payment_deposit_status(p); mark_payment(p)
+    adjust_collector_clearing(batch.collector_id, deposits=total)
     # Surface constraint/data errors here, before journal idempotency queries
     # can trigger an incidental autoflush.
     db.session.flush()
@@ -2356,7 +2658,9 @@ def reverse_collection_deposit(batch, reversal_date, reason, user_id=None):
     entry=AccountingJournalEntry.query.get(batch.journal_entry_id)
     rev=reverse_journal(entry, reversal_date, reason, user_id)
     for alloc in batch.allocations:
-        p=alloc.payment; p.deposited_amount=money(Decimal(p.deposited_amount or 0)-Decimal(alloc.allocated_amount)); p.deposit_status=_payment_deposit_status(p)
+        p=alloc.payment; before=clearing_contribution(p)
+        p.deposited_amount=money(Decimal(p.deposited_amount or 0)-Decimal(alloc.allocated_amount)); p.deposit_status=_payment_deposit_status(p)
+        track_collector_clearing(p, before)
     batch.status="REVERSED"; batch.reversed_at=datetime.utcnow(); batch.reversal_reason=reason; batch.reversal_journal_id=rev.id; log_audit("COLLECTION_DEPOSIT_REVERSE", "CollectionDepositBatch", batch.id, user_id, reason)
     return rev
 
@@ -2365,11 +2669,111 @@ _old_reverse_payment_impl = reverse_payment
 def reverse_payment(payment, reversal_date, reason, user_id=None):
     if money(getattr(payment, "deposited_amount", 0)) > 0:
         raise AccountingError("Cannot reverse a payment already included in a posted deposit batch; reverse the deposit first")
+    lock_loan(payment.loan_id)
+    before = clearing_contribution(payment)
     rev = _old_reverse_payment_impl(payment, reversal_date, reason, user_id)
     payment.status = "REVERSED"; payment.deposit_status = "REVERSED"; payment.reversed_by = user_id
+    track_collector_clearing(payment, before)
     credit = CustomerCreditBalance.query.filter_by(payment_id=payment.id).first()
     if credit:
         credit.status = "REVERSED"
         credit.available_amount = Decimal("0.00")
     recalculate_and_settle_loan(payment.loan_id, reversal_date, None, user_id)
     return rev
+
+
+def reverse_payments_bulk(payments, reversal_date, reason, user_id=None):
+    """Reverse many receipts together; the batch form of ``reverse_payment``.
+
+    The affected loans are locked in id order before anything is written, so
+    overlapping bulk reversals cannot deadlock.  Reversal journals are posted
+    with ``post_journals_bulk``, ledger paid amounts are rolled back by one
+    executemany UPDATE built from a GROUP BY over the allocations, and each loan
+    is re-settled once.  Nothing is written unless every receipt can be
+    reversed.  Returns the reversal journals in ``payments`` order.
+    """
+    if not reason: raise AccountingError("Reversal reason is required")
+    if isinstance(reversal_date, str): reversal_date = date.fromisoformat(reversal_date)
+    require_open_accounting_period(reversal_date)
+    payments = list(payments)
+    if not payments: return []
+    for payment in payments:
+        if payment.reversed_at: raise AccountingError(f"Payment {payment.id} is already reversed")
+        if money(payment.deposited_amount) > 0:
+            raise AccountingError(f"Payment {payment.id} is included in a posted deposit batch; reverse the deposit first")
+    loans = lock_loans(p.loan_id for p in payments)
+
+    by_id = {e.id: e for e in AccountingJournalEntry.query.options(selectinload(AccountingJournalEntry.lines)).filter(
+        AccountingJournalEntry.id.in_([p.journal_id for p in payments if p.journal_id]))}
+    unlinked = [str(p.id) for p in payments if not p.journal_id]
+    by_ref = {e.reference_id: e for e in AccountingJournalEntry.query.options(selectinload(AccountingJournalEntry.lines)).filter(
+        AccountingJournalEntry.reference_type == "LOAN_PAYMENT", AccountingJournalEntry.reference_id.in_(unlinked))} if unlinked else {}
+    entries = []
+    for payment in payments:
+        entry = by_id.get(payment.journal_id) if payment.journal_id else by_ref.get(str(payment.id))
+        if not entry: raise AccountingError(f"Payment {payment.id} journal not found")
+        if entry.status not in {"POSTED", "REVERSED"}: raise AccountingError("Only posted journals can be reversed")
+        entries.append(entry)
+    reversals = post_journals_bulk([{
+        "journal_date": reversal_date, "description": reason, "reference_type": "REVERSAL", "reference_id": entry.id, "source_module": entry.source_module,
+        "idempotency_key": f"REVERSAL:{entry.id}", "loan_id": entry.loan_id, "customer_id": entry.customer_id,
+        "lines": [{"account_id": line.account_id, "debit": money(line.credit), "credit": money(line.debit), "customer_id": line.customer_id, "loan_id": line.loan_id,
+                   "payment_id": line.payment_id, "collection_id": line.collection_id, "description": line.description} for line in entry.lines]}
+        for entry in entries], user_id)
+    now = datetime.utcnow()
+    for entry, rev in zip(entries, reversals):
+        rev.is_reversal = True; rev.reversal_of_id = rev.reversal_of_journal_id = entry.id
+        if entry.status != "REVERSED":
+            entry.status = "REVERSED"; entry.reversed_at = now; entry.reversal_journal_id = rev.id
+            log_audit("JOURNAL_REVERSE", "AccountingJournalEntry", entry.id, user_id, {"reversal_id": rev.id, "journal_no": entry.journal_no, "reason": reason})
+
+    payment_ids = [p.id for p in payments]
+    def reversed_amount(kind):
+        return func.sum(case((PaymentAllocation.allocation_type == kind, PaymentAllocation.amount), else_=0))
+    ledgers = (db.session.query(PaymentAllocation.ledger_id, LoanLedger.loan_id, LoanLedger.due_date, LoanLedger.installment_no,
+                                reversed_amount("PRINCIPAL"), reversed_amount("INTEREST"), reversed_amount("DELAY_INTEREST"))
+               .join(LoanLedger, LoanLedger.id == PaymentAllocation.ledger_id).filter(PaymentAllocation.payment_id.in_(payment_ids))
+               .group_by(PaymentAllocation.ledger_id, LoanLedger.loan_id, LoanLedger.due_date, LoanLedger.installment_no).all())
+    if ledgers:
+        table = LoanLedger.__table__
+        principal = func.coalesce(table.c.principal_paid, 0) - bindparam("less_principal")
+        interest = func.coalesce(table.c.interest_paid, 0) - bindparam("less_interest")
+        delay = func.coalesce(table.c.delay_interest_paid, 0) - bindparam("less_delay")
+        paid = principal + interest + delay
+        db.session.execute(table.update().where(table.c.id == bindparam("ledger_id")).values(
+            principal_paid=principal, interest_paid=interest, delay_interest_paid=delay, paid_amount=paid, status=case((paid > 0, "PARTIAL"), else_="PENDING")),
+            [{"ledger_id": ledger_id, "less_principal": money(p), "less_interest": money(i), "less_delay": money(d)} for ledger_id, _, _, _, p, i, d in ledgers])
+        # The UPDATE bypassed the ORM: refresh loaded rows and move the allocation cursors back by hand.
+        touched = {row[0] for row in ledgers}
+        for obj in list(db.session.identity_map.values()):
+            if isinstance(obj, LoanLedger) and obj.id in touched: db.session.expire(obj)
+        for _, loan_id, due_date, installment_no, *_ in ledgers:
+            rewind_allocation_cursor(loans[loan_id], (due_date, installment_no))
+
+    movements = {}
+    for payment, rev in zip(payments, reversals):
+        before = clearing_contribution(payment)
+        payment.reversed_at = now; payment.reversal_journal_id = rev.id; payment.reversal_reason = reason
+        payment.status = "REVERSED"; payment.deposit_status = "REVERSED"; payment.reversed_by = user_id
+        after = clearing_contribution(payment)
+        if payment.collector_id:
+            c, d = movements.get(payment.collector_id, (Decimal("0"), Decimal("0")))
+            movements[payment.collector_id] = (c + after[0] - before[0], d + after[1] - before[1])
+        mark_payment(payment)
+        log_audit("PAYMENT_REVERSE", "Payment", payment.id, user_id, reason)
+    for collector_id in sorted(movements):
+        adjust_collector_clearing(collector_id, *movements[collector_id])
+    db.session.execute(update(CustomerCreditBalance).where(CustomerCreditBalance.payment_id.in_(payment_ids)).values(status="REVERSED", available_amount=Decimal("0.00")))
+    for loan_id in sorted(loans):
+        recalculate_and_settle_loan(loan_id, reversal_date, None, user_id)
+    return reversals
+
+
+def payments_to_reverse(payment_ids=None, deposit_batch_id=None):
+    """Receipts selected by id and/or by the deposit batch that carried them, ordered by id."""
+    query = Payment.query
+    if deposit_batch_id:
+        query = query.filter(Payment.id.in_(db.session.query(CollectionDepositAllocation.payment_id).filter(CollectionDepositAllocation.deposit_batch_id == deposit_batch_id)))
+    if payment_ids:
+        query = query.filter(Payment.id.in_(payment_ids))
+    return query.order_by(Payment.id).all() if payment_ids or deposit_batch_id else []
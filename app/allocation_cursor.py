@@ -0,0 +1,108 @@
+"""Per-loan payment allocation cursor.
+
+A loan's ``allocation_cursor_due_date``/``allocation_cursor_installment`` mark
+a position in the allocation order ``(due_date, installment_no)`` such that
+every installment before it is settled: nothing left for the waterfall to pay
+and nothing for it to rewrite.  ``allocate_payment`` reads the ledger from the
+cursor one page at a time, so a receipt touches the installments it pays (plus
+at most one page) however long the loan has been running, and then moves the
+cursor to the first installment that is still open.
+
+The cursor only has to move back when an installment before it stops being
+settled.  Every ORM change to a ledger row goes through ``_rewind_cursors``,
+which covers payment reversals, ledger recalculation and settlement
+reconciliation; code that rewrites ledger rows with Core statements must call
+``rewind`` or ``reset_cursor`` itself.  A NULL cursor is always safe: it scans
+from the first installment.
+"""
+from sqlalchemy import event, inspect, tuple_
+
+from .extensions import db
+from .loan_terms import money
+from .models import Loan, LoanLedger
+
+PAGE_SIZE = 8
+# Columns whose change can turn a settled installment back into an open one.
+_WATCHED = ("principal_amount", "interest_amount", "principal_paid", "interest_paid", "paid_amount", "status", "paid_date")
+
+
+def position(entry):
+    return entry.due_date, entry.installment_no
+
+
+def cursor(loan):
+    if loan.allocation_cursor_installment is None or loan.allocation_cursor_due_date is None:
+        return None
+    return loan.allocation_cursor_due_date, loan.allocation_cursor_installment
+
+
+def move_cursor(loan, entry):
+    loan.allocation_cursor_due_date, loan.allocation_cursor_installment = position(entry)
+
+
+def reset_cursor(loan):
+    loan.allocation_cursor_due_date = loan.allocation_cursor_installment = None
+
+
+def rewind(loan, pos):
+    """Move the cursor back to ``pos`` when it is past it."""
+    current = cursor(loan)
+    if current is not None and pos < current:
+        loan.allocation_cursor_due_date, loan.allocation_cursor_installment = pos
+
+
+def is_settled(entry):
+    """True when the allocation waterfall would neither pay nor change ``entry``."""
+    principal_paid, interest_paid = money(entry.principal_paid or 0), money(entry.interest_paid or 0)
+    return (principal_paid == money(entry.principal_amount) and interest_paid == money(entry.interest_amount)
+            and entry.status == "PAID" and entry.paid_date is not None
+            and money(entry.paid_amount or 0) == money(principal_paid + interest_paid))
+
+
+def open_entries(loan, page_size=PAGE_SIZE):
+    """Yield ledger rows from the cursor on, in allocation order, one query per page."""
+    start, inclusive = cursor(loan), True
+    while True:
+        query = LoanLedger.query.filter(LoanLedger.loan_id == loan.id)
+        if start is not None:
+            key = tuple_(LoanLedger.due_date, LoanLedger.installment_no)
+            query = query.filter(key >= tuple_(*start) if inclusive else key > tuple_(*start))
+        page = query.order_by(LoanLedger.due_date, LoanLedger.installment_no).limit(page_size).all()
+        yield from page
+        if len(page) < page_size:
+            return
+        start, inclusive = position(page[-1]), False
+
+
+def advance(loan, visited):
+    """Place the cursor after allocating over ``visited`` (rows in allocation order)."""
+    if not visited:
+        return
+    move_cursor(loan, next((e for e in visited if not is_settled(e)), visited[-1]))
+
+
+@event.listens_for(db.session, "before_flush")
+def _rewind_cursors(session, flush_context, instances):
+    earliest = {}
+    for entry in list(session.new) + list(session.dirty):
+        if not isinstance(entry, LoanLedger) or entry.loan_id is None or entry.due_date is None:
+            continue
+        if entry not in session.new:
+            state = inspect(entry)
+            if not any(state.attrs[name].history.has_changes() for name in _WATCHED):
+                continue
+        if is_settled(entry):
+            continue
+        if entry.loan_id not in earliest or position(entry) < earliest[entry.loan_id]:
+            earliest[entry.loan_id] = position(entry)
+    if not earliest:
+        return
+    identity = session.identity_map
+    loans = {loan_id: identity.get(Loan.__mapper__.identity_key_from_primary_key([loan_id])) for loan_id in earliest}
+    missing = [loan_id for loan_id, loan in loans.items() if loan is None]
+    if missing:
+        with session.no_autoflush:
+            loans.update({loan.id: loan for loan in session.query(Loan).filter(Loan.id.in_(missing))})
+    for loan_id, pos in earliest.items():
+        if loans.get(loan_id) is not None:
+            rewind(loans[loan_id], pos)
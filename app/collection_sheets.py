@@ -2,16 +2,20 @@
 from datetime import date, datetime
 from decimal import Decimal, InvalidOperation
 
-from sqlalchemy import func, or_, text
+from sqlalchemy import exists, func, insert, or_, text
 
 from .extensions import db
 from .models import (AccountingAccount, AccountingJournalEntry, AccountingJournalLine, CollectionSheet,
-                     CollectionSheetExpense, CollectionSheetItem, Customer, Loan,
+                     CollectionSheetExpense, CollectionSheetItem, Customer, Loan, LoanLedger,
                      Payment, User, CollectionDepositAllocation)
+from .loan_locks import lock_loans
+from .loan_schedule import materialize_due
+from .loan_search import DEFAULT_RESULTS, due_aggregates, find_loans
 from .accounting import (AccountingError, account_subtype, allocate_payment,
                          create_draft_journal, is_active_account, is_posting_account,
                          log_audit, money, post_journal, post_loan_payment,
-                         reverse_journal, reverse_payment, validate_collection_account)
+                         reverse_journal, reverse_payments_bulk, track_collector_clearing,
+                         clearing_contribution, validate_collection_account)
 
 EDITABLE = {"DRAFT"}
 POSTED = {"POSTED", "RECONCILED", "REVERSED"}
@@ -149,6 +153,7 @@ def approve_and_post(sheet_id, user_id):
     if sheet.status != "SUBMITTED": raise SheetError("Only SUBMITTED sheets may be approved", 409)
     validate(sheet, submitted=True)
     clearing = db.session.get(AccountingAccount, sheet.collector.default_collection_account_id)
+    lock_loans(item.loan_id for item in sheet.items if not item.payment_id)
     try:
         for item in sheet.items:
             if item.payment_id: continue
@@ -209,9 +214,11 @@ def clear_reconciled_payments(sheet):
             bank_share = min(amount, remaining)
         else:
             bank_share = min(amount, money(remaining * amount / remaining_gross))
+        before = clearing_contribution(payment)
         payment.deposited_amount = bank_share
         payment.deposit_status = "DEPOSITED" if bank_share >= amount else "PARTIALLY_DEPOSITED"
         payment.collection_clearance_status = "CLEARED"
+        track_collector_clearing(payment, before)
         payment.collection_sheet_id = sheet.id
         payment.collection_sheet_deposit_journal_id = sheet.bank_journal_id
         remaining -= bank_share
@@ -365,24 +372,61 @@ def reverse(sheet, user_id, reason, reversal_date=None):
     if sheet.bank_journal_id: reverse_journal(db.session.get(AccountingJournalEntry, sheet.bank_journal_id), reversal_date, reason, user_id)
     for expense in sheet.expenses:
         if expense.journal_entry_id: reverse_journal(db.session.get(AccountingJournalEntry, expense.journal_entry_id), reversal_date, reason, user_id)
+    payments = []
     for item in sheet.items:
         if item.payment_id:
-            payment = db.session.get(Payment, item.payment_id)
+            payment = db.session.get(Payment, item.payment_id); before = clearing_contribution(payment)
             payment.deposited_amount = Decimal("0.00"); payment.collection_clearance_status = "UNDEPOSITED"
+            track_collector_clearing(payment, before)
             payment.collection_sheet_deposit_journal_id = None
-            reverse_payment(payment, reversal_date, reason, user_id); item.posting_status = "REVERSED"
+            payments.append(payment); item.posting_status = "REVERSED"
+    reverse_payments_bulk([p for p in payments if not p.reversed_at], reversal_date, reason, user_id)
     sheet.status = "REVERSED"; sheet.reversed_at = datetime.utcnow(); sheet.reversed_by_id = user_id; sheet.reversal_reason = reason
     log_audit("COLLECTION_SHEET_REVERSE", "CollectionSheet", sheet.id, user_id, {"reason": reason})
     db.session.commit(); return serialize(sheet, True)
 
 
-def search_loans(query):
-    q = (query or "").strip()
-    if not q: return []
-    pattern = f"%{q}%"
-    loans = Loan.query.join(Customer).filter(or_(Loan.loan_number.ilike(pattern), Customer.full_name.ilike(pattern),
-                                                  Customer.nic_number.ilike(pattern), Customer.mobile.ilike(pattern))).limit(20).all()
-    return [{"loan_id": l.id, "loan_number": l.loan_number, "customer_id": l.customer_id,
-             "customer_name": l.customer.full_name, "nic": l.customer.nic_number, "mobile": l.customer.mobile,
-             "loan_status": l.status, "contractual_outstanding": f"{money(l.outstanding):.2f}",
-             "delay_interest_outstanding": f"{money(sum((Decimal(x.delay_interest_accrued or 0) - Decimal(x.delay_interest_paid or 0) for x in l.ledger_entries), Decimal('0'))):.2f}"} for l in loans]
+def due_collections(as_of, collector_id=None, exclude_sheet_id=None):
+    """Contractual amount due on or before ``as_of`` per eligible loan, in one aggregate.
+
+    ``collector_id`` limits the result to the collector's route, i.e. loans the
+    collector has already collected for.  Loans already on ``exclude_sheet_id``
+    are skipped so regeneration never conflicts with manually added lines.
+    """
+    due = (LoanLedger.principal_amount + LoanLedger.interest_amount - LoanLedger.principal_paid
+           - LoanLedger.interest_paid - LoanLedger.waived_interest_amount)
+    query = (db.session.query(LoanLedger.loan_id, Loan.customer_id, func.sum(due).label("due"),
+                              func.min(LoanLedger.due_date).label("oldest_due"))
+             .join(Loan, Loan.id == LoanLedger.loan_id)
+             .filter(LoanLedger.due_date <= as_of, LoanLedger.status != "PAID",
+                     func.upper(func.trim(Loan.status)).in_(ELIGIBLE_LOANS)))
+    if collector_id:
+        query = query.filter(exists().where(Payment.loan_id == Loan.id, Payment.collector_id == collector_id))
+    if exclude_sheet_id:
+        query = query.filter(~exists().where(CollectionSheetItem.loan_id == Loan.id,
+                                             CollectionSheetItem.collection_sheet_id == exclude_sheet_id))
+    rows = query.group_by(LoanLedger.loan_id, Loan.customer_id).having(func.sum(due) > 0).order_by(LoanLedger.loan_id).all()
+    return [{"loan_id": r.loan_id, "customer_id": r.customer_id, "amount": money(r.due), "oldest_due_date": r.oldest_due} for r in rows]
+
+
+def generate_items(sheet, as_of=None, route_only=True):
+    """Pre-fill a draft sheet with every due/overdue loan using one bulk INSERT."""
+    ensure_draft(sheet)
+    materialize_due(as_of or sheet.collection_date)
+    rows = due_collections(as_of or sheet.collection_date, sheet.collector_id if route_only else None, sheet.id)
+    if rows:
+        db.session.execute(insert(CollectionSheetItem), [{"collection_sheet_id": sheet.id, "loan_id": r["loan_id"],
+                                                          "customer_id": r["customer_id"], "amount": r["amount"]} for r in rows])
+        db.session.expire(sheet, ["items"])
+    recalculate(sheet)
+    return {"generated": len(rows), "amount": f"{money(sum((r['amount'] for r in rows), Decimal('0'))):.2f}"}
+
+
+def search_loans(query, limit=None):
+    """Ranked, capped loan lookup for sheet entry; dues come from one aggregate over the matches."""
+    rows = find_loans(query, limit or DEFAULT_RESULTS, ELIGIBLE_LOANS)
+    dues = due_aggregates([r.id for r in rows])
+    return [{"loan_id": r.id, "loan_number": r.loan_number, "customer_id": r.customer_id,
+             "customer_name": r.full_name, "nic": r.nic_number, "mobile": r.mobile, "loan_status": r.status,
+             "contractual_outstanding": f"{money(dues[r.id]['outstanding']):.2f}",
+             "delay_interest_outstanding": f"{money(dues[r.id]['delay_interest_outstanding']):.2f}"} for r in rows]
@@ -0,0 +1,141 @@
+"""Collector performance rollups.
+
+One ``collector_daily_performance`` row per collector and collection day holds
+the instalments due on the collector's route, receipts, visits and the
+amount-weighted deposit lag.  Posting paths mark the (collector, day) buckets
+they touch; every marked bucket is recomputed from source once, when the
+session commits.  Days without any collection activity (missed routes) are
+populated by ``flask rebuild-collector-performance``.
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+
+from sqlalchemy import func, insert, select
+
+from . import read_models
+from .extensions import db
+from .models import (CollectionDepositAllocation, CollectionDepositBatch, CollectionSheet,
+                     CollectorDailyPerformance, LoanLedger, Payment)
+
+FIELDS = ("expected_amount", "collected_amount", "receipt_count", "visit_count", "deposited_amount", "deposit_lag_amount_days")
+ZERO = Decimal("0.00")
+
+
+def _money(value):
+    return Decimal(str(value or 0)).quantize(Decimal("0.01"))
+
+
+def mark_collector_day(collector_id, day):
+    if collector_id and day:
+        read_models.pending_changes(db.session, "collector_performance")["days"].add((collector_id, day))
+
+
+def mark_payment(payment):
+    mark_collector_day(payment.collector_id, payment.collection_date)
+
+
+def _in_range(column, date_from, date_to):
+    return [column >= date_from, column <= date_to]
+
+
+def compute_buckets(date_from, date_to, collector_id=None):
+    """Aggregate every (collector, day) in the range with one GROUP BY per source."""
+    buckets = {}
+
+    def bucket(cid, day):
+        return buckets.setdefault((cid, day), {"expected_amount": ZERO, "collected_amount": ZERO, "receipt_count": 0, "visit_count": 0,
+                                               "deposited_amount": ZERO, "deposit_lag_amount_days": ZERO})
+
+    receipts = [Payment.collector_id.isnot(None), Payment.reversed_at.is_(None), *_in_range(Payment.collection_date, date_from, date_to)]
+    if collector_id: receipts.append(Payment.collector_id == collector_id)
+    for cid, day, amount, count, visits in (db.session.query(Payment.collector_id, Payment.collection_date, func.sum(Payment.amount_collected),
+                                                             func.count(Payment.id), func.count(func.distinct(Payment.loan_id)))
+                                            .filter(*receipts).group_by(Payment.collector_id, Payment.collection_date)):
+        row = bucket(cid, day); row.update(collected_amount=_money(amount), receipt_count=count, visit_count=visits)
+    deposits = (db.session.query(Payment.collector_id, Payment.collection_date, CollectionDepositBatch.deposit_date,
+                                 func.sum(CollectionDepositAllocation.allocated_amount))
+                .join(CollectionDepositAllocation, CollectionDepositAllocation.payment_id == Payment.id)
+                .join(CollectionDepositBatch, CollectionDepositBatch.id == CollectionDepositAllocation.deposit_batch_id)
+                .filter(*receipts, CollectionDepositBatch.status == "POSTED")
+                .group_by(Payment.collector_id, Payment.collection_date, CollectionDepositBatch.deposit_date).all())
+    # A reconciled sheet clears the whole receipt, as in accounting.clearing_contribution.
+    cleared = (db.session.query(Payment.collector_id, Payment.collection_date, CollectionSheet.deposit_date, func.sum(Payment.amount_collected))
+               .join(CollectionSheet, CollectionSheet.id == Payment.collection_sheet_id)
+               .filter(*receipts, Payment.collection_clearance_status == "CLEARED")
+               .group_by(Payment.collector_id, Payment.collection_date, CollectionSheet.deposit_date).all())
+    for cid, day, deposited_on, amount in deposits + cleared:
+        row = bucket(cid, day); amount = _money(amount)
+        row["deposited_amount"] += amount
+        row["deposit_lag_amount_days"] += amount * max(((deposited_on or day) - day).days, 0)
+    # Expected: instalments falling due on loans in the collector's route (loans they have collected for).
+    route = select(Payment.collector_id, Payment.loan_id).where(Payment.collector_id.isnot(None)).distinct()
+    if collector_id: route = route.where(Payment.collector_id == collector_id)
+    route = route.subquery()
+    for cid, day, amount in (db.session.query(route.c.collector_id, LoanLedger.due_date, func.sum(LoanLedger.principal_amount + LoanLedger.interest_amount))
+                             .join(route, route.c.loan_id == LoanLedger.loan_id)
+                             .filter(*_in_range(LoanLedger.due_date, date_from, date_to))
+                             .group_by(route.c.collector_id, LoanLedger.due_date)):
+        bucket(cid, day)["expected_amount"] = _money(amount)
+    return buckets
+
+
+def refresh_collector_day(collector_id, day):
+    """Recompute one bucket inside the caller's transaction; empty buckets are removed."""
+    values = compute_buckets(day, day, collector_id).get((collector_id, day))
+    row = CollectorDailyPerformance.query.filter_by(collector_id=collector_id, performance_date=day).with_for_update().first()
+    if values is None:
+        if row: db.session.delete(row)
+        return None
+    if row is None:
+        row = CollectorDailyPerformance(collector_id=collector_id, performance_date=day); db.session.add(row)
+    for field in FIELDS: setattr(row, field, values[field])
+    return row
+
+
+def _refresh(session, pending):
+    for collector_id, day in sorted(pending["days"]):
+        refresh_collector_day(collector_id, day)
+
+
+read_models.register("collector_performance", _refresh)
+
+
+def rebuild_collector_performance(date_from, date_to, collector_id=None):
+    """Replace the rollup for a date range with one bulk insert."""
+    buckets = compute_buckets(date_from, date_to, collector_id)
+    stale = CollectorDailyPerformance.query.filter(*_in_range(CollectorDailyPerformance.performance_date, date_from, date_to))
+    if collector_id: stale = stale.filter(CollectorDailyPerformance.collector_id == collector_id)
+    removed = stale.delete(synchronize_session=False)
+    if buckets:
+        db.session.execute(insert(CollectorDailyPerformance), [
+            {"collector_id": cid, "performance_date": day, **values} for (cid, day), values in sorted(buckets.items())])
+    return {"date_from": date_from.isoformat(), "date_to": date_to.isoformat(), "collector_id": collector_id,
+            "removed": removed, "rows": len(buckets)}
+
+
+def default_range(date_from=None, date_to=None, days=30):
+    date_to = date_to or date.today()
+    return date_from or date_to - timedelta(days=days - 1), date_to
+
+
+def serialize_totals(expected, collected, receipts, visits, deposited, lag_amount_days):
+    expected, collected, deposited = _money(expected), _money(collected), _money(deposited)
+    return {"expected_amount": f"{expected:.2f}", "collected_amount": f"{collected:.2f}",
+            "collection_efficiency": f"{collected * 100 / expected:.2f}" if expected > 0 else None,
+            "receipt_count": int(receipts or 0), "visit_count": int(visits or 0),
+            "deposited_amount": f"{deposited:.2f}", "undeposited_amount": f"{max(collected - deposited, ZERO):.2f}",
+            "average_deposit_lag_days": f"{Decimal(str(lag_amount_days or 0)) / deposited:.2f}" if deposited > 0 else None}
+
+
+def serialize_day(row):
+    return {"collector_id": row.collector_id, "performance_date": row.performance_date.isoformat(),
+            **serialize_totals(row.expected_amount, row.collected_amount, row.receipt_count, row.visit_count,
+                               row.deposited_amount, row.deposit_lag_amount_days)}
+
+
+def range_totals_query(date_from, date_to):
+    """Date-range aggregation over the rollup only; never touches receipts."""
+    p = CollectorDailyPerformance
+    return (db.session.query(func.sum(p.expected_amount), func.sum(p.collected_amount), func.sum(p.receipt_count),
+                             func.sum(p.visit_count), func.sum(p.deposited_amount), func.sum(p.deposit_lag_amount_days))
+            .filter(*_in_range(p.performance_date, date_from, date_to)))
@@ -0,0 +1,126 @@
+"""Offline collector batch sync.
+
+A device signs the raw JSON body with HMAC-SHA256 (``X-Sync-Signature``).  Each
+item carries a client idempotency key which is stored, namespaced by collector,
+in the unique ``payments.idempotency_key`` index; replays resolve to the
+original receipt instead of posting again.  Receipts record the syncing (JWT)
+user in ``collected_by_id`` and the collector whose cash it is in
+``collector_id``.
+"""
+import hashlib
+import hmac
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
+
+from .extensions import db
+from .models import AccountingAccount, Loan, Payment, User
+from .accounting import (AccountingError, allocate_payment, log_audit, money,
+                         post_loan_payment, validate_collection_account)
+from .loan_ledger import generate_loan_ledger, has_schedule
+from .loan_locks import lock_loans
+
+MAX_SYNC_ITEMS = 500
+SYNC_LOAN_STATUSES = {"ACTIVE", "OVERDUE"}
+
+
+class SyncError(ValueError):
+    def __init__(self, message, status=422, **details):
+        super().__init__(message); self.status = status; self.details = details
+
+
+def sign_batch(body: bytes, secret: str) -> str:
+    return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def verify_signature(body: bytes, signature, secret):
+    if not secret: raise SyncError("Collector sync is not configured", 503)
+    if not signature or not hmac.compare_digest(sign_batch(body, secret), str(signature).strip().lower()):
+        raise SyncError("Invalid batch signature", 401)
+
+
+def sync_key(collector_id, client_key):
+    return f"COLLECTOR_SYNC:{collector_id}:{client_key}"
+
+
+def _parse_item(raw):
+    key = str(raw.get("idempotency_key") or "").strip()
+    if not key or len(key) > 120: raise SyncError("idempotency_key is required (max 120 characters)")
+    try: amount = money(Decimal(str(raw.get("amount_collected"))))
+    except (InvalidOperation, TypeError, ValueError): raise SyncError("amount_collected must be a valid number")
+    if amount <= 0: raise SyncError("amount_collected must be greater than zero")
+    try: collected_on = date.fromisoformat(str(raw.get("collection_date")))
+    except ValueError: raise SyncError("collection_date must be ISO formatted (YYYY-MM-DD)")
+    try: loan_id = int(raw.get("loan_id"))
+    except (TypeError, ValueError): raise SyncError("loan_id is required")
+    return {"key": key, "loan_id": loan_id, "amount": amount, "collection_date": collected_on,
+            "remarks": raw.get("remarks"), "reference": raw.get("transaction_reference")}
+
+
+def _result(key, status, payment=None, error=None):
+    return {"idempotency_key": key, "status": status, "payment_id": payment.id if payment else None,
+            "receipt_number": payment.receipt_number if payment else None, "error": error}
+
+
+def sync_collections(data, user_id):
+    """Post a batch of offline collections; every item gets a POSTED/DUPLICATE/REJECTED result."""
+    items = data.get("items")
+    if not isinstance(items, list) or not items: raise SyncError("items must be a non-empty list")
+    if len(items) > MAX_SYNC_ITEMS: raise SyncError(f"A sync batch may contain at most {MAX_SYNC_ITEMS} items")
+    collector = db.session.get(User, data.get("collector_id"))
+    if not collector: raise SyncError("Collector not found", 404)
+    # One posting context for the whole batch: collector, clearing account and loans.
+    try:
+        account = validate_collection_account(db.session.get(AccountingAccount, collector.default_collection_account_id),
+                                              "CASH_COLLECTOR", collector.id)
+    except AccountingError as exc:
+        raise SyncError(str(exc))
+    parsed, results = [], [None] * len(items)
+    for index, raw in enumerate(items):
+        try: parsed.append((index, _parse_item(raw if isinstance(raw, dict) else {})))
+        except SyncError as exc: results[index] = _result((raw or {}).get("idempotency_key") if isinstance(raw, dict) else None, "REJECTED", error=str(exc))
+    keys = {sync_key(collector.id, item["key"]) for _, item in parsed}
+    existing = {p.idempotency_key: p for p in Payment.query.filter(Payment.idempotency_key.in_(keys)).all()} if keys else {}
+    loan_ids = sorted({item["loan_id"] for _, item in parsed})
+    loans = lock_loans(loan_ids, selectinload(Loan.payments), selectinload(Loan.customer))
+    posted = 0
+    for index, item in parsed:
+        key = sync_key(collector.id, item["key"])
+        if key in existing:
+            results[index] = _result(item["key"], "DUPLICATE", existing[key]); continue
+        loan = loans.get(item["loan_id"])
+        if not loan: results[index] = _result(item["key"], "REJECTED", error="Loan not found"); continue
+        if str(loan.status or "").strip().upper() not in SYNC_LOAN_STATUSES:
+            results[index] = _result(item["key"], "REJECTED", error="Payments can only be recorded for active loans"); continue
+        savepoint = db.session.begin_nested()
+        try:
+            # has_schedule never loads the installments of a compact loan; allocate_payment stores only those it reaches.
+            if not has_schedule(loan): generate_loan_ledger(loan); db.session.flush(); db.session.expire(loan, ["ledger_entries"])
+            principal, interest, penalty, excess = allocate_payment(loan, item["amount"], item["collection_date"])
+            payment = Payment(loan_id=loan.id, amount_collected=item["amount"], principal_paid=principal, interest_paid=interest,
+                              penalty_paid=penalty, other_fee_paid=excess, collection_date=item["collection_date"],
+                              payment_date=item["collection_date"], accounting_date=item["collection_date"],
+                              collected_by_id=user_id, collector_id=collector.id, payment_method="CASH_COLLECTOR",
+                              collection_method="CASH_COLLECTOR", remarks=item["remarks"], transaction_reference=item["reference"],
+                              bank_reference=item["reference"], receipt_account_id=account.id, collection_account_id=account.id,
+                              idempotency_key=key, collection_clearance_status="UNDEPOSITED")
+            db.session.add(payment); db.session.flush()
+            post_loan_payment(payment, user_id, receipt_account=account)
+            savepoint.commit()
+        except IntegrityError:
+            # A concurrent replay won the unique key; report its receipt.
+            savepoint.rollback(); db.session.expire(loan)
+            results[index] = _result(item["key"], "DUPLICATE", Payment.query.filter_by(idempotency_key=key).first()); continue
+        except AccountingError as exc:
+            savepoint.rollback(); db.session.expire(loan)
+            results[index] = _result(item["key"], "REJECTED", error=str(exc)); continue
+        existing[key] = payment; posted += 1
+        results[index] = _result(item["key"], "POSTED", payment)
+    summary = {"batch_id": data.get("batch_id"), "collector_id": collector.id, "posted": posted,
+               "duplicates": sum(1 for r in results if r["status"] == "DUPLICATE"),
+               "rejected": sum(1 for r in results if r["status"] == "REJECTED")}
+    log_audit("COLLECTOR_SYNC", "User", collector.id, user_id, summary)
+    db.session.commit()
+    return {**summary, "items": results}
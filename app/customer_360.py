@@ -0,0 +1,112 @@
+"""Customer 360 view for call-center staff.
+
+The view is assembled in a fixed number of queries: the customer with its user,
+applications and their documents via ``selectinload``, one bulk statement for
+every loan's balances (``loan_search.due_aggregates``), and single queries for
+documents and recent receipts.  ``profile_fingerprint`` reads only the max
+``updated_at`` and row counts of the involved tables in one statement; its hash
+is the strong ETag, so an unchanged profile answers ``304`` without loading or
+serializing anything.
+"""
+import hashlib
+from decimal import Decimal
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import selectinload
+
+from .customer_master import build_customer_master_profile
+from .extensions import db
+from .loan_search import due_aggregates
+from .loan_status import serialize_loan_status
+from .models import (Customer, CustomerDocument, CustomerKYCProfile, Loan, LoanApplication, LoanApplicationDocument, LoanLedger,
+                     Payment, User)
+
+RECENT_PAYMENTS = 20
+ZERO = Decimal("0.00")
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def _amount(value):
+    return f"{Decimal(str(value or 0)):.2f}"
+
+
+def profile_fingerprint(customer_id):
+    """Max ``updated_at`` and row count of every table in the view, or None when the customer does not exist."""
+    loan_ids = select(Loan.id).where(Loan.customer_id == customer_id).scalar_subquery()
+    application_ids = select(LoanApplication.id).where(LoanApplication.customer_id == customer_id).scalar_subquery()
+    user_ids = select(Customer.user_id).where(Customer.id == customer_id).scalar_subquery()
+
+    def stamp(model, *where, column=None):
+        column = column if column is not None else model.updated_at
+        return [select(func.max(column)).where(*where).scalar_subquery(), select(func.count(model.id)).where(*where).scalar_subquery()]
+
+    row = db.session.execute(select(
+        Customer.updated_at,
+        *stamp(Loan, Loan.customer_id == customer_id),
+        *stamp(Payment, Payment.loan_id.in_(loan_ids)),
+        *stamp(LoanLedger, LoanLedger.loan_id.in_(loan_ids)),
+        *stamp(LoanApplication, LoanApplication.customer_id == customer_id),
+        *stamp(CustomerKYCProfile, CustomerKYCProfile.customer_id == customer_id),
+        *stamp(LoanApplicationDocument, LoanApplicationDocument.loan_application_id.in_(application_ids), column=LoanApplicationDocument.id),
+        *stamp(CustomerDocument, CustomerDocument.customer_id == customer_id, column=CustomerDocument.id),
+        *stamp(User, User.id.in_(user_ids)),
+    ).where(Customer.id == customer_id)).first()
+    return None if row is None else (customer_id, *row)
+
+
+def profile_etag(fingerprint):
+    return hashlib.sha256(repr(fingerprint).encode()).hexdigest()[:32]
+
+
+def _loan(loan, balances):
+    return {"id": loan.id, "loan_number": loan.loan_number, "status": serialize_loan_status(loan),
+            "principal_amount": _amount(loan.principal_amount), "total_payable": _amount(loan.total_payable),
+            "total_paid": _amount(balances.get("total_paid")), "outstanding": _amount(balances.get("outstanding")),
+            "delay_interest_outstanding": _amount(balances.get("delay_interest_outstanding")),
+            "start_date": _iso(loan.start_date), "end_date": _iso(loan.end_date), "settled_date": _iso(loan.settled_date)}
+
+
+def _application(application):
+    return {"id": application.id, "application_number": application.application_number, "loan_type": application.loan_type,
+            "status": application.status, "applied_amount": _amount(application.applied_amount) if application.applied_amount is not None else None,
+            "approved_amount": _amount(application.approved_amount) if application.approved_amount is not None else None,
+            "submitted_at": _iso(application.submitted_at), "created_at": _iso(application.created_at),
+            "documents": [{"id": d.id, "document_type": d.document_type, "file_path": d.file_path, "uploaded_at": _iso(d.uploaded_at)}
+                          for d in application.documents]}
+
+
+def _payment(payment, loan_numbers):
+    return {"id": payment.id, "loan_id": payment.loan_id, "loan_number": loan_numbers.get(payment.loan_id),
+            "receipt_number": payment.receipt_number, "collection_date": _iso(payment.collection_date),
+            "amount_collected": _amount(payment.amount_collected), "payment_method": payment.payment_method,
+            "status": payment.status, "reversed": payment.reversed_at is not None}
+
+
+def build_customer_360(customer_id):
+    customer = (Customer.query.options(selectinload(Customer.user), selectinload(Customer.loans),
+                                       selectinload(Customer.loan_applications).selectinload(LoanApplication.documents))
+                .filter(Customer.id == customer_id).first())
+    if customer is None: raise LookupError("Customer not found")
+    loans = sorted(customer.loans, key=lambda loan: loan.id, reverse=True)
+    balances = due_aggregates([loan.id for loan in loans])
+    loan_numbers = {loan.id: loan.loan_number for loan in loans}
+    payments = (Payment.query.filter(Payment.loan_id.in_(list(loan_numbers)))
+                .order_by(Payment.collection_date.desc(), Payment.id.desc()).limit(RECENT_PAYMENTS).all()) if loans else []
+    documents = CustomerDocument.query.filter_by(customer_id=customer.id).order_by(CustomerDocument.uploaded_at.desc(), CustomerDocument.id.desc()).all()
+    live = [loan for loan in loans if serialize_loan_status(loan) not in {"SETTLED", "CANCELLED", "WRITTEN_OFF"}]
+    return {
+        "customer": {**customer.to_dict(), "user_id": customer.user_id, "status": customer.status, "email": customer.email,
+                     "created_at": _iso(customer.created_at), "updated_at": _iso(customer.updated_at)},
+        "profile": build_customer_master_profile(customer.id),
+        "loans": [_loan(loan, balances.get(loan.id, {})) for loan in loans],
+        "applications": [_application(a) for a in sorted(customer.loan_applications, key=lambda a: a.id, reverse=True)],
+        "recent_payments": [_payment(p, loan_numbers) for p in payments],
+        "documents": [{"id": d.id, "document_type": d.document_type, "file_path": d.file_path, "uploaded_at": _iso(d.uploaded_at)} for d in documents],
+        "totals": {"loan_count": len(loans), "active_loan_count": len(live),
+                   "total_outstanding": _amount(sum((balances.get(loan.id, {}).get("outstanding", ZERO) for loan in loans), ZERO)),
+                   "delay_interest_outstanding": _amount(sum((balances.get(loan.id, {}).get("delay_interest_outstanding", ZERO) for loan in loans), ZERO)),
+                   "total_paid": _amount(sum((balances.get(loan.id, {}).get("total_paid", ZERO) for loan in loans), ZERO))},
+    }
@@ -0,0 +1,113 @@
+"""Normalized customer identity columns.
+
+``mobile_e164``/``guarantor_mobile_e164`` hold Sri Lankan numbers in E.164 form
+(``+94771234567``) and ``nic_canonical`` holds the 12-digit NIC, with old
+``YYDDDSSSSV`` numbers converted to ``19YYDDD0SSSS`` so both spellings of one
+identity compare equal.  The columns are set before every insert/update,
+filled for existing rows by migration 0055 and recomputed with
+``flask backfill-customer-identity``; search and dedup compare them by equality
+or index-friendly prefix ranges.  Duplicate-NIC checks also compare the raw NIC
+of rows whose ``nic_canonical`` is still NULL (e.g. written by raw SQL).
+"""
+import re
+
+from sqlalchemy import and_, event, func, or_, select, update
+
+from .extensions import db
+from .models import Customer
+
+COUNTRY_CODE = "94"
+_OLD_NIC = re.compile(r"^(\d{9})[VX]$")
+_NON_ALNUM = re.compile(r"[^0-9A-Z]+")
+
+
+def normalize_phone(value):
+    raw = str(value or "").strip()
+    digits = re.sub(r"\D", "", raw)
+    if digits.startswith("00"): digits = digits[2:]
+    elif digits.startswith(COUNTRY_CODE) and len(digits) == 11: pass
+    elif digits.startswith("0") and len(digits) == 10: digits = COUNTRY_CODE + digits[1:]
+    elif len(digits) == 9 and not raw.startswith("+"): digits = COUNTRY_CODE + digits
+    return f"+{digits}" if 8 <= len(digits) <= 15 else None
+
+
+def normalize_nic(value):
+    compact = _NON_ALNUM.sub("", str(value or "").upper())
+    old = _OLD_NIC.match(compact)
+    if old:
+        d = old.group(1); return f"19{d[:5]}0{d[5:]}"
+    return compact or None
+
+
+def phone_search_prefixes(query):
+    """E.164 prefixes a partially typed number can match (``076`` -> ``+9476``)."""
+    digits = re.sub(r"\D", "", str(query or ""))
+    if not digits: return set()
+    if digits.startswith("00"): return {f"+{digits[2:]}"} if len(digits) > 2 else set()
+    if digits.startswith(COUNTRY_CODE): return {f"+{digits}", f"+{COUNTRY_CODE}{digits}"}
+    if digits.startswith("0"): return {f"+{COUNTRY_CODE}{digits[1:]}"}
+    return {f"+{COUNTRY_CODE}{digits}", f"+{digits}"}
+
+
+def nic_search_prefixes(query):
+    """Canonical NIC prefixes for a partial NIC in either format."""
+    compact = _NON_ALNUM.sub("", str(query or "").upper())
+    if not compact: return set()
+    full = normalize_nic(compact)
+    prefixes = {full}
+    digits = compact[:-1] if compact[-1] in "VX" and len(compact) == 10 else compact
+    if digits.isdigit() and len(digits) <= 9 and full == compact:
+        # A partial old-format number maps onto 19YYDDD0SSSS position by position.
+        prefixes.add(f"19{digits[:5]}" + (f"0{digits[5:]}" if len(digits) > 5 else ""))
+    return prefixes
+
+
+def prefix_range(column, prefix):
+    """``column LIKE 'prefix%'`` as a range so a B-tree index serves it on every engine."""
+    return (column >= prefix) & (column < prefix + "\uffff")
+
+
+def apply_identity(customer):
+    customer.nic_canonical = normalize_nic(customer.nic_number)
+    customer.mobile_e164 = normalize_phone(customer.mobile)
+    customer.guarantor_mobile_e164 = normalize_phone(customer.guarantor_mobile)
+
+
+@event.listens_for(Customer, "before_insert")
+@event.listens_for(Customer, "before_update")
+def _maintain_identity(mapper, connection, customer):
+    apply_identity(customer)
+
+
+def find_by_nic(nic_number, exclude_id=None):
+    canonical = normalize_nic(nic_number)
+    if not canonical: return None
+    # Rows not backfilled yet are compared on the NIC as typed.
+    raw = and_(Customer.nic_canonical.is_(None), func.upper(func.trim(Customer.nic_number)).in_({str(nic_number).strip().upper(), canonical}))
+    query = Customer.query.filter(or_(Customer.nic_canonical == canonical, raw))
+    if exclude_id: query = query.filter(Customer.id != exclude_id)
+    return query.order_by(Customer.id).first()
+
+
+def backfill_identity(batch_size=1000, apply=False):
+    """Recompute the columns in id order; reports rows that change and NICs shared by several customers."""
+    last_id, checked, changed = 0, 0, []
+    while True:
+        rows = (db.session.query(Customer.id, Customer.nic_number, Customer.mobile, Customer.guarantor_mobile, Customer.nic_canonical,
+                                 Customer.mobile_e164, Customer.guarantor_mobile_e164)
+                .filter(Customer.id > last_id).order_by(Customer.id).limit(batch_size).all())
+        if not rows: break
+        updates = []
+        for c in rows:
+            values = {"id": c.id, "nic_canonical": normalize_nic(c.nic_number), "mobile_e164": normalize_phone(c.mobile),
+                      "guarantor_mobile_e164": normalize_phone(c.guarantor_mobile)}
+            if (c.nic_canonical, c.mobile_e164, c.guarantor_mobile_e164) != (values["nic_canonical"], values["mobile_e164"], values["guarantor_mobile_e164"]):
+                updates.append(values)
+        if apply and updates: db.session.execute(update(Customer), updates)
+        changed.extend(u["id"] for u in updates); checked += len(rows); last_id = rows[-1].id
+    shared = select(Customer.nic_canonical).where(Customer.nic_canonical.isnot(None)).group_by(Customer.nic_canonical).having(func.count(Customer.id) > 1)
+    duplicates = {}
+    for nic, customer_id in db.session.query(Customer.nic_canonical, Customer.id).filter(Customer.nic_canonical.in_(shared)).order_by(Customer.nic_canonical, Customer.id):
+        duplicates.setdefault(nic, []).append(customer_id)
+    return {"checked": checked, "changed": len(changed), "changed_ids": changed[:100],
+            "duplicate_nics": [{"nic_canonical": nic, "customer_ids": ids} for nic, ids in duplicates.items()]}
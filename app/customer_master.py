@@ -73,7 +73,7 @@ def build_customer_master_profile(customer_id):
     active_loans = (
         Loan.query.filter(
             Loan.customer_id == customer.id,
-            Loan.status.in_(("ACTIVE", "DISBURSED")),
+            Loan.status.in_(("ACTIVE", "OVERDUE", "DISBURSED")),
         )
         .order_by(Loan.id.desc())
         .all()
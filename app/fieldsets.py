@@ -0,0 +1,70 @@
+"""Sparse fieldsets for list endpoints (``?fields=id,loan_number,status``).
+
+Each endpoint declares cheap per-field getters and the columns they read.  When
+every requested field has a getter the rows are loaded with ``load_only`` and
+only those getters run; otherwise the endpoint's full serializer is used and
+its output trimmed.  Derived values (aggregates, relationships) are computed
+only when a requested field needs them.  ``id`` is always returned.
+"""
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask import jsonify
+from sqlalchemy.orm import load_only
+
+ALWAYS = ("id",)
+
+
+class FieldsetError(ValueError):
+    pass
+
+
+def requested_fields(args, available):
+    raw = (args.get("fields") or "").strip()
+    if not raw: return None
+    fields = [f.strip() for f in raw.split(",") if f.strip()]
+    unknown = sorted(set(fields) - set(available))
+    if unknown: raise FieldsetError(f"Unknown fields: {', '.join(unknown)}.")
+    return list(dict.fromkeys([*(f for f in ALWAYS if f in available), *fields]))
+
+
+def wants(fields, *names):
+    return fields is None or any(name in fields for name in names)
+
+
+def covered(fields, getters):
+    """True when the cheap getters can serve every requested field."""
+    return fields is not None and all(f in getters for f in fields)
+
+
+def load_only_fields(model, fields, columns=None):
+    """``load_only`` for the model columns the requested getters read."""
+    names = set(ALWAYS)
+    for field in fields:
+        names.update((columns or {}).get(field, (field,)))
+    table_columns = model.__table__.columns.keys()
+    return load_only(*(getattr(model, name) for name in sorted(names) if name in table_columns))
+
+
+def _json_value(value):
+    if isinstance(value, (date, datetime)): return value.isoformat()
+    if isinstance(value, Decimal): return float(value)
+    return value
+
+
+def column_getters(*names):
+    """Getters that serialize columns the way the models' ``to_dict`` methods do."""
+    return {name: (lambda obj, *context, name=name: _json_value(getattr(obj, name))) for name in names}
+
+
+def project(obj, fields, getters, serializer=None, *context):
+    if fields is None:
+        return serializer(obj, *context) if serializer else {k: get(obj, *context) for k, get in getters.items()}
+    if covered(fields, getters):
+        return {f: getters[f](obj, *context) for f in fields}
+    full = serializer(obj, *context)
+    return {f: full.get(f) for f in fields}
+
+
+def fieldset_error(exc):
+    return jsonify({"error": "invalid_fields", "message": str(exc)}), 422
@@ -0,0 +1,243 @@
+"""Unified search index.
+
+``search_documents`` holds one row per customer, lead, loan, application,
+receipt and journal with display fields and a normalized token string.
+PostgreSQL matches it with prefix full-text queries over a GIN expression
+index (migration 0056); other engines intersect prefix ranges over
+``search_tokens``.  Rows are refreshed at commit for entities changed in the
+session and rebuilt with ``flask rebuild-search-index``; the deploy entrypoint
+runs it with ``--missing-only`` after migrating, which fills the index for rows
+that existed before migration 0056.
+"""
+from sqlalchemy import and_, delete, false, func, insert, intersect, select, update
+
+from . import read_models
+from .customer_identity import normalize_phone
+from .extensions import db
+from .loan_search import normalize_words
+from .models import (AccountingAccount, AccountingJournalEntry, AccountingJournalLine, Customer, Lead, Loan, LoanApplication,
+                     Payment, SearchDocument, SearchToken)
+
+MAX_RESULTS = 50
+DEFAULT_RESULTS = 20
+MAX_QUERY_WORDS = 8
+MAX_TEXT_TOKENS = 40
+
+
+def _identifier(value):
+    words = normalize_words(value)
+    return set(words) | ({"".join(words)} if words else set())
+
+
+def _phone(value):
+    e164 = normalize_phone(value)
+    if not e164: return set()
+    digits = e164[1:]
+    return {digits, digits[2:], "0" + digits[2:]} if digits.startswith("94") else {digits}
+
+
+def _text(value):
+    return set([w for w in normalize_words(value) if len(w) > 1][:MAX_TEXT_TOKENS])
+
+
+def _money(value):
+    return f"{value:.2f}" if value is not None else None
+
+
+def _customer(rows):
+    for r in rows:
+        yield r.id, r.full_name or r.customer_code or f"Customer #{r.id}", " · ".join(filter(None, (r.customer_code, r.mobile))), r.status, (
+            _text(r.full_name) | _identifier(r.customer_code) | _identifier(r.nic_number) | {(r.nic_canonical or "").lower()} | _phone(r.mobile))
+
+
+def _lead(rows):
+    for r in rows:
+        yield r.id, r.name or r.mobile, " · ".join(filter(None, ("Lead", r.mobile, r.source))), r.status, _text(r.name) | _phone(r.mobile)
+
+
+def _loan(rows):
+    for r in rows:
+        yield r.id, r.loan_number, r.full_name, r.status, _identifier(r.loan_number) | _text(r.full_name) | _identifier(r.customer_code)
+
+
+def _application(rows):
+    for r in rows:
+        yield r.id, r.application_number or f"Application #{r.id}", r.full_name, r.status, (
+            _identifier(r.application_number) | _text(r.full_name) | _identifier(r.nic_number) | _phone(r.mobile_number))
+
+
+def _payment(rows):
+    for r in rows:
+        subtitle = " · ".join(filter(None, (r.loan_number, _money(r.amount_collected), r.collection_date.isoformat() if r.collection_date else None)))
+        yield r.id, r.receipt_number or f"Payment #{r.id}", subtitle, r.status, (
+            _identifier(r.receipt_number) | _identifier(r.transaction_reference) | _identifier(r.bank_reference) | _identifier(r.loan_number))
+
+
+def _journal(rows):
+    ids = [r.id for r in rows]
+    linked = {}
+    # Denormalize what list_journals used to reach through joins: line accounts, loans and customers, and reversal numbers.
+    for entry_id, account_code, account_name, loan_number, customer_name, customer_code in (
+            db.session.query(AccountingJournalLine.journal_entry_id, AccountingAccount.account_code, AccountingAccount.account_name,
+                             Loan.loan_number, Customer.full_name, Customer.customer_code)
+            .join(AccountingAccount, AccountingAccount.id == AccountingJournalLine.account_id)
+            .outerjoin(Loan, Loan.id == AccountingJournalLine.loan_id).outerjoin(Customer, Customer.id == AccountingJournalLine.customer_id)
+            .filter(AccountingJournalLine.journal_entry_id.in_(ids)) if ids else []):
+        linked.setdefault(entry_id, set()).update(_identifier(account_code) | _text(account_name) | _identifier(loan_number)
+                                                  | _text(customer_name) | _identifier(customer_code))
+    reversal = db.aliased(AccountingJournalEntry)
+    for entry_id, journal_no in (db.session.query(reversal.reversal_of_id, reversal.journal_no).filter(reversal.reversal_of_id.in_(ids)) if ids else []):
+        linked.setdefault(entry_id, set()).update(_identifier(journal_no))
+    for r in rows:
+        yield r.id, r.journal_no, (r.description or "")[:255], r.status, (
+            _identifier(r.journal_no) | _identifier(r.reference) | _text(r.description) | _identifier(r.reference_type) | _identifier(r.source_type)
+            | _identifier(r.reversal_of_no) | _identifier(r.loan_number) | _text(r.customer_name) | _identifier(r.customer_code) | linked.get(r.id, set()))
+
+
+def _journal_query():
+    original = db.aliased(AccountingJournalEntry)
+    return (db.session.query(AccountingJournalEntry.id, AccountingJournalEntry.journal_no, AccountingJournalEntry.reference,
+                             AccountingJournalEntry.description, AccountingJournalEntry.status, AccountingJournalEntry.reference_type,
+                             AccountingJournalEntry.source_type, original.journal_no.label("reversal_of_no"), Loan.loan_number,
+                             Customer.full_name.label("customer_name"), Customer.customer_code)
+            .outerjoin(original, original.id == AccountingJournalEntry.reversal_of_id)
+            .outerjoin(Loan, Loan.id == AccountingJournalEntry.loan_id)
+            .outerjoin(Customer, Customer.id == AccountingJournalEntry.customer_id))
+
+
+# entity type -> (model, fields whose change re-indexes the row, loader query, document builder)
+SOURCES = {
+    "CUSTOMER": (Customer, ("full_name", "customer_code", "nic_number", "mobile", "status"),
+                 lambda: db.session.query(Customer.id, Customer.full_name, Customer.customer_code, Customer.nic_number,
+                                          Customer.nic_canonical, Customer.mobile, Customer.status), _customer),
+    "LEAD": (Lead, ("name", "mobile", "source", "status"),
+             lambda: db.session.query(Lead.id, Lead.name, Lead.mobile, Lead.source, Lead.status), _lead),
+    "LOAN": (Loan, ("loan_number", "customer_id", "status"),
+             lambda: db.session.query(Loan.id, Loan.loan_number, Loan.status, Customer.full_name, Customer.customer_code)
+             .outerjoin(Customer, Customer.id == Loan.customer_id), _loan),
+    "LOAN_APPLICATION": (LoanApplication, ("application_number", "full_name", "nic_number", "mobile_number", "status"),
+                         lambda: db.session.query(LoanApplication.id, LoanApplication.application_number, LoanApplication.full_name,
+                                                  LoanApplication.nic_number, LoanApplication.mobile_number, LoanApplication.status), _application),
+    "PAYMENT": (Payment, ("receipt_number", "transaction_reference", "bank_reference", "status", "amount_collected", "loan_id"),
+                lambda: db.session.query(Payment.id, Payment.receipt_number, Payment.transaction_reference, Payment.bank_reference,
+                                         Payment.status, Payment.amount_collected, Payment.collection_date, Loan.loan_number)
+                .outerjoin(Loan, Loan.id == Payment.loan_id), _payment),
+    "JOURNAL": (AccountingJournalEntry, ("journal_no", "reference", "description", "status", "reference_type", "source_type",
+                                         "loan_id", "customer_id", "reversal_of_id"), _journal_query, _journal),
+}
+ENTITY_TYPES = {model: entity_type for entity_type, (model, *_rest) in SOURCES.items()}
+
+
+def index_entities(entity_type, ids):
+    """Replace the documents and tokens of ``ids`` with bulk statements; missing entities are dropped."""
+    ids = sorted({int(i) for i in ids if i})
+    if not ids: return 0
+    model, _fields, loader, build = SOURCES[entity_type]
+    for table in (SearchToken, SearchDocument):
+        db.session.execute(delete(table).where(table.entity_type == entity_type, table.entity_id.in_(ids)))
+    documents, tokens = [], []
+    for entity_id, title, subtitle, status, words in build(loader().filter(model.id.in_(ids)).all()):
+        words = sorted({w[:120] for w in words if w})
+        documents.append({"entity_type": entity_type, "entity_id": entity_id, "title": str(title or "")[:255],
+                          "subtitle": (subtitle or None) and str(subtitle)[:255], "status": status, "search_text": " ".join(words)})
+        tokens.extend({"entity_type": entity_type, "entity_id": entity_id, "token": w} for w in words)
+    if documents: db.session.execute(insert(SearchDocument), documents)
+    if documents and entity_type == "JOURNAL":
+        db.session.execute(update(AccountingJournalEntry), [{"id": d["entity_id"], "search_vector": d["search_text"]} for d in documents])
+    if tokens and not uses_full_text(): db.session.execute(insert(SearchToken), tokens)
+    return len(documents)
+
+
+def unindexed_entity_types():
+    """Entity types whose document count differs from their row count, e.g. right after migration 0056."""
+    indexed = dict(db.session.query(SearchDocument.entity_type, func.count()).group_by(SearchDocument.entity_type))
+    return [entity_type for entity_type, (model, *_rest) in SOURCES.items()
+            if db.session.query(func.count(model.id)).scalar() != indexed.get(entity_type, 0)]
+
+
+def rebuild_index(entity_types=None, batch_size=1000):
+    report = {}
+    for entity_type in entity_types or SOURCES:
+        model = SOURCES[entity_type][0]
+        for table in (SearchToken, SearchDocument):
+            db.session.execute(delete(table).where(table.entity_type == entity_type))
+        last_id, count = 0, 0
+        while True:
+            ids = [r[0] for r in db.session.query(model.id).filter(model.id > last_id).order_by(model.id).limit(batch_size)]
+            if not ids: break
+            count += index_entities(entity_type, ids); last_id = ids[-1]
+        report[entity_type] = count
+    return report
+
+
+def _collect_changed(session, pending):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, AccountingJournalLine):
+            pending["JOURNAL"].add(obj.journal_entry_id); continue
+        entity_type = ENTITY_TYPES.get(type(obj))
+        if not entity_type: continue
+        state = db.inspect(obj)
+        if obj in session.dirty and not any(state.attrs[f].history.has_changes() for f in SOURCES[entity_type][1]): continue
+        pending[entity_type].add(obj.id)
+        if entity_type == "JOURNAL" and obj.reversal_of_id:
+            pending["JOURNAL"].add(obj.reversal_of_id)
+
+
+def _refresh(session, pending):
+    if pending.get("CUSTOMER"):
+        # Loan and journal documents carry the customer's name and code.
+        customers = pending["CUSTOMER"]
+        pending["LOAN"].update(r[0] for r in session.query(Loan.id).filter(Loan.customer_id.in_(customers)))
+        pending["JOURNAL"].update(r[0] for r in session.query(AccountingJournalEntry.id).filter(AccountingJournalEntry.customer_id.in_(customers)).union(
+            session.query(AccountingJournalLine.journal_entry_id).filter(AccountingJournalLine.customer_id.in_(customers))))
+    for entity_type, ids in pending.items():
+        index_entities(entity_type, ids)
+
+
+read_models.register("search_documents", _refresh, _collect_changed)
+
+
+def uses_full_text():
+    return bool(db.session.bind and db.session.bind.dialect.name == "postgresql")
+
+
+def search(query, entity_types=None, limit=DEFAULT_RESULTS):
+    """Ranked, typed matches where every query word prefixes a document token."""
+    words = list(dict.fromkeys(normalize_words(query)))[:MAX_QUERY_WORDS]
+    if not words: return []
+    limit = min(max(int(limit or DEFAULT_RESULTS), 1), MAX_RESULTS)
+    doc = SearchDocument
+    if uses_full_text():
+        tsquery = func.to_tsquery("simple", " & ".join(f"{w}:*" for w in words))
+        vector = func.to_tsvector("simple", doc.search_text)
+        rank = func.ts_rank(vector, tsquery)
+        rows = db.session.query(doc, rank.label("rank")).filter(vector.op("@@")(tsquery))
+    else:
+        per_word = [select(SearchToken.entity_type, SearchToken.entity_id)
+                    .where(SearchToken.token >= w, SearchToken.token < w + "\uffff") for w in words]
+        matched = (intersect(*per_word) if len(per_word) > 1 else per_word[0]).subquery()
+        exact = (select(SearchToken.entity_type, SearchToken.entity_id, func.count().label("hits"))
+                 .where(SearchToken.token.in_(words)).group_by(SearchToken.entity_type, SearchToken.entity_id).subquery())
+        rank = func.coalesce(exact.c.hits, 0)
+        rows = (db.session.query(doc, rank.label("rank"))
+                .join(matched, and_(matched.c.entity_type == doc.entity_type, matched.c.entity_id == doc.entity_id))
+                .outerjoin(exact, and_(exact.c.entity_type == doc.entity_type, exact.c.entity_id == doc.entity_id)))
+    if entity_types: rows = rows.filter(doc.entity_type.in_(entity_types))
+    return rows.order_by(rank.desc(), doc.title, doc.entity_type, doc.entity_id).limit(limit).all()
+
+
+def serialize_hit(document, rank):
+    return {"entity_type": document.entity_type, "entity_id": document.entity_id, "title": document.title,
+            "subtitle": document.subtitle, "status": document.status, "rank": float(rank or 0)}
+
+
+def journal_search_filter(query):
+    """Index-driven predicate for list_journals ``search``: every word must prefix a token of the entry."""
+    words = list(dict.fromkeys(normalize_words(query)))[:MAX_QUERY_WORDS]
+    if not words: return false()
+    if uses_full_text():
+        tsquery = func.to_tsquery("simple", " & ".join(f"{w}:*" for w in words))
+        return func.to_tsvector("simple", func.coalesce(AccountingJournalEntry.search_vector, "")).op("@@")(tsquery)
+    per_word = [select(SearchToken.entity_id).where(SearchToken.entity_type == "JOURNAL", SearchToken.token >= w,
+                                                    SearchToken.token < w + "\uffff") for w in words]
+    return AccountingJournalEntry.id.in_(intersect(*per_word) if len(per_word) > 1 else per_word[0])
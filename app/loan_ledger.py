@@ -1,13 +1,20 @@
 from datetime import timedelta
 from decimal import Decimal, ROUND_HALF_UP
+from functools import lru_cache
 import calendar
 
+from sqlalchemy import insert
+
+from .allocation_cursor import reset_cursor
 from .currency import CURRENCY_CODE, format_currency
 from .extensions import db
 from .models import Loan, LoanLedger
 from .loan_terms import resolve_loan_term
 
 CENT = Decimal("0.01")
+# Schedules are pure data: dates depend only on (start, term, frequency) and amounts only on the loan
+# figures, so both are memoized and many loans disbursed on the same terms share one computation.
+TEMPLATE_CACHE_SIZE = 1024
 
 
 def money(value) -> Decimal:
@@ -25,20 +32,71 @@ def _add_month(d):
     return d.replace(year=year, month=month, day=min(d.day, calendar.monthrange(year, month)[1]))
 
 
-def _next_due_date(start_date, frequency, installment_no):
-    if frequency == "DAILY":
-        return start_date + timedelta(days=installment_no - 1)
-    if frequency == "WEEKLY":
-        return start_date + timedelta(days=(installment_no * 7) - 1)
-    if frequency == "MONTHLY":
-        due = start_date
-        for _ in range(installment_no):
-            due = _add_month(due)
-        return due - timedelta(days=1)
-    return None
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _resolved_term(start_date, term_type, term_value, frequency):
+    return resolve_loan_term(start_date, term_type, term_value, frequency)
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _fixed_terms_amounts(principal, total_interest, total_repayment, count):
+    """(opening, principal, interest, installment, closing) per installment; the last one absorbs rounding."""
+    principal_regular = money(principal / Decimal(count))
+    interest_regular = money(total_interest / Decimal(count))
+    installment_regular = money(total_repayment / Decimal(count))
+    opening_balance = principal
+    principal_allocated = interest_allocated = installment_allocated = Decimal("0.00")
+    rows = []
+    for installment_no in range(1, count + 1):
+        is_last = installment_no == count
+        principal_amount = money(principal - principal_allocated) if is_last else principal_regular
+        interest_amount = money(total_interest - interest_allocated) if is_last else interest_regular
+        installment_amount = money(total_repayment - installment_allocated) if is_last else installment_regular
+        closing_balance = Decimal("0.00") if is_last else money(opening_balance - principal_amount)
+        rows.append((opening_balance, principal_amount, interest_amount, installment_amount, closing_balance))
+        principal_allocated += principal_amount; interest_allocated += interest_amount; installment_allocated += installment_amount
+        opening_balance = closing_balance
+    return tuple(rows)
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _interval_amounts(principal, rate, period_lengths):
+    """Declining-balance amounts for the legacy fixed-interval schedule."""
+    principal_per_installment = money(principal / Decimal(len(period_lengths)))
+    opening_balance = money(principal)
+    rows = []
+    for index, period_days in enumerate(period_lengths, start=1):
+        is_last = index == len(period_lengths)
+        principal_amount = opening_balance if is_last else principal_per_installment
+        interest_amount = money(opening_balance * rate * Decimal(period_days))
+        closing_balance = Decimal("0.00") if is_last else money(opening_balance - principal_amount)
+        rows.append((opening_balance, principal_amount, interest_amount, money(principal_amount + interest_amount), closing_balance))
+        opening_balance = closing_balance
+    return tuple(rows)
+
+
+def _ledger_row(loan_id, installment_no, period_start, due_date, period_days, amounts):
+    opening_balance, principal_amount, interest_amount, installment_amount, closing_balance = amounts
+    return {"loan_id": loan_id, "installment_no": installment_no, "period_start_date": period_start, "due_date": due_date,
+            "period_days": period_days, "opening_balance": opening_balance, "interest_amount": interest_amount,
+            "principal_amount": principal_amount, "installment_amount": installment_amount, "closing_balance": closing_balance,
+            "paid_amount": Decimal("0.00"), "delay_days": 0, "delay_interest": Decimal("0.00"), "status": "PENDING"}
+
 
+def _insert_ledger_rows(loan, rows):
+    """Write the schedule with one bulk INSERT and return the loan's persisted entries."""
+    if rows: db.session.execute(insert(LoanLedger), rows)
+    # A rebuilt schedule starts allocating from its first installment again.
+    reset_cursor(loan)
+    db.session.expire(loan, ["ledger_entries"])
+    return list(loan.ledger_entries)
 
-def _generate_fixed_terms_ledger(loan: Loan):
+
+def fixed_terms_rows(loan: Loan, compact=None) -> list:
+    """Set the loan's schedule fields and return its ledger rows, without writing them.
+
+    Batch callers (``disburse_applications``) collect the rows of many loans
+    and insert them together; a compact schedule returns no rows.
+    """
     count = int(loan.installment_count or loan.number_of_installments or 0)
     if count <= 0:
         return []
@@ -49,37 +107,19 @@ def _generate_fixed_terms_ledger(loan: Loan):
 
     term_type = getattr(loan, "term_type", None) or ("DAYS" if loan.loan_days else None) or ("MONTHS" if getattr(loan, "tenure_months", None) else None)
     term_value = getattr(loan, "term_value", None) or loan.loan_days or getattr(loan, "tenure_months", None)
-    resolved = resolve_loan_term(loan.start_date, term_type, term_value, frequency)
+    resolved = _resolved_term(loan.start_date, term_type, term_value, frequency)
     periods = resolved.installment_periods
     count = resolved.installment_count
 
-    principal_regular = money(principal / Decimal(count))
-    interest_regular = money(total_interest / Decimal(count))
-    installment_regular = money(total_repayment / Decimal(count))
-    opening_balance = principal
-    principal_allocated = Decimal("0.00")
-    interest_allocated = Decimal("0.00")
-    installment_allocated = Decimal("0.00")
-    entries = []
-
-    for period in periods:
-        is_last = period.installment_no == count
-        principal_amount = money(principal - principal_allocated) if is_last else principal_regular
-        interest_amount = money(total_interest - interest_allocated) if is_last else interest_regular
-        installment_amount = money(total_repayment - installment_allocated) if is_last else installment_regular
-        closing_balance = money(opening_balance - principal_amount)
-        if is_last:
-            closing_balance = Decimal("0.00")
-        entry = LoanLedger(
-            loan_id=loan.id, installment_no=period.installment_no, period_start_date=period.period_start,
-            due_date=period.due_date, period_days=period.days_in_period, opening_balance=opening_balance,
-            interest_amount=interest_amount, principal_amount=principal_amount,
-            installment_amount=installment_amount, closing_balance=closing_balance,
-            paid_amount=Decimal("0.00"), delay_days=0, delay_interest=Decimal("0.00"), status="PENDING")
-        db.session.add(entry); entries.append(entry)
-        principal_allocated += principal_amount; interest_allocated += interest_amount; installment_allocated += installment_amount
-        opening_balance = closing_balance
-    loan.final_installment_due_date = entries[-1].due_date if entries else None
+    amounts = _fixed_terms_amounts(principal, total_interest, total_repayment, count)
+    from .loan_schedule import compact_schedules_enabled, create_rule
+    if compact is None:
+        compact = compact_schedules_enabled()
+    rows = [] if compact else [_ledger_row(loan.id, period.installment_no, period.period_start, period.due_date, period.days_in_period, amounts[index])
+                               for index, period in enumerate(periods)]
+    if compact and periods:
+        create_rule(loan, resolved, frequency, amounts)
+    loan.final_installment_due_date = periods[-1].due_date if periods else None
     loan.maturity_date = resolved.maturity_date
     loan.end_date = resolved.maturity_date
     loan.total_days = resolved.total_days
@@ -87,7 +127,12 @@ def _generate_fixed_terms_ledger(loan: Loan):
     loan.installment_count = count
     loan.total_payable = total_repayment
     loan.daily_installment = money(total_repayment / Decimal(max(int(loan.total_days or count), 1)))
-    return entries
+    return rows
+
+
+def _generate_fixed_terms_ledger(loan: Loan, compact=None):
+    rows = fixed_terms_rows(loan, compact)
+    return _insert_ledger_rows(loan, rows) if rows else []
 
 
 def _ordered_entries(loan: Loan):
@@ -179,14 +224,27 @@ def backfill_period_start_dates_from_schedule(loan: Loan) -> int:
         previous_due = entry.due_date or previous_due
     return changed
 
-def generate_loan_ledger(loan: Loan):
-    """Create repayment ledger rows for a loan if they do not already exist."""
+def has_schedule(loan: Loan) -> bool:
+    """Whether the loan has a repayment schedule, stored as rows or as a compact rule."""
+    return bool(loan.compact_schedule) or bool(loan.ledger_entries)
+
+
+def generate_loan_ledger(loan: Loan, compact=None):
+    """Create repayment ledger rows for a loan if they do not already exist.
+
+    Flat schedules are stored as a ``LoanScheduleRule`` instead when ``compact``
+    (default: the ``COMPACT_LOAN_SCHEDULES`` setting) is true; see ``app.loan_schedule``.
+    """
+    if loan.id is None:
+        db.session.flush()
+    if loan.compact_schedule:
+        return []
     existing_count = LoanLedger.query.filter_by(loan_id=loan.id).count() if loan.id else 0
     if existing_count:
         return list(loan.ledger_entries)
 
     if getattr(loan, "number_of_installments", None) and getattr(loan, "installment_amount", None):
-        return _generate_fixed_terms_ledger(loan)
+        return _generate_fixed_terms_ledger(loan, compact)
 
     interval = int(getattr(loan, "payment_interval_days", None) or 7)
     if interval <= 0:
@@ -198,27 +256,15 @@ def generate_loan_ledger(loan: Loan):
     period_lengths = [interval] * full_periods
     if remainder:
         period_lengths.append(remainder)
-    installment_count = len(period_lengths)
-    principal = Decimal(loan.principal_amount)
-    principal_per_installment = money(principal / Decimal(installment_count))
-    opening_balance = money(principal)
-    rate = daily_interest_rate(loan)
-    period_start = loan.start_date
-    entries = []
+    amounts = _interval_amounts(Decimal(loan.principal_amount), daily_interest_rate(loan), tuple(period_lengths))
+    rows, period_start = [], loan.start_date
     for index, period_days in enumerate(period_lengths, start=1):
-        is_last = index == installment_count
-        principal_amount = opening_balance if is_last else principal_per_installment
-        interest_amount = money(opening_balance * rate * Decimal(period_days))
-        installment_amount = money(principal_amount + interest_amount)
-        closing_balance = money(opening_balance - principal_amount)
-        if is_last: closing_balance = Decimal("0.00")
-        entry = LoanLedger(loan_id=loan.id, installment_no=index, period_start_date=period_start, due_date=period_start + timedelta(days=period_days - 1), period_days=period_days, opening_balance=opening_balance, interest_amount=interest_amount, principal_amount=principal_amount, installment_amount=installment_amount, closing_balance=closing_balance, paid_amount=Decimal("0.00"), delay_days=0, delay_interest=Decimal("0.00"), status="PENDING")
-        db.session.add(entry); entries.append(entry)
-        opening_balance = closing_balance; period_start = period_start + timedelta(days=period_days)
-    loan.final_installment_due_date = entries[-1].due_date if entries else None
-    loan.total_payable = money(sum((e.installment_amount for e in entries), Decimal("0.00")))
+        rows.append(_ledger_row(loan.id, index, period_start, period_start + timedelta(days=period_days - 1), period_days, amounts[index - 1]))
+        period_start = period_start + timedelta(days=period_days)
+    loan.final_installment_due_date = rows[-1]["due_date"]
+    loan.total_payable = money(sum((row["installment_amount"] for row in rows), Decimal("0.00")))
     loan.daily_installment = money(loan.total_payable / Decimal(total_days))
-    return entries
+    return _insert_ledger_rows(loan, rows)
 
 
 def ledger_totals(loan: Loan) -> dict:
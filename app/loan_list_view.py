@@ -0,0 +1,118 @@
+"""Denormalized read model for the admin loan list.
+
+``loan_list_view`` holds one row per loan with the customer, product, balance,
+next due date and last payment columns the list filters and sorts on, so a
+page is an indexed scan of one table instead of correlated aggregates per
+loan.  Rows are refreshed at commit for loans whose loan, customer, payment,
+ledger, deduction or application rows changed in the session.  Migration 0060
+fills the table for existing loans; ``flask rebuild-loan-list-view`` rebuilds it.  Days past due are derived from
+``next_due_date`` at read time so the rows do not go stale overnight.
+"""
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import delete, func, insert, select
+
+from . import read_models
+from .extensions import db
+from .models import Customer, Loan, LoanApplication, LoanDisbursementDeduction, LoanLedger, LoanListView, LoanScheduleRule, Payment
+
+ZERO = Decimal("0.00")
+# Changes to these columns move a loan's list row; other updates (accrual flags, journals) do not.
+TRACKED_FIELDS = {
+    Payment: ("loan_id", "amount_collected", "status", "reversed_at", "collection_date"),
+    LoanLedger: ("due_date", "status"),
+    LoanDisbursementDeduction: ("loan_id", "loan_application_id"),
+    Customer: ("full_name", "customer_code", "nic_number", "mobile"),
+    LoanApplication: ("application_number", "loan_type"),
+    LoanScheduleRule: ("next_due_date",),
+}
+
+
+def _money(value):
+    return Decimal(str(value or 0)).quantize(ZERO)
+
+
+def days_past_due(next_due_date, as_of=None):
+    if next_due_date is None: return 0
+    return max(0, ((as_of or date.today()) - next_due_date).days)
+
+
+def _build_rows(loan_ids):
+    receipts = (select(Payment.loan_id.label("loan_id"), func.sum(Payment.amount_collected).label("paid"),
+                       func.max(Payment.collection_date).label("last_payment_date"))
+                .where(Payment.loan_id.in_(loan_ids), Payment.reversed_at.is_(None), func.upper(func.trim(Payment.status)) == "POSTED")
+                .group_by(Payment.loan_id).subquery())
+    due = (select(LoanLedger.loan_id.label("loan_id"), func.min(LoanLedger.due_date).label("next_due_date"))
+           .where(LoanLedger.loan_id.in_(loan_ids), LoanLedger.status != "PAID").group_by(LoanLedger.loan_id).subquery())
+    # The list has always linked a loan to its application through the lowest disbursement-deduction application id.
+    linked = (select(LoanDisbursementDeduction.loan_id.label("loan_id"), func.min(LoanDisbursementDeduction.loan_application_id).label("application_id"))
+              .where(LoanDisbursementDeduction.loan_id.in_(loan_ids)).group_by(LoanDisbursementDeduction.loan_id).subquery())
+    rows = db.session.execute(
+        select(Loan.id, Loan.loan_number, Loan.customer_id, Loan.status, Loan.principal_amount, Loan.total_payable,
+               Loan.customer_credit_balance, Loan.start_date, Loan.settled_date, Customer.customer_code, Customer.full_name,
+               Customer.nic_number, Customer.mobile, linked.c.application_id, LoanApplication.application_number,
+               LoanApplication.loan_type, receipts.c.paid, receipts.c.last_payment_date,
+               # A compact schedule's first unstored installment comes after every stored one.
+               func.coalesce(due.c.next_due_date, LoanScheduleRule.next_due_date).label("next_due_date"))
+        .outerjoin(Customer, Customer.id == Loan.customer_id).outerjoin(linked, linked.c.loan_id == Loan.id)
+        .outerjoin(LoanApplication, LoanApplication.id == linked.c.application_id)
+        .outerjoin(receipts, receipts.c.loan_id == Loan.id).outerjoin(due, due.c.loan_id == Loan.id)
+        .outerjoin(LoanScheduleRule, LoanScheduleRule.loan_id == Loan.id)
+        .where(Loan.id.in_(loan_ids))).all()
+    now = datetime.utcnow()
+    for r in rows:
+        paid = _money(r.paid)
+        raw_outstanding = _money(r.total_payable) - paid
+        yield {"loan_id": r.id, "loan_number": r.loan_number, "customer_id": r.customer_id, "customer_code": r.customer_code,
+               "customer_name": r.full_name or "", "nic_number": r.nic_number, "mobile": r.mobile, "application_id": r.application_id,
+               "application_number": r.application_number, "product": r.loan_type, "status": str(r.status or "").strip().upper(),
+               "principal_amount": _money(r.principal_amount), "total_payable": _money(r.total_payable), "total_paid": paid,
+               "raw_outstanding": raw_outstanding, "outstanding_amount": max(ZERO, raw_outstanding),
+               "customer_credit_balance": _money(r.customer_credit_balance), "start_date": r.start_date, "settled_date": r.settled_date,
+               "next_due_date": r.next_due_date, "last_payment_date": r.last_payment_date, "refreshed_at": now}
+
+
+def refresh_loans(loan_ids):
+    """Replace the list rows of ``loan_ids`` with one DELETE and one bulk INSERT; deleted loans drop out."""
+    loan_ids = sorted({int(i) for i in loan_ids if i})
+    if not loan_ids: return 0
+    db.session.execute(delete(LoanListView).where(LoanListView.loan_id.in_(loan_ids)))
+    values = list(_build_rows(loan_ids))
+    if values: db.session.execute(insert(LoanListView), values)
+    return len(values)
+
+
+def rebuild_view(batch_size=1000):
+    db.session.execute(delete(LoanListView))
+    last_id, loans = 0, 0
+    while True:
+        ids = [r[0] for r in db.session.query(Loan.id).filter(Loan.id > last_id).order_by(Loan.id).limit(batch_size)]
+        if not ids: break
+        loans += refresh_loans(ids); last_id = ids[-1]
+    return {"loans": loans}
+
+
+def _collect_changed(session, pending):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Loan):
+            pending["loans"].add(obj.id); continue
+        fields = TRACKED_FIELDS.get(type(obj))
+        if not fields: continue
+        if obj in session.dirty and not any(db.inspect(obj).attrs[f].history.has_changes() for f in fields): continue
+        if isinstance(obj, Customer): pending["customers"].add(obj.id)
+        elif isinstance(obj, LoanApplication): pending["applications"].add(obj.id)
+        else: pending["loans"].add(obj.loan_id)
+
+
+def _refresh(session, pending):
+    loan_ids = set(pending["loans"])
+    if pending["customers"]:
+        loan_ids.update(r[0] for r in session.query(Loan.id).filter(Loan.customer_id.in_(pending["customers"])))
+    if pending["applications"]:
+        loan_ids.update(r[0] for r in session.query(LoanDisbursementDeduction.loan_id)
+                        .filter(LoanDisbursementDeduction.loan_application_id.in_(pending["applications"])))
+    refresh_loans(loan_ids)
+
+
+read_models.register("loan_list_view", _refresh, _collect_changed)
@@ -0,0 +1,74 @@
+"""Loan offer comparison grid.
+
+Quotes every amount × term × repayment frequency combination in one pass:
+term resolution runs once per (term, frequency) pair, interest and
+disbursement charges once per amount, and the charge catalog, accounts and
+settings are loaded once for the whole grid.  The arithmetic is the same
+Decimal expressions as ``calculate_flat_term_amounts`` and
+``calculate_disbursement_charges``, so a grid cell equals the scalar result.
+"""
+from datetime import date
+from decimal import Decimal
+
+from .accounting import AccountingError, apply_disbursement_charges, prepare_disbursement_charges, required_disbursement_charges
+from .loan_terms import money, resolve_loan_term
+
+MAX_QUOTES = 1000
+
+
+class QuoteGridError(ValueError):
+    pass
+
+
+def _fmt(value):
+    return f"{money(value):.2f}"
+
+
+def _flat_amounts(principal, interest_rate):
+    """Amount-only half of ``calculate_flat_term_amounts``: interest does not depend on the term."""
+    total_interest = money(principal * interest_rate / Decimal("100"))
+    return total_interest, money(principal + total_interest)
+
+
+def quote_grid(amounts, terms, frequencies, interest_rate, start_date=None, charges=None):
+    """Return one quote per combination; a combination that cannot be offered carries an ``error``."""
+    if len(amounts) * len(terms) * len(frequencies) > MAX_QUOTES:
+        raise QuoteGridError(f"A quote grid is limited to {MAX_QUOTES} combinations")
+    start_date = start_date or date.today()
+    interest_rate = Decimal(str(interest_rate or 0))
+    prepared = prepare_disbursement_charges(required_disbursement_charges() if charges is None else charges)
+
+    schedules = []
+    for term_type, term_value in terms:
+        for frequency in frequencies:
+            try:
+                resolved = resolve_loan_term(start_date, term_type, term_value, frequency)
+                schedules.append((term_type, term_value, frequency, resolved, None))
+            except ValueError as exc:
+                schedules.append((term_type, term_value, frequency, None, str(exc)))
+
+    quotes = []
+    for amount in amounts:
+        principal = money(amount)
+        total_interest, total_repayment = _flat_amounts(principal, interest_rate)
+        try:
+            deductions = apply_disbursement_charges(principal, prepared)
+            charge_error = None
+        except AccountingError as exc:
+            deductions, charge_error = None, str(exc)
+        for term_type, term_value, frequency, resolved, term_error in schedules:
+            quote = {"amount": _fmt(principal), "term_type": term_type, "term_value": term_value, "repayment_frequency": frequency}
+            if term_error:
+                quotes.append({**quote, "error": term_error}); continue
+            count = resolved.installment_count
+            quote.update({"installment_count": count, "total_days": resolved.total_days,
+                          "maturity_date": resolved.maturity_date.isoformat(),
+                          "installment_amount": _fmt(total_repayment / Decimal(count)),
+                          "total_interest": _fmt(total_interest), "total_repayment": _fmt(total_repayment)})
+            if charge_error:
+                quote["error"] = charge_error
+            else:
+                quote.update({"total_deductions": _fmt(deductions["total_deductions"]), "tax_amount": _fmt(deductions["tax_amount"]),
+                              "net_disbursement": _fmt(deductions["net_disbursement"])})
+            quotes.append(quote)
+    return quotes
@@ -17,8 +17,8 @@ def _normalize_status(value):
 
 def is_safe_to_repair_defective_loan(loan: Loan) -> tuple[bool, list[str]]:
     reasons = []
-    if _normalize_status(loan.status) != "ACTIVE":
-        reasons.append("loan status is not ACTIVE")
+    if _normalize_status(loan.status) not in {"ACTIVE", "OVERDUE"}:
+        reasons.append("loan status is not ACTIVE or OVERDUE")
     if money(loan.total_paid) != Decimal("0.00"):
         reasons.append("loan has paid amount")
     if Payment.query.filter_by(loan_id=loan.id).count():
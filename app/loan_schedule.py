@@ -0,0 +1,188 @@
+"""Compact rule-based repayment schedules.
+
+A flat schedule is fully described by its start, maturity, frequency, count and
+the regular/final installment amounts, so a loan disbursed with
+``COMPACT_LOAN_SCHEDULES`` enabled stores one ``LoanScheduleRule`` instead of a
+``LoanLedger`` row per installment.  Rows are the exception records: an
+installment is written (as a contiguous prefix, with one bulk INSERT) only once
+it falls due, is paid, or a caller needs the full schedule.  Amounts due up to
+any date are computed arithmetically from the rule.
+
+Code that still iterates ``Loan.ledger_entries`` keeps working: loading that
+relationship for a compact loan expands the remaining installments first.
+"""
+from datetime import date, timedelta
+from decimal import ROUND_CEILING, Decimal
+
+from flask import current_app
+from sqlalchemy import event, insert, update
+
+from .allocation_cursor import open_entries
+from .extensions import db
+from .loan_ledger import _ledger_row, money
+from .loan_terms import add_calendar_months
+from .models import Loan, LoanLedger, LoanScheduleRule
+
+ZERO = Decimal("0.00")
+
+
+def compact_schedules_enabled():
+    return bool(current_app.config.get("COMPACT_LOAN_SCHEDULES"))
+
+
+def create_rule(loan, resolved, frequency, amounts):
+    """Store the schedule of ``loan`` as a rule; ``amounts`` is the loan_ledger amounts tuple."""
+    count = resolved.installment_count
+    regular, final = amounts[0], amounts[-1]
+    rule = LoanScheduleRule(loan_id=loan.id, start_date=resolved.start_date, maturity_date=resolved.maturity_date,
+                            frequency=frequency, period_days={"DAILY": 1, "WEEKLY": 7}.get(frequency), installment_count=count,
+                            principal_amount=regular[0], regular_principal=regular[1], regular_interest=regular[2],
+                            regular_installment=regular[3], final_principal=final[1], final_interest=final[2],
+                            final_installment=final[3], materialized_count=0)
+    rule.next_due_date = period(rule, 1)[1]
+    db.session.add(rule)
+    loan.compact_schedule = True
+    return rule
+
+
+def period(rule, n):
+    """(period_start, due_date, days) of installment ``n``, in closed form."""
+    if rule.frequency == "MONTHLY":
+        start = add_calendar_months(rule.start_date, n - 1)
+        due = min(add_calendar_months(rule.start_date, n), rule.maturity_date)
+    else:
+        start = rule.start_date + timedelta(days=(n - 1) * rule.period_days)
+        due = min(start + timedelta(days=rule.period_days), rule.maturity_date)
+    return start, due, (due - start).days
+
+
+def amounts(rule, n):
+    """(opening, principal, interest, installment, closing) of installment ``n``."""
+    opening = money(rule.principal_amount - rule.regular_principal * (n - 1))
+    if n == rule.installment_count:
+        return opening, money(rule.final_principal), money(rule.final_interest), money(rule.final_installment), ZERO
+    principal = money(rule.regular_principal)
+    return opening, principal, money(rule.regular_interest), money(rule.regular_installment), money(opening - principal)
+
+
+def due_count(rule, as_of):
+    """Number of installments whose due date is on or before ``as_of``."""
+    if as_of >= rule.maturity_date: return rule.installment_count
+    if as_of < rule.start_date: return 0
+    if rule.frequency == "MONTHLY":
+        n = (as_of.year - rule.start_date.year) * 12 + as_of.month - rule.start_date.month
+        if add_calendar_months(rule.start_date, n) > as_of: n -= 1
+    else:
+        n = (as_of - rule.start_date).days // rule.period_days
+    return max(0, min(n, rule.installment_count))
+
+
+def scheduled_through(rule, k):
+    """Contractual principal, interest and installment totals of installments ``1..k``."""
+    k = max(0, min(int(k), rule.installment_count))
+    regular = min(k, rule.installment_count - 1)
+    principal = money(rule.regular_principal * regular)
+    interest = money(rule.regular_interest * regular)
+    installment = money(rule.regular_installment * regular)
+    if k == rule.installment_count:
+        principal = money(principal + rule.final_principal)
+        interest = money(interest + rule.final_interest)
+        installment = money(installment + rule.final_installment)
+    return {"principal": principal, "interest": interest, "installment": installment}
+
+
+def due_through(loan, as_of=None):
+    """Contractual amount due up to ``as_of`` for a compact loan, without touching ledger rows."""
+    rule = loan.schedule_rule
+    return scheduled_through(rule, due_count(rule, as_of or date.today()))["installment"]
+
+
+def stored_entries(loan):
+    """Persisted ledger rows of ``loan`` ordered by installment; does not expand a compact schedule."""
+    if not getattr(loan, "compact_schedule", False):
+        return list(loan.ledger_entries)
+    return LoanLedger.query.filter_by(loan_id=loan.id).order_by(LoanLedger.installment_no).all()
+
+
+def pending_schedule_totals(loan):
+    """Principal and interest of installments still implied by the rule rather than stored."""
+    rule = loan.schedule_rule if getattr(loan, "compact_schedule", False) else None
+    if rule is None: return {"principal": ZERO, "interest": ZERO, "installment": ZERO}
+    total, stored = scheduled_through(rule, rule.installment_count), scheduled_through(rule, rule.materialized_count)
+    return {key: money(total[key] - stored[key]) for key in total}
+
+
+def _materialize(pairs):
+    """Write installments ``materialized_count+1..through`` for each (rule, through) with one INSERT."""
+    rows, completed = [], []
+    for rule, through in pairs:
+        through = min(int(through), rule.installment_count)
+        if through <= rule.materialized_count: continue
+        for n in range(rule.materialized_count + 1, through + 1):
+            start, due, days = period(rule, n)
+            rows.append(_ledger_row(rule.loan_id, n, start, due, days, amounts(rule, n)))
+        rule.materialized_count = through
+        rule.next_due_date = period(rule, through + 1)[1] if through < rule.installment_count else None
+        if through == rule.installment_count: completed.append(rule.loan_id)
+    if rows: db.session.execute(insert(LoanLedger), rows)
+    if completed:
+        db.session.execute(update(Loan).where(Loan.id.in_(completed)).values(compact_schedule=False))
+    return len(rows)
+
+
+def materialize(loan, through):
+    written = _materialize([(loan.schedule_rule, through)]) if getattr(loan, "compact_schedule", False) else 0
+    if written: db.session.expire(loan, ["ledger_entries"])
+    return written
+
+
+def expand_schedule(loan):
+    """Store every remaining installment so ``loan`` is an ordinary materialized loan again."""
+    return materialize(loan, loan.schedule_rule.installment_count) if getattr(loan, "compact_schedule", False) else 0
+
+
+def expand_loan(loan_id):
+    """Expand by id before a query that eager-loads ``Loan.ledger_entries``."""
+    rule = LoanScheduleRule.query.join(Loan).filter(LoanScheduleRule.loan_id == loan_id, Loan.compact_schedule.is_(True)).first()
+    return _materialize([(rule, rule.installment_count)]) if rule else 0
+
+
+def materialize_due(as_of, loan_id=None):
+    """Store every compact installment due on or before ``as_of``; used ahead of the due-date jobs."""
+    query = LoanScheduleRule.query.join(Loan).filter(Loan.compact_schedule.is_(True), LoanScheduleRule.next_due_date <= as_of)
+    if loan_id: query = query.filter(LoanScheduleRule.loan_id == loan_id)
+    return _materialize([(rule, due_count(rule, as_of)) for rule in query.all()])
+
+
+def materialize_for_payment(loan, amount, paid_date):
+    """Store the installments a receipt on ``paid_date`` can reach: everything due, plus prepaid ones."""
+    if not getattr(loan, "compact_schedule", False): return 0
+    rule = loan.schedule_rule
+    through = max(rule.materialized_count, due_count(rule, paid_date))
+    written = materialize(loan, through)
+    unpaid = sum((max(ZERO, money(e.interest_amount) - money(e.interest_paid)) + max(ZERO, money(e.principal_amount) - money(e.principal_paid))
+                  for e in open_entries(loan)), ZERO)
+    remaining = money(amount) - unpaid
+    if remaining > 0 and rule.materialized_count < rule.installment_count:
+        step = money(rule.regular_installment)
+        ahead = (remaining / step).to_integral_value(rounding=ROUND_CEILING) if step > 0 else rule.installment_count
+        written += materialize(loan, rule.materialized_count + int(ahead))
+    return written
+
+
+@event.listens_for(db.session, "do_orm_execute")
+def _expand_before_ledger_load(state):
+    """Expand compact loans whose ``ledger_entries`` relationship is being loaded by legacy code."""
+    if not state.is_relationship_load or not state.loader_strategy_path: return
+    prop = state.loader_strategy_path[-1]
+    if getattr(prop, "key", None) != "ledger_entries" or getattr(prop, "parent", None) is None or prop.parent.class_ is not Loan: return
+    if state.lazy_loaded_from is not None:
+        loans = [state.lazy_loaded_from.obj()]
+    else:
+        identity = state.session.identity_map
+        loans = [identity.get(Loan.__mapper__.identity_key_from_primary_key([key]))
+                 for key in (state.parameters or {}).get("primary_keys", ())]
+    # Only look at loaded state: deciding must not cost a query for ordinary loans.
+    rules = [(loan.schedule_rule, loan.schedule_rule.installment_count) for loan in loans
+             if loan is not None and loan.__dict__.get("compact_schedule") and loan.schedule_rule is not None]
+    if rules: _materialize(rules)
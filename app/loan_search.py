@@ -0,0 +1,158 @@
+"""Indexed loan search.
+
+PostgreSQL serves ``ILIKE '%term%'`` from pg_trgm GIN indexes (migration 0054).
+Other engines use ``loan_search_tokens``: normalized words of the loan number,
+customer name, NIC and mobile, matched by prefix with an index range scan.  The
+token table is refreshed at commit for loans and customers changed in the
+session, and rebuilt with ``flask rebuild-loan-search-index``; the deploy
+entrypoint runs it with ``--missing-only`` after migrating, which tokenizes the
+loans that existed before migration 0054.
+"""
+import re
+from decimal import Decimal
+
+from sqlalchemy import and_, case, delete, func, insert, or_, select
+
+from . import read_models
+from .extensions import db
+from .loan_totals import money
+from .models import Customer, Loan, LoanLedger, LoanSearchToken, Payment
+
+MAX_RESULTS = 50
+DEFAULT_RESULTS = 20
+TOKEN_FIELDS = {Loan: ("loan_number", "customer_id"), Customer: ("full_name", "nic_number", "mobile")}
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def uses_trigram_index():
+    return bool(db.session.bind and db.session.bind.dialect.name == "postgresql")
+
+
+def normalize_words(value):
+    return [w for w in _NON_ALNUM.split(str(value or "").lower()) if w]
+
+
+def loan_tokens(loan_number, full_name, nic_number, mobile):
+    tokens = set(normalize_words(full_name))
+    for value in (loan_number, nic_number):
+        # Identifiers also match when typed without separators (LN-0042 -> ln0042).
+        words = normalize_words(value); tokens.update(words); tokens.add("".join(words))
+    digits = re.sub(r"\D", "", str(mobile or ""))
+    if digits:
+        # Local and international spellings of the same number both prefix-match.
+        tokens.update({digits, digits.lstrip("0"), digits[-9:]} - {""})
+    return {t[:120] for t in tokens if t}
+
+
+def index_loans(loan_ids):
+    """Replace the token rows of ``loan_ids`` with one DELETE and one bulk INSERT."""
+    loan_ids = sorted({int(i) for i in loan_ids if i})
+    if not loan_ids: return 0
+    db.session.execute(delete(LoanSearchToken).where(LoanSearchToken.loan_id.in_(loan_ids)))
+    rows = (db.session.query(Loan.id, Loan.loan_number, Customer.full_name, Customer.nic_number, Customer.mobile)
+            .outerjoin(Customer, Customer.id == Loan.customer_id).filter(Loan.id.in_(loan_ids)).all())
+    values = [{"loan_id": row.id, "token": token} for row in rows
+              for token in sorted(loan_tokens(row.loan_number, row.full_name, row.nic_number, row.mobile))]
+    if values: db.session.execute(insert(LoanSearchToken), values)
+    return len(values)
+
+
+def index_missing(batch_size=1000):
+    """Tokenize only loans without token rows, e.g. every loan that existed before migration 0054."""
+    missing = ~select(LoanSearchToken.id).where(LoanSearchToken.loan_id == Loan.id).exists()
+    last_id, loans, tokens = 0, 0, 0
+    while True:
+        ids = [r[0] for r in db.session.query(Loan.id).filter(Loan.id > last_id, missing).order_by(Loan.id).limit(batch_size)]
+        if not ids: break
+        tokens += index_loans(ids); loans += len(ids); last_id = ids[-1]
+    return {"loans": loans, "tokens": tokens, "mode": "token"}
+
+
+def rebuild_index(batch_size=1000):
+    db.session.execute(delete(LoanSearchToken))
+    last_id, loans, tokens = 0, 0, 0
+    while True:
+        ids = [r[0] for r in db.session.query(Loan.id).filter(Loan.id > last_id).order_by(Loan.id).limit(batch_size)]
+        if not ids: break
+        tokens += index_loans(ids); loans += len(ids); last_id = ids[-1]
+    return {"loans": loans, "tokens": tokens, "mode": "trigram" if uses_trigram_index() else "token"}
+
+
+def _collect_changed(session, pending):
+    for obj in list(session.new) + list(session.dirty):
+        fields = TOKEN_FIELDS.get(type(obj))
+        if not fields: continue
+        state = db.inspect(obj)
+        if obj in session.new or any(state.attrs[f].history.has_changes() for f in fields):
+            pending["loans" if isinstance(obj, Loan) else "customers"].add(obj.id)
+
+
+def _refresh(session, pending):
+    if uses_trigram_index(): return
+    loan_ids = set(pending["loans"])
+    if pending["customers"]:
+        loan_ids.update(r[0] for r in session.query(Loan.id).filter(Loan.customer_id.in_(pending["customers"])))
+    index_loans(loan_ids)
+
+
+read_models.register("loan_search", _refresh, _collect_changed)
+
+
+def _rank(q):
+    term = q.lower(); prefix = f"{term}%"
+    exact = or_(func.lower(Loan.loan_number) == term, func.lower(Customer.nic_number) == term, Customer.mobile == q)
+    starts = or_(func.lower(Loan.loan_number).like(prefix), func.lower(Customer.full_name).like(prefix),
+                 func.lower(Customer.nic_number).like(prefix), Customer.mobile.like(prefix))
+    return case((exact, 0), (starts, 1), else_=2)
+
+
+def find_loans(query, limit=DEFAULT_RESULTS, statuses=None):
+    """Ranked loan matches: exact identifiers, then prefixes, then other hits; eligible statuses first."""
+    q = (query or "").strip()
+    words = normalize_words(q)
+    if not q or not words: return []
+    limit = min(max(int(limit or DEFAULT_RESULTS), 1), MAX_RESULTS)
+    search = (db.session.query(Loan.id, Loan.loan_number, Loan.customer_id, Loan.status, Customer.full_name,
+                               Customer.nic_number, Customer.mobile).join(Customer, Customer.id == Loan.customer_id))
+    if uses_trigram_index():
+        pattern = f"%{q}%"
+        search = search.filter(or_(Loan.loan_number.ilike(pattern), Customer.full_name.ilike(pattern),
+                                   Customer.nic_number.ilike(pattern), Customer.mobile.ilike(pattern)))
+    else:
+        for word in words:
+            # Range predicate instead of LIKE so the (token, loan_id) index is used on every engine.
+            search = search.filter(Loan.id.in_(select(LoanSearchToken.loan_id).where(
+                and_(LoanSearchToken.token >= word, LoanSearchToken.token < word + "\uffff"))))
+    ordering = [_rank(q)]
+    if statuses: ordering.insert(0, case((func.upper(func.trim(Loan.status)).in_(statuses), 0), else_=1))
+    return search.order_by(*ordering, Loan.loan_number, Loan.id).limit(limit).all()
+
+
+def due_aggregates(loan_ids):
+    """Outstanding and delay interest for ``loan_ids`` in one statement; mirrors loan_totals.loan_totals."""
+    loan_ids = list(loan_ids)
+    if not loan_ids: return {}
+    ledger = (select(LoanLedger.loan_id.label("loan_id"),
+                     func.sum(LoanLedger.delay_interest_accrued - LoanLedger.delay_interest_paid).label("delay_due"),
+                     func.sum(LoanLedger.waived_interest_amount).label("interest_waived"),
+                     func.sum(LoanLedger.waived_delay_interest_amount).label("delay_waived"),
+                     func.sum(LoanLedger.waived_penalty_amount).label("penalty_waived"))
+              .where(LoanLedger.loan_id.in_(loan_ids)).group_by(LoanLedger.loan_id).subquery())
+    receipts = (select(Payment.loan_id.label("loan_id"), func.sum(Payment.amount_collected).label("paid"))
+                .where(Payment.loan_id.in_(loan_ids), Payment.reversed_at.is_(None), func.upper(func.trim(Payment.status)) == "POSTED",
+                       Payment.transaction_type != "POST_SETTLEMENT_PAYMENT")
+                .group_by(Payment.loan_id).subquery())
+    rows = db.session.execute(
+        select(Loan.id, Loan.total_payable, Loan.interest_rebate_amount, Loan.delay_interest_waiver_amount, Loan.penalty_waiver_amount,
+               ledger.c.delay_due, ledger.c.interest_waived, ledger.c.delay_waived, ledger.c.penalty_waived, receipts.c.paid)
+        .outerjoin(ledger, ledger.c.loan_id == Loan.id).outerjoin(receipts, receipts.c.loan_id == Loan.id)
+        .where(Loan.id.in_(loan_ids))).all()
+    result = {}
+    for r in rows:
+        # Loan-level approved waivers win over the ledger detail, as in loan_totals.
+        waived = sum((money(loan_level) or money(ledger_level) for loan_level, ledger_level in
+                      ((r.interest_rebate_amount, r.interest_waived), (r.delay_interest_waiver_amount, r.delay_waived),
+                       (r.penalty_waiver_amount, r.penalty_waived))), Decimal("0.00"))
+        result[r.id] = {"outstanding": max(Decimal("0.00"), money(r.total_payable) - money(money(r.paid) + waived)),
+                        "delay_interest_outstanding": money(r.delay_due), "total_paid": money(r.paid)}
+    return result
@@ -6,6 +6,7 @@ loan account ACTIVE after principal and contractual interest are cleared.
 from datetime import datetime
 from decimal import Decimal
 
+from .loan_schedule import pending_schedule_totals, stored_entries
 from .models import Loan
 
 
@@ -32,9 +33,10 @@ def serialize_loan_status(loan):
 
 def contractual_balances(loan):
     """Return canonical outstanding contractual and delay-interest balances."""
-    entries = list(loan.ledger_entries)
-    principal = sum((_amount(row.principal_amount) - _amount(row.principal_paid) for row in entries), Decimal())
-    interest = sum((_amount(row.interest_amount) - _amount(row.interest_paid) - _amount(row.waived_interest_amount) for row in entries), Decimal())
+    entries = stored_entries(loan)
+    pending = pending_schedule_totals(loan)
+    principal = pending["principal"] + sum((_amount(row.principal_amount) - _amount(row.principal_paid) for row in entries), Decimal())
+    interest = pending["interest"] + sum((_amount(row.interest_amount) - _amount(row.interest_paid) - _amount(row.waived_interest_amount) for row in entries), Decimal())
     delay_interest = sum((_amount(row.delay_interest_accrued) - _amount(row.delay_interest_paid) - _amount(row.delay_interest_waived) for row in entries), Decimal())
     return {
         "principal_outstanding": max(principal, Decimal("0")),
@@ -64,7 +66,8 @@ def update_loan_settlement_status(loan_id, settlement_date=None, user_id=None, l
                 loan.settled_at = (datetime.combine(settlement_date, datetime.min.time())
                                    if settlement_date else datetime.utcnow())
                 loan.settled_by_id = user_id
-        else:
+        elif current != "OVERDUE":
+            # OVERDUE is left for the nightly classification (app.overdue_classification) to clear.
             loan.status = "ACTIVE"
     balances["is_contractually_settled"] = settled
     return loan, balances
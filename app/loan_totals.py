@@ -24,7 +24,9 @@ def is_valid_posted_receipt(payment):
 
 
 def loan_totals(loan):
-    entries = list(loan.ledger_entries)
+    from .loan_schedule import stored_entries
+    # Installments a compact schedule has not stored yet carry no receipts or waivers.
+    entries = stored_entries(loan)
     receipts = [payment for payment in loan.payments if is_valid_posted_receipt(payment)]
     post_settlement_receipts = [payment for payment in receipts if getattr(payment, "transaction_type", None) == "POST_SETTLEMENT_PAYMENT"]
     contractual_receipts = [payment for payment in receipts if payment not in post_settlement_receipts]
@@ -127,11 +127,19 @@ class Customer(db.Model):
     kyc_status = db.Column(db.String(32), nullable=False, default="PENDING")
     eligibility_status = db.Column(db.String(32), nullable=False, default="UNKNOWN")
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Maintained from nic_number/mobile/guarantor_mobile by app.customer_identity on every write.
+    nic_canonical = db.Column(db.String(20), nullable=True)
+    mobile_e164 = db.Column(db.String(20), nullable=True)
+    guarantor_mobile_e164 = db.Column(db.String(20), nullable=True)
 
     __table_args__ = (
         Index("ix_customers_nic_number", "nic_number"),
         Index("ix_customers_mobile", "mobile"),
         Index("ix_customers_lower_full_name", func.lower(full_name)),
+        Index("ix_customers_nic_canonical", "nic_canonical", postgresql_where=db.text("nic_canonical IS NOT NULL"), sqlite_where=db.text("nic_canonical IS NOT NULL")),
+        Index("ix_customers_mobile_e164", "mobile_e164", postgresql_where=db.text("mobile_e164 IS NOT NULL"), sqlite_where=db.text("mobile_e164 IS NOT NULL")),
+        Index("ix_customers_guarantor_mobile_e164", "guarantor_mobile_e164", postgresql_where=db.text("guarantor_mobile_e164 IS NOT NULL"), sqlite_where=db.text("guarantor_mobile_e164 IS NOT NULL")),
     )
 
     user = relationship("User", back_populates="customer_profile")
@@ -255,6 +263,7 @@ class CustomerKYCProfile(db.Model):
     review_status = db.Column(db.String(32), nullable=True)
     reviewed_at = db.Column(db.DateTime, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     customer = relationship("Customer", back_populates="kyc_profile")
 
@@ -302,9 +311,10 @@ class Loan(db.Model):
     end_date = db.Column(db.Date, nullable=False)
     maturity_date = db.Column(db.Date)
     final_installment_due_date = db.Column(db.Date)
-    status = db.Column(db.String(50), default="ACTIVE")
+    status = db.Column(db.String(50), default="ACTIVE", index=True)
     created_by_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     interest_accounting_method = db.Column(db.String(32), nullable=False, default="ACCRUAL_BY_INSTALLMENT")
     historical_accrual_mode = db.Column(db.String(16), nullable=False, default="AUTO")
     accrual_processed_through = db.Column(db.Date)
@@ -331,6 +341,12 @@ class Loan(db.Model):
     # Reconciled cache only; receipt aggregation remains the source of truth.
     cash_paid_cache = db.Column(Numeric(18, 2))
     outstanding_amount = db.Column(Numeric(18, 2))
+    # True while the schedule is a LoanScheduleRule plus only the installments touched so far.
+    compact_schedule = db.Column(db.Boolean, nullable=False, default=False)
+    # (due_date, installment_no) from which payment allocation starts; every
+    # installment before it is fully paid.  NULL means start at the beginning.
+    allocation_cursor_due_date = db.Column(db.Date)
+    allocation_cursor_installment = db.Column(db.Integer)
 
     customer = relationship("Customer", back_populates="loans")
     created_by = relationship(
@@ -356,6 +372,9 @@ class Loan(db.Model):
 
     def expected_to_date(self) -> Decimal:
         today = date.today()
+        if self.compact_schedule and self.schedule_rule is not None:
+            from .loan_schedule import due_through
+            return due_through(self, today)
         if today < self.start_date:
             return Decimal("0")
         elapsed_days = min((today - self.start_date).days + 1, self.total_days)
@@ -397,6 +416,7 @@ class LoanLedger(db.Model):
         db.UniqueConstraint(
             "loan_id", "installment_no", name="uq_loan_ledger_loan_installment"
         ),
+        Index("ix_loan_ledger_allocation_order", "loan_id", "due_date", "installment_no"),
     )
 
     id = db.Column(db.Integer, primary_key=True)
@@ -448,8 +468,58 @@ class LoanLedger(db.Model):
     loan = relationship("Loan", back_populates="ledger_entries")
 
 
+class LoanScheduleRule(db.Model):
+    """Arithmetic description of a flat repayment schedule (see ``app.loan_schedule``).
+
+    Installments ``1..materialized_count`` exist as ``LoanLedger`` rows; the rest
+    are implied by the rule until a payment, accrual or legacy reader needs them.
+    """
+    __tablename__ = "loan_schedule_rules"
+    __table_args__ = (Index("ix_loan_schedule_rules_next_due", "next_due_date"),)
+
+    loan_id = db.Column(db.Integer, db.ForeignKey("loans.id", ondelete="CASCADE"), primary_key=True, autoincrement=False)
+    start_date = db.Column(db.Date, nullable=False)
+    maturity_date = db.Column(db.Date, nullable=False)
+    frequency = db.Column(db.String(20), nullable=False)
+    period_days = db.Column(db.Integer)
+    installment_count = db.Column(db.Integer, nullable=False)
+    principal_amount = db.Column(Numeric(18, 2), nullable=False)
+    regular_principal = db.Column(Numeric(18, 2), nullable=False)
+    regular_interest = db.Column(Numeric(18, 2), nullable=False)
+    regular_installment = db.Column(Numeric(18, 2), nullable=False)
+    final_principal = db.Column(Numeric(18, 2), nullable=False)
+    final_interest = db.Column(Numeric(18, 2), nullable=False)
+    final_installment = db.Column(Numeric(18, 2), nullable=False)
+    materialized_count = db.Column(db.Integer, nullable=False, default=0)
+    # Due date of installment materialized_count + 1; NULL once every installment is stored.
+    next_due_date = db.Column(db.Date)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    loan = relationship("Loan", backref=db.backref("schedule_rule", uselist=False))
+
+
+class LoanStatusTransition(db.Model):
+    """One ACTIVE/OVERDUE status change made by the overdue classification job (see ``app.overdue_classification``)."""
+    __tablename__ = "loan_status_transitions"
+    __table_args__ = (Index("ix_loan_status_transitions_loan_date", "loan_id", "as_of_date"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    loan_id = db.Column(db.Integer, db.ForeignKey("loans.id", ondelete="CASCADE"), nullable=False)
+    from_status = db.Column(db.String(50))
+    to_status = db.Column(db.String(50), nullable=False)
+    as_of_date = db.Column(db.Date, nullable=False, index=True)
+    days_past_due = db.Column(db.Integer, nullable=False, default=0)
+    # Earliest unpaid due date the classification was based on; NULL when nothing is due.
+    next_due_date = db.Column(db.Date)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+
 class LoanApplication(db.Model):
     __tablename__ = "loan_applications"
+    __table_args__ = (
+        Index("ix_loan_applications_status_created_at", "status", "created_at", "id"),
+        Index("ix_loan_applications_officer_created_at", "assigned_officer_id", "created_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     application_number = db.Column(
@@ -608,6 +678,7 @@ class LoanDisbursementDeduction(db.Model):
 
 class Payment(db.Model):
     __tablename__ = "payments"
+    __table_args__ = (Index("ix_payments_collector_collection_date", "collector_id", "collection_date"),)
 
     id = db.Column(db.Integer, primary_key=True)
     loan_id = db.Column(db.Integer, db.ForeignKey("loans.id"), nullable=False)
@@ -623,6 +694,7 @@ class Payment(db.Model):
     receipt_account_id = db.Column(db.Integer, db.ForeignKey("accounting_accounts.id"))
     remarks = db.Column(db.String(255))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     journal_id = db.Column(db.Integer, db.ForeignKey("accounting_journal_entries.id"))
     reversed_at = db.Column(db.DateTime)
     reversal_journal_id = db.Column(db.Integer, db.ForeignKey("accounting_journal_entries.id"))
@@ -735,6 +807,8 @@ class AccountingJournalEntry(db.Model):
     total_credit = db.Column(Numeric(18, 2), nullable=False, default=Decimal("0.00"))
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    # Normalized tokens of the entry, its lines' accounts/customers/loans and linked reversals; maintained by app.global_search.
+    search_vector = db.Column(db.Text)
 
     lines = relationship("AccountingJournalLine", back_populates="journal_entry", cascade="all, delete-orphan", order_by="AccountingJournalLine.line_no")
     reversal_of = relationship("AccountingJournalEntry", remote_side=[id], foreign_keys=[reversal_of_id], backref="reversal_journals")
@@ -1118,6 +1192,113 @@ class CollectionDepositAllocation(db.Model):
     def credit_amount(self, value):
         self.credit = value
 
+class CollectorClearingBalance(db.Model):
+    """Running collector clearing sub-ledger; receipts are the source of truth."""
+    __tablename__ = "collector_clearing_balances"
+
+    collector_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    collections = db.Column(Numeric(18, 2), nullable=False, default=Decimal("0.00"))
+    deposits = db.Column(Numeric(18, 2), nullable=False, default=Decimal("0.00"))
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    @property
+    def balance(self):
+        return Decimal(self.collections or 0) - Decimal(self.deposits or 0)
+
+
+class CollectorDailyPerformance(db.Model):
+    """Per collector and collection day rollup; rebuilt from receipts, deposits and the ledger."""
+    __tablename__ = "collector_daily_performance"
+    __table_args__ = (db.UniqueConstraint("collector_id", "performance_date", name="uq_collector_daily_performance"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    collector_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    performance_date = db.Column(db.Date, nullable=False, index=True)
+    expected_amount = db.Column(Numeric(18, 2), nullable=False, default=Decimal("0.00"))
+    collected_amount = db.Column(Numeric(18, 2), nullable=False, default=Decimal("0.00"))
+    receipt_count = db.Column(db.Integer, nullable=False, default=0)
+    visit_count = db.Column(db.Integer, nullable=False, default=0)
+    deposited_amount = db.Column(Numeric(18, 2), nullable=False, default=Decimal("0.00"))
+    # Sum of amount x days between collection and deposit; divide by deposited_amount for the weighted lag.
+    deposit_lag_amount_days = db.Column(Numeric(20, 2), nullable=False, default=Decimal("0.00"))
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+
+class LoanSearchToken(db.Model):
+    """Normalized prefix tokens for loan search on engines without pg_trgm."""
+    __tablename__ = "loan_search_tokens"
+    __table_args__ = (Index("ix_loan_search_tokens_token_loan", "token", "loan_id"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    loan_id = db.Column(db.Integer, db.ForeignKey("loans.id", ondelete="CASCADE"), nullable=False, index=True)
+    token = db.Column(db.String(120), nullable=False)
+
+
+class LoanListView(db.Model):
+    """Denormalized admin loan-list row per loan, maintained by ``app.loan_list_view``."""
+    __tablename__ = "loan_list_view"
+    __table_args__ = (
+        Index("ix_loan_list_view_status_start", "status", "start_date", "loan_id"),
+        Index("ix_loan_list_view_start_date", "start_date", "loan_id"),
+        Index("ix_loan_list_view_customer", "customer_id", "start_date"),
+        Index("ix_loan_list_view_outstanding", "outstanding_amount", "loan_id"),
+        Index("ix_loan_list_view_next_due", "next_due_date"),
+        Index("ix_loan_list_view_loan_number", "loan_number"),
+        Index("ix_loan_list_view_customer_name", "customer_name", "loan_id"),
+    )
+
+    loan_id = db.Column(db.Integer, db.ForeignKey("loans.id", ondelete="CASCADE"), primary_key=True, autoincrement=False)
+    loan_number = db.Column(db.String(50), nullable=False)
+    customer_id = db.Column(db.Integer, nullable=False)
+    customer_code = db.Column(db.String(50))
+    customer_name = db.Column(db.String(150), nullable=False, default="")
+    nic_number = db.Column(db.String(50))
+    mobile = db.Column(db.String(20))
+    application_id = db.Column(db.Integer)
+    application_number = db.Column(db.String(50))
+    product = db.Column(db.String(50))
+    status = db.Column(db.String(50), nullable=False, default="")
+    principal_amount = db.Column(Numeric(18, 2), nullable=False, default=Decimal("0.00"))
+    total_payable = db.Column(Numeric(18, 2), nullable=False, default=Decimal("0.00"))
+    total_paid = db.Column(Numeric(18, 2), nullable=False, default=Decimal("0.00"))
+    raw_outstanding = db.Column(Numeric(18, 2), nullable=False, default=Decimal("0.00"))
+    outstanding_amount = db.Column(Numeric(18, 2), nullable=False, default=Decimal("0.00"))
+    customer_credit_balance = db.Column(Numeric(18, 2), nullable=False, default=Decimal("0.00"))
+    start_date = db.Column(db.Date, nullable=False)
+    settled_date = db.Column(db.Date)
+    # Earliest unpaid installment; days past due are derived from it at read time.
+    next_due_date = db.Column(db.Date)
+    last_payment_date = db.Column(db.Date)
+    refreshed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+
+class SearchDocument(db.Model):
+    """One searchable row per indexed entity, with display fields for typed results."""
+    __tablename__ = "search_documents"
+    __table_args__ = (db.UniqueConstraint("entity_type", "entity_id", name="uq_search_documents_entity"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    entity_type = db.Column(db.String(40), nullable=False)
+    entity_id = db.Column(db.Integer, nullable=False)
+    title = db.Column(db.String(255), nullable=False)
+    subtitle = db.Column(db.String(255))
+    status = db.Column(db.String(50))
+    search_text = db.Column(db.Text, nullable=False, default="")
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+
+class SearchToken(db.Model):
+    """Normalized prefix tokens of search_documents for engines without pg_trgm/FTS."""
+    __tablename__ = "search_tokens"
+    __table_args__ = (Index("ix_search_tokens_token_entity", "token", "entity_type", "entity_id"),
+                      Index("ix_search_tokens_entity", "entity_type", "entity_id"))
+
+    id = db.Column(db.Integer, primary_key=True)
+    entity_type = db.Column(db.String(40), nullable=False)
+    entity_id = db.Column(db.Integer, nullable=False)
+    token = db.Column(db.String(120), nullable=False)
+
+
 class Investor(db.Model):
     __tablename__ = "investors"
     __table_args__ = (db.UniqueConstraint("investor_number", name="uq_investors_investor_number"),)
@@ -1243,3 +1424,75 @@ class InvestorInterestAccrual(db.Model):
     agreement = relationship("InvestorFundingAgreement", backref="interest_accruals")
     investor = relationship("Investor")
     journal_entry = relationship("AccountingJournalEntry", foreign_keys=[journal_entry_id])
+
+
+class PortfolioImportBatch(db.Model):
+    """One legacy portfolio import run (see ``app.portfolio_import``)."""
+    __tablename__ = "portfolio_import_batches"
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120))
+    cutover_date = db.Column(db.Date, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default="STAGED")
+    # Last stage that finished for every row; a resumed run starts after it.
+    completed_stage = db.Column(db.String(20))
+    error_count = db.Column(db.Integer, nullable=False, default=0)
+    contra_account_id = db.Column(db.Integer, db.ForeignKey("accounting_accounts.id"))
+    created_by_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+
+class PortfolioImportCustomer(db.Model):
+    __tablename__ = "portfolio_import_customers"
+    __table_args__ = (Index("ix_portfolio_import_customers_batch_code", "batch_id", "customer_code"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    batch_id = db.Column(db.Integer, db.ForeignKey("portfolio_import_batches.id", ondelete="CASCADE"), nullable=False)
+    row_no = db.Column(db.Integer, nullable=False)
+    customer_code = db.Column(db.String(50))
+    full_name = db.Column(db.String(150))
+    nic_number = db.Column(db.String(50))
+    nic_canonical = db.Column(db.String(20))
+    mobile = db.Column(db.String(20))
+    email = db.Column(db.String(120))
+    address = db.Column(db.String(255))
+    business_type = db.Column(db.String(120))
+    error = db.Column(db.Text)
+    customer_id = db.Column(db.Integer)
+
+
+class PortfolioImportLoan(db.Model):
+    __tablename__ = "portfolio_import_loans"
+    __table_args__ = (Index("ix_portfolio_import_loans_batch_number", "batch_id", "loan_number"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    batch_id = db.Column(db.Integer, db.ForeignKey("portfolio_import_batches.id", ondelete="CASCADE"), nullable=False)
+    row_no = db.Column(db.Integer, nullable=False)
+    loan_number = db.Column(db.String(50))
+    customer_code = db.Column(db.String(50))
+    principal_amount = db.Column(Numeric(18, 2))
+    interest_rate = db.Column(Numeric(9, 4))
+    term_type = db.Column(db.String(20))
+    term_value = db.Column(db.Integer)
+    repayment_frequency = db.Column(db.String(20))
+    start_date = db.Column(db.Date)
+    total_payable = db.Column(Numeric(18, 2))
+    error = db.Column(db.Text)
+    loan_id = db.Column(db.Integer)
+
+
+class PortfolioImportPayment(db.Model):
+    __tablename__ = "portfolio_import_payments"
+    __table_args__ = (Index("ix_portfolio_import_payments_batch_loan", "batch_id", "loan_number"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    batch_id = db.Column(db.Integer, db.ForeignKey("portfolio_import_batches.id", ondelete="CASCADE"), nullable=False)
+    row_no = db.Column(db.Integer, nullable=False)
+    loan_number = db.Column(db.String(50))
+    payment_date = db.Column(db.Date)
+    amount = db.Column(Numeric(18, 2))
+    payment_method = db.Column(db.String(50))
+    reference = db.Column(db.String(120))
+    error = db.Column(db.Text)
+    payment_id = db.Column(db.Integer)
@@ -0,0 +1,69 @@
+"""Nightly overdue classification of active loans.
+
+``Loan.status`` moves between ``ACTIVE`` and ``OVERDUE`` here, once a day, so
+arrears screens can filter on the indexed status instead of recomputing days
+past due per loan.  One pass:
+
+* one query returns only the ACTIVE/OVERDUE loans whose classification
+  changes.  It uses each loan's earliest unpaid installment: the first
+  ``loan_ledger`` row that is not PAID, otherwise the compact schedule's first
+  unstored installment.  This is the loan list's ``next_due_date``;
+* a loan with an installment due before the as-of date is OVERDUE, with days
+  past due counted from that installment; an OVERDUE loan with nothing past
+  due is ACTIVE again (recovered);
+* statuses change with one UPDATE per target status and chunk of loans, every
+  change is recorded in ``loan_status_transitions`` with one bulk INSERT, and
+  the loan list rows of the changed loans are refreshed.
+
+Loans in any other status are never touched, and a second run for the same
+date finds nothing to change.  Receipts and settlement recalculation keep an
+OVERDUE loan OVERDUE until they settle it; the next run moves it back.
+"""
+from datetime import date
+
+from sqlalchemy import and_, func, insert, or_, select
+
+from .extensions import db
+from .loan_list_view import refresh_loans
+from .models import Loan, LoanLedger, LoanScheduleRule, LoanStatusTransition
+
+CLASSIFIED_STATUSES = ("ACTIVE", "OVERDUE")
+CHUNK_SIZE = 1000
+
+
+def _changed_loans(as_of):
+    status = func.upper(func.trim(Loan.status))
+    classified = select(Loan.id).where(status.in_(CLASSIFIED_STATUSES))
+    due = (select(LoanLedger.loan_id.label("loan_id"), func.min(LoanLedger.due_date).label("next_due_date"))
+           .where(LoanLedger.loan_id.in_(classified), LoanLedger.status != "PAID").group_by(LoanLedger.loan_id).subquery())
+    # A compact schedule's first unstored installment comes after every stored one.
+    next_due = func.coalesce(due.c.next_due_date, LoanScheduleRule.next_due_date)
+    past_due = next_due < as_of
+    # Loans are locked in id order, the order receipts lock them in (app.loan_locks).
+    return db.session.execute(
+        select(Loan.id, Loan.status, next_due.label("next_due_date"))
+        .outerjoin(due, due.c.loan_id == Loan.id).outerjoin(LoanScheduleRule, LoanScheduleRule.loan_id == Loan.id)
+        .where(or_(and_(status == "ACTIVE", past_due), and_(status == "OVERDUE", or_(next_due.is_(None), next_due >= as_of))))
+        .order_by(Loan.id).with_for_update(of=Loan.__table__)).all()
+
+
+def classify_overdue_loans(as_of=None):
+    """Move ACTIVE/OVERDUE loans to their status as of ``as_of`` (default today); the caller commits."""
+    as_of = as_of or date.today()
+    moves, history = {"OVERDUE": [], "ACTIVE": []}, []
+    for row in _changed_loans(as_of):
+        overdue = row.next_due_date is not None and row.next_due_date < as_of
+        to_status = "OVERDUE" if overdue else "ACTIVE"
+        moves[to_status].append(row.id)
+        history.append({"loan_id": row.id, "from_status": row.status, "to_status": to_status, "as_of_date": as_of,
+                        "days_past_due": (as_of - row.next_due_date).days if overdue else 0, "next_due_date": row.next_due_date})
+    table = Loan.__table__
+    for to_status, loan_ids in moves.items():
+        for start in range(0, len(loan_ids), CHUNK_SIZE):
+            chunk = loan_ids[start:start + CHUNK_SIZE]
+            db.session.execute(table.update().where(table.c.id.in_(chunk)).values(status=to_status))
+            refresh_loans(chunk)
+    if history:
+        db.session.execute(insert(LoanStatusTransition), history)
+    return {"as_of_date": as_of.isoformat(), "became_overdue": len(moves["OVERDUE"]), "recovered": len(moves["ACTIVE"]),
+            "max_days_past_due": max((h["days_past_due"] for h in history), default=0)}
@@ -0,0 +1,112 @@
+"""Keyset pagination for list endpoints.
+
+Pages are ordered by ``(sort key, id)`` and continue from an opaque cursor
+holding the last row's pair, so each page costs one indexed range scan of
+``limit + 1`` rows however deep the client pages.  ``?page=`` keeps the old
+OFFSET behaviour for existing callers; both modes return a ``next_cursor``.
+Every endpoint returns at most ``DEFAULT_LIMIT`` rows unless the client asks
+for another ``limit`` (up to ``MAX_LIMIT``); clients that need every row follow
+``next_cursor`` (``X-Next-Cursor`` on bare lists) until it is null.  Rows with
+a NULL sort key come after all others (``NULLS LAST`` on the raw column, so the
+``(sort key, id)`` index still orders the page) and the cursor pages through
+them by id.
+"""
+import base64
+import json
+from collections import namedtuple
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from flask import jsonify
+from sqlalchemy import and_, or_
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 500
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+Page = namedtuple("Page", "items next_cursor limit")
+
+
+class PaginationError(ValueError):
+    pass
+
+
+def encode_cursor(key, row_id):
+    if isinstance(key, (date, datetime)): key = key.isoformat()
+    elif isinstance(key, Decimal): key = str(key)
+    raw = json.dumps([key, row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor, sort_column):
+    try:
+        key, row_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if key is None and _nullable(sort_column): return None, int(row_id)
+        python_type = sort_column.type.python_type
+        if python_type is datetime: key = datetime.fromisoformat(key)
+        elif python_type is date: key = date.fromisoformat(key)
+        elif python_type is int: key = int(key)
+        elif python_type is Decimal: key = Decimal(key)
+        return key, int(row_id)
+    except (ValueError, TypeError, NotImplementedError, InvalidOperation):
+        raise PaginationError("cursor is invalid or expired.")
+
+
+def _int_arg(args, *names):
+    for name in names:
+        raw = (args.get(name) or "").strip()
+        if raw:
+            try: value = int(raw)
+            except ValueError: raise PaginationError(f"{name} must be a positive integer.")
+            if value < 1: raise PaginationError(f"{name} must be a positive integer.")
+            return value
+    return None
+
+
+def _nullable(sort_column):
+    return bool(getattr(sort_column, "nullable", None) or getattr(getattr(sort_column, "expression", None), "nullable", False))
+
+
+def keyset_page(query, sort_column, id_column, args, descending=True, default_limit=DEFAULT_LIMIT):
+    """One page of ``query`` ordered by ``(sort_column, id_column)``; ``sort_column`` may be ``id_column`` itself."""
+    limit = min(_int_arg(args, "limit", "page_size", "per_page") or default_limit, MAX_LIMIT)
+    cursor, page = (args.get("cursor") or "").strip(), _int_arg(args, "page")
+    single_key = sort_column is id_column
+    nullable = not single_key and _nullable(sort_column)
+    direction = (lambda column: column.desc()) if descending else (lambda column: column.asc())
+    sort_order = direction(sort_column).nulls_last() if nullable else direction(sort_column)
+    query = query.order_by(*([] if single_key else [sort_order]), direction(id_column))
+    if cursor:
+        key, last_id = decode_cursor(cursor, sort_column)
+        after = (lambda column, value: column < value) if descending else (lambda column, value: column > value)
+        if single_key:
+            query = query.filter(after(id_column, last_id))
+        elif key is None:
+            # Inside the trailing NULL block only the id moves on.
+            query = query.filter(sort_column.is_(None), after(id_column, last_id))
+        else:
+            query = query.filter(or_(after(sort_column, key), and_(sort_column == key, after(id_column, last_id)),
+                                     *([sort_column.is_(None)] if nullable else [])))
+    elif page:
+        query = query.offset((page - 1) * limit)
+    rows = query.limit(limit + 1).all()
+    items, more = rows[:limit], len(rows) > limit
+    next_cursor = None
+    if more:
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
+    return Page(items, next_cursor, limit)
+
+
+def page_meta(page):
+    return {"next_cursor": page.next_cursor, "limit": page.limit}
+
+
+def with_next_cursor(response, page):
+    """Bare-list responses keep their body shape and carry the cursor in a header."""
+    if page.next_cursor: response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+    return response
+
+
+def pagination_error(exc):
+    return jsonify({"error": "invalid_pagination", "message": str(exc)}), 422
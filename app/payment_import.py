@@ -0,0 +1,147 @@
+"""Bulk import of bank-transfer and mobile-money receipts.
+
+A daily bank file is posted in one pass instead of one ``record_payment`` call
+per line:
+
+* rows are matched to loans with one ``IN`` query on the loan number (or on the
+  reference, when a file quotes the loan number there), and the matched loans
+  are locked in id order;
+* re-imported lines are caught with one ``IN`` query on the references of
+  live receipts: a row is a duplicate when an unreversed receipt of the same
+  loan already carries its reference, date and amount, or an earlier row of
+  the file does;
+* the valid rows are allocated in date order and posted together through
+  ``post_loan_payments_bulk``.
+
+Every input row gets a result (``POSTED``, ``DUPLICATE`` or ``INVALID``) for
+the result file.  A posting failure after validation aborts the whole import.
+"""
+import csv
+from io import StringIO
+
+from .accounting import AccountingError, allocate_payment, post_loan_payments_bulk, require_open_accounting_period
+from .extensions import db
+from .loan_ledger import generate_loan_ledger, has_schedule, money
+from .loan_locks import lock_loans
+from .models import Loan, Payment
+from .portfolio_import import _Row
+
+IMPORT_METHODS = {"BANK_TRANSFER", "MOBILE_TRANSFER", "CHEQUE", "CASH_OFFICE", "OTHER"}
+PAYABLE_LOAN_STATUSES = {"ACTIVE", "OVERDUE"}
+MAX_ROWS = 20000
+RESULT_FIELDS = ("row_no", "status", "loan_number", "payment_date", "amount", "reference", "payment_id", "receipt_number", "journal_no", "message")
+
+
+class PaymentImportError(ValueError):
+    pass
+
+
+def read_csv(stream):
+    """Rows of a payment CSV; columns ``loan_number, payment_date, amount, reference, payment_method, remarks``."""
+    return list(csv.DictReader(stream))
+
+
+def results_csv(results):
+    out = StringIO()
+    writer = csv.DictWriter(out, fieldnames=RESULT_FIELDS, extrasaction="ignore")
+    writer.writeheader(); writer.writerows(results)
+    return out.getvalue()
+
+
+def _parse(raw, default_method):
+    row = _Row(raw)
+    values = {"loan_number": row.text("loan_number", 50), "payment_date": row.date("payment_date"), "amount": row.amount("amount"),
+              "reference": row.required("reference", 120), "payment_method": (row.text("payment_method", 50) or default_method).upper(),
+              "remarks": row.text("remarks", 255)}
+    if values["payment_method"] not in IMPORT_METHODS:
+        row.errors.append(f"payment_method must be one of {', '.join(sorted(IMPORT_METHODS))}")
+    return values, row.errors
+
+
+def _result(row_no, values, status, message=None, **extra):
+    amount = values.get("amount")
+    return {"row_no": row_no, "status": status, "loan_number": values.get("loan_number"), "reference": values.get("reference"),
+            "payment_date": values["payment_date"].isoformat() if values.get("payment_date") else None,
+            "amount": f"{money(amount):.2f}" if amount is not None else None, "message": message, **extra}
+
+
+def import_payments(rows, user_id, payment_method="BANK_TRANSFER", receipt_account=None, first_row_no=1):
+    """Validate, allocate and post ``rows`` (dicts, e.g. from ``read_csv``); returns ``(summary, results)``.
+
+    The caller commits.  ``first_row_no`` numbers the results (2 for a CSV with
+    a header line, so results point at file lines).
+    """
+    rows = list(rows)
+    if len(rows) > MAX_ROWS:
+        raise PaymentImportError(f"A payment import is limited to {MAX_ROWS} rows")
+    default_method = (payment_method or "BANK_TRANSFER").upper()
+    if default_method not in IMPORT_METHODS:
+        raise PaymentImportError(f"payment_method must be one of {', '.join(sorted(IMPORT_METHODS))}")
+
+    results, parsed = {}, []
+    for row_no, raw in enumerate(rows, start=first_row_no):
+        values, errors = _parse(raw or {}, default_method)
+        if errors: results[row_no] = _result(row_no, values, "INVALID", "; ".join(errors))
+        else: parsed.append((row_no, values))
+
+    keys = {v["loan_number"] or v["reference"] for _, v in parsed}
+    matched = db.session.query(Loan.id).filter(Loan.loan_number.in_(keys)).all() if keys else []
+    # Lock before validating, so statuses and balances cannot move under the import.
+    loans = {loan.loan_number: loan for loan in lock_loans(row.id for row in matched).values()}
+    references = {v["reference"] for _, v in parsed}
+    seen = {(p.loan_id, p.transaction_reference, p.collection_date, money(p.amount_collected)) for p in db.session.query(
+        Payment.loan_id, Payment.transaction_reference, Payment.collection_date, Payment.amount_collected).filter(
+        Payment.transaction_reference.in_(references), Payment.reversed_at.is_(None))} if references else set()
+    open_dates = {}
+
+    valid = []
+    for row_no, values in parsed:
+        loan = loans.get(values["loan_number"] or values["reference"])
+        error = None
+        if loan is None:
+            error = "No loan matches the loan_number or reference"
+        elif str(loan.status or "").strip().upper() not in PAYABLE_LOAN_STATUSES:
+            error = "Payments can only be recorded for active loans"
+        elif values["payment_date"] < loan.start_date:
+            error = "payment_date is before the loan start date"
+        elif values["payment_date"] not in open_dates:
+            try:
+                require_open_accounting_period(values["payment_date"]); open_dates[values["payment_date"]] = None
+            except AccountingError as exc:
+                open_dates[values["payment_date"]] = str(exc)
+        error = error or open_dates.get(values["payment_date"])
+        values["loan_number"] = loan.loan_number if loan else values["loan_number"]
+        if error:
+            results[row_no] = _result(row_no, values, "INVALID", error); continue
+        key = (loan.id, values["reference"], values["payment_date"], money(values["amount"]))
+        if key in seen:
+            results[row_no] = _result(row_no, values, "DUPLICATE", "A receipt with this reference, date and amount is already recorded"); continue
+        seen.add(key)
+        valid.append((row_no, values, loan))
+
+    # Allocate in receipt order so each loan's waterfall sees its payments chronologically.
+    valid.sort(key=lambda item: (item[1]["payment_date"], item[0]))
+    items, scheduled = [], set()
+    for row_no, values, loan in valid:
+        if loan.id not in scheduled:
+            if not has_schedule(loan): generate_loan_ledger(loan)
+            scheduled.add(loan.id)
+        principal, interest, penalty, other = allocate_payment(loan, values["amount"], values["payment_date"])
+        payment = Payment(loan_id=loan.id, amount_collected=money(values["amount"]), principal_paid=principal, interest_paid=interest,
+                          penalty_paid=penalty, other_fee_paid=other, collection_date=values["payment_date"], payment_date=values["payment_date"],
+                          accounting_date=values["payment_date"], collected_by_id=user_id, payment_method=values["payment_method"],
+                          collection_method=values["payment_method"], remarks=values["remarks"], transaction_reference=values["reference"],
+                          bank_reference=values["reference"], receipt_account_id=receipt_account.id if receipt_account else None,
+                          collection_account_id=receipt_account.id if receipt_account else None)
+        items.append((row_no, values, payment, list(loan._pending_allocations)))
+    if items:
+        db.session.add_all([payment for _, _, payment, _ in items]); db.session.flush()
+        journals = post_loan_payments_bulk([(payment, allocations) for _, _, payment, allocations in items], user_id, receipt_account=receipt_account)
+        db.session.flush()
+        for (row_no, values, payment, _), journal in zip(items, journals):
+            results[row_no] = _result(row_no, values, "POSTED", payment_id=payment.id, receipt_number=payment.receipt_number, journal_no=journal.journal_no)
+
+    ordered = [results[row_no] for row_no in sorted(results)]
+    summary = {"rows": len(ordered), **{status.lower(): sum(1 for r in ordered if r["status"] == status) for status in ("POSTED", "DUPLICATE", "INVALID")},
+               "amount_posted": f"{money(sum((money(v['amount']) for _, v, _, _ in items), money(0))):.2f}"}
+    return summary, ordered
@@ -0,0 +1,411 @@
+"""Bulk import of a legacy loan portfolio.
+
+Onboarding a branch replays its book in set-based stages instead of one API
+call or backfill posting per record:
+
+1. ``stage_files`` parses the customer, loan and payment CSVs into the
+   ``portfolio_import_*`` staging tables with bulk INSERTs; parse errors are
+   stored on the row.
+2. ``validate_batch`` runs the cross-row checks (duplicates, collisions with
+   live data, dangling references, receipts outside a loan's life or above its
+   payable) as a handful of UPDATE statements.
+3. ``run_import`` promotes a clean batch stage by stage -- customers, loans
+   with their schedules, payments with allocations, opening journals -- in
+   chunks of bulk INSERT/UPDATEs.  Every chunk stores the ids it created on its
+   staging rows, so an interrupted run resumes where it stopped.
+
+Historical receipts are already part of the legacy balances and are not
+journalized one by one: per chunk of loans one opening journal debits the
+outstanding principal and the interest due but unpaid at the cutover date
+against a contra account, and installments due by the cutover count as
+accrued.  Imported loans carry ``historical_accrual_mode = "OPENING"`` and
+imported receipts ``transaction_type = "LEGACY_IMPORT"``, which the accounting
+backfills skip.
+"""
+import csv
+import secrets
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import and_, case, exists, func, insert, or_, select, update
+from sqlalchemy.orm import aliased
+from werkzeug.security import generate_password_hash
+
+from . import global_search, loan_list_view
+from .accounting import post_journals_bulk, require_open_accounting_period, resolve_system_account
+from .customer_identity import normalize_nic, normalize_phone
+from .extensions import db
+from .loan_ledger import fixed_terms_rows, money
+from .loan_terms import ALLOWED_REPAYMENT_FREQUENCIES, ALLOWED_TERM_TYPES, calculate_flat_term_amounts, resolve_loan_term
+from .models import (AccountingAccount, AccountingJournalEntry, Customer, Loan, LoanLedger, Payment, PaymentAllocation,
+                     PortfolioImportBatch, PortfolioImportCustomer, PortfolioImportLoan, PortfolioImportPayment, User)
+
+STAGES = ("customers", "loans", "payments", "journals")
+DEFAULT_BATCH_SIZE = 1000
+ERROR_SAMPLE = 50
+OPENING_ACCRUAL_MODE = "OPENING"
+LEGACY_PAYMENT_TYPE = "LEGACY_IMPORT"
+INTERVAL_DAYS = {"DAILY": 1, "WEEKLY": 7, "MONTHLY": 30}
+ZERO = Decimal("0.00")
+
+
+class PortfolioImportError(ValueError):
+    pass
+
+
+# -- staging ---------------------------------------------------------------
+
+class _Row:
+    """One CSV row being parsed; conversion failures are collected, not raised."""
+
+    def __init__(self, row):
+        self.row, self.errors = row, []
+
+    def text(self, key, limit):
+        return str(self.row.get(key) or "").strip()[:limit] or None
+
+    def required(self, key, limit):
+        value = self.text(key, limit)
+        if value is None: self.errors.append(f"{key} is required")
+        return value
+
+    def convert(self, key, convert, message):
+        raw = str(self.row.get(key) or "").strip()
+        if not raw:
+            self.errors.append(f"{key} is required"); return None
+        try:
+            return convert(raw)
+        except (InvalidOperation, ValueError):
+            self.errors.append(f"{key} {message}"); return None
+
+    def amount(self, key):
+        value = self.convert(key, lambda raw: Decimal(raw.replace(",", "")), "must be a number")
+        if value is not None and value <= 0:
+            self.errors.append(f"{key} must be greater than zero"); return None
+        return value
+
+    def date(self, key):
+        return self.convert(key, date.fromisoformat, "must be YYYY-MM-DD")
+
+
+def _parse_customer(raw):
+    row = _Row(raw)
+    values = {"customer_code": row.required("customer_code", 50), "full_name": row.required("full_name", 150),
+              "nic_number": row.text("nic_number", 50), "mobile": row.text("mobile", 20), "email": row.text("email", 120),
+              "address": row.text("address", 255), "business_type": row.text("business_type", 120)}
+    values["nic_canonical"] = normalize_nic(values["nic_number"])
+    return values, row.errors
+
+
+def _parse_loan(raw):
+    row = _Row(raw)
+    values = {"loan_number": row.required("loan_number", 50), "customer_code": row.required("customer_code", 50),
+              "principal_amount": row.amount("principal_amount"), "interest_rate": row.convert("interest_rate", Decimal, "must be a number"),
+              "term_type": (row.required("term_type", 20) or "").upper() or None, "term_value": row.convert("term_value", int, "must be a whole number"),
+              "repayment_frequency": (row.required("repayment_frequency", 20) or "").upper() or None, "start_date": row.date("start_date"),
+              "total_payable": None}
+    if values["term_type"] and values["term_type"] not in ALLOWED_TERM_TYPES:
+        row.errors.append("term_type must be DAYS or MONTHS")
+    if values["repayment_frequency"] and values["repayment_frequency"] not in ALLOWED_REPAYMENT_FREQUENCIES:
+        row.errors.append("repayment_frequency must be DAILY, WEEKLY or MONTHLY")
+    if not row.errors:
+        try:
+            resolved = resolve_loan_term(values["start_date"], values["term_type"], values["term_value"], values["repayment_frequency"])
+            values["total_payable"] = calculate_flat_term_amounts(values["principal_amount"], values["interest_rate"], resolved.installment_count)[1]
+        except ValueError as exc:
+            row.errors.append(str(exc))
+    return values, row.errors
+
+
+def _parse_payment(raw):
+    row = _Row(raw)
+    return {"loan_number": row.required("loan_number", 50), "payment_date": row.date("payment_date"), "amount": row.amount("amount"),
+            "payment_method": row.text("payment_method", 50) or "Cash", "reference": row.text("reference", 120)}, row.errors
+
+
+def _stage_rows(model, batch, stream, parse, batch_size):
+    staged, rows = 0, []
+    # Row numbers are file line numbers; line 1 is the header.
+    for row_no, raw in enumerate(csv.DictReader(stream), start=2):
+        values, errors = parse(raw)
+        rows.append({**values, "batch_id": batch.id, "row_no": row_no, "error": "; ".join(errors) or None})
+        if len(rows) >= batch_size:
+            db.session.execute(insert(model), rows); staged += len(rows); rows = []
+    if rows: db.session.execute(insert(model), rows)
+    return staged + len(rows)
+
+
+def stage_files(customers, loans, payments, cutover_date, user_id, name=None, contra_account=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Create a batch and load the CSV streams (any may be ``None``) into its staging tables."""
+    batch = PortfolioImportBatch(name=name, cutover_date=cutover_date, created_by_id=user_id, status="STAGED",
+                                 contra_account_id=contra_account.id if contra_account is not None else None)
+    db.session.add(batch); db.session.flush()
+    for model, stream, parse in ((PortfolioImportCustomer, customers, _parse_customer), (PortfolioImportLoan, loans, _parse_loan),
+                                 (PortfolioImportPayment, payments, _parse_payment)):
+        if stream is not None: _stage_rows(model, batch, stream, parse, batch_size)
+    return batch
+
+
+# -- validation ------------------------------------------------------------
+
+def _flag(model, batch, message, *conditions):
+    """Record ``message`` on every not-yet-failed staging row matching ``conditions``."""
+    db.session.execute(update(model).where(model.batch_id == batch.id, model.error.is_(None), *conditions)
+                       .values(error=message).execution_options(synchronize_session=False))
+
+
+def _repeated(column, model, batch):
+    # An alias keeps the subquery from being correlated to the table being updated.
+    other = aliased(model); value = getattr(other, column.key)
+    return column.in_(select(value).where(other.batch_id == batch.id, value.isnot(None)).group_by(value).having(func.count() > 1))
+
+
+def validate_batch(batch):
+    """Flag invalid staging rows with set-based checks and return the batch's error count."""
+    C, L, P = PortfolioImportCustomer, PortfolioImportLoan, PortfolioImportPayment
+    _flag(C, batch, "customer_code is repeated in the file", _repeated(C.customer_code, C, batch))
+    _flag(C, batch, "customer_code already exists", exists().where(Customer.customer_code == C.customer_code))
+    _flag(C, batch, "nic_number is repeated in the file", _repeated(C.nic_canonical, C, batch))
+    # Customers not backfilled yet are compared on the NIC as typed.
+    raw_nic = and_(C.nic_canonical.isnot(None), Customer.nic_canonical.is_(None),
+                   func.upper(func.trim(Customer.nic_number)) == func.upper(func.trim(C.nic_number)))
+    _flag(C, batch, "nic_number already belongs to a customer", exists().where(or_(Customer.nic_canonical == C.nic_canonical, raw_nic)))
+    _flag(C, batch, "email is repeated in the file", _repeated(C.email, C, batch))
+    _flag(C, batch, "email already belongs to a user", exists().where(User.email == C.email))
+
+    staged_customer = select(C.id).where(C.batch_id == batch.id, C.customer_code == L.customer_code)
+    _flag(L, batch, "loan_number is repeated in the file", _repeated(L.loan_number, L, batch))
+    _flag(L, batch, "loan_number already exists", exists().where(Loan.loan_number == L.loan_number))
+    _flag(L, batch, "customer_code is not in the customer file or the customer master",
+          ~staged_customer.exists(), ~exists().where(Customer.customer_code == L.customer_code))
+    _flag(L, batch, "customer row is invalid", staged_customer.where(C.error.isnot(None)).exists())
+    _flag(L, batch, "start_date is after the cutover date", L.start_date > batch.cutover_date)
+
+    staged_loan = select(L.id).where(L.batch_id == batch.id, L.loan_number == P.loan_number)
+    _flag(P, batch, "loan_number is not in the loan file", ~staged_loan.exists())
+    _flag(P, batch, "loan row is invalid", staged_loan.where(L.error.isnot(None)).exists())
+    _flag(P, batch, "payment_date is before the loan start date", staged_loan.where(P.payment_date < L.start_date).exists())
+    _flag(P, batch, "payment_date is after the cutover date", P.payment_date > batch.cutover_date)
+    other = aliased(PortfolioImportPayment)
+    paid = select(func.sum(other.amount)).where(other.batch_id == batch.id, other.loan_number == L.loan_number).scalar_subquery()
+    _flag(P, batch, "payments exceed the loan's total payable",
+          P.loan_number.in_(select(L.loan_number).where(L.batch_id == batch.id, paid > L.total_payable)))
+
+    batch.error_count = sum(db.session.query(func.count(model.id)).filter(model.batch_id == batch.id, model.error.isnot(None)).scalar()
+                            for model in (C, L, P))
+    batch.status = "INVALID" if batch.error_count else "VALIDATED"
+    return batch.error_count
+
+
+# -- promotion -------------------------------------------------------------
+
+def _checkpoint(checkpoint):
+    db.session.flush()
+    if checkpoint: checkpoint()
+
+
+def _promote_customers(batch, batch_size, checkpoint):
+    C = PortfolioImportCustomer
+    # Imported customers get no usable password: one random hash per run
+    # (hashing per user would dominate the import) and a forced reset.
+    password_hash = generate_password_hash(secrets.token_urlsafe(32))
+    created = 0
+    while True:
+        rows = C.query.filter(C.batch_id == batch.id, C.customer_id.is_(None)).order_by(C.row_no).limit(batch_size).all()
+        if not rows: return created
+        users = [{"email": r.email or f"customer-{batch.id}-{r.row_no}@portfolio-import.local", "name": r.full_name, "role": "customer",
+                  "password_hash": password_hash, "must_change_password": True} for r in rows]
+        user_ids = db.session.execute(insert(User).returning(User.id, sort_by_parameter_order=True), users).scalars().all()
+        # Bulk INSERTs skip the identity listener, so the normalized columns are set here.
+        customers = [{"user_id": user_id, "customer_code": r.customer_code, "full_name": r.full_name, "nic_number": r.nic_number,
+                      "nic_canonical": r.nic_canonical, "mobile": r.mobile, "mobile_e164": normalize_phone(r.mobile), "email": r.email,
+                      "address": r.address, "business_type": r.business_type, "status": "ACTIVE"} for r, user_id in zip(rows, user_ids)]
+        customer_ids = db.session.execute(insert(Customer).returning(Customer.id, sort_by_parameter_order=True), customers).scalars().all()
+        for r, customer_id in zip(rows, customer_ids):
+            r.customer_id = customer_id
+        global_search.index_entities("CUSTOMER", customer_ids)
+        created += len(rows)
+        _checkpoint(checkpoint)
+
+
+def _imported_loan(r, customer_id, batch):
+    resolved = resolve_loan_term(r.start_date, r.term_type, r.term_value, r.repayment_frequency)
+    total_interest, total_payable, installment = calculate_flat_term_amounts(r.principal_amount, r.interest_rate, resolved.installment_count)
+    principal = money(r.principal_amount)
+    return Loan(loan_number=r.loan_number, customer_id=customer_id, principal_amount=principal, gross_principal_amount=principal,
+                net_disbursed_amount=principal, interest_rate=r.interest_rate, total_days=resolved.total_days,
+                payment_interval_days=INTERVAL_DAYS[r.repayment_frequency], daily_installment=money(total_payable / Decimal(resolved.total_days)),
+                total_payable=total_payable, start_date=r.start_date, end_date=resolved.maturity_date, status="ACTIVE",
+                created_by_id=batch.created_by_id, term_type=r.term_type, term_value=r.term_value,
+                loan_days=r.term_value if r.term_type == "DAYS" else None, tenure_months=r.term_value if r.term_type == "MONTHS" else None,
+                repayment_frequency=r.repayment_frequency, number_of_installments=resolved.installment_count,
+                installment_count=resolved.installment_count, installment_amount=installment, total_interest=total_interest,
+                total_repayment=total_payable, interest_type="FLAT", interest_rate_basis="FLAT_TERM", maturity_date=resolved.maturity_date,
+                historical_accrual_mode=OPENING_ACCRUAL_MODE, accrual_processed_through=batch.cutover_date)
+
+
+def _promote_loans(batch, batch_size, checkpoint):
+    L = PortfolioImportLoan
+    created = 0
+    while True:
+        rows = L.query.filter(L.batch_id == batch.id, L.loan_id.is_(None)).order_by(L.row_no).limit(batch_size).all()
+        if not rows: return created
+        customer_ids = dict(db.session.query(Customer.customer_code, Customer.id).filter(Customer.customer_code.in_({r.customer_code for r in rows})))
+        loans = [_imported_loan(r, customer_ids[r.customer_code], batch) for r in rows]
+        db.session.add_all(loans); db.session.flush()
+        ledger = [row for loan in loans for row in fixed_terms_rows(loan, compact=False)]
+        for row in ledger:
+            # The opening journal carries interest due by the cutover; it must not be accrued again.
+            row["interest_accrued"] = row["due_date"] <= batch.cutover_date
+        if ledger: db.session.execute(insert(LoanLedger), ledger)
+        for r, loan in zip(rows, loans):
+            r.loan_id = loan.id
+        created += len(rows)
+        _checkpoint(checkpoint)
+
+
+def _allocate(installments, amount, paid_date):
+    """The ``allocate_payment`` waterfall over plain rows: interest, then principal, oldest installment first."""
+    remaining, allocations = money(amount), []
+    for row in installments:
+        if remaining <= 0: break
+        for kind, due_key, paid_key in (("INTEREST", "interest_amount", "interest_paid"), ("PRINCIPAL", "principal_amount", "principal_paid")):
+            pay = min(remaining, money(row[due_key] - row[paid_key]))
+            if pay > 0:
+                row[paid_key] = money(row[paid_key] + pay); remaining -= pay
+                allocations.append((row, kind, pay)); row["last_payment_date"] = paid_date
+        if row["principal_paid"] >= row["principal_amount"] and row["interest_paid"] >= row["interest_amount"] and row["paid_date"] is None:
+            row["paid_date"] = paid_date
+    return allocations
+
+
+def _promote_payments(batch, batch_size, checkpoint):
+    L, P = PortfolioImportLoan, PortfolioImportPayment
+    created = 0
+    while True:
+        # A loan's receipts are promoted together so its waterfall runs once, in date order.
+        chunk = dict(db.session.query(L.loan_number, L.loan_id).filter(
+            L.batch_id == batch.id, L.loan_id.isnot(None),
+            exists().where(P.batch_id == batch.id, P.loan_number == L.loan_number, P.payment_id.is_(None))).order_by(L.row_no).limit(batch_size))
+        if not chunk: return created
+        staged = (P.query.filter(P.batch_id == batch.id, P.loan_number.in_(chunk), P.payment_id.is_(None))
+                  .order_by(P.loan_number, P.payment_date, P.row_no).all())
+        schedules = {}
+        for e in (db.session.query(LoanLedger.id, LoanLedger.loan_id, LoanLedger.principal_amount, LoanLedger.interest_amount)
+                  .filter(LoanLedger.loan_id.in_(list(chunk.values()))).order_by(LoanLedger.loan_id, LoanLedger.due_date, LoanLedger.installment_no)):
+            schedules.setdefault(e.loan_id, []).append({"id": e.id, "principal_amount": money(e.principal_amount), "interest_amount": money(e.interest_amount),
+                                                        "principal_paid": ZERO, "interest_paid": ZERO, "last_payment_date": None, "paid_date": None})
+        payments, allocations = [], []
+        for p in staged:
+            loan_id = chunk[p.loan_number]
+            split = _allocate(schedules[loan_id], p.amount, p.payment_date)
+            allocations.append(split)
+            payments.append({"loan_id": loan_id, "collection_date": p.payment_date, "payment_date": p.payment_date, "accounting_date": p.payment_date,
+                             "amount_collected": money(p.amount), "principal_paid": money(sum((a for _, kind, a in split if kind == "PRINCIPAL"), ZERO)),
+                             "interest_paid": money(sum((a for _, kind, a in split if kind == "INTEREST"), ZERO)), "collected_by_id": batch.created_by_id,
+                             "payment_method": p.payment_method, "transaction_reference": p.reference, "status": "POSTED",
+                             "transaction_type": LEGACY_PAYMENT_TYPE, "deposited_amount": money(p.amount), "collection_clearance_status": "CLEARED",
+                             "remarks": f"Portfolio import {batch.id}, row {p.row_no}", "idempotency_key": f"PORTFOLIO_IMPORT:{batch.id}:{p.row_no}"})
+        payment_ids = db.session.execute(insert(Payment).returning(Payment.id, sort_by_parameter_order=True), payments).scalars().all()
+        rows = [{"payment_id": payment_id, "loan_id": payment["loan_id"], "ledger_id": row["id"], "allocation_type": kind, "amount": amount}
+                for payment_id, payment, split in zip(payment_ids, payments, allocations) for row, kind, amount in split]
+        if rows: db.session.execute(insert(PaymentAllocation), rows)
+
+        ledger_updates, settled = [], []
+        for loan_id, installments in schedules.items():
+            for row in installments:
+                if row["last_payment_date"] is None: continue
+                paid = money(row["principal_paid"] + row["interest_paid"])
+                ledger_updates.append({"id": row["id"], "principal_paid": row["principal_paid"], "interest_paid": row["interest_paid"], "paid_amount": paid,
+                                       "status": "PAID" if row["paid_date"] else "PARTIAL", "last_payment_date": row["last_payment_date"], "paid_date": row["paid_date"]})
+            if installments and all(row["paid_date"] for row in installments):
+                settled_date = max(row["paid_date"] for row in installments)
+                settled.append({"id": loan_id, "status": "SETTLED", "settled_date": settled_date, "settled_at": datetime.combine(settled_date, datetime.min.time())})
+        if ledger_updates: db.session.execute(update(LoanLedger), ledger_updates)
+        if settled: db.session.execute(update(Loan), settled)
+        for p, payment_id in zip(staged, payment_ids):
+            p.payment_id = payment_id
+        global_search.index_entities("PAYMENT", payment_ids)
+        global_search.index_entities("LOAN", [row["id"] for row in settled])
+        loan_list_view.refresh_loans(list(chunk.values()))
+        created += len(staged)
+        _checkpoint(checkpoint)
+
+
+def _post_opening_journals(batch, batch_size, checkpoint):
+    L = PortfolioImportLoan
+    contra = db.session.get(AccountingAccount, batch.contra_account_id) if batch.contra_account_id else resolve_system_account("RETAINED_EARNINGS_ACCOUNT")
+    principal_account = resolve_system_account("LOAN_PRINCIPAL_RECEIVABLE")
+    interest_account = resolve_system_account("INTEREST_RECEIVABLE")
+    prefix = f"PORTFOLIO_IMPORT:{batch.id}:"
+    posted = {key for (key,) in db.session.query(AccountingJournalEntry.idempotency_key).filter(AccountingJournalEntry.idempotency_key.startswith(prefix))}
+    loan_ids = [loan_id for (loan_id,) in db.session.query(L.loan_id).filter(L.batch_id == batch.id, L.loan_id.isnot(None)).order_by(L.row_no)]
+    created = 0
+    for chunk_no, start in enumerate(range(0, len(loan_ids), batch_size), start=1):
+        key, ids = f"{prefix}J{chunk_no}", loan_ids[start:start + batch_size]
+        if key in posted: continue
+        balances = (db.session.query(LoanLedger.loan_id, Loan.customer_id, func.sum(LoanLedger.principal_amount - LoanLedger.principal_paid),
+                                     func.sum(case((LoanLedger.due_date <= batch.cutover_date, LoanLedger.interest_amount - LoanLedger.interest_paid), else_=0)))
+                    .join(Loan, Loan.id == LoanLedger.loan_id).filter(LoanLedger.loan_id.in_(ids))
+                    .group_by(LoanLedger.loan_id, Loan.customer_id).order_by(LoanLedger.loan_id).all())
+        lines, total = [], ZERO
+        for loan_id, customer_id, principal, interest in balances:
+            for account, amount in ((principal_account, money(principal or 0)), (interest_account, money(interest or 0))):
+                if amount > 0:
+                    lines.append({"account_id": account.id, "debit": amount, "customer_id": customer_id, "loan_id": loan_id}); total += amount
+        if total > 0:
+            lines.append({"account_id": contra.id, "credit": money(total), "description": "Opening balance contra"})
+            journal, = post_journals_bulk([{"journal_date": batch.cutover_date, "description": f"Opening loan balances – portfolio import {batch.id} ({chunk_no})",
+                                            "lines": lines, "reference_type": "PORTFOLIO_IMPORT", "reference_id": f"{batch.id}:{chunk_no}", "source_module": "LOANS",
+                                            "idempotency_key": key}], batch.created_by_id)
+            db.session.execute(update(Loan).where(Loan.id.in_(ids)).values(disbursement_journal_id=journal.id).execution_options(synchronize_session=False))
+            db.session.execute(update(Payment).where(Payment.loan_id.in_(ids), Payment.transaction_type == LEGACY_PAYMENT_TYPE)
+                               .values(journal_id=journal.id).execution_options(synchronize_session=False))
+            created += 1
+        _checkpoint(checkpoint)
+    return created
+
+
+PROMOTERS = {"customers": _promote_customers, "loans": _promote_loans, "payments": _promote_payments, "journals": _post_opening_journals}
+
+
+def run_import(batch, batch_size=DEFAULT_BATCH_SIZE, checkpoint=None):
+    """Promote a validated batch, resuming after its last completed stage.
+
+    ``checkpoint`` (normally ``db.session.commit``) is called after every chunk
+    and stage; without it the whole import stays in the caller's transaction,
+    which is how a dry run previews it.
+    """
+    if batch.status == "COMPLETED":
+        return {}
+    if batch.status not in {"VALIDATED", "PROMOTING"} or batch.error_count:
+        raise PortfolioImportError("Only a validated batch without errors can be promoted")
+    require_open_accounting_period(batch.cutover_date)
+    batch.status = "PROMOTING"
+    done = STAGES.index(batch.completed_stage) + 1 if batch.completed_stage else 0
+    counts = {}
+    for stage in STAGES[done:]:
+        counts[stage] = PROMOTERS[stage](batch, batch_size, checkpoint)
+        batch.completed_stage = stage
+        _checkpoint(checkpoint)
+    batch.status = "COMPLETED"
+    _checkpoint(checkpoint)
+    return counts
+
+
+def batch_report(batch):
+    C, L, P = PortfolioImportCustomer, PortfolioImportLoan, PortfolioImportPayment
+    report = {"batch_id": batch.id, "status": batch.status, "completed_stage": batch.completed_stage,
+              "cutover_date": batch.cutover_date.isoformat(), "error_count": batch.error_count}
+    errors = []
+    for name, model, target in (("customers", C, C.customer_id), ("loans", L, L.loan_id), ("payments", P, P.payment_id)):
+        rows, failed, promoted = db.session.query(func.count(model.id), func.count(model.error), func.count(target)).filter(model.batch_id == batch.id).one()
+        report[name] = {"rows": rows, "errors": failed, "promoted": promoted}
+        if failed and len(errors) < ERROR_SAMPLE:
+            errors.extend({"file": name, "row": row_no, "error": error} for row_no, error in
+                          db.session.query(model.row_no, model.error).filter(model.batch_id == batch.id, model.error.isnot(None))
+                          .order_by(model.row_no).limit(ERROR_SAMPLE - len(errors)))
+    report["principal_amount"] = f"{money(db.session.query(func.sum(L.principal_amount)).filter(L.batch_id == batch.id).scalar() or 0):.2f}"
+    report["payments_amount"] = f"{money(db.session.query(func.sum(P.amount)).filter(P.batch_id == batch.id).scalar() or 0):.2f}"
+    report["errors"] = errors
+    return report
@@ -0,0 +1,52 @@
+"""Commit-time refresh of denormalized read models.
+
+Loan search tokens, the loan list view, the unified search index and the
+collector rollups each record what a session changed and rebuild only those
+rows when the outer transaction commits.  ``register`` wires a read model into
+one shared ``after_flush``/``before_commit`` pair:
+
+* ``collect(session, changes)`` runs after every flush and adds keys to
+  ``changes``, a ``{kind: set()}`` kept in ``session.info`` for the model;
+  posting code can also add keys directly through ``pending_changes``;
+* ``refresh(session, changes)`` runs once per commit, after a final flush, for
+  every model with recorded changes.  Savepoint commits are skipped so a
+  rolled-back savepoint never loses its changes, and the flush/refresh pass is
+  repeated while refreshes themselves record further changes.
+"""
+from collections import defaultdict
+
+from sqlalchemy import event
+
+from .extensions import db
+
+PENDING_KEY = "read_model_changes"
+MAX_PASSES = 5
+
+_READ_MODELS = {}
+
+
+def register(name, refresh, collect=None):
+    _READ_MODELS[name] = (collect, refresh)
+
+
+def pending_changes(session, name):
+    """The ``{kind: set()}`` of changes recorded for read model ``name`` in this transaction."""
+    return session.info.setdefault(PENDING_KEY, {}).setdefault(name, defaultdict(set))
+
+
+@event.listens_for(db.session, "after_flush")
+def _collect_changed(session, flush_context):
+    for name, (collect, _refresh) in _READ_MODELS.items():
+        if collect: collect(session, pending_changes(session, name))
+
+
+@event.listens_for(db.session, "before_commit")
+def _refresh_before_commit(session):
+    if session.in_nested_transaction(): return
+    for _ in range(MAX_PASSES):
+        session.flush()  # before_commit runs ahead of the final flush; collect its changes too.
+        changes = session.info.pop(PENDING_KEY, None) or {}
+        changes = {name: kinds for name, kinds in changes.items() if any(kinds.values())}
+        if not changes: return
+        for name, (_collect, refresh) in _READ_MODELS.items():
+            if name in changes: refresh(session, changes[name])
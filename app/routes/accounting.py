@@ -7,7 +7,9 @@ from sqlalchemy import func, or_
 from sqlalchemy.orm import joinedload, selectinload
 
 from ..extensions import db
-from ..models import AccountingAccount, AccountingJournalEntry, AccountingJournalLine, Customer, Loan
+from ..fieldsets import FieldsetError, covered, fieldset_error, load_only_fields, project, requested_fields
+from ..global_search import journal_search_filter
+from ..models import AccountingAccount, AccountingJournalEntry, AccountingJournalLine
 from ..accounting import (
     AccountingError,
     create_account,
@@ -24,6 +26,7 @@ from ..accounting import (
     accounting_settings_payload,
     update_accounting_settings,
     account_subtype,
+    money,
     validate_funding_account, is_funding_account,
     resolve_system_account,
     trial_balance_report,
@@ -182,6 +185,35 @@ def _journal_id_arg(name):
     try: return int(value), None
     except ValueError: return None, _journal_filter_error(f"invalid_{name}", f"{name} must be a numeric ID.")
 
+def _amount(attribute):
+    return lambda e: f"{money(getattr(e, attribute)):.2f}"
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+# Journal list fields served from entry columns alone; any other field falls back to serialize_journal with lines and reversals loaded.
+JOURNAL_LIST_FIELDS = {
+    "id": lambda e: e.id, "journal_no": lambda e: e.journal_no, "journal_number": lambda e: e.journal_no,
+    "journal_date": lambda e: e.journal_date.isoformat(), "accounting_date": lambda e: _iso(e.accounting_date),
+    "reference": lambda e: e.reference, "description": lambda e: e.description,
+    "reference_type": lambda e: e.reference_type or e.source_type, "source_type": lambda e: e.source_type or e.reference_type,
+    "reference_id": lambda e: e.reference_id, "source_module": lambda e: e.source_module, "status": lambda e: e.status,
+    "total_debit": _amount("total_debit"), "total_credit": _amount("total_credit"),
+    "debit_total": _amount("total_debit"), "credit_total": _amount("total_credit"),
+    "posted_at": lambda e: _iso(e.posted_at), "posting_datetime": lambda e: _iso(e.posted_at),
+    "original_journal_id": lambda e: e.reversal_of_id, "is_reversal": lambda e: bool(e.reversal_of_id), "can_view": lambda e: True,
+}
+JOURNAL_LIST_COLUMNS = {
+    "journal_number": ("journal_no",), "reference_type": ("reference_type", "source_type"), "source_type": ("reference_type", "source_type"),
+    "debit_total": ("total_debit",), "credit_total": ("total_credit",), "posting_datetime": ("posted_at",),
+    "original_journal_id": ("reversal_of_id",), "is_reversal": ("reversal_of_id",), "can_view": (),
+}
+JOURNAL_RELATED_FIELDS = (
+    "created_by_name", "posted_by_name", "customer_id", "customer_number", "customer_name", "loan_id", "loan_number",
+    "installment_number", "payment_id", "collection_id", "original_journal_no", "original_journal_number", "reversal_journal_id",
+    "reversal_journal_no", "reversal_journal_number", "can_reverse", "lines",
+)
+
 @accounting_bp.route("/journal-entries", methods=["GET"])
 @accounting_bp.route("/journals", methods=["GET"])
 @role_required(["admin"])
@@ -202,8 +234,11 @@ def list_journals():
         except ValueError: return _journal_filter_error("invalid_pagination", "page and page_size must be positive integers.")
         status = _journal_arg("status"); status = status.upper() if status and status.upper() != "ALL" else None
         reference_type = _journal_arg("reference_type"); reference_type = reference_type.upper() if reference_type else None
+        try: fields = requested_fields(request.args, [*JOURNAL_LIST_FIELDS, *JOURNAL_RELATED_FIELDS])
+        except FieldsetError as exc: return fieldset_error(exc)
         search = _journal_arg("search"); effective_date = func.coalesce(AccountingJournalEntry.accounting_date, AccountingJournalEntry.journal_date)
-        q = AccountingJournalEntry.query.options(selectinload(AccountingJournalEntry.lines).joinedload(AccountingJournalLine.account), selectinload(AccountingJournalEntry.lines).joinedload(AccountingJournalLine.customer), selectinload(AccountingJournalEntry.lines).joinedload(AccountingJournalLine.loan), selectinload(AccountingJournalEntry.reversal_journals), joinedload(AccountingJournalEntry.reversal_of), joinedload(AccountingJournalEntry.created_by), joinedload(AccountingJournalEntry.posted_by))
+        if covered(fields, JOURNAL_LIST_FIELDS): q = AccountingJournalEntry.query.options(load_only_fields(AccountingJournalEntry, fields, JOURNAL_LIST_COLUMNS))
+        else: q = AccountingJournalEntry.query.options(selectinload(AccountingJournalEntry.lines).joinedload(AccountingJournalLine.account), selectinload(AccountingJournalEntry.lines).joinedload(AccountingJournalLine.customer), selectinload(AccountingJournalEntry.lines).joinedload(AccountingJournalLine.loan), selectinload(AccountingJournalEntry.reversal_journals), joinedload(AccountingJournalEntry.reversal_of), joinedload(AccountingJournalEntry.created_by), joinedload(AccountingJournalEntry.posted_by))
         if date_from: q = q.filter(effective_date >= date_from)
         if date_to: q = q.filter(effective_date <= date_to)
         if status: q = q.filter(func.upper(func.trim(AccountingJournalEntry.status)) == status)
@@ -211,16 +246,12 @@ def list_journals():
         if ids["account_id"] is not None: q = q.filter(AccountingJournalEntry.lines.any(AccountingJournalLine.account_id == ids["account_id"]))
         if ids["customer_id"] is not None: q = q.filter(or_(AccountingJournalEntry.customer_id == ids["customer_id"], AccountingJournalEntry.lines.any(AccountingJournalLine.customer_id == ids["customer_id"])))
         if ids["loan_id"] is not None: q = q.filter(or_(AccountingJournalEntry.loan_id == ids["loan_id"], AccountingJournalEntry.lines.any(AccountingJournalLine.loan_id == ids["loan_id"])))
-        if search:
-            pattern = f"%{search}%"
-            matching_customers = db.session.query(Customer.id).filter(or_(Customer.full_name.ilike(pattern), Customer.customer_code.ilike(pattern)))
-            matching_loans = db.session.query(Loan.id).filter(Loan.loan_number.ilike(pattern))
-            q = q.filter(or_(AccountingJournalEntry.journal_no.ilike(pattern), AccountingJournalEntry.description.ilike(pattern), AccountingJournalEntry.reference.ilike(pattern), AccountingJournalEntry.reference_type.ilike(pattern), AccountingJournalEntry.source_type.ilike(pattern), AccountingJournalEntry.reversal_of.has(AccountingJournalEntry.journal_no.ilike(pattern)), AccountingJournalEntry.reversal_journals.any(AccountingJournalEntry.journal_no.ilike(pattern)), AccountingJournalEntry.loan_id.in_(matching_loans), AccountingJournalEntry.customer_id.in_(matching_customers), AccountingJournalEntry.lines.any(AccountingJournalLine.loan.has(Loan.loan_number.ilike(pattern))), AccountingJournalEntry.lines.any(AccountingJournalLine.customer.has(or_(Customer.full_name.ilike(pattern), Customer.customer_code.ilike(pattern))))))
+        if search: q = q.filter(journal_search_filter(search))
         columns = {"accounting_date": effective_date, "journal_date": effective_date, "journal_number": AccountingJournalEntry.journal_no, "journal_no": AccountingJournalEntry.journal_no, "status": AccountingJournalEntry.status}
         column = columns.get((_journal_arg("sort_by") or "accounting_date").lower(), effective_date)
         ordering = column.asc() if (_journal_arg("sort_direction") or "desc").lower() == "asc" else column.desc()
         total = q.order_by(None).count(); entries = q.order_by(ordering, AccountingJournalEntry.id.desc()).offset((page - 1) * page_size).limit(page_size).all(); total_pages = (total + page_size - 1) // page_size
-        return jsonify({"items": [serialize_journal(e) for e in entries], "total": total, "page": page, "per_page": page_size, "pagination": {"page": page, "page_size": page_size, "total_items": total, "total_pages": total_pages, "has_next": page < total_pages, "has_previous": page > 1}, "applied_filters": {"date_from": raw_from, "date_to": raw_to, "status": status, "reference_type": reference_type, **ids, "search": search}})
+        return jsonify({"items": [project(e, fields, JOURNAL_LIST_FIELDS, serialize_journal) for e in entries], "total": total, "page": page, "per_page": page_size, "pagination": {"page": page, "page_size": page_size, "total_items": total, "total_pages": total_pages, "has_next": page < total_pages, "has_previous": page > 1}, "applied_filters": {"date_from": raw_from, "date_to": raw_to, "status": status, "reference_type": reference_type, **ids, "search": search, "fields": fields}})
     except Exception:
         current_app.logger.exception("Journal list query failed")
         return jsonify({"error": "journal_list_error", "message": "Unable to retrieve journal entries."}), 500
@@ -1,6 +1,7 @@
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
 from decimal import Decimal, InvalidOperation
-from flask import Blueprint, request, jsonify, current_app
+from io import StringIO
+from flask import Blueprint, Response, request, jsonify, current_app
 from sqlalchemy.exc import IntegrityError
 import logging
 import secrets
@@ -24,15 +25,17 @@ from ..models import (
     AccountingAccount,
     AccountingJournalLine,
     CollectionDepositBatch,
-    LoanDisbursementDeduction,
     DisbursementChargeType,
     AccountingSetting,
     CustomerCreditBalance,
+    CollectorDailyPerformance,
+    LoanListView,
 )
-from ..accounting import log_audit, post_loan_disbursement, AccountingError, accrue_due_loan_interest, reverse_payment, reverse_loan_disbursement, money as acct_money, preview_collection_deposit, create_collection_deposit, reverse_collection_deposit, collector_cash_position, account_subtype, allocate_payment, post_loan_payment, validate_collection_account, repair_unposted_payment, require_open_accounting_period, ValidationError, preview_loan_disbursement, preview_loan_application_disbursement, CALCULATION_METHODS, is_funding_account, is_active_account, is_posting_account, create_draft_journal, post_journal, resolve_system_account, customer_advance_account, generate_receipt_number
+from ..accounting import log_audit, post_loan_disbursement, AccountingError, accrue_due_loan_interest, reverse_payment, reverse_payments_bulk, payments_to_reverse, reverse_loan_disbursement, money as acct_money, preview_collection_deposit, create_collection_deposit, reverse_collection_deposit, collector_cash_position, collector_clearing_positions, account_subtype, allocate_payment, post_loan_payment, validate_collection_account, repair_unposted_payment, require_open_accounting_period, ValidationError, preview_loan_disbursement, preview_loan_application_disbursement, CALCULATION_METHODS, is_funding_account, is_active_account, is_posting_account, create_draft_journal, post_journal, resolve_system_account, customer_advance_account, generate_receipt_number
 from ..loan_ledger import (
     daily_interest_rate,
     generate_loan_ledger,
+    has_schedule,
     ledger_totals,
     loan_config_summary,
     money,
@@ -45,8 +48,16 @@ from ..settlement_reconciliation import preview as settlement_preview, finalize_
 from ..loan_status import serialize_loan_status
 from ..early_settlement import preview_early_loan_settlement, post_early_loan_settlement, reverse_early_loan_settlement, EarlySettlementError
 from ..customer_master import build_customer_master_profile
-
-ACTIVE_LOAN_STATUSES = {"ACTIVE", "DISBURSED"}
+from ..customer_identity import find_by_nic, nic_search_prefixes, normalize_nic, normalize_phone, phone_search_prefixes, prefix_range
+from ..collector_performance import default_range, range_totals_query, serialize_day, serialize_totals
+from ..fieldsets import FieldsetError, column_getters, fieldset_error, load_only_fields, project, requested_fields, wants
+from ..loan_list_view import days_past_due
+from ..loan_locks import lock_loan, run_with_retry
+from ..loan_schedule import expand_loan, materialize_due
+from ..pagination import PaginationError, keyset_page, page_meta, pagination_error
+from ..payment_import import PaymentImportError, import_payments, read_csv as read_payment_csv, results_csv as payment_results_csv
+
+ACTIVE_LOAN_STATUSES = {"ACTIVE", "OVERDUE", "DISBURSED"}
 POSTED_PAYMENT_STATUSES = {"POSTED"}
 
 
@@ -59,31 +70,6 @@ def _parse_customer_search_limit(raw_limit) -> int:
     return min(max(parsed_limit, 1), 20)
 
 
-def _normalized_phone_expression(column):
-    normalized = func.coalesce(column, "")
-    for old in (" ", "-", "+", "(", ")", "."):
-        normalized = func.replace(normalized, old, "")
-    return normalized
-
-
-def _phone_search_variants(query: str) -> set[str]:
-    digits = "".join(ch for ch in query if ch.isdigit())
-    if not digits:
-        return set()
-
-    variants = {digits}
-    if digits.startswith("94") and len(digits) > 2:
-        variants.add("0" + digits[2:])
-        variants.add(digits[2:])
-    elif digits.startswith("0") and len(digits) > 1:
-        variants.add("94" + digits[1:])
-        variants.add(digits[1:])
-    else:
-        variants.add("0" + digits)
-        variants.add("94" + digits)
-    return {variant for variant in variants if variant}
-
-
 def _serialize_customer_search_item(customer: Customer) -> dict:
     customer_number = customer.customer_code
     full_name = customer.full_name
@@ -293,6 +279,10 @@ def create_customer():
     if User.query.filter_by(email=user_data["email"]).first():
         return jsonify({"message": "User already exists"}), 400
 
+    duplicate = find_by_nic(profile_data.get("nic_number"))
+    if duplicate:
+        return jsonify({"message": "A customer with this NIC already exists", "customer_id": duplicate.id, "customer_code": duplicate.customer_code}), 409
+
     user = User(
         email=user_data["email"], name=user_data.get("name", ""), role="customer"
     )
@@ -331,43 +321,35 @@ def search_customers():
         prefix = f"{query_text}%"
         exact_lower = query_text.lower()
         numeric_id = int(query_text) if query_text.isdigit() else None
-        mobile_normalized = _normalized_phone_expression(Customer.mobile)
-        guarantor_mobile_normalized = _normalized_phone_expression(
-            Customer.guarantor_mobile
-        )
-        phone_variants = _phone_search_variants(query_text)
+        phone_prefixes = phone_search_prefixes(query_text)
+        phone_exact = normalize_phone(query_text)
+        nic_prefixes = nic_search_prefixes(query_text)
 
         filters = [
             Customer.customer_code.ilike(search),
             Customer.full_name.ilike(search),
-            Customer.nic_number.ilike(search),
-            Customer.mobile.ilike(search),
-            Customer.guarantor_mobile.ilike(search),
             User.email.ilike(search),
             cast(Customer.id, String).ilike(search),
+            *[prefix_range(Customer.nic_canonical, p) for p in nic_prefixes],
         ]
-        for variant in phone_variants:
+        for variant in phone_prefixes:
             filters.extend(
                 [
-                    mobile_normalized.like(f"%{variant}%"),
-                    guarantor_mobile_normalized.like(f"%{variant}%"),
+                    prefix_range(Customer.mobile_e164, variant),
+                    prefix_range(Customer.guarantor_mobile_e164, variant),
                 ]
             )
 
         rank = case(
             (Customer.id == numeric_id, 1),
             (func.lower(Customer.customer_code) == exact_lower, 2),
-            (func.lower(Customer.nic_number) == exact_lower, 3),
-            (
-                or_(*[mobile_normalized == variant for variant in phone_variants])
-                if phone_variants
-                else false(),
-                4,
-            ),
+            (Customer.nic_canonical == normalize_nic(query_text), 3),
+            (Customer.mobile_e164 == phone_exact if phone_exact else false(), 4),
             (
                 or_(
-                    Customer.nic_number.ilike(prefix),
-                    *[mobile_normalized.like(f"{variant}%") for variant in phone_variants],
+                    false(),
+                    *[prefix_range(Customer.nic_canonical, p) for p in nic_prefixes],
+                    *[prefix_range(Customer.mobile_e164, p) for p in phone_prefixes],
                 ),
                 5,
             ),
@@ -426,21 +408,15 @@ def get_normalized_customer_profile(customer_id: int):
 @admin_bp.route("/customers", methods=["GET"])
 @role_required(["admin"])
 def list_customers():
-    customers = Customer.query.all()
-    results = [
-        {
-            "id": c.id,
-            "customer_code": c.customer_code,
-            "full_name": c.full_name,
-            "status": c.status,
-            "mobile": c.mobile,
-            "lead_status": c.lead_status,
-            "kyc_status": c.kyc_status,
-            "eligibility_status": c.eligibility_status,
-        }
-        for c in customers
-    ]
-    return jsonify(results)
+    try:
+        fields = requested_fields(request.args, ADMIN_CUSTOMER_LIST_FIELDS)
+    except FieldsetError as exc:
+        return fieldset_error(exc)
+    query = Customer.query.options(load_only_fields(Customer, fields or ADMIN_CUSTOMER_LIST_FIELDS))
+    return jsonify([project(c, fields, ADMIN_CUSTOMER_LIST_FIELDS) for c in query.all()])
+
+
+ADMIN_CUSTOMER_LIST_FIELDS = column_getters("id", "customer_code", "full_name", "status", "mobile", "lead_status", "kyc_status", "eligibility_status")
 
 
 @admin_bp.route("/loans/search", methods=["GET"], strict_slashes=False)
@@ -586,6 +562,10 @@ def list_loans():
     page_size, error = parse_positive_int("page_size", 25, 100)
     if error:
         return error
+    try:
+        fields = requested_fields(request.args, LOAN_LIST_FIELDS)
+    except FieldsetError as exc:
+        return fieldset_error(exc)
     customer_id_raw = value("customer_id")
     customer_id = None
     if customer_id_raw:
@@ -596,101 +576,140 @@ def list_loans():
         except ValueError:
             return invalid("customer_id must be a positive integer.")
 
-    # These correlated aggregates preserve one row per loan while keeping balance
-    # filters, sorting, and pagination entirely in the database.
-    paid_amount = db.session.query(func.coalesce(func.sum(Payment.amount_collected), 0)).filter(
-        Payment.loan_id == Loan.id,
-        Payment.reversed_at.is_(None),
-        func.upper(func.trim(Payment.status)) == "POSTED",
-    ).correlate(Loan).scalar_subquery()
-    raw_outstanding = (func.coalesce(Loan.total_payable, 0) - paid_amount).label("raw_outstanding")
-    outstanding_amount = case((raw_outstanding < 0, 0), else_=raw_outstanding).label("outstanding_amount")
-    application_id = db.session.query(func.min(LoanDisbursementDeduction.loan_application_id)).filter(
-        LoanDisbursementDeduction.loan_id == Loan.id
-    ).correlate(Loan).scalar_subquery()
+    dpd_min, error = parse_positive_int("dpd_min", None)
+    if error:
+        return error
 
+    # Filters, sorting and paging run on the loan_list_view read model; only the page's loans are loaded.
+    view = LoanListView
     sort_fields = {
-        "loan_number": Loan.loan_number,
-        "customer_name": Customer.full_name,
-        "principal_amount": Loan.principal_amount,
-        "total_payable": Loan.total_payable,
-        "total_paid": paid_amount,
-        "outstanding_amount": outstanding_amount,
-        "disbursement_date": Loan.start_date,
-        "settled_date": Loan.settled_date,
-        "status": func.upper(func.trim(Loan.status)),
+        "loan_number": view.loan_number,
+        "customer_name": view.customer_name,
+        "principal_amount": view.principal_amount,
+        "total_payable": view.total_payable,
+        "total_paid": view.total_paid,
+        "outstanding_amount": view.outstanding_amount,
+        "disbursement_date": view.start_date,
+        "settled_date": view.settled_date,
+        "status": view.status,
     }
     if sort_by not in sort_fields:
         return invalid("sort_by is not supported.")
+    keyset = value("cursor") is not None or value("limit") is not None
+    if keyset and sort_by == "settled_date":
+        return invalid("sort_by settled_date cannot be combined with cursor pagination.")
 
-    query = db.session.query(Loan, paid_amount.label("total_paid"), raw_outstanding, outstanding_amount, application_id.label("application_id"), LoanApplication.application_number).options(joinedload(Loan.customer)).outerjoin(Customer, Loan.customer_id == Customer.id).outerjoin(LoanApplication, LoanApplication.id == application_id)
+    query = view.query
     if q:
         pattern = f"%{q}%"
         search_terms = [
-            Loan.loan_number.ilike(pattern), Customer.full_name.ilike(pattern),
-            Customer.customer_code.ilike(pattern), Customer.nic_number.ilike(pattern),
-            Customer.mobile.ilike(pattern), LoanApplication.application_number.ilike(pattern),
+            view.loan_number.ilike(pattern), view.customer_name.ilike(pattern), view.customer_code.ilike(pattern),
+            view.nic_number.ilike(pattern), view.mobile.ilike(pattern), view.application_number.ilike(pattern),
         ]
         if q.isdigit():
-            search_terms.append(Loan.id == int(q))
+            search_terms.append(view.loan_id == int(q))
         query = query.filter(or_(*search_terms))
     if status:
-        query = query.filter(func.upper(func.trim(Loan.status)) == status)
+        query = query.filter(view.status == status)
     if customer_id:
-        query = query.filter(Loan.customer_id == customer_id)
+        query = query.filter(view.customer_id == customer_id)
     if date_from:
-        query = query.filter(Loan.start_date >= date_from)
+        query = query.filter(view.start_date >= date_from)
     if date_to:
-        query = query.filter(Loan.start_date <= date_to)
+        query = query.filter(view.start_date <= date_to)
     if principal_min is not None:
-        query = query.filter(Loan.principal_amount >= principal_min)
+        query = query.filter(view.principal_amount >= principal_min)
     if principal_max is not None:
-        query = query.filter(Loan.principal_amount <= principal_max)
-    credit = func.coalesce(Loan.customer_credit_balance, 0)
+        query = query.filter(view.principal_amount <= principal_max)
+    if dpd_min:
+        query = query.filter(view.next_due_date <= date.today() - timedelta(days=dpd_min))
     if balance_status == "OUTSTANDING":
-        query = query.filter(outstanding_amount > Decimal("0.01"))
+        query = query.filter(view.outstanding_amount > Decimal("0.01"))
     elif balance_status == "FULLY_PAID":
-        query = query.filter(and_(outstanding_amount <= Decimal("0.01"), credit <= Decimal("0.01"), raw_outstanding >= 0))
+        query = query.filter(and_(view.outstanding_amount <= Decimal("0.01"), view.customer_credit_balance <= Decimal("0.01"), view.raw_outstanding >= 0))
     elif balance_status == "OVERPAID":
-        query = query.filter(or_(credit > Decimal("0.01"), raw_outstanding < 0))
+        query = query.filter(or_(view.customer_credit_balance > Decimal("0.01"), view.raw_outstanding < 0))
     elif balance_status == "ZERO_BALANCE":
-        query = query.filter(outstanding_amount <= Decimal("0.01"))
+        query = query.filter(view.outstanding_amount <= Decimal("0.01"))
 
-    total_items = query.order_by(None).count()
     sort_expression = sort_fields[sort_by]
-    ordering = sort_expression.asc() if sort_direction == "asc" else sort_expression.desc()
-    rows = query.order_by(ordering, Loan.id.asc()).offset((page - 1) * page_size).limit(page_size).all()
-    total_pages = (total_items + page_size - 1) // page_size
-    items = []
-    for loan, total_paid, raw_balance, displayed_balance, linked_application_id, application_number in rows:
-        customer = loan.customer
-        raw_balance = Decimal(raw_balance or 0)
-        displayed_balance = Decimal(displayed_balance or 0)
-        credit_balance = Decimal(loan.customer_credit_balance or 0)
-        reconciliation_required = (loan.status or "").strip().upper() != "SETTLED" and displayed_balance <= Decimal("0.01") and raw_balance >= 0
-        items.append({
-            "id": loan.id, "loan_id": loan.id, "loan_number": loan.loan_number,
-            "application_id": linked_application_id, "application_number": application_number,
-            "customer_id": loan.customer_id, "customer_number": customer.customer_code if customer else None,
-            "customer_name": customer.full_name if customer else None, "nic": customer.nic_number if customer else None,
-            "mobile": customer.mobile if customer else None, "customer": _loan_customer_to_dict(customer),
-            "currency": CURRENCY_CODE, "principal_amount": float(loan.principal_amount or 0),
-            "total_interest": float(loan.total_interest if loan.total_interest is not None else (loan.total_payable or 0) - (loan.principal_amount or 0)),
-            "total_payable": float(loan.total_payable or 0), "total_paid": float(total_paid or 0),
-            "outstanding_amount": float(displayed_balance), "outstanding": float(displayed_balance),
-            "customer_credit_balance": float(credit_balance), "disbursement_date": loan.start_date.isoformat() if loan.start_date else None,
-            "start_date": loan.start_date.isoformat() if loan.start_date else None,
-            "maturity_date": loan.maturity_date.isoformat() if loan.maturity_date else (loan.end_date.isoformat() if loan.end_date else None),
-            "settled_date": loan.settled_date.isoformat() if loan.settled_date else None, "status": serialize_loan_status(loan),
-            "settlement_reconciliation_required": reconciliation_required,
-            "available_actions": [],
-            # Legacy list consumers use these keys; monetary values remain numeric.
-            "principal_amount_formatted": format_currency(loan.principal_amount or 0),
-            "total_payable_formatted": format_currency(loan.total_payable or 0),
-            "total_paid_formatted": format_currency(total_paid or 0),
-            "outstanding_formatted": format_currency(displayed_balance),
-        })
-    return jsonify({"items": items, "pagination": {"page": page, "page_size": page_size, "total_items": total_items, "total_pages": total_pages, "has_next": page < total_pages, "has_previous": page > 1}, "applied_filters": {"q": q, "status": status, "date_from": date_from.isoformat() if date_from else None, "date_to": date_to.isoformat() if date_to else None, "balance_status": balance_status, "principal_min": float(principal_min) if principal_min is not None else None, "principal_max": float(principal_max) if principal_max is not None else None, "customer_id": customer_id, "sort_by": sort_by, "sort_direction": sort_direction}})
+    if keyset:
+        try:
+            result = keyset_page(query, sort_expression, view.loan_id, request.args, descending=sort_direction == "desc", default_limit=25)
+        except PaginationError as exc:
+            return pagination_error(exc)
+        rows, pagination = result.items, page_meta(result)
+    else:
+        total_items = query.order_by(None).count()
+        ordering = sort_expression.asc() if sort_direction == "asc" else sort_expression.desc()
+        rows = query.order_by(ordering, view.loan_id.asc()).offset((page - 1) * page_size).limit(page_size).all()
+        total_pages = (total_items + page_size - 1) // page_size
+        pagination = {"page": page, "page_size": page_size, "total_items": total_items, "total_pages": total_pages, "has_next": page < total_pages, "has_previous": page > 1}
+
+    loan_query = Loan.query.filter(Loan.id.in_([row.loan_id for row in rows]))
+    if wants(fields, *_LOAN_CUSTOMER_FIELDS):
+        loan_query = loan_query.options(joinedload(Loan.customer))
+    if fields is not None:
+        loan_query = loan_query.options(load_only_fields(Loan, fields, LOAN_LIST_COLUMNS))
+    loans = {loan.id: loan for loan in loan_query.all()} if rows else {}
+    items = [project(loans[row.loan_id], fields, LOAN_LIST_FIELDS, None, _loan_list_extra(row)) for row in rows if row.loan_id in loans]
+    return jsonify({"items": items, "pagination": pagination, "applied_filters": {"q": q, "status": status, "date_from": date_from.isoformat() if date_from else None, "date_to": date_to.isoformat() if date_to else None, "balance_status": balance_status, "principal_min": float(principal_min) if principal_min is not None else None, "principal_max": float(principal_max) if principal_max is not None else None, "customer_id": customer_id, "dpd_min": dpd_min, "sort_by": sort_by, "sort_direction": sort_direction, "fields": fields}})
+
+
+def _loan_list_extra(row: LoanListView) -> dict:
+    return {"total_paid": row.total_paid, "raw_outstanding": row.raw_outstanding, "outstanding_amount": row.outstanding_amount,
+            "application_id": row.application_id, "application_number": row.application_number, "product": row.product,
+            "next_due_date": row.next_due_date, "last_payment_date": row.last_payment_date}
+
+
+def _loan_balance(extra, key):
+    return Decimal(extra.get(key) or 0)
+
+
+def _loan_customer_value(attribute):
+    return lambda loan, extra: getattr(loan.customer, attribute) if loan.customer else None
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+# Admin loan list items: field -> getter(loan, extra); ``extra`` holds the row's aggregate columns.
+LOAN_LIST_FIELDS = {
+    "id": lambda loan, extra: loan.id, "loan_id": lambda loan, extra: loan.id, "loan_number": lambda loan, extra: loan.loan_number,
+    "application_id": lambda loan, extra: extra.get("application_id"), "application_number": lambda loan, extra: extra.get("application_number"),
+    "customer_id": lambda loan, extra: loan.customer_id, "customer_number": _loan_customer_value("customer_code"),
+    "customer_name": _loan_customer_value("full_name"), "nic": _loan_customer_value("nic_number"), "mobile": _loan_customer_value("mobile"),
+    "customer": lambda loan, extra: _loan_customer_to_dict(loan.customer),
+    "currency": lambda loan, extra: CURRENCY_CODE, "principal_amount": lambda loan, extra: float(loan.principal_amount or 0),
+    "total_interest": lambda loan, extra: float(loan.total_interest if loan.total_interest is not None else (loan.total_payable or 0) - (loan.principal_amount or 0)),
+    "total_payable": lambda loan, extra: float(loan.total_payable or 0), "total_paid": lambda loan, extra: float(extra.get("total_paid") or 0),
+    "outstanding_amount": lambda loan, extra: float(_loan_balance(extra, "outstanding_amount")),
+    "outstanding": lambda loan, extra: float(_loan_balance(extra, "outstanding_amount")),
+    "customer_credit_balance": lambda loan, extra: float(Decimal(loan.customer_credit_balance or 0)),
+    "disbursement_date": lambda loan, extra: _iso(loan.start_date), "start_date": lambda loan, extra: _iso(loan.start_date),
+    "maturity_date": lambda loan, extra: _iso(loan.maturity_date) or _iso(loan.end_date),
+    "settled_date": lambda loan, extra: _iso(loan.settled_date), "status": lambda loan, extra: serialize_loan_status(loan),
+    "settlement_reconciliation_required": lambda loan, extra: (loan.status or "").strip().upper() != "SETTLED"
+        and _loan_balance(extra, "outstanding_amount") <= Decimal("0.01") and _loan_balance(extra, "raw_outstanding") >= 0,
+    "available_actions": lambda loan, extra: [],
+    "product": lambda loan, extra: extra.get("product"), "next_due_date": lambda loan, extra: _iso(extra.get("next_due_date")),
+    "days_past_due": lambda loan, extra: days_past_due(extra.get("next_due_date")),
+    "last_payment_date": lambda loan, extra: _iso(extra.get("last_payment_date")),
+    # Legacy list consumers use these keys; monetary values remain numeric.
+    "principal_amount_formatted": lambda loan, extra: format_currency(loan.principal_amount or 0),
+    "total_payable_formatted": lambda loan, extra: format_currency(loan.total_payable or 0),
+    "total_paid_formatted": lambda loan, extra: format_currency(extra.get("total_paid") or 0),
+    "outstanding_formatted": lambda loan, extra: format_currency(_loan_balance(extra, "outstanding_amount")),
+}
+LOAN_LIST_COLUMNS = {
+    "loan_id": (), "customer_number": ("customer_id",), "customer_name": ("customer_id",), "nic": ("customer_id",),
+    "mobile": ("customer_id",), "customer": ("customer_id",), "total_interest": ("total_interest", "total_payable", "principal_amount"),
+    "disbursement_date": ("start_date",), "maturity_date": ("maturity_date", "end_date"), "settlement_reconciliation_required": ("status",),
+    "principal_amount_formatted": ("principal_amount",), "total_payable_formatted": ("total_payable",),
+    "product": (), "next_due_date": (), "days_past_due": (), "last_payment_date": (),
+}
+_LOAN_CUSTOMER_FIELDS = ("customer_number", "customer_name", "nic", "mobile", "customer")
 
 
 def _loan_customer_to_dict(customer: Customer | None) -> dict | None:
@@ -737,6 +756,7 @@ def _post_settlement_response(payment):
 def record_post_settlement_payment(loan_id):
     """Collect delay interest and customer advances without reopening a settled loan."""
     data = request.get_json(silent=True) or {}
+    expand_loan(loan_id)
     loan = Loan.query.options(joinedload(Loan.ledger_entries)).get(loan_id)
     if not loan:
         return jsonify({"error": "loan_not_found", "message": "Loan not found"}), 404
@@ -1206,6 +1226,9 @@ def _ledger_to_dict(entry: LoanLedger) -> dict:
 @admin_bp.route("/loans/<int:loan_id>/ledger", methods=["GET"])
 @role_required(["admin"])
 def get_loan_ledger(loan_id):
+    # The full schedule is shown, so a compact one is stored out first.
+    if expand_loan(loan_id):
+        db.session.commit()
     loan = Loan.query.options(
         joinedload(Loan.customer), joinedload(Loan.ledger_entries)
     ).get_or_404(loan_id)
@@ -1294,34 +1317,39 @@ def record_ledger_payment(loan_id, entry_id):
         return jsonify({"error": "Collector setup incomplete", "message": "The selected collector has no active posting collection account."}), 422
 
     try:
-        require_open_accounting_period(paid_date)
-        if str(getattr(loan, "interest_accounting_method", "ACCRUAL_BY_INSTALLMENT")) == "ACCRUAL_BY_INSTALLMENT":
-            accrue_due_loan_interest(paid_date, loan.id, historical=True, requested_by=int(get_jwt_identity()))
-        if not loan.ledger_entries:
-            generate_loan_ledger(loan)
+        def post():
+            lock_loan(loan.id)
+            require_open_accounting_period(paid_date)
+            if str(getattr(loan, "interest_accounting_method", "ACCRUAL_BY_INSTALLMENT")) == "ACCRUAL_BY_INSTALLMENT":
+                accrue_due_loan_interest(paid_date, loan.id, historical=True, requested_by=int(get_jwt_identity()))
+            if not has_schedule(loan):
+                generate_loan_ledger(loan)
+                db.session.flush()
+            entry = LoanLedger.query.filter_by(id=entry_id, loan_id=loan.id).first_or_404()
+            entry.delay_days = max((paid_date - entry.due_date).days, 0)
+            entry.delay_interest = money(Decimal(entry.opening_balance) * daily_interest_rate(loan) * Decimal(entry.delay_days))
+            entry.delay_interest_accrued = entry.delay_interest
+            principal_paid, interest_paid, penalty_paid, other_fee_paid = allocate_payment(loan, paid_amount, paid_date)
+            payment = Payment(
+                loan_id=loan.id, amount_collected=paid_amount, principal_paid=principal_paid,
+                interest_paid=interest_paid, penalty_paid=penalty_paid, other_fee_paid=other_fee_paid,
+                collection_date=paid_date, payment_date=paid_date, accounting_date=paid_date,
+                collected_by_id=int(get_jwt_identity()), collector_id=int(collector_id) if collector_id else None,
+                payment_method=method, collection_method=method, remarks=remarks,
+                transaction_reference=reference,
+                receipt_account_id=receipt_account.id if receipt_account else None,
+                collection_account_id=receipt_account.id if receipt_account else None,
+                bank_reference=reference,
+            )
+            db.session.add(payment)
             db.session.flush()
-        entry = LoanLedger.query.filter_by(id=entry_id, loan_id=loan.id).first_or_404()
-        entry.delay_days = max((paid_date - entry.due_date).days, 0)
-        entry.delay_interest = money(Decimal(entry.opening_balance) * daily_interest_rate(loan) * Decimal(entry.delay_days))
-        entry.delay_interest_accrued = entry.delay_interest
-        principal_paid, interest_paid, penalty_paid, other_fee_paid = allocate_payment(loan, paid_amount, paid_date)
-        payment = Payment(
-            loan_id=loan.id, amount_collected=paid_amount, principal_paid=principal_paid,
-            interest_paid=interest_paid, penalty_paid=penalty_paid, other_fee_paid=other_fee_paid,
-            collection_date=paid_date, payment_date=paid_date, accounting_date=paid_date,
-            collected_by_id=int(get_jwt_identity()), collector_id=int(collector_id) if collector_id else None,
-            payment_method=method, collection_method=method, remarks=remarks,
-            transaction_reference=reference,
-            receipt_account_id=receipt_account.id if receipt_account else None,
-            collection_account_id=receipt_account.id if receipt_account else None,
-            bank_reference=reference,
-        )
-        db.session.add(payment)
-        db.session.flush()
-        journal = post_loan_payment(payment, int(get_jwt_identity()), receipt_account=receipt_account)
-        if not payment.journal_id:
-            raise AccountingError("Payment journal was not created")
-        db.session.commit()
+            journal = post_loan_payment(payment, int(get_jwt_identity()), receipt_account=receipt_account)
+            if not payment.journal_id:
+                raise AccountingError("Payment journal was not created")
+            db.session.commit()
+            return payment, journal, entry
+
+        payment, journal, entry = run_with_retry(post)
     except Exception as exc:
         db.session.rollback()
         logger.exception("Record payment accounting failure loan_id=%s", loan_id)
@@ -1528,6 +1556,62 @@ def admin_reverse_payment(payment_id):
     except AccountingError as exc:
         db.session.rollback(); return jsonify({"message": str(exc)}), 422
 
+@admin_bp.route("/payments/reverse-batch", methods=["POST"])
+@role_required(["admin"])
+def admin_reverse_payments_batch():
+    """Reverse every receipt in ``payment_ids`` and/or ``deposit_batch_id`` in one transaction."""
+    data = request.get_json() or {}
+    payment_ids = data.get("payment_ids") or []
+    if not isinstance(payment_ids, list) or not all(isinstance(pid, int) for pid in payment_ids):
+        return jsonify({"message": "payment_ids must be a list of payment ids"}), 400
+    if not payment_ids and not data.get("deposit_batch_id"):
+        return jsonify({"message": "payment_ids or deposit_batch_id is required"}), 400
+    payments = payments_to_reverse(payment_ids, data.get("deposit_batch_id"))
+    missing = sorted(set(payment_ids) - {p.id for p in payments})
+    if missing or not payments:
+        return jsonify({"message": "Payments not found", "payment_ids": missing}), 404
+    try:
+        reversal_date = date.fromisoformat(data.get("reversal_date") or date.today().isoformat())
+        reversals = reverse_payments_bulk(payments, reversal_date, data.get("reason"), int(get_jwt_identity()))
+        db.session.commit()
+    except ValueError as exc:
+        db.session.rollback(); return jsonify({"message": str(exc)}), 422
+    return jsonify({"reversed": len(payments), "items": [{"payment_id": p.id, "reversal_journal_id": rev.id} for p, rev in zip(payments, reversals)]})
+
+@admin_bp.route("/payments/import", methods=["POST"])
+@role_required(["admin"])
+def import_payment_file():
+    """Post a bank/mobile-money receipt file: multipart ``file`` (CSV) or JSON ``{"payments": [...]}``.
+
+    ``?format=csv`` returns the per-row result file instead of JSON.
+    """
+    upload = request.files.get("file")
+    if upload:
+        options, rows, first_row_no = request.form, read_payment_csv(StringIO(upload.read().decode("utf-8-sig"))), 2
+    else:
+        options = request.get_json(silent=True) or {}
+        rows, first_row_no = options.get("payments"), 1
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            return jsonify({"message": "Upload a CSV file or send payments as a list of objects"}), 400
+    account = None
+    if options.get("collection_account_id"):
+        try:
+            account = AccountingAccount.query.get(int(options["collection_account_id"]))
+        except (TypeError, ValueError):
+            account = None
+        if account is None:
+            return jsonify({"message": "collection_account_id must be a valid account id"}), 400
+    try:
+        summary, results = import_payments(rows, int(get_jwt_identity()), options.get("payment_method") or "BANK_TRANSFER", account, first_row_no)
+        db.session.commit()
+    except PaymentImportError as exc:
+        db.session.rollback(); return jsonify({"message": str(exc)}), 400
+    except AccountingError as exc:
+        db.session.rollback(); return jsonify({"message": str(exc)}), 422
+    if request.args.get("format") == "csv":
+        return Response(payment_results_csv(results), mimetype="text/csv", headers={"Content-Disposition": "attachment; filename=payment-import-results.csv"})
+    return jsonify({**summary, "results": results})
+
 @admin_bp.route("/disbursement-charge-types", methods=["GET"])
 @role_required(["admin"])
 def list_disbursement_charge_types():
@@ -1837,16 +1921,69 @@ def collector_position(collector_id):
 @role_required(["admin"])
 def collections_reconciliation():
     accounts = AccountingAccount.query.filter_by(is_collection_account=True).all()
+    gl_rows = db.session.query(AccountingJournalLine.account_id, db.func.coalesce(db.func.sum(AccountingJournalLine.debit), 0), db.func.coalesce(db.func.sum(AccountingJournalLine.credit), 0)).filter(AccountingJournalLine.account_id.in_([a.id for a in accounts])).group_by(AccountingJournalLine.account_id).all()
+    gl_balances = {account_id: acct_money(deb) - acct_money(cre) for account_id, deb, cre in gl_rows}
+    positions = collector_clearing_positions([a.collector_id for a in accounts if a.collector_id])
     items=[]
     for acct in accounts:
-        deb = db.session.query(db.func.coalesce(db.func.sum(AccountingJournalLine.debit), 0)).filter_by(account_id=acct.id).scalar()
-        cre = db.session.query(db.func.coalesce(db.func.sum(AccountingJournalLine.credit), 0)).filter_by(account_id=acct.id).scalar()
-        gl = acct_money(deb) - acct_money(cre)
-        pos = collector_cash_position(acct.collector_id) if acct.collector_id else {"closing_balance": acct_money(0)}
-        sub = acct_money(pos["closing_balance"])
+        gl = gl_balances.get(acct.id, acct_money(0))
+        collections, deposits = positions.get(acct.collector_id, (acct_money(0), acct_money(0)))
+        sub = acct_money(collections - deposits)
         items.append({"collector_id": acct.collector_id, "collector": acct.collector.name if acct.collector else None, "account_id": acct.id, "account": acct.account_name, "gl_collection_account_balance": f"{gl:.2f}", "collector_subledger_balance": f"{sub:.2f}", "difference": f"{acct_money(gl-sub):.2f}"})
     return jsonify({"items": items})
 
+def _performance_args():
+    """Shared date range and page parsing for the collector performance reports."""
+    try:
+        date_from, date_to = default_range(date.fromisoformat(request.args["date_from"]) if request.args.get("date_from") else None,
+                                           date.fromisoformat(request.args["date_to"]) if request.args.get("date_to") else None)
+        page = max(1, int(request.args.get("page") or 1)); page_size = min(100, max(1, int(request.args.get("page_size") or 25)))
+    except ValueError:
+        return None, (jsonify({"message": "date_from/date_to must be YYYY-MM-DD; page and page_size must be integers"}), 400)
+    if date_from > date_to:
+        return None, (jsonify({"message": "date_from must be on or before date_to"}), 400)
+    return (date_from, date_to, page, page_size), None
+
+
+def _pagination(page, page_size, total_items):
+    total_pages = (total_items + page_size - 1) // page_size
+    return {"page": page, "page_size": page_size, "total_items": total_items, "total_pages": total_pages, "has_next": page < total_pages, "has_previous": page > 1}
+
+
+@admin_bp.route("/collectors/performance", methods=["GET"], strict_slashes=False)
+@role_required(["admin"])
+def collectors_performance():
+    args, error = _performance_args()
+    if error: return error
+    date_from, date_to, page, page_size = args
+    p = CollectorDailyPerformance
+    totals = range_totals_query(date_from, date_to)
+    if request.args.get("collector_id"): totals = totals.filter(p.collector_id == request.args.get("collector_id", type=int))
+    grouped = totals.add_columns(p.collector_id, User.name).join(User, User.id == p.collector_id).group_by(p.collector_id, User.name)
+    total_items = grouped.order_by(None).count()
+    rows = grouped.order_by(func.sum(p.collected_amount).desc(), p.collector_id).offset((page - 1) * page_size).limit(page_size).all()
+    items = [{"collector_id": row[6], "collector": row[7], **serialize_totals(*row[:6])} for row in rows]
+    return jsonify({"items": items, "totals": serialize_totals(*totals.one()), "pagination": _pagination(page, page_size, total_items),
+                    "applied_filters": {"date_from": date_from.isoformat(), "date_to": date_to.isoformat(), "collector_id": request.args.get("collector_id", type=int)}})
+
+
+@admin_bp.route("/collectors/<int:collector_id>/performance", methods=["GET"], strict_slashes=False)
+@role_required(["admin"])
+def collector_daily_performance(collector_id):
+    collector = User.query.get_or_404(collector_id)
+    args, error = _performance_args()
+    if error: return error
+    date_from, date_to, page, page_size = args
+    p = CollectorDailyPerformance
+    days = p.query.filter(p.collector_id == collector_id, p.performance_date >= date_from, p.performance_date <= date_to)
+    total_items = days.count()
+    rows = days.order_by(p.performance_date.desc()).offset((page - 1) * page_size).limit(page_size).all()
+    totals = range_totals_query(date_from, date_to).filter(p.collector_id == collector_id).one()
+    return jsonify({"collector": {"id": collector.id, "name": collector.name}, "items": [serialize_day(r) for r in rows],
+                    "totals": serialize_totals(*totals), "pagination": _pagination(page, page_size, total_items),
+                    "applied_filters": {"date_from": date_from.isoformat(), "date_to": date_to.isoformat()}})
+
+
 def _collector_account_payload(account):
     if not account:
         return None
@@ -8,7 +8,7 @@ from ..extensions import db
 from ..models import AccountingAccount, CollectionSheet, CollectionSheetExpense, CollectionSheetItem, Loan, User
 from ..accounting import log_audit
 from ..collection_sheets import (ELIGIBLE_LOANS, SheetError, approve_and_post, decimal_amount,
-                                 ensure_draft, preview, recalculate, reverse, search_loans,
+                                 ensure_draft, generate_items, preview, recalculate, reverse, search_loans,
                                  serialize, sheet_number, valid_bank, valid_expense_account, validate)
 from .utils import role_required
 
@@ -24,6 +24,13 @@ def sheet_error(exc):
 def actor(): return int(get_jwt_identity())
 
 
+def flag(data, name, default=False):
+    """A JSON flag that may arrive as a boolean or as a string such as "false"."""
+    value = data.get(name, default)
+    if isinstance(value, str): return value.strip().lower() in {"1", "true", "yes", "on"}
+    return bool(value)
+
+
 @collection_sheets_bp.post("")
 @role_required(["admin"])
 def create_sheet():
@@ -36,10 +43,13 @@ def create_sheet():
                             collection_date=collection_date, notes=data.get("notes"), created_by_id=actor())
     db.session.add(sheet)
     try:
-        db.session.flush(); log_audit("COLLECTION_SHEET_CREATE", "CollectionSheet", sheet.id, actor()); db.session.commit()
+        db.session.flush(); log_audit("COLLECTION_SHEET_CREATE", "CollectionSheet", sheet.id, actor())
+        generated = generate_items(sheet, route_only=flag(data, "route_only", True)) if flag(data, "generate_items") else None
+        if generated: log_audit("COLLECTION_SHEET_ITEMS_GENERATE", "CollectionSheet", sheet.id, actor(), generated)
+        db.session.commit()
     except IntegrityError:
         db.session.rollback(); raise SheetError("Could not allocate a unique sheet number; retry request", 409)
-    return jsonify({"id": sheet.id, "sheet_number": sheet.sheet_number, "status": sheet.status}), 201
+    return jsonify({"id": sheet.id, "sheet_number": sheet.sheet_number, "status": sheet.status, "generated": generated}), 201
 
 
 @collection_sheets_bp.get("")
@@ -56,7 +66,7 @@ def list_sheets():
 
 @collection_sheets_bp.get("/loan-search")
 @role_required(["admin"])
-def loan_search(): return jsonify({"items": search_loans(request.args.get("q"))})
+def loan_search(): return jsonify({"items": search_loans(request.args.get("q"), request.args.get("limit", type=int))})
 
 
 @collection_sheets_bp.get("/<int:sheet_id>")
@@ -88,6 +98,17 @@ def add_item(sheet_id):
     return jsonify(serialize(sheet, True)), 201
 
 
+@collection_sheets_bp.post("/<int:sheet_id>/generate-items")
+@role_required(["admin"])
+def generate(sheet_id):
+    sheet = CollectionSheet.query.get_or_404(sheet_id); data = request.get_json(silent=True) or {}
+    try: as_of = date.fromisoformat(data["as_of"]) if data.get("as_of") else None
+    except ValueError: raise SheetError("as_of must be a valid ISO date")
+    result = generate_items(sheet, as_of, flag(data, "route_only", True))
+    log_audit("COLLECTION_SHEET_ITEMS_GENERATE", "CollectionSheet", sheet.id, actor(), result); db.session.commit()
+    return jsonify({**serialize(sheet, True), "generated": result}), 201
+
+
 @collection_sheets_bp.delete("/<int:sheet_id>/items/<int:item_id>")
 @role_required(["admin"])
 def remove_item(sheet_id, item_id):
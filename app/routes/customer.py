@@ -1,9 +1,10 @@
 from decimal import Decimal
-from flask import Blueprint, jsonify, current_app
+from flask import Blueprint, jsonify, current_app, request
 from flask_jwt_extended import get_jwt_identity
 
 from ..currency import CURRENCY_CODE, format_currency
-from ..models import Customer, Loan
+from ..fieldsets import FieldsetError, column_getters, covered, fieldset_error, load_only_fields, project, requested_fields, wants
+from ..models import Customer, Loan, Payment
 from ..loan_totals import loan_totals
 from ..loan_status import serialize_loan_status
 from .utils import role_required
@@ -34,47 +35,84 @@ def me():
     )
 
 
+def _totals(loan, memo):
+    # loan_totals walks payments and the ledger; run it once per loan per request.
+    if "totals" not in memo:
+        memo["totals"] = loan_totals(loan)
+    return memo["totals"]
+
+
+def _arrears(loan, memo):
+    if "arrears" not in memo:
+        expected, paid = loan.expected_to_date(), _totals(loan, memo)["cash_paid"]
+        memo["arrears"] = expected - paid if expected > paid else Decimal("0")
+    return memo["arrears"]
+
+
+# Customer loan list items: field -> getter(loan, memo).
+MY_LOAN_FIELDS = {
+    "id": lambda loan, memo: loan.id,
+    "loan_number": lambda loan, memo: loan.loan_number,
+    "currency": lambda loan, memo: CURRENCY_CODE,
+    "principal_amount": lambda loan, memo: float(loan.principal_amount),
+    "principal_amount_formatted": lambda loan, memo: format_currency(loan.principal_amount),
+    "total_payable": lambda loan, memo: float(loan.total_payable),
+    "total_payable_formatted": lambda loan, memo: format_currency(loan.total_payable),
+    "total_paid": lambda loan, memo: float(_totals(loan, memo)["cash_paid"]),
+    "total_paid_formatted": lambda loan, memo: format_currency(_totals(loan, memo)["cash_paid"]),
+    "cash_paid": lambda loan, memo: float(_totals(loan, memo)["cash_paid"]),
+    "settlement_adjustments": lambda loan, memo: float(_totals(loan, memo)["settlement_adjustments"]),
+    "gross_satisfied_amount": lambda loan, memo: float(_totals(loan, memo)["gross_satisfied_amount"]),
+    "outstanding": lambda loan, memo: float(_totals(loan, memo)["outstanding_amount"]),
+    "outstanding_formatted": lambda loan, memo: format_currency(_totals(loan, memo)["outstanding_amount"]),
+    "expected_to_date": lambda loan, memo: float(loan.expected_to_date()),
+    "expected_to_date_formatted": lambda loan, memo: format_currency(loan.expected_to_date()),
+    "arrears": lambda loan, memo: float(_arrears(loan, memo)),
+    "arrears_formatted": lambda loan, memo: format_currency(_arrears(loan, memo)),
+    "start_date": lambda loan, memo: loan.start_date.isoformat(),
+    "end_date": lambda loan, memo: loan.end_date.isoformat(),
+    "status": lambda loan, memo: serialize_loan_status(loan),
+}
+MY_LOAN_COLUMNS = {
+    "currency": (), "principal_amount_formatted": ("principal_amount",), "total_payable_formatted": ("total_payable",),
+    "expected_to_date": ("start_date", "total_days", "daily_installment"),
+    "expected_to_date_formatted": ("start_date", "total_days", "daily_installment"),
+}
+
+PAYMENT_LIST_FIELDS = {
+    **column_getters("id", "collection_date", "amount_collected", "payment_method", "remarks"),
+    "currency": lambda payment: CURRENCY_CODE,
+    "amount_collected_formatted": lambda payment: format_currency(payment.amount_collected),
+}
+PAYMENT_LIST_COLUMNS = {"currency": (), "amount_collected_formatted": ("amount_collected",)}
+
+
+def _item_fields(fields, block):
+    return None if fields is None else [f for f in fields if f != block]
+
+
 @customer_bp.route("/loans", methods=["GET"])
 @role_required(["customer"])
 def my_loans():
+    """``?fields=`` trims loan items; the portfolio summary is only computed when ``summary`` is requested."""
+    try:
+        fields = requested_fields(request.args, [*MY_LOAN_FIELDS, "summary"])
+    except FieldsetError as exc:
+        return fieldset_error(exc)
     user_id = int(get_jwt_identity())
     customer = Customer.query.filter_by(user_id=user_id).first()
-    loans = Loan.query.filter_by(customer_id=customer.id).all()
-
-    loan_list = []
-    total_outstanding = Decimal("0")
-    total_arrears = Decimal("0")
-    for loan in loans:
-        totals = loan_totals(loan)
-        arrears = loan.arrears()
-        total_outstanding += loan.outstanding
-        total_arrears += arrears
-        loan_list.append(
-            {
-                "id": loan.id,
-                "loan_number": loan.loan_number,
-                "currency": CURRENCY_CODE,
-                "principal_amount": float(loan.principal_amount),
-                "principal_amount_formatted": format_currency(loan.principal_amount),
-                "total_payable": float(loan.total_payable),
-                "total_payable_formatted": format_currency(loan.total_payable),
-                "total_paid": float(loan.total_paid),
-                "total_paid_formatted": format_currency(loan.total_paid),
-                "cash_paid": float(totals["cash_paid"]),
-                "settlement_adjustments": float(totals["settlement_adjustments"]),
-                "gross_satisfied_amount": float(totals["gross_satisfied_amount"]),
-                "outstanding": float(loan.outstanding),
-                "outstanding_formatted": format_currency(loan.outstanding),
-                "expected_to_date": float(loan.expected_to_date()),
-                "expected_to_date_formatted": format_currency(loan.expected_to_date()),
-                "arrears": float(arrears),
-                "arrears_formatted": format_currency(arrears),
-                "start_date": loan.start_date.isoformat(),
-                "end_date": loan.end_date.isoformat(),
-                "status": serialize_loan_status(loan),
-            }
-        )
+    item_fields = _item_fields(fields, "summary")
+    query = Loan.query.filter_by(customer_id=customer.id)
+    if item_fields is not None and covered(item_fields, MY_LOAN_FIELDS):
+        query = query.options(load_only_fields(Loan, item_fields, MY_LOAN_COLUMNS))
+    loans = query.all()
+    memos = [{} for _ in loans]
+    loan_list = [project(loan, item_fields, MY_LOAN_FIELDS, None, memo) for loan, memo in zip(loans, memos)]
+    if not wants(fields, "summary"):
+        return jsonify({"loans": loan_list})
 
+    total_outstanding = sum((_totals(loan, memo)["outstanding_amount"] for loan, memo in zip(loans, memos)), Decimal("0"))
+    total_arrears = sum((_arrears(loan, memo) for loan, memo in zip(loans, memos)), Decimal("0"))
     summary = {
         "total_active_loans": sum(serialize_loan_status(loan) in {"ACTIVE", "OVERDUE"} for loan in loans),
         "currency": CURRENCY_CODE,
@@ -89,25 +127,27 @@ def my_loans():
 @customer_bp.route("/loans/<int:loan_id>/payments", methods=["GET"])
 @role_required(["customer"])
 def loan_payments(loan_id):
+    """``?fields=`` trims payment items; the loan block is only computed when ``loan`` is requested."""
+    try:
+        fields = requested_fields(request.args, [*PAYMENT_LIST_FIELDS, "loan"])
+    except FieldsetError as exc:
+        return fieldset_error(exc)
     user_id = int(get_jwt_identity())
     customer = Customer.query.filter_by(user_id=user_id).first()
     loan = Loan.query.filter_by(id=loan_id, customer_id=customer.id).first()
     if not loan:
         return jsonify({"message": "Loan not found"}), 404
 
-    payments = [
-        {
-            "id": p.id,
-            "collection_date": p.collection_date.isoformat(),
-            "currency": CURRENCY_CODE,
-            "amount_collected": float(p.amount_collected),
-            "amount_collected_formatted": format_currency(p.amount_collected),
-            "payment_method": p.payment_method,
-            "remarks": p.remarks,
-        }
-        for p in loan.payments
-    ]
+    item_fields = _item_fields(fields, "loan")
+    query = Payment.query.filter_by(loan_id=loan.id)
+    if item_fields is not None:
+        query = query.options(load_only_fields(Payment, item_fields, PAYMENT_LIST_COLUMNS))
+    payments = [project(p, item_fields, PAYMENT_LIST_FIELDS) for p in query.order_by(Payment.id).all()]
+    if not wants(fields, "loan"):
+        return jsonify({"payments": payments})
 
+    memo = {}
+    totals = _totals(loan, memo)
     loan_info = {
         "loan_number": loan.loan_number,
         "currency": CURRENCY_CODE,
@@ -115,13 +155,13 @@ def loan_payments(loan_id):
         "principal_amount_formatted": format_currency(loan.principal_amount),
         "total_payable": float(loan.total_payable),
         "total_payable_formatted": format_currency(loan.total_payable),
-        "total_paid": float(loan.total_paid),
-        "total_paid_formatted": format_currency(loan.total_paid),
-        **{key: float(value) for key, value in loan_totals(loan).items()},
-        "outstanding": float(loan.outstanding),
-        "outstanding_formatted": format_currency(loan.outstanding),
-        "arrears": float(loan.arrears()),
-        "arrears_formatted": format_currency(loan.arrears()),
+        "total_paid": float(totals["cash_paid"]),
+        "total_paid_formatted": format_currency(totals["cash_paid"]),
+        **{key: float(value) for key, value in totals.items()},
+        "outstanding": float(totals["outstanding_amount"]),
+        "outstanding_formatted": format_currency(totals["outstanding_amount"]),
+        "arrears": float(_arrears(loan, memo)),
+        "arrears_formatted": format_currency(_arrears(loan, memo)),
         "start_date": loan.start_date.isoformat(),
         "end_date": loan.end_date.isoformat(),
     }
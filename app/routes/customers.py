@@ -8,8 +8,11 @@ from flask import Blueprint, current_app, jsonify, request
 from sqlalchemy import text
 from werkzeug.utils import secure_filename
 
+from ..customer_360 import build_customer_360, profile_etag, profile_fingerprint
 from ..extensions import db
 from ..models import Customer, CustomerDocument, CustomerKYCProfile
+from ..fieldsets import FieldsetError, column_getters, fieldset_error, load_only_fields, project, requested_fields
+from ..pagination import PaginationError, keyset_page, pagination_error, with_next_cursor
 from ..supabase_client import build_public_url, get_supabase_client
 from .utils import role_required
 
@@ -33,6 +36,18 @@ def _serialize_customer(customer: Customer) -> dict:
     }
 
 
+# Every key of _serialize_customer is a column of the same name.
+CUSTOMER_LIST_FIELDS = column_getters(
+    "id", "customer_code", "full_name", "nic_number", "mobile", "address", "business_type", "date_of_birth", "civil_status",
+    "permanent_address_line1", "permanent_address_line2", "permanent_city", "permanent_district", "permanent_province",
+    "permanent_postal_code", "current_address_line1", "current_address_line2", "current_city", "current_district",
+    "current_province", "current_postal_code", "current_address_since", "household_size", "dependents_count", "customer_type",
+    "employer_name", "employer_address", "occupation", "monthly_income", "business_name", "business_address", "guarantor_name",
+    "guarantor_relationship", "guarantor_mobile", "consent_data_processing", "consent_credit_checks", "lead_status", "kyc_status",
+    "eligibility_status", "user_id", "status", "created_at",
+)
+
+
 def _get_customer_or_404(customer_id: int):
     customer = Customer.query.get(customer_id)
     if not customer:
@@ -103,10 +118,17 @@ def list_customers():
         if eligibility_status:
             query = query.filter_by(eligibility_status=eligibility_status)
 
-        customers = query.order_by(Customer.id.asc()).all()
-        response = jsonify([_serialize_customer(customer) for customer in customers])
+        fields = requested_fields(request.args, CUSTOMER_LIST_FIELDS)
+        if fields is not None:
+            query = query.options(load_only_fields(Customer, fields))
+        page = keyset_page(query, Customer.id, Customer.id, request.args, descending=False)
+        response = with_next_cursor(jsonify([project(customer, fields, CUSTOMER_LIST_FIELDS, _serialize_customer) for customer in page.items]), page)
         logger.info("Handled %s %s with status %s", request.method, request.path, 200)
         return response
+    except PaginationError as exc:
+        return pagination_error(exc)
+    except FieldsetError as exc:
+        return fieldset_error(exc)
     except Exception as exc:  # pragma: no cover - defensive logging
         logger.exception("Error handling %s %s: %s", request.method, request.path, exc)
         return jsonify({"message": "Failed to load customers"}), 500
@@ -233,6 +255,23 @@ def get_customer(customer_id: int):
         return jsonify({"message": "Failed to load customer"}), 500
 
 
+@customers_bp.route("/<int:customer_id>/360", methods=["GET"])
+@role_required(["admin", "staff"])
+def get_customer_360(customer_id: int):
+    """Customer 360 view; revalidate with If-None-Match to get 304 while nothing changed."""
+    fingerprint = profile_fingerprint(customer_id)
+    if fingerprint is None:
+        return jsonify({"message": "Customer not found"}), 404
+    etag = profile_etag(fingerprint)
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = jsonify(build_customer_360(customer_id))
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
 @customers_bp.route("/by-code", methods=["GET"])
 @role_required(["admin", "staff"])
 def get_customer_by_code_admin():
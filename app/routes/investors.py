@@ -7,6 +7,7 @@ from ..extensions import db
 from ..models import AccountingJournalEntry, Investor, InvestorFundingAgreement, InvestorFundingTransaction, InvestorInterestAccrual
 from ..investor_funding import INCREASE_TYPES, DECREASE_TYPES, create_investor, create_agreement, record_funding, principal_repayment, calculate_investor_interest, post_investor_interest_accrual, pay_interest, capitalize_interest, month_bounds, completed_periods_for, reverse_investor_transaction, investor_reconciliation, reverse_interest_accrual, catch_up_investor_interest, investor_interest_summary, run_monthly_investor_interest_accrual, investor_interest_accrual_dashboard
 from ..accounting import ValidationError, AccountingError
+from ..pagination import PaginationError, keyset_page, page_meta, pagination_error
 from .utils import role_required
 
 investors_bp = Blueprint("investors", __name__, url_prefix="/admin")
@@ -456,7 +457,10 @@ def repay(aid):
     except Exception as e: return error(e)
 @investors_bp.route("/investor-agreements/<int:aid>/transactions")
 @role_required(["admin"])
-def txs(aid): return jsonify({"items":[tx_dict(t) for t in InvestorFundingTransaction.query.filter_by(agreement_id=aid).order_by(InvestorFundingTransaction.transaction_date).all()]})
+def txs(aid):
+    try: page=keyset_page(InvestorFundingTransaction.query.filter_by(agreement_id=aid), InvestorFundingTransaction.transaction_date, InvestorFundingTransaction.id, request.args, descending=False)
+    except PaginationError as e: return pagination_error(e)
+    return jsonify({"items":[tx_dict(t) for t in page.items], **page_meta(page)})
 
 @investors_bp.route("/investor-transactions/<int:tid>", methods=["GET"], strict_slashes=False)
 @role_required(["admin"])
@@ -512,7 +516,10 @@ def accrue(aid):
     except Exception as e: return error(e)
 @investors_bp.route("/investor-agreements/<int:aid>/interest-accruals")
 @role_required(["admin"])
-def accruals(aid): return jsonify({"items":[ac_dict(a) for a in InvestorInterestAccrual.query.filter_by(agreement_id=aid).order_by(InvestorInterestAccrual.accrual_period_end).all()]})
+def accruals(aid):
+    try: page=keyset_page(InvestorInterestAccrual.query.filter_by(agreement_id=aid), InvestorInterestAccrual.accrual_period_end, InvestorInterestAccrual.id, request.args, descending=False)
+    except PaginationError as e: return pagination_error(e)
+    return jsonify({"items":[ac_dict(a) for a in page.items], **page_meta(page)})
 
 
 def _parse_accrual_month(value):
@@ -653,10 +660,16 @@ def rev_accrual(accrual_id):
 
 @investors_bp.route("/reports/investor-funding")
 @role_required(["admin"])
-def rep_funding(): return jsonify({"items":[tx_dict(t) for t in InvestorFundingTransaction.query.all()]})
+def rep_funding():
+    try: page=keyset_page(InvestorFundingTransaction.query, InvestorFundingTransaction.id, InvestorFundingTransaction.id, request.args, descending=False)
+    except PaginationError as e: return pagination_error(e)
+    return jsonify({"items":[tx_dict(t) for t in page.items], **page_meta(page)})
 @investors_bp.route("/reports/investor-interest")
 @role_required(["admin"])
-def rep_interest(): return jsonify({"items":[ac_dict(a) for a in InvestorInterestAccrual.query.all()]})
+def rep_interest():
+    try: page=keyset_page(InvestorInterestAccrual.query, InvestorInterestAccrual.id, InvestorInterestAccrual.id, request.args, descending=False)
+    except PaginationError as e: return pagination_error(e)
+    return jsonify({"items":[ac_dict(a) for a in page.items], **page_meta(page)})
 def _optional_int_filter(name):
     raw = request.args.get(name)
     if raw is None or str(raw).strip() == "":
@@ -5,6 +5,7 @@ from sqlalchemy import func
 
 from ..extensions import db
 from ..models import Customer, Lead, User
+from ..pagination import PaginationError, keyset_page, pagination_error, with_next_cursor
 
 
 leads_bp = Blueprint("leads", __name__, url_prefix="/leads")
@@ -83,8 +84,11 @@ def list_leads():
             return jsonify({"message": "Invalid status value"}), 400
         query = query.filter_by(status=status)
 
-    leads = query.order_by(Lead.created_at.desc()).all()
-    return jsonify([lead_to_dict(lead) for lead in leads])
+    try:
+        page = keyset_page(query, Lead.created_at, Lead.id, request.args)
+    except PaginationError as exc:
+        return pagination_error(exc)
+    return with_next_cursor(jsonify([lead_to_dict(lead) for lead in page.items]), page)
 
 
 @leads_bp.route("/<int:lead_id>/convert-to-customer", methods=["POST"])
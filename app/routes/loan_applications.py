@@ -7,7 +7,8 @@ from typing import Dict, List, Optional
 from flask import Blueprint, current_app, jsonify, request
 from flask_cors import cross_origin
 from flask_jwt_extended import get_jwt_identity, get_jwt
-from sqlalchemy import func
+from sqlalchemy import func, insert
+from sqlalchemy.orm import joinedload, selectinload
 
 from app.supabase_client import (
     get_storage_bucket,
@@ -16,10 +17,13 @@ from app.supabase_client import (
 )
 from ..currency import CURRENCY_CODE, format_currency
 from ..extensions import db
-from ..models import Customer, Loan, LoanApplication, LoanApplicationDocument
-from ..loan_ledger import generate_loan_ledger, money
+from ..models import Customer, Loan, LoanApplication, LoanApplicationDocument, LoanLedger
+from ..loan_ledger import fixed_terms_rows, generate_loan_ledger, money
 from ..loan_terms import calculate_flat_term_amounts, resolve_loan_term
+from ..fieldsets import FieldsetError, column_getters, fieldset_error, load_only_fields, project, requested_fields, wants
+from ..pagination import PaginationError, keyset_page, page_meta, pagination_error, with_next_cursor
 from ..accounting import seed_disbursement_settings, AccountingError, post_loan_disbursement, validate_funding_account, preview_loan_application_disbursement
+from ..accounting import apply_disbursement_charges, post_loan_disbursements_bulk, prepare_disbursement_charges, require_open_accounting_period, required_disbursement_charges
 from ..models import AccountingAccount
 from .utils import role_required
 
@@ -458,6 +462,18 @@ def available_application_actions(application: LoanApplication) -> List[str]:
     return []
 
 
+def _application_documents(application: LoanApplication) -> list:
+    return [
+        {
+            "id": d.id,
+            "document_type": d.document_type,
+            "file_path": d.file_path,
+            "uploaded_at": d.uploaded_at.isoformat() if d.uploaded_at else None,
+        }
+        for d in application.documents
+    ]
+
+
 def build_application_response(application: LoanApplication) -> dict:
     customer = application.customer
     return {
@@ -556,15 +572,7 @@ def build_application_response(application: LoanApplication) -> dict:
         "proposed_disbursement_deductions": application.proposed_disbursement_deductions or [],
         "estimated_total_deductions": _decimal_to_float(application.estimated_total_deductions),
         "estimated_net_disbursement": _decimal_to_float(application.estimated_net_disbursement),
-        "documents": [
-            {
-                "id": d.id,
-                "document_type": d.document_type,
-                "file_path": d.file_path,
-                "uploaded_at": d.uploaded_at.isoformat() if d.uploaded_at else None,
-            }
-            for d in application.documents
-        ],
+        "documents": _application_documents(application),
         "created_at": (
             application.created_at.isoformat() if application.created_at else None
         ),
@@ -576,6 +584,56 @@ def build_application_response(application: LoanApplication) -> dict:
     }
 
 
+def _formatted_amount(attribute):
+    return lambda application: (
+        format_currency(getattr(application, attribute))
+        if getattr(application, attribute) is not None
+        else None
+    )
+
+
+# List-screen subset of build_application_response available through ?fields=.
+APPLICATION_LIST_FIELDS = {
+    **column_getters(
+        "id", "application_number", "customer_id", "loan_type", "status", "applied_amount", "interest_rate",
+        "approved_amount", "approved_tenure", "term_type", "term_value", "loan_days", "repayment_frequency",
+        "number_of_installments", "installment_count", "installment_amount", "total_repayment", "total_interest",
+        "interest_type", "interest_rate_basis", "review_notes", "reject_reason", "submitted_at", "approved_at",
+        "full_name", "nic_number", "mobile_number", "email", "city", "district", "province", "created_at",
+        "updated_at", "assigned_officer_id",
+    ),
+    "customer_name": lambda a: a.customer.full_name if a.customer else a.full_name,
+    "customer_code": lambda a: a.customer.customer_code if a.customer else None,
+    "currency": lambda a: CURRENCY_CODE,
+    "applied_amount_formatted": _formatted_amount("applied_amount"),
+    "approved_amount_formatted": _formatted_amount("approved_amount"),
+    "tenure_months": lambda a: None if a.term_type == "DAYS" else a.tenure_months,
+    "term_display": _term_display,
+    "total_payable": lambda a: _decimal_to_float(a.total_repayment),
+    "documents": _application_documents,
+    "available_actions": available_application_actions,
+}
+APPLICATION_LIST_COLUMNS = {
+    "customer_name": ("customer_id", "full_name"), "customer_code": ("customer_id",), "currency": (),
+    "applied_amount_formatted": ("applied_amount",), "approved_amount_formatted": ("approved_amount",),
+    "tenure_months": ("term_type", "tenure_months"), "term_display": ("term_type", "term_value"),
+    "total_payable": ("total_repayment",), "documents": (), "available_actions": ("status",),
+}
+
+
+def application_list_options(fields):
+    """Eager loads for the relationships the requested fields read, plus column projection."""
+    options = []
+    if wants(fields, "customer_name", "customer_code"):
+        options.append(joinedload(LoanApplication.customer))
+    if wants(fields, "documents"):
+        options.append(selectinload(LoanApplication.documents))
+    if fields is not None:
+        # created_at is the keyset sort key.
+        options.append(load_only_fields(LoanApplication, [*fields, "created_at"], APPLICATION_LIST_COLUMNS))
+    return options
+
+
 def assert_application_access(application: LoanApplication) -> Optional[tuple]:
     claims = get_jwt()
     role = claims.get("role")
@@ -895,10 +953,15 @@ def list_applications():
                 LoanApplication.created_at <= datetime.fromisoformat(end_date)
             )
 
-        applications = query.order_by(LoanApplication.created_at.desc()).all()
-        response = jsonify([build_application_response(app) for app in applications])
+        fields = requested_fields(request.args, APPLICATION_LIST_FIELDS)
+        page = keyset_page(query.options(*application_list_options(fields)), LoanApplication.created_at, LoanApplication.id, request.args)
+        response = with_next_cursor(jsonify([project(app, fields, APPLICATION_LIST_FIELDS, build_application_response) for app in page.items]), page)
         logger.info("Handled %s %s with status %s", request.method, request.path, 200)
         return response
+    except PaginationError as exc:
+        return pagination_error(exc)
+    except FieldsetError as exc:
+        return fieldset_error(exc)
     except ValueError as exc:
         logger.exception(
             "Invalid request parameter while handling %s %s: %s",
@@ -950,10 +1013,15 @@ def admin_list_all_applications():
                 return jsonify({"message": "Invalid status value"}), 400
             query = query.filter_by(status=normalized_status)
 
-        applications = query.order_by(LoanApplication.created_at.desc()).all()
-        response = jsonify([build_application_response(app) for app in applications])
+        fields = requested_fields(request.args, APPLICATION_LIST_FIELDS)
+        page = keyset_page(query.options(*application_list_options(fields)), LoanApplication.created_at, LoanApplication.id, request.args)
+        response = with_next_cursor(jsonify([project(app, fields, APPLICATION_LIST_FIELDS, build_application_response) for app in page.items]), page)
         logger.info("Handled %s %s with status %s", request.method, request.path, 200)
         return response
+    except PaginationError as exc:
+        return pagination_error(exc)
+    except FieldsetError as exc:
+        return fieldset_error(exc)
     except Exception as exc:  # pragma: no cover - defensive logging
         logger.exception("Error handling %s %s: %s", request.method, request.path, exc)
         return jsonify({"message": "Failed to load loan applications"}), 500
@@ -1086,6 +1154,7 @@ def list_awaiting_review_applications():
     try:
         applications = (
             LoanApplication.query.filter_by(status=STATUS_SUBMITTED)
+            .options(*application_list_options(None))
             .order_by(LoanApplication.created_at.desc())
             .all()
         )
@@ -1097,6 +1166,148 @@ def list_awaiting_review_applications():
         return jsonify({"message": "Failed to load applications"}), 500
 
 
+REVIEW_QUEUE_STATUSES = (
+    STATUS_SUBMITTED,
+    STATUS_STAFF_APPROVED,
+    STATUS_APPROVED,
+    STATUS_REJECTED,
+    STATUS_DISBURSED,
+)
+
+
+def _review_queue_filters(args) -> list:
+    """Filters shared by the page and the status counts; ``branch`` matches the application's district."""
+    filters = [LoanApplication.status.in_(REVIEW_QUEUE_STATUSES)]
+    branch = (args.get("branch") or "").strip()
+    if branch:
+        filters.append(func.lower(LoanApplication.district) == branch.lower())
+    officer_id = (args.get("officer_id") or "").strip()
+    if officer_id:
+        if not officer_id.isdigit():
+            raise ValueError("officer_id must be an integer.")
+        filters.append(LoanApplication.assigned_officer_id == int(officer_id))
+    loan_type = (args.get("loan_type") or "").strip()
+    if loan_type:
+        filters.append(LoanApplication.loan_type == loan_type)
+    date_from = date.fromisoformat(args["date_from"]) if args.get("date_from") else None
+    date_to = date.fromisoformat(args["date_to"]) if args.get("date_to") else None
+    if date_from:
+        filters.append(LoanApplication.created_at >= datetime.combine(date_from, datetime.min.time()))
+    if date_to:
+        filters.append(LoanApplication.created_at < datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+    return filters
+
+
+def review_queue_counts(filters) -> dict:
+    rows = (
+        db.session.query(LoanApplication.status, func.count(LoanApplication.id))
+        .filter(*filters)
+        .group_by(LoanApplication.status)
+        .all()
+    )
+    counts = {status: 0 for status in REVIEW_QUEUE_STATUSES}
+    counts.update({status: count for status, count in rows})
+    return counts
+
+
+def _review_queue_item(application: LoanApplication) -> dict:
+    officer = application.assigned_officer
+    return {
+        **build_application_response(application),
+        "assigned_officer_name": officer.name if officer else None,
+        "created_by_name": application.created_by.name if application.created_by else None,
+    }
+
+
+@loan_app_bp.route("/review-queue", methods=["GET", "OPTIONS"])
+@cross_origin()
+@role_required(["admin", "staff"])
+def application_review_queue():
+    """Approvals screen: one page of applications plus per-status tab counts.
+
+    The page eager-loads customers, documents, officers and creators, and the
+    counts come from a single ``GROUP BY status`` over the same filters, so a
+    page costs a fixed number of queries whatever its size.
+    """
+
+    logger = current_app.logger
+    try:
+        claims = get_jwt()
+        status = (request.args.get("status") or "").upper()
+        if not status:
+            status = STATUS_STAFF_APPROVED if claims.get("role") == "admin" else STATUS_SUBMITTED
+        if status != "ALL" and status not in REVIEW_QUEUE_STATUSES:
+            return jsonify({"message": "Invalid status value"}), 400
+
+        filters = _review_queue_filters(request.args)
+        query = LoanApplication.query.filter(*filters).options(
+            joinedload(LoanApplication.customer),
+            selectinload(LoanApplication.documents),
+            selectinload(LoanApplication.assigned_officer),
+            selectinload(LoanApplication.created_by),
+        )
+        if status != "ALL":
+            query = query.filter(LoanApplication.status == status)
+
+        page = keyset_page(query, LoanApplication.created_at, LoanApplication.id, request.args)
+        response = jsonify(
+            {
+                "status": status,
+                "counts": review_queue_counts(filters),
+                "items": [_review_queue_item(app) for app in page.items],
+                **page_meta(page),
+            }
+        )
+        logger.info("Handled %s %s with status %s", request.method, request.path, 200)
+        return response
+    except PaginationError as exc:
+        return pagination_error(exc)
+    except ValueError as exc:
+        return jsonify({"message": str(exc)}), 400
+    except Exception as exc:  # pragma: no cover - defensive logging
+        logger.exception("Error handling %s %s: %s", request.method, request.path, exc)
+        return jsonify({"message": "Failed to load review queue"}), 500
+
+
+@loan_app_bp.route("/quote-grid", methods=["POST"])
+@role_required(["admin", "staff"])
+def application_quote_grid():
+    """Compare offers for a customer: every amount × term × frequency quoted in one call."""
+    data = request.get_json(silent=True) or {}
+    customer = Customer.query.get(parse_int(data.get("customer_id"))) if data.get("customer_id") is not None else None
+    if not customer:
+        return jsonify({"message": "Customer not found"}), 404
+
+    errors = []
+    loan_type = (data.get("loan_type") or "").upper()
+    if loan_type not in ALLOWED_LOAN_TYPES:
+        errors.append("loan_type is unsupported")
+    amounts = [parse_decimal(value) for value in data.get("amounts") or []]
+    if not amounts or any(amount is None or amount <= 0 for amount in amounts):
+        errors.append("amounts must be a non-empty list of positive amounts")
+    terms = [((term.get("term_type") or "").upper(), parse_int(term.get("term_value"))) for term in data.get("terms") or [] if isinstance(term, dict)]
+    if not terms or len(terms) != len(data.get("terms") or []):
+        errors.append("terms must be a non-empty list of {term_type, term_value}")
+    frequencies = [str(value or "").upper() for value in data.get("repayment_frequencies") or []]
+    if not frequencies or any(value not in SUPPORTED_REPAYMENT_FREQUENCIES for value in frequencies):
+        errors.append("repayment_frequencies must be a non-empty list of DAILY, WEEKLY or MONTHLY")
+    interest_rate = parse_decimal(data.get("interest_rate"))
+    if interest_rate is None or interest_rate < 0:
+        errors.append("interest_rate must be zero or greater")
+    if (data.get("interest_rate_basis") or "FLAT_TERM").upper() not in {"FLAT", "FLAT_TERM"}:
+        errors.append("Only FLAT_TERM interest_rate_basis is currently supported for new GROW loans")
+    if errors:
+        return jsonify({"error": "Quote grid validation failed", "errors": errors}), 422
+
+    from ..loan_quotes import QuoteGridError, quote_grid
+    try:
+        quotes = quote_grid(amounts, terms, frequencies, interest_rate, _parse_iso_date(data.get("start_date")), data.get("charges"))
+    except (QuoteGridError, AccountingError) as exc:
+        return jsonify({"error": "Quote grid validation failed", "errors": [str(exc)]}), 422
+    return jsonify({"customer_id": customer.id, "loan_type": loan_type, "currency": CURRENCY_CODE,
+                    "interest_rate": f"{interest_rate}", "count": len(quotes), "quotes": quotes})
+
+
 @loan_app_bp.route("/<int:application_id>", methods=["GET"])
 @role_required(["customer", "admin", "staff"])
 def get_application(application_id):
@@ -1165,6 +1376,12 @@ def generate_loan_number() -> str:
     return f"GROW-LOAN-{date_str}-{(daily_count or 0) + 1:04d}"
 
 
+def generate_loan_numbers(count: int) -> list[str]:
+    """``count`` consecutive loan numbers from one daily-count query, for batch disbursement."""
+    first = int(generate_loan_number().rsplit("-", 1)[1])
+    return [f"GROW-LOAN-{date.today():%Y%m%d}-{number:04d}" for number in range(first, first + count)]
+
+
 @loan_app_bp.route("/<int:application_id>/disburse", methods=["POST"], strict_slashes=False)
 @role_required(["admin"])
 def disburse_application(application_id):
@@ -1249,6 +1466,137 @@ def disburse_application(application_id):
         db.session.rollback(); current_app.logger.exception("Failed to disburse application %s: %s", application.id, exc); return jsonify({"message": "Failed to disburse loan"}), 500
 
 
+BATCH_DISBURSEMENT_MODES = {"all_or_nothing", "best_effort"}
+MAX_BATCH_DISBURSEMENTS = 1000
+
+
+def _loan_from_terms(application, terms, disbursement_date, loan_number, user_id):
+    resolved = resolve_loan_term(disbursement_date, terms["term_type"], terms["term_value"], terms["repayment_frequency"])
+    principal = terms["approved_amount"]
+    return Loan(loan_number=loan_number, customer_id=application.customer_id, principal_amount=principal, gross_principal_amount=principal,
+                net_disbursed_amount=principal, interest_rate=terms["interest_rate"], total_days=resolved.total_days,
+                payment_interval_days={"DAILY": 1, "WEEKLY": 7, "MONTHLY": 30}[terms["repayment_frequency"]],
+                daily_installment=money(terms["total_repayment"] / Decimal(resolved.total_days)), total_payable=terms["total_repayment"],
+                start_date=disbursement_date, end_date=resolved.maturity_date, status="ACTIVE", created_by_id=user_id,
+                term_type=terms["term_type"], term_value=terms["term_value"], loan_days=resolved.total_days if terms["term_type"] == "DAYS" else None,
+                tenure_months=application.tenure_months if terms["term_type"] == "MONTHS" else None,
+                repayment_frequency=terms["repayment_frequency"], number_of_installments=terms["installment_count"],
+                installment_count=terms["installment_count"], installment_amount=terms["installment_amount"],
+                total_interest=terms["total_interest"], total_repayment=terms["total_repayment"], interest_type=terms["interest_type"],
+                interest_rate_basis=terms["interest_rate_basis"], maturity_date=resolved.maturity_date, final_installment_due_date=resolved.maturity_date)
+
+
+def disburse_applications(application_ids, user_id, *, disbursement_date=None, funding_account=None, charges=None,
+                          mode="all_or_nothing", transaction_method=None, reference=None, remarks=None):
+    """Disburse many APPROVED applications in one transaction; the batch form of ``disburse_application``.
+
+    Applications, the charge catalog, settings and accounts are loaded once;
+    every item is validated and priced before anything is written, then the
+    loans, ledgers, journals and deductions are written in bulk.  In
+    ``all_or_nothing`` mode one invalid item leaves everything untouched; in
+    ``best_effort`` mode invalid items are reported and the rest disbursed.
+    The caller commits (or rolls back) the session.
+    """
+    if mode not in BATCH_DISBURSEMENT_MODES:
+        raise ValueError("mode must be all_or_nothing or best_effort")
+    ids = list(dict.fromkeys(int(i) for i in application_ids))
+    if not ids:
+        raise ValueError("application_ids must be a non-empty list")
+    if len(ids) > MAX_BATCH_DISBURSEMENTS:
+        raise ValueError(f"A batch is limited to {MAX_BATCH_DISBURSEMENTS} applications")
+    disbursement_date = disbursement_date or date.today()
+    require_open_accounting_period(disbursement_date)
+    funding_account = validate_funding_account(funding_account, transaction_method) if funding_account is not None else None
+    if charges is None:
+        seed_disbursement_settings()
+    prepared = prepare_disbursement_charges(required_disbursement_charges() if charges is None else charges)
+
+    applications = {a.id: a for a in LoanApplication.query.filter(LoanApplication.id.in_(ids)).order_by(LoanApplication.id).with_for_update().all()}
+    items, accepted = [], []
+    for application_id in ids:
+        item = {"application_id": application_id}
+        application = applications.get(application_id)
+        try:
+            if application is None:
+                raise LookupError("Loan application not found")
+            if application.status != STATUS_APPROVED:
+                raise ValueError(f"Only APPROVED applications can be disbursed (status {application.status})")
+            missing_fields = _missing_disbursement_term_fields(application)
+            if missing_fields:
+                raise ValueError(f"Loan term information is incomplete: {', '.join(missing_fields)}")
+            terms, errors = _validate_and_calculate_terms(_application_terms(application), start_date=disbursement_date)
+            if errors:
+                raise ValueError("; ".join(errors))
+            priced = apply_disbursement_charges(terms["approved_amount"], prepared)
+        except (LookupError, ValueError, AccountingError) as exc:
+            items.append({**item, "status": "FAILED", "error": str(exc)}); continue
+        items.append(item); accepted.append((item, application, terms, priced))
+
+    failed = sum(1 for item in items if item.get("status") == "FAILED")
+    if failed and mode == "all_or_nothing":
+        for item in items:
+            item.setdefault("status", "NOT_PROCESSED")
+        return {"mode": mode, "requested": len(ids), "disbursed": 0, "failed": failed, "items": items}
+
+    loans = [_loan_from_terms(application, terms, disbursement_date, number, user_id)
+             for (_, application, terms, _), number in zip(accepted, generate_loan_numbers(len(accepted)))]
+    db.session.add_all(loans); db.session.flush()
+    rows = [row for loan in loans for row in fixed_terms_rows(loan)]
+    if rows:
+        db.session.execute(insert(LoanLedger), rows)
+        for loan in loans:
+            db.session.expire(loan, ["ledger_entries"])
+    post_loan_disbursements_bulk([(loan, priced, application.id) for loan, (_, application, _, priced) in zip(loans, accepted)], user_id,
+                                 funding_account=funding_account, disbursement_date=disbursement_date,
+                                 transaction_method=transaction_method, reference=reference, remarks=remarks)
+    for loan, (item, application, _, _) in zip(loans, accepted):
+        application.status = STATUS_DISBURSED
+        item.update({"status": "DISBURSED", "loan_id": loan.id, "loan_number": loan.loan_number,
+                     "gross_principal_amount": f"{money(loan.gross_principal_amount):.2f}",
+                     "total_disbursement_deductions": f"{money(loan.total_disbursement_deductions):.2f}",
+                     "net_disbursed_amount": f"{money(loan.net_disbursed_amount):.2f}"})
+    return {"mode": mode, "requested": len(ids), "disbursed": len(loans), "failed": failed, "items": items}
+
+
+@loan_app_bp.route("/disburse-batch", methods=["POST"], strict_slashes=False)
+@role_required(["admin"])
+def disburse_applications_batch():
+    """Disburse a list of APPROVED applications in one request; see ``disburse_applications``."""
+    data = request.get_json(silent=True) or {}
+    raw_ids = data.get("application_ids")
+    if not isinstance(raw_ids, list) or not raw_ids:
+        return jsonify({"message": "application_ids must be a non-empty list"}), 400
+    funding_account = None
+    if data.get("funding_account_id") is not None:
+        try:
+            funding_account = validate_funding_account(AccountingAccount.query.get(int(data["funding_account_id"])), data.get("transaction_method"))
+        except AccountingError as exc:
+            return jsonify({"message": str(exc)}), 400
+        except (TypeError, ValueError):
+            return jsonify({"message": "funding_account_id must be a valid account id"}), 400
+    try:
+        disbursement_date = date.fromisoformat(data["disbursement_date"]) if data.get("disbursement_date") else None
+        charges = None
+        if "charges" in data:
+            charges = [{**charge, "charge_type_id": int(charge["charge_type_id"])} for charge in data["charges"] or []]
+        report = disburse_applications([int(i) for i in raw_ids], int(get_jwt_identity()), disbursement_date=disbursement_date,
+                                       funding_account=funding_account, charges=charges, mode=(data.get("mode") or "all_or_nothing").lower(),
+                                       transaction_method=data.get("transaction_method"), reference=data.get("reference"), remarks=data.get("remarks"))
+    except AccountingError as exc:
+        db.session.rollback()
+        if getattr(exc, "payload", None):
+            return jsonify(exc.payload), 422
+        return jsonify({"message": "Accounting posting failed", "error": str(exc)}), 422
+    except (TypeError, ValueError, KeyError) as exc:
+        db.session.rollback()
+        return jsonify({"message": str(exc) or "Invalid batch disbursement request"}), 400
+    if not report["disbursed"]:
+        db.session.rollback()
+        return jsonify(report), 422
+    db.session.commit()
+    return jsonify(report), 201
+
+
 @loan_app_bp.route("/<int:application_id>/reject", methods=["POST"])
 @role_required(["admin", "staff"])
 def reject_application(application_id):
@@ -0,0 +1,18 @@
+from flask import Blueprint, jsonify, request
+
+from ..global_search import SOURCES, search, serialize_hit
+from .utils import role_required
+
+search_bp = Blueprint("search", __name__)
+
+
+@search_bp.route("/search", methods=["GET"], strict_slashes=False)
+@role_required(["admin", "staff"])
+def global_search():
+    query = str(request.args.get("q") or "").strip()
+    types = [t.strip().upper() for t in (request.args.get("types") or "").split(",") if t.strip()]
+    unknown = sorted(set(types) - set(SOURCES))
+    if unknown:
+        return jsonify({"message": f"Unknown search types: {', '.join(unknown)}", "allowed_types": sorted(SOURCES)}), 400
+    hits = search(query, types, request.args.get("limit", type=int)) if query else []
+    return jsonify({"items": [serialize_hit(document, rank) for document, rank in hits], "total": len(hits), "query": query})
@@ -7,7 +7,10 @@ from sqlalchemy import func
 from ..currency import CURRENCY_CODE, format_currency
 from ..extensions import db
 from ..models import Loan, LoanApplication, Payment, Customer, AccountingAccount, CustomerCreditBalance
-from ..loan_ledger import generate_loan_ledger
+from ..loan_ledger import generate_loan_ledger, has_schedule
+from ..pagination import PaginationError, keyset_page, pagination_error, with_next_cursor
+from ..collector_sync import SyncError, sync_collections, verify_signature
+from ..loan_locks import lock_loan, run_with_retry
 from ..accounting import AccountingError, allocate_payment, money, post_loan_payment, validate_collection_account
 from .loan_applications import (
     STATUS_STAFF_APPROVED,
@@ -23,7 +26,10 @@ staff_bp = Blueprint("staff", __name__, url_prefix="/staff")
 @staff_bp.route("/customers", methods=["GET"])
 @role_required(["admin", "staff"])
 def list_customers():
-    customers = Customer.query.all()
+    try:
+        page = keyset_page(Customer.query, Customer.id, Customer.id, request.args, descending=False)
+    except PaginationError as exc:
+        return pagination_error(exc)
     results = [
         {
             "id": c.id,
@@ -35,9 +41,9 @@ def list_customers():
             "kyc_status": c.kyc_status,
             "eligibility_status": c.eligibility_status,
         }
-        for c in customers
+        for c in page.items
     ]
-    return jsonify(results)
+    return with_next_cursor(jsonify(results), page)
 
 
 @staff_bp.route("/payments", methods=["POST"])
@@ -100,8 +106,12 @@ def record_payment():
             400,
         )
 
-    try:
-        if not loan.ledger_entries:
+    def post():
+        # Re-check under the loan lock; a concurrent receipt may have settled it.
+        lock_loan(loan.id)
+        if str(loan.status or "").strip().upper() not in {"ACTIVE", "OVERDUE"}:
+            raise AccountingError("Payments can only be recorded for active loans")
+        if not has_schedule(loan):
             generate_loan_ledger(loan)
             db.session.flush()
         principal_paid, interest_paid, penalty_paid, other_fee_paid = allocate_payment(loan, amount, collection_date_value)
@@ -131,6 +141,10 @@ def record_payment():
         if not payment.journal_id:
             raise AccountingError("Payment journal was not created")
         db.session.commit()
+        return payment, journal
+
+    try:
+        payment, journal = run_with_retry(post)
     except AccountingError as exc:
         db.session.rollback()
         current_app.logger.exception("Loan payment posting failed")
@@ -143,6 +157,17 @@ def record_payment():
     return jsonify({"message": "Payment recorded", "payment_id": payment.id, "receipt_number": payment.receipt_number, "journal_entry_id": payment.journal_id, "journal_number": journal.journal_no, "loan_status": loan.status, "settled_date": loan.settled_date.isoformat() if loan.settled_date else None, "total_applied_to_loan": float(money(amount - payment.other_fee_paid)), "overpayment": float(money(payment.other_fee_paid)), "outstanding_amount": float(loan.outstanding), "customer_credit": {"id": credit.id, "credit_number": credit.credit_number, "available_amount": float(credit.available_amount), "status": credit.status} if credit else None, "collection_account": {"id": acct.id, "code": acct.account_code, "name": acct.account_name} if acct else None, "allocation": allocation, "deposit_status": payment.deposit_status})
 
 
+@staff_bp.route("/collector-sync", methods=["POST"])
+@role_required(["admin", "staff"])
+def collector_sync():
+    try:
+        verify_signature(request.get_data(), request.headers.get("X-Sync-Signature"), current_app.config.get("COLLECTOR_SYNC_SECRET"))
+        return jsonify(sync_collections(request.get_json(silent=True) or {}, int(get_jwt_identity())))
+    except SyncError as exc:
+        db.session.rollback()
+        return jsonify({"error": str(exc), "message": str(exc), **exc.details}), exc.status
+
+
 @staff_bp.route("/today-collections", methods=["GET"])
 @role_required(["admin", "staff"])
 def today_collections():
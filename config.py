@@ -13,6 +13,9 @@ class BaseConfig:
         "https://grow-microfinance-app-production.up.railway.app",
     )
     UPLOAD_FOLDER = os.getenv("UPLOAD_FOLDER", "uploads")
+    COLLECTOR_SYNC_SECRET = os.getenv("COLLECTOR_SYNC_SECRET")
+    # Store new flat schedules as a rule plus exception rows (app.loan_schedule) instead of one row per installment.
+    COMPACT_LOAN_SCHEDULES = os.getenv("COMPACT_LOAN_SCHEDULES", "false").lower() in {"1", "true", "yes"}
 
 
 class DevelopmentConfig(BaseConfig):
@@ -14,6 +14,10 @@ echo "Applying database migrations..."
 flask --app app:create_app db upgrade 2>&1
 echo "Database migrations completed."
 
+echo "Building missing search index documents..."
+flask --app app:create_app rebuild-search-index --missing-only 2>&1
+flask --app app:create_app rebuild-loan-search-index --missing-only 2>&1
+
 echo "Validating database schema..."
 python -m scripts.validate_schema 2>&1
 
@@ -0,0 +1,34 @@
+"""maintained collector clearing balances
+
+Revision ID: 0052_collector_clearing
+Revises: 0051_partial_dep
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0052_collector_clearing"
+down_revision = "0051_partial_dep"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table("collector_clearing_balances",
+        sa.Column("collector_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("collections", sa.Numeric(18, 2), nullable=False, server_default="0"),
+        sa.Column("deposits", sa.Numeric(18, 2), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.func.now()))
+    # Same definition as accounting.collector_cash_position.
+    op.execute("""
+        INSERT INTO collector_clearing_balances (collector_id, collections, deposits, updated_at)
+        SELECT collector_id, SUM(amount_collected),
+               SUM(CASE WHEN collection_clearance_status = 'CLEARED' THEN amount_collected ELSE deposited_amount END),
+               CURRENT_TIMESTAMP
+          FROM payments
+         WHERE collector_id IS NOT NULL AND reversed_at IS NULL AND deposit_status <> 'NOT_APPLICABLE'
+         GROUP BY collector_id
+    """)
+
+
+def downgrade():
+    op.drop_table("collector_clearing_balances")
@@ -0,0 +1,36 @@
+"""collector daily performance rollup
+
+Revision ID: 0053_collector_performance
+Revises: 0052_collector_clearing
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0053_collector_performance"
+down_revision = "0052_collector_clearing"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table("collector_daily_performance",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("collector_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("performance_date", sa.Date(), nullable=False),
+        sa.Column("expected_amount", sa.Numeric(18, 2), nullable=False, server_default="0"),
+        sa.Column("collected_amount", sa.Numeric(18, 2), nullable=False, server_default="0"),
+        sa.Column("receipt_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("visit_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("deposited_amount", sa.Numeric(18, 2), nullable=False, server_default="0"),
+        sa.Column("deposit_lag_amount_days", sa.Numeric(20, 2), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.UniqueConstraint("collector_id", "performance_date", name="uq_collector_daily_performance"))
+    op.create_index("ix_collector_daily_performance_performance_date", "collector_daily_performance", ["performance_date"])
+    # Receipt-level history is backfilled with `flask rebuild-collector-performance`.
+    op.create_index("ix_payments_collector_collection_date", "payments", ["collector_id", "collection_date"])
+
+
+def downgrade():
+    op.drop_index("ix_payments_collector_collection_date", table_name="payments")
+    op.drop_index("ix_collector_daily_performance_performance_date", table_name="collector_daily_performance")
+    op.drop_table("collector_daily_performance")
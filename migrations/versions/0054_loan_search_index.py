@@ -0,0 +1,46 @@
+"""indexed loan search
+
+Revision ID: 0054_loan_search
+Revises: 0053_collector_performance
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0054_loan_search"
+down_revision = "0053_collector_performance"
+branch_labels = None
+depends_on = None
+
+TRIGRAM_INDEXES = {
+    "ix_loans_loan_number_trgm": ("loans", "loan_number"),
+    "ix_customers_full_name_trgm": ("customers", "full_name"),
+    "ix_customers_nic_number_trgm": ("customers", "nic_number"),
+    "ix_customers_mobile_trgm": ("customers", "mobile"),
+}
+
+
+def upgrade():
+    op.create_table("loan_search_tokens",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("loan_id", sa.Integer(), sa.ForeignKey("loans.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("token", sa.String(120), nullable=False))
+    op.create_index("ix_loan_search_tokens_loan_id", "loan_search_tokens", ["loan_id"])
+    op.create_index("ix_loan_search_tokens_token_loan", "loan_search_tokens", ["token", "loan_id"])
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        # Token rows are populated by `flask rebuild-loan-search-index --missing-only`,
+        # which entrypoint.sh runs after every `db upgrade`.
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, (table, column) in TRIGRAM_INDEXES.items():
+        op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ({column} gin_trgm_ops)")
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        for name in TRIGRAM_INDEXES:
+            op.execute(f"DROP INDEX IF EXISTS {name}")
+    op.drop_index("ix_loan_search_tokens_token_loan", table_name="loan_search_tokens")
+    op.drop_index("ix_loan_search_tokens_loan_id", table_name="loan_search_tokens")
+    op.drop_table("loan_search_tokens")
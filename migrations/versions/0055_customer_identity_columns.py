@@ -0,0 +1,79 @@
+"""normalized customer identity columns
+
+Revision ID: 0055_customer_identity
+Revises: 0054_loan_search
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0055_customer_identity"
+down_revision = "0054_loan_search"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+INDEXES = {"ix_customers_nic_canonical": "nic_canonical", "ix_customers_mobile_e164": "mobile_e164",
+           "ix_customers_guarantor_mobile_e164": "guarantor_mobile_e164"}
+
+
+def upgrade():
+    with op.batch_alter_table("customers") as batch:
+        batch.add_column(sa.Column("nic_canonical", sa.String(20), nullable=True))
+        batch.add_column(sa.Column("mobile_e164", sa.String(20), nullable=True))
+        batch.add_column(sa.Column("guarantor_mobile_e164", sa.String(20), nullable=True))
+    for name, column in INDEXES.items():
+        # Partial: most guarantor numbers and legacy NICs are empty.
+        op.create_index(name, "customers", [column], postgresql_where=sa.text(f"{column} IS NOT NULL"),
+                        sqlite_where=sa.text(f"{column} IS NOT NULL"))
+    _backfill(op.get_bind())
+
+
+# Copies of app.customer_identity.normalize_phone/normalize_nic as of this
+# revision; `flask backfill-customer-identity` recomputes with the live ones.
+def _normalize_phone(value):
+    raw = str(value or "").strip()
+    digits = re.sub(r"\D", "", raw)
+    if digits.startswith("00"): digits = digits[2:]
+    elif digits.startswith("94") and len(digits) == 11: pass
+    elif digits.startswith("0") and len(digits) == 10: digits = "94" + digits[1:]
+    elif len(digits) == 9 and not raw.startswith("+"): digits = "94" + digits
+    return f"+{digits}" if 8 <= len(digits) <= 15 else None
+
+
+def _normalize_nic(value):
+    compact = re.sub(r"[^0-9A-Z]+", "", str(value or "").upper())
+    old = re.match(r"^(\d{9})[VX]$", compact)
+    if old:
+        d = old.group(1); return f"19{d[:5]}0{d[5:]}"
+    return compact or None
+
+
+def _backfill(bind):
+    customers = sa.table("customers", sa.column("id"), sa.column("nic_number"), sa.column("mobile"), sa.column("guarantor_mobile"),
+                         sa.column("nic_canonical"), sa.column("mobile_e164"), sa.column("guarantor_mobile_e164"))
+    update = (customers.update().where(customers.c.id == sa.bindparam("row_id"))
+              .values(nic_canonical=sa.bindparam("nic"), mobile_e164=sa.bindparam("mobile_norm"),
+                      guarantor_mobile_e164=sa.bindparam("guarantor_norm")))
+    last_id = 0
+    while True:
+        rows = bind.execute(sa.select(customers.c.id, customers.c.nic_number, customers.c.mobile, customers.c.guarantor_mobile)
+                            .where(customers.c.id > last_id).order_by(customers.c.id).limit(BATCH_SIZE)).all()
+        if not rows:
+            break
+        params = [{"row_id": r.id, "nic": _normalize_nic(r.nic_number), "mobile_norm": _normalize_phone(r.mobile),
+                   "guarantor_norm": _normalize_phone(r.guarantor_mobile)} for r in rows]
+        params = [p for p in params if p["nic"] or p["mobile_norm"] or p["guarantor_norm"]]
+        if params:
+            bind.execute(update, params)
+        last_id = rows[-1].id
+
+
+def downgrade():
+    for name in INDEXES:
+        op.drop_index(name, table_name="customers")
+    with op.batch_alter_table("customers") as batch:
+        batch.drop_column("guarantor_mobile_e164")
+        batch.drop_column("mobile_e164")
+        batch.drop_column("nic_canonical")
@@ -0,0 +1,48 @@
+"""unified search documents
+
+Revision ID: 0056_search_documents
+Revises: 0055_customer_identity
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0056_search_documents"
+down_revision = "0055_customer_identity"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table("search_documents",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("entity_type", sa.String(40), nullable=False),
+        sa.Column("entity_id", sa.Integer(), nullable=False),
+        sa.Column("title", sa.String(255), nullable=False),
+        sa.Column("subtitle", sa.String(255)),
+        sa.Column("status", sa.String(50)),
+        sa.Column("search_text", sa.Text(), nullable=False, server_default=""),
+        sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.UniqueConstraint("entity_type", "entity_id", name="uq_search_documents_entity"))
+    op.create_table("search_tokens",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("entity_type", sa.String(40), nullable=False),
+        sa.Column("entity_id", sa.Integer(), nullable=False),
+        sa.Column("token", sa.String(120), nullable=False))
+    op.create_index("ix_search_tokens_token_entity", "search_tokens", ["token", "entity_type", "entity_id"])
+    op.create_index("ix_search_tokens_entity", "search_tokens", ["entity_type", "entity_id"])
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        # Prefix tsqueries (word:*) from global_search.search are served by this expression index.
+        op.execute("CREATE INDEX ix_search_documents_fts ON search_documents USING gin (to_tsvector('simple', search_text))")
+    # Documents are populated by `flask rebuild-search-index --missing-only`, which
+    # entrypoint.sh runs after every `db upgrade`.
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_search_documents_fts")
+    op.drop_index("ix_search_tokens_entity", table_name="search_tokens")
+    op.drop_index("ix_search_tokens_token_entity", table_name="search_tokens")
+    op.drop_table("search_tokens")
+    op.drop_table("search_documents")
@@ -0,0 +1,94 @@
+"""journal search vector
+
+Revision ID: 0057_journal_search_vector
+Revises: 0056_search_documents
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0057_journal_search_vector"
+down_revision = "0056_search_documents"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+MAX_TEXT_TOKENS = 40
+
+
+def upgrade():
+    with op.batch_alter_table("accounting_journal_entries") as batch:
+        batch.add_column(sa.Column("search_vector", sa.Text(), nullable=True))
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        # Serves global_search.journal_search_filter (list_journals ?search=).
+        op.execute("CREATE INDEX ix_accounting_journal_entries_search_vector ON accounting_journal_entries "
+                   "USING gin (to_tsvector('simple', coalesce(search_vector, '')))")
+    _backfill(bind)
+
+
+# Token rules of app.global_search as of this revision; `flask rebuild-search-index
+# --entity-type JOURNAL` recomputes with the live ones.
+def _words(value):
+    return [w for w in re.split(r"[^0-9a-z]+", str(value or "").lower()) if w]
+
+
+def _identifier(value):
+    words = _words(value)
+    return set(words) | ({"".join(words)} if words else set())
+
+
+def _text(value):
+    return set([w for w in _words(value) if len(w) > 1][:MAX_TEXT_TOKENS])
+
+
+def _backfill(bind):
+    entries = sa.table("accounting_journal_entries", sa.column("id"), sa.column("journal_no"), sa.column("reference"), sa.column("description"),
+                       sa.column("reference_type"), sa.column("source_type"), sa.column("reversal_of_id"), sa.column("loan_id"),
+                       sa.column("customer_id"), sa.column("search_vector"))
+    lines = sa.table("accounting_journal_lines", sa.column("journal_entry_id"), sa.column("account_id"), sa.column("loan_id"), sa.column("customer_id"))
+    accounts = sa.table("accounting_accounts", sa.column("id"), sa.column("account_code"), sa.column("account_name"))
+    loans = sa.table("loans", sa.column("id"), sa.column("loan_number"))
+    customers = sa.table("customers", sa.column("id"), sa.column("full_name"), sa.column("customer_code"))
+    original, reversal = entries.alias("original"), entries.alias("reversal")
+    update = entries.update().where(entries.c.id == sa.bindparam("entry_id")).values(search_vector=sa.bindparam("vector"))
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(entries.c.id, entries.c.journal_no, entries.c.reference, entries.c.description, entries.c.reference_type,
+                      entries.c.source_type, original.c.journal_no.label("reversal_of_no"), loans.c.loan_number,
+                      customers.c.full_name, customers.c.customer_code)
+            .select_from(entries.outerjoin(original, original.c.id == entries.c.reversal_of_id)
+                         .outerjoin(loans, loans.c.id == entries.c.loan_id).outerjoin(customers, customers.c.id == entries.c.customer_id))
+            .where(entries.c.id > last_id).order_by(entries.c.id).limit(BATCH_SIZE)).all()
+        if not rows:
+            break
+        ids = [r.id for r in rows]
+        linked = {}
+        for r in bind.execute(
+                sa.select(lines.c.journal_entry_id, accounts.c.account_code, accounts.c.account_name, loans.c.loan_number,
+                          customers.c.full_name, customers.c.customer_code)
+                .select_from(lines.join(accounts, accounts.c.id == lines.c.account_id).outerjoin(loans, loans.c.id == lines.c.loan_id)
+                             .outerjoin(customers, customers.c.id == lines.c.customer_id))
+                .where(lines.c.journal_entry_id.in_(ids))):
+            linked.setdefault(r.journal_entry_id, set()).update(
+                _identifier(r.account_code) | _text(r.account_name) | _identifier(r.loan_number) | _text(r.full_name) | _identifier(r.customer_code))
+        for r in bind.execute(sa.select(reversal.c.reversal_of_id, reversal.c.journal_no).where(reversal.c.reversal_of_id.in_(ids))):
+            linked.setdefault(r.reversal_of_id, set()).update(_identifier(r.journal_no))
+        params = []
+        for r in rows:
+            words = (_identifier(r.journal_no) | _identifier(r.reference) | _text(r.description) | _identifier(r.reference_type)
+                     | _identifier(r.source_type) | _identifier(r.reversal_of_no) | _identifier(r.loan_number) | _text(r.full_name)
+                     | _identifier(r.customer_code) | linked.get(r.id, set()))
+            params.append({"entry_id": r.id, "vector": " ".join(sorted({w[:120] for w in words if w}))})
+        bind.execute(update, params)
+        last_id = ids[-1]
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_accounting_journal_entries_search_vector")
+    with op.batch_alter_table("accounting_journal_entries") as batch:
+        batch.drop_column("search_vector")
@@ -0,0 +1,27 @@
+"""updated_at on customer 360 source tables
+
+Revision ID: 0058_profile_updated_at
+Revises: 0057_journal_search_vector
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0058_profile_updated_at"
+down_revision = "0057_journal_search_vector"
+branch_labels = None
+depends_on = None
+
+# customer_360.profile_fingerprint derives the profile ETag from these; existing rows start NULL.
+TABLES = ("customers", "customer_kyc_profiles", "loans", "payments")
+
+
+def upgrade():
+    for table in TABLES:
+        with op.batch_alter_table(table) as batch:
+            batch.add_column(sa.Column("updated_at", sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    for table in reversed(TABLES):
+        with op.batch_alter_table(table) as batch:
+            batch.drop_column("updated_at")
@@ -0,0 +1,22 @@
+"""loan application review queue indexes
+
+Revision ID: 0059_application_review_queue
+Revises: 0058_profile_updated_at
+"""
+from alembic import op
+
+revision = "0059_application_review_queue"
+down_revision = "0058_profile_updated_at"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Status tabs and the keyset page both read (status, created_at, id); officer filters use their own prefix.
+    op.create_index("ix_loan_applications_status_created_at", "loan_applications", ["status", "created_at", "id"])
+    op.create_index("ix_loan_applications_officer_created_at", "loan_applications", ["assigned_officer_id", "created_at"])
+
+
+def downgrade():
+    op.drop_index("ix_loan_applications_officer_created_at", table_name="loan_applications")
+    op.drop_index("ix_loan_applications_status_created_at", table_name="loan_applications")
@@ -0,0 +1,110 @@
+"""loan list read model
+
+Revision ID: 0060_loan_list_view
+Revises: 0059_application_review_queue
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0060_loan_list_view"
+down_revision = "0059_application_review_queue"
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    "ix_loan_list_view_status_start": ["status", "start_date", "loan_id"],
+    "ix_loan_list_view_start_date": ["start_date", "loan_id"],
+    "ix_loan_list_view_customer": ["customer_id", "start_date"],
+    "ix_loan_list_view_outstanding": ["outstanding_amount", "loan_id"],
+    "ix_loan_list_view_next_due": ["next_due_date"],
+    "ix_loan_list_view_loan_number": ["loan_number"],
+    "ix_loan_list_view_customer_name": ["customer_name", "loan_id"],
+}
+TRIGRAM_INDEXES = ("loan_number", "customer_name", "nic_number", "mobile")
+
+
+def upgrade():
+    money = sa.Numeric(18, 2)
+    op.create_table("loan_list_view",
+        sa.Column("loan_id", sa.Integer(), sa.ForeignKey("loans.id", ondelete="CASCADE"), primary_key=True, autoincrement=False),
+        sa.Column("loan_number", sa.String(50), nullable=False),
+        sa.Column("customer_id", sa.Integer(), nullable=False),
+        sa.Column("customer_code", sa.String(50)),
+        sa.Column("customer_name", sa.String(150), nullable=False),
+        sa.Column("nic_number", sa.String(50)),
+        sa.Column("mobile", sa.String(20)),
+        sa.Column("application_id", sa.Integer()),
+        sa.Column("application_number", sa.String(50)),
+        sa.Column("product", sa.String(50)),
+        sa.Column("status", sa.String(50), nullable=False),
+        sa.Column("principal_amount", money, nullable=False),
+        sa.Column("total_payable", money, nullable=False),
+        sa.Column("total_paid", money, nullable=False),
+        sa.Column("raw_outstanding", money, nullable=False),
+        sa.Column("outstanding_amount", money, nullable=False),
+        sa.Column("customer_credit_balance", money, nullable=False),
+        sa.Column("start_date", sa.Date(), nullable=False),
+        sa.Column("settled_date", sa.Date()),
+        sa.Column("next_due_date", sa.Date()),
+        sa.Column("last_payment_date", sa.Date()),
+        sa.Column("refreshed_at", sa.DateTime(), nullable=False))
+    for name, columns in INDEXES.items():
+        op.create_index(name, "loan_list_view", columns)
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        # The list's ?q= is an ILIKE '%term%' over these columns.
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for column in TRIGRAM_INDEXES:
+            op.execute(f"CREATE INDEX IF NOT EXISTS ix_loan_list_view_{column}_trgm ON loan_list_view USING gin ({column} gin_trgm_ops)")
+    _populate()
+
+
+def _populate():
+    """Fill the view for existing loans, as app.loan_list_view._build_rows does; the app keeps it current from here."""
+    t = lambda name, *cols: sa.table(name, *(sa.column(c) for c in cols))
+    loans = t("loans", "id", "loan_number", "customer_id", "status", "principal_amount", "total_payable", "customer_credit_balance", "start_date", "settled_date")
+    customers = t("customers", "id", "customer_code", "full_name", "nic_number", "mobile")
+    payments = t("payments", "loan_id", "amount_collected", "collection_date", "status", "reversed_at")
+    ledger = t("loan_ledger", "loan_id", "due_date", "status")
+    deductions = t("loan_disbursement_deductions", "loan_id", "loan_application_id")
+    applications = t("loan_applications", "id", "application_number", "loan_type")
+    view = t("loan_list_view", "loan_id", "loan_number", "customer_id", "customer_code", "customer_name", "nic_number", "mobile",
+             "application_id", "application_number", "product", "status", "principal_amount", "total_payable", "total_paid",
+             "raw_outstanding", "outstanding_amount", "customer_credit_balance", "start_date", "settled_date", "next_due_date",
+             "last_payment_date", "refreshed_at")
+
+    receipts = (sa.select(payments.c.loan_id, sa.func.sum(payments.c.amount_collected).label("paid"),
+                          sa.func.max(payments.c.collection_date).label("last_payment_date"))
+                .where(payments.c.reversed_at.is_(None), sa.func.upper(sa.func.trim(payments.c.status)) == "POSTED")
+                .group_by(payments.c.loan_id).subquery())
+    due = (sa.select(ledger.c.loan_id, sa.func.min(ledger.c.due_date).label("next_due_date"))
+           .where(ledger.c.status != "PAID").group_by(ledger.c.loan_id).subquery())
+    linked = (sa.select(deductions.c.loan_id, sa.func.min(deductions.c.loan_application_id).label("application_id"))
+              .group_by(deductions.c.loan_id).subquery())
+    paid = sa.func.coalesce(receipts.c.paid, 0)
+    raw_outstanding = sa.func.coalesce(loans.c.total_payable, 0) - paid
+    rows = (sa.select(
+                loans.c.id, loans.c.loan_number, loans.c.customer_id, customers.c.customer_code,
+                sa.func.coalesce(customers.c.full_name, ""), customers.c.nic_number, customers.c.mobile,
+                linked.c.application_id, applications.c.application_number, applications.c.loan_type,
+                sa.func.upper(sa.func.trim(sa.func.coalesce(loans.c.status, ""))),
+                sa.func.coalesce(loans.c.principal_amount, 0), sa.func.coalesce(loans.c.total_payable, 0), paid, raw_outstanding,
+                sa.case((raw_outstanding > 0, raw_outstanding), else_=0), sa.func.coalesce(loans.c.customer_credit_balance, 0),
+                loans.c.start_date, loans.c.settled_date, due.c.next_due_date, receipts.c.last_payment_date, sa.func.current_timestamp())
+            .select_from(loans)
+            .outerjoin(customers, customers.c.id == loans.c.customer_id)
+            .outerjoin(linked, linked.c.loan_id == loans.c.id)
+            .outerjoin(applications, applications.c.id == linked.c.application_id)
+            .outerjoin(receipts, receipts.c.loan_id == loans.c.id)
+            .outerjoin(due, due.c.loan_id == loans.c.id))
+    op.execute(view.insert().from_select(list(view.c), rows))
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        for column in TRIGRAM_INDEXES:
+            op.execute(f"DROP INDEX IF EXISTS ix_loan_list_view_{column}_trgm")
+    for name in reversed(list(INDEXES)):
+        op.drop_index(name, table_name="loan_list_view")
+    op.drop_table("loan_list_view")
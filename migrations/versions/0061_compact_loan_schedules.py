@@ -0,0 +1,43 @@
+"""compact rule-based loan schedules
+
+Revision ID: 0061_compact_loan_schedules
+Revises: 0060_loan_list_view
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0061_compact_loan_schedules"
+down_revision = "0060_loan_list_view"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("loans") as batch:
+        batch.add_column(sa.Column("compact_schedule", sa.Boolean(), nullable=False, server_default=sa.false()))
+    money = sa.Numeric(18, 2)
+    op.create_table("loan_schedule_rules",
+        sa.Column("loan_id", sa.Integer(), sa.ForeignKey("loans.id", ondelete="CASCADE"), primary_key=True, autoincrement=False),
+        sa.Column("start_date", sa.Date(), nullable=False),
+        sa.Column("maturity_date", sa.Date(), nullable=False),
+        sa.Column("frequency", sa.String(20), nullable=False),
+        sa.Column("period_days", sa.Integer()),
+        sa.Column("installment_count", sa.Integer(), nullable=False),
+        sa.Column("principal_amount", money, nullable=False),
+        sa.Column("regular_principal", money, nullable=False),
+        sa.Column("regular_interest", money, nullable=False),
+        sa.Column("regular_installment", money, nullable=False),
+        sa.Column("final_principal", money, nullable=False),
+        sa.Column("final_interest", money, nullable=False),
+        sa.Column("final_installment", money, nullable=False),
+        sa.Column("materialized_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("next_due_date", sa.Date()),
+        sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.func.now()))
+    op.create_index("ix_loan_schedule_rules_next_due", "loan_schedule_rules", ["next_due_date"])
+
+
+def downgrade():
+    op.drop_index("ix_loan_schedule_rules_next_due", table_name="loan_schedule_rules")
+    op.drop_table("loan_schedule_rules")
+    with op.batch_alter_table("loans") as batch:
+        batch.drop_column("compact_schedule")
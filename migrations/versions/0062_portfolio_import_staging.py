@@ -0,0 +1,76 @@
+"""legacy portfolio import staging tables
+
+Revision ID: 0062_portfolio_import_staging
+Revises: 0061_compact_loan_schedules
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0062_portfolio_import_staging"
+down_revision = "0061_compact_loan_schedules"
+branch_labels = None
+depends_on = None
+
+
+def _staging_columns():
+    return [sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("batch_id", sa.Integer(), sa.ForeignKey("portfolio_import_batches.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("row_no", sa.Integer(), nullable=False)]
+
+
+def upgrade():
+    op.create_table("portfolio_import_batches",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(120)),
+        sa.Column("cutover_date", sa.Date(), nullable=False),
+        sa.Column("status", sa.String(20), nullable=False, server_default="STAGED"),
+        sa.Column("completed_stage", sa.String(20)),
+        sa.Column("error_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("contra_account_id", sa.Integer(), sa.ForeignKey("accounting_accounts.id")),
+        sa.Column("created_by_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.func.now()))
+    op.create_table("portfolio_import_customers", *_staging_columns(),
+        sa.Column("customer_code", sa.String(50)),
+        sa.Column("full_name", sa.String(150)),
+        sa.Column("nic_number", sa.String(50)),
+        sa.Column("nic_canonical", sa.String(20)),
+        sa.Column("mobile", sa.String(20)),
+        sa.Column("email", sa.String(120)),
+        sa.Column("address", sa.String(255)),
+        sa.Column("business_type", sa.String(120)),
+        sa.Column("error", sa.Text()),
+        sa.Column("customer_id", sa.Integer()))
+    op.create_index("ix_portfolio_import_customers_batch_code", "portfolio_import_customers", ["batch_id", "customer_code"])
+    op.create_table("portfolio_import_loans", *_staging_columns(),
+        sa.Column("loan_number", sa.String(50)),
+        sa.Column("customer_code", sa.String(50)),
+        sa.Column("principal_amount", sa.Numeric(18, 2)),
+        sa.Column("interest_rate", sa.Numeric(9, 4)),
+        sa.Column("term_type", sa.String(20)),
+        sa.Column("term_value", sa.Integer()),
+        sa.Column("repayment_frequency", sa.String(20)),
+        sa.Column("start_date", sa.Date()),
+        sa.Column("total_payable", sa.Numeric(18, 2)),
+        sa.Column("error", sa.Text()),
+        sa.Column("loan_id", sa.Integer()))
+    op.create_index("ix_portfolio_import_loans_batch_number", "portfolio_import_loans", ["batch_id", "loan_number"])
+    op.create_table("portfolio_import_payments", *_staging_columns(),
+        sa.Column("loan_number", sa.String(50)),
+        sa.Column("payment_date", sa.Date()),
+        sa.Column("amount", sa.Numeric(18, 2)),
+        sa.Column("payment_method", sa.String(50)),
+        sa.Column("reference", sa.String(120)),
+        sa.Column("error", sa.Text()),
+        sa.Column("payment_id", sa.Integer()))
+    op.create_index("ix_portfolio_import_payments_batch_loan", "portfolio_import_payments", ["batch_id", "loan_number"])
+
+
+def downgrade():
+    op.drop_index("ix_portfolio_import_payments_batch_loan", table_name="portfolio_import_payments")
+    op.drop_table("portfolio_import_payments")
+    op.drop_index("ix_portfolio_import_loans_batch_number", table_name="portfolio_import_loans")
+    op.drop_table("portfolio_import_loans")
+    op.drop_index("ix_portfolio_import_customers_batch_code", table_name="portfolio_import_customers")
+    op.drop_table("portfolio_import_customers")
+    op.drop_table("portfolio_import_batches")
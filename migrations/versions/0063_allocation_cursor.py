@@ -0,0 +1,28 @@
+"""per-loan payment allocation cursor
+
+Revision ID: 0063_allocation_cursor
+Revises: 0062_portfolio_import_staging
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0063_allocation_cursor"
+down_revision = "0062_portfolio_import_staging"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing loans keep a NULL cursor and are scanned from the first
+    # installment once; their next allocation sets it.
+    with op.batch_alter_table("loans") as batch:
+        batch.add_column(sa.Column("allocation_cursor_due_date", sa.Date()))
+        batch.add_column(sa.Column("allocation_cursor_installment", sa.Integer()))
+    op.create_index("ix_loan_ledger_allocation_order", "loan_ledger", ["loan_id", "due_date", "installment_no"])
+
+
+def downgrade():
+    op.drop_index("ix_loan_ledger_allocation_order", table_name="loan_ledger")
+    with op.batch_alter_table("loans") as batch:
+        batch.drop_column("allocation_cursor_installment")
+        batch.drop_column("allocation_cursor_due_date")
@@ -0,0 +1,34 @@
+"""overdue classification: loan status index and transition history
+
+Revision ID: 0064_loan_status_transitions
+Revises: 0063_allocation_cursor
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0064_loan_status_transitions"
+down_revision = "0063_allocation_cursor"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_loans_status", "loans", ["status"])
+    op.create_table("loan_status_transitions",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("loan_id", sa.Integer(), sa.ForeignKey("loans.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("from_status", sa.String(50)),
+        sa.Column("to_status", sa.String(50), nullable=False),
+        sa.Column("as_of_date", sa.Date(), nullable=False),
+        sa.Column("days_past_due", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("next_due_date", sa.Date()),
+        sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.func.now()))
+    op.create_index("ix_loan_status_transitions_loan_date", "loan_status_transitions", ["loan_id", "as_of_date"])
+    op.create_index("ix_loan_status_transitions_as_of_date", "loan_status_transitions", ["as_of_date"])
+
+
+def downgrade():
+    op.drop_index("ix_loan_status_transitions_as_of_date", table_name="loan_status_transitions")
+    op.drop_index("ix_loan_status_transitions_loan_date", table_name="loan_status_transitions")
+    op.drop_table("loan_status_transitions")
+    op.drop_index("ix_loans_status", table_name="loans")
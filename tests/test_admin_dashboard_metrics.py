@@ -125,7 +125,8 @@ def test_dashboard_counts_all_loans_regardless_of_status_and_excludes_applicatio
     body = client.get("/admin/dashboard", headers=_headers(app, admin)).get_json()
 
     assert body["total_loans"] == 17
-    assert body["active_loans"] == 10
+    # OVERDUE loans are still live: the nightly classification only marks them in arrears.
+    assert body["active_loans"] == 12
 
 
 def test_dashboard_count_metrics_are_always_numeric(app, client):
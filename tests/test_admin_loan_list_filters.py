@@ -1,10 +1,10 @@
-from datetime import date
+from datetime import date, timedelta
 from decimal import Decimal
 
 from flask_jwt_extended import create_access_token
 
 from app.extensions import db
-from app.models import Customer, Loan, Payment, User
+from app.models import Customer, Loan, LoanLedger, LoanListView, Payment, User
 
 
 def _user(role, name, email):
@@ -72,3 +72,50 @@ def test_admin_loan_list_rejects_invalid_ranges(app, client):
     response = client.get("/admin/loans?date_from=2026-07-20&date_to=2026-07-19", headers=_headers(app, admin))
     assert response.status_code == 422
     assert response.get_json() == {"error": "invalid_date_range", "message": "Date From cannot be later than Date To."}
+
+
+def test_admin_loan_list_reads_maintained_read_model_with_keyset_pages(app, client):
+    admin = _user("admin", "Admin", "admin-view@example.com")
+    customer_user = _user("customer", "View Customer", "view-customer@example.com")
+    customer = Customer(user_id=customer_user.id, customer_code="CUST-VIEW", full_name="View Customer", mobile="0771112223")
+    db.session.add(customer); db.session.flush()
+    loans = [_loan(admin, customer, f"VIEW-{i}", date(2026, 7, 1 + i), principal=f"{1000 + (i % 2) * 500}.00") for i in range(5)]
+    db.session.flush()
+    overdue_from = date.today() - timedelta(days=10)
+    db.session.add(LoanLedger(loan_id=loans[0].id, installment_no=1, due_date=overdue_from, period_days=30, opening_balance=Decimal("1000"),
+                              interest_amount=Decimal("100"), principal_amount=Decimal("1000"), installment_amount=Decimal("1100"),
+                              closing_balance=Decimal("0"), status="PENDING"))
+    db.session.add(Payment(loan_id=loans[1].id, amount_collected=Decimal("300.00"), collected_by_id=admin.id, collection_date=date(2026, 7, 9),
+                           status="POSTED"))
+    db.session.commit()
+    headers = _headers(app, admin)
+
+    row = db.session.get(LoanListView, loans[1].id)
+    assert (row.total_paid, row.outstanding_amount, row.last_payment_date) == (Decimal("300.00"), Decimal("800.00"), date(2026, 7, 9))
+    overdue = client.get("/admin/loans?dpd_min=5&fields=loan_number,next_due_date,days_past_due", headers=headers).get_json()["items"]
+    assert overdue == [{"id": loans[0].id, "loan_number": "VIEW-0", "next_due_date": overdue_from.isoformat(), "days_past_due": 10}]
+
+    # Customer, payment and status changes reach the list at commit.
+    customer.full_name = "Renamed Customer"
+    db.session.get(Payment, db.session.query(Payment.id).filter_by(loan_id=loans[1].id).scalar()).status = "REVERSED"
+    loans[2].status = "Settled"
+    db.session.commit()
+    items = {item["id"]: item for item in client.get("/admin/loans?page_size=100", headers=headers).get_json()["items"]}
+    assert {item["customer_name"] for item in items.values()} == {"Renamed Customer"}
+    assert items[loans[1].id]["total_paid"] == 0.0 and items[loans[2].id]["status"] == "SETTLED"
+    assert client.get("/admin/loans?q=renamed&status=SETTLED", headers=headers).get_json()["items"][0]["id"] == loans[2].id
+
+    # Cursor pages over a decimal sort key with ties on the loan id.
+    seen, cursor = [], None
+    while True:
+        body = client.get("/admin/loans?limit=2&sort_by=principal_amount&sort_direction=desc" + (f"&cursor={cursor}" if cursor else ""), headers=headers).get_json()
+        seen.extend(item["id"] for item in body["items"])
+        cursor = body["pagination"]["next_cursor"]
+        if not cursor: break
+    assert seen == [loan.id for loan in sorted(loans, key=lambda loan: (loan.principal_amount, loan.id), reverse=True)]
+    assert client.get("/admin/loans?limit=2&sort_by=settled_date", headers=headers).status_code == 422
+
+    db.session.query(LoanListView).delete(); db.session.commit()
+    result = app.test_cli_runner().invoke(args=["rebuild-loan-list-view", "--batch-size", "2"])
+    assert result.exit_code == 0 and "'loans': 5" in result.output
+    assert db.session.get(LoanListView, loans[0].id).next_due_date == overdue_from
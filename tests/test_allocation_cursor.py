@@ -0,0 +1,133 @@
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+from app.accounting import allocate_payment, post_loan_payment, reverse_payment, seed_default_accounts
+from app.allocation_cursor import cursor, is_settled, position
+from app.extensions import db
+from app.models import Customer, Loan, LoanLedger, Payment, User
+
+START = date(2026, 1, 1)
+FIELDS = ("principal_paid", "interest_paid", "paid_amount", "status", "paid_date", "last_payment_date")
+
+
+def _setup():
+    seed_default_accounts()
+    user = User(email="cursor@example.com", name="Cursor", role="admin"); user.set_password("password")
+    db.session.add(user); db.session.flush()
+    customer = Customer(user_id=user.id, customer_code="CURSOR", full_name="Cursor Customer")
+    db.session.add(customer); db.session.commit()
+    return user, customer
+
+
+def _loan(user, customer, rng, number):
+    count = 15
+    loan = Loan(loan_number=f"CURSOR-{number}", customer_id=customer.id, principal_amount=Decimal("15000"), interest_rate=Decimal("10"),
+                total_days=count * 7, payment_interval_days=7, daily_installment=Decimal("0"), total_payable=Decimal("16500"),
+                start_date=START, end_date=START + timedelta(days=count * 7), created_by_id=user.id, status="ACTIVE",
+                interest_accounting_method="CASH_BASIS")
+    db.session.add(loan); db.session.flush()
+    # Uneven amounts, a shared due date and installment numbers out of due-date order.
+    due_dates = sorted(START + timedelta(days=7 * rng.randint(1, count)) for _ in range(count))
+    numbers = list(range(1, count + 1)); numbers[3], numbers[4] = numbers[4], numbers[3]
+    for no, due in zip(numbers, due_dates):
+        principal, interest = Decimal(rng.randint(50000, 150000)) / 100, Decimal(rng.randint(0, 15000)) / 100
+        db.session.add(LoanLedger(loan_id=loan.id, installment_no=no, due_date=due, period_days=7, opening_balance=Decimal("15000"),
+                                  principal_amount=principal, interest_amount=interest, installment_amount=principal + interest,
+                                  closing_balance=Decimal("0"), status="PENDING"))
+    db.session.commit()
+    return loan
+
+
+def _snapshot(loan):
+    rows = LoanLedger.query.filter_by(loan_id=loan.id).all()
+    return {r.installment_no: {"due_date": r.due_date, "principal_amount": Decimal(r.principal_amount), "interest_amount": Decimal(r.interest_amount),
+                               **{f: getattr(r, f) for f in FIELDS}} for r in rows}
+
+
+def _full_scan(rows, amount, paid_date):
+    """The waterfall as it was before the cursor: every installment, from the first."""
+    remaining, allocations = amount, []
+    for no, e in sorted(rows.items(), key=lambda item: (item[1]["due_date"], item[0])):
+        if remaining <= 0: break
+        touched = False
+        for kind, paid_key, amount_key in (("INTEREST", "interest_paid", "interest_amount"), ("PRINCIPAL", "principal_paid", "principal_amount")):
+            pay = min(remaining, e[amount_key] - Decimal(e[paid_key] or 0))
+            e[paid_key] = Decimal(e[paid_key] or 0) + pay; remaining -= pay
+            if pay: allocations.append((no, kind, pay)); touched = True
+        e["paid_amount"] = e["principal_paid"] + e["interest_paid"]
+        settled = e["principal_paid"] >= e["principal_amount"] and e["interest_paid"] >= e["interest_amount"]
+        e["status"] = "PAID" if settled else ("PARTIAL" if e["paid_amount"] > 0 else "PENDING")
+        if touched: e["last_payment_date"] = paid_date
+        if settled and e["paid_date"] is None: e["paid_date"] = paid_date
+    return allocations, max(remaining, Decimal("0"))
+
+
+def _unwind(rows, allocations):
+    for no, kind, amount in allocations:
+        e = rows[no]
+        key = "principal_paid" if kind == "PRINCIPAL" else "interest_paid"
+        e[key] -= amount
+        e["paid_amount"] = e["principal_paid"] + e["interest_paid"]
+        e["status"] = "PARTIAL" if e["paid_amount"] > 0 else "PENDING"
+
+
+def _pay(loan, user, amount, paid_date):
+    principal, interest, penalty, other = allocate_payment(loan, amount, paid_date)
+    allocations = [(ledger.installment_no, kind, amt) for ledger, kind, amt in loan._pending_allocations if ledger is not None]
+    payment = Payment(loan_id=loan.id, amount_collected=amount, principal_paid=principal, interest_paid=interest, penalty_paid=penalty,
+                      other_fee_paid=other, collection_date=paid_date, payment_date=paid_date, accounting_date=paid_date,
+                      collected_by_id=user.id, payment_method="CASH", status="POSTED")
+    db.session.add(payment); db.session.flush()
+    post_loan_payment(payment, user.id)
+    db.session.commit()
+    return payment, allocations, other
+
+
+def _assert_cursor_invariant(loan):
+    db.session.refresh(loan)
+    start = cursor(loan)
+    if start is None: return
+    assert all(is_settled(e) for e in LoanLedger.query.filter_by(loan_id=loan.id) if position(e) < start)
+
+
+def test_cursor_allocation_matches_the_full_scan_under_payments_and_reversals(app):
+    user, customer = _setup()
+    for seed in range(4):
+        rng = random.Random(seed)
+        loan = _loan(user, customer, rng, seed)
+        expected, live, paid_date = _snapshot(loan), [], START
+        for _ in range(30):
+            paid_date += timedelta(days=rng.randint(0, 5))
+            if live and rng.random() < 0.3:
+                payment, allocations = live.pop(rng.randrange(len(live)))
+                reverse_payment(payment, paid_date, "property test", user.id)
+                db.session.commit()
+                _unwind(expected, allocations)
+            else:
+                outstanding = sum((e["principal_amount"] + e["interest_amount"] - e["paid_amount"] for e in expected.values()), Decimal("0"))
+                if not outstanding: continue
+                # Overpayments need a customer advance account; they do not reach the ledger anyway.
+                amount = min(outstanding, Decimal(rng.choice([rng.randint(1, 300000), rng.randint(50000, 160000), 1])) / 100)
+                want, unapplied = _full_scan(expected, amount, paid_date)
+                payment, allocations, other = _pay(loan, user, amount, paid_date)
+                assert (allocations, other) == (want, unapplied)
+                live.append((payment, allocations))
+            assert _snapshot(loan) == expected
+            _assert_cursor_invariant(loan)
+
+
+def test_cursor_skips_settled_installments_and_rewinds_on_reversal(app):
+    user, customer = _setup()
+    loan = _loan(user, customer, random.Random(7), "skip")
+    rows = sorted(LoanLedger.query.filter_by(loan_id=loan.id), key=position)
+    first_three = sum((r.principal_amount + r.interest_amount for r in rows[:3]), Decimal("0"))
+    payment, _, _ = _pay(loan, user, first_three, START)
+    assert cursor(loan) == position(rows[2])  # the last one paid: nothing after it was reached
+
+    _pay(loan, user, Decimal("1.00"), START)
+    assert cursor(loan) == position(rows[3])
+
+    reverse_payment(payment, START, "wrong loan", user.id)
+    db.session.commit()
+    assert cursor(loan) == position(rows[0])
@@ -0,0 +1,65 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from sqlalchemy import event
+
+from app.accounting import allocate_payment, post_loan_payment, seed_default_accounts
+from app.extensions import db
+from app.models import Customer, Loan, LoanLedger, Payment, PaymentAllocation, User
+
+START = date(2026, 1, 1)
+
+
+def _setup():
+    seed_default_accounts()
+    user = User(email="alloc-writes@example.com", name="Alloc Writes", role="admin"); user.set_password("password")
+    db.session.add(user); db.session.flush()
+    customer = Customer(user_id=user.id, customer_code="ALLOC-W", full_name="Allocation Customer")
+    db.session.add(customer); db.session.flush()
+    loans = []
+    for n in (1, 2):
+        loan = Loan(loan_number=f"ALLOC-W-{n}", customer_id=customer.id, principal_amount=Decimal("10000"), interest_rate=Decimal("10"), total_days=70,
+                    payment_interval_days=7, daily_installment=Decimal("0"), total_payable=Decimal("11000"), start_date=START,
+                    end_date=START + timedelta(days=70), created_by_id=user.id, status="ACTIVE", interest_accounting_method="CASH_BASIS")
+        db.session.add(loan); db.session.flush()
+        db.session.add_all([LoanLedger(loan_id=loan.id, installment_no=i, due_date=START + timedelta(days=7 * i), period_days=7, opening_balance=Decimal("10000"),
+                                       principal_amount=Decimal("1000"), interest_amount=Decimal("100"), installment_amount=Decimal("1100"),
+                                       closing_balance=Decimal("0"), status="PENDING") for i in range(1, 11)])
+        loans.append(loan)
+    db.session.commit()
+    return user, loans
+
+
+def _pay(user, loan, amount, paid_date):
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.engine, "before_cursor_execute", listener)
+    try:
+        principal, interest, penalty, other = allocate_payment(loan, amount, paid_date)
+        payment = Payment(loan_id=loan.id, amount_collected=amount, principal_paid=principal, interest_paid=interest, penalty_paid=penalty,
+                          other_fee_paid=other, collection_date=paid_date, payment_date=paid_date, accounting_date=paid_date,
+                          collected_by_id=user.id, payment_method="CASH", status="POSTED")
+        db.session.add(payment); db.session.flush()
+        post_loan_payment(payment, user.id)
+        db.session.flush()
+    finally:
+        event.remove(db.engine, "before_cursor_execute", listener)
+    db.session.commit()
+    return payment, statements
+
+
+def test_allocation_writes_do_not_grow_with_installments_paid(app):
+    user, (one, many) = _setup()
+    _pay(user, one, Decimal("10"), START)  # the first receipt also warms per-process caches
+    _, small = _pay(user, one, Decimal("2190"), START + timedelta(days=7))  # settles two installments
+    payment, large = _pay(user, many, Decimal("6600"), START + timedelta(days=7))
+    assert len(large) == len(small)
+    assert sum(s.lstrip().upper().startswith("UPDATE LOAN_LEDGER") for s in large) == 1
+    assert sum(s.lstrip().upper().startswith("INSERT INTO PAYMENT_ALLOCATIONS") for s in large) == 1
+
+    rows = LoanLedger.query.filter_by(loan_id=many.id).order_by(LoanLedger.installment_no).all()
+    assert [r.status for r in rows[:7]] == ["PAID"] * 6 + ["PENDING"]
+    assert all(r.paid_date == r.last_payment_date == START + timedelta(days=7) and r.paid_amount == Decimal("1100.00") for r in rows[:6])
+    allocations = PaymentAllocation.query.filter_by(payment_id=payment.id).order_by(PaymentAllocation.id).all()
+    assert [(a.ledger_id, a.allocation_type, a.amount) for a in allocations] == [
+        (r.id, kind, Decimal(amount)) for r in rows[:6] for kind, amount in (("INTEREST", "100.00"), ("PRINCIPAL", "1000.00"))]
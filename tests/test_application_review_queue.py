@@ -0,0 +1,87 @@
+from datetime import datetime
+from decimal import Decimal
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from app.extensions import db
+from app.models import Customer, LoanApplication, LoanApplicationDocument, User
+
+
+def _user(role, email):
+    user = User(email=email, name=f"{role} {email}", role=role)
+    user.set_password("password")
+    db.session.add(user)
+    db.session.flush()
+    return user
+
+
+def _headers(app, user):
+    with app.app_context():
+        token = create_access_token(identity=str(user.id), additional_claims={"role": user.role})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _seed(count, officers, offset=0):
+    for i in range(offset, offset + count):
+        user = _user("customer", f"queue-{i}@example.com")
+        customer = Customer(user_id=user.id, customer_code=f"Q-{i}", full_name=f"Queue {i}", status="Active")
+        db.session.add(customer); db.session.flush()
+        application = LoanApplication(
+            customer_id=customer.id, application_number=f"APP-Q-{i}", loan_type="GROW_BUSINESS",
+            status=["SUBMITTED", "STAFF_APPROVED", "REJECTED"][i % 3], applied_amount=Decimal("5000.00"), tenure_months=1,
+            full_name=f"Queue {i}", nic_number=f"NIC{i}", mobile_number="0771234567", district="Galle" if i % 2 else "Matara",
+            assigned_officer_id=officers[i % 2].id, created_by_id=officers[0].id, created_at=datetime(2026, 7, 1 + i % 20, 9, 0),
+        )
+        db.session.add(application); db.session.flush()
+        db.session.add(LoanApplicationDocument(loan_application_id=application.id, document_type="NIC_FRONT", file_path=f"q/{i}.png"))
+    db.session.commit()
+
+
+def _queue(client, url, headers):
+    db.session.expire_all()
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.engine, "before_cursor_execute", listener)
+    try:
+        response = client.get(url, headers=headers)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", listener)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json(), len(statements)
+
+
+def test_review_queue_pages_with_status_counts_in_constant_queries(app, client):
+    officers = [_user("staff", "officer-a@example.com"), _user("staff", "officer-b@example.com")]
+    admin = _user("admin", "queue-admin@example.com")
+    _seed(6, officers)
+    headers = _headers(app, admin)
+
+    body, small = _queue(client, "/loan-applications/review-queue?status=ALL&limit=50", headers)
+    assert body["counts"] == {"SUBMITTED": 2, "STAFF_APPROVED": 2, "APPROVED": 0, "REJECTED": 2, "DISBURSED": 0}
+    assert len(body["items"]) == 6 and body["next_cursor"] is None
+    assert {item["assigned_officer_name"] for item in body["items"]} == {officers[0].name, officers[1].name}
+    assert all(len(item["documents"]) == 1 and item["customer_code"].startswith("Q-") for item in body["items"])
+
+    _seed(18, officers, offset=6)
+    body, large = _queue(client, "/loan-applications/review-queue?status=ALL&limit=50", headers)
+    assert len(body["items"]) == 24 and large == small
+
+    # Admins default to the STAFF_APPROVED tab; pages follow the cursor without overlap.
+    seen, cursor = [], None
+    while True:
+        body, _ = _queue(client, "/loan-applications/review-queue?limit=3" + (f"&cursor={cursor}" if cursor else ""), headers)
+        assert body["status"] == "STAFF_APPROVED" and body["counts"]["STAFF_APPROVED"] == 8
+        seen.extend(item["id"] for item in body["items"])
+        cursor = body["next_cursor"]
+        if not cursor: break
+    assert len(seen) == len(set(seen)) == 8
+
+    filtered, _ = _queue(client, f"/loan-applications/review-queue?status=ALL&branch=galle&officer_id={officers[1].id}"
+                                 "&date_from=2026-07-02&date_to=2026-07-06", headers)
+    assert {(item["district"], item["assigned_officer_id"]) for item in filtered["items"]} == {("Galle", officers[1].id)}
+    assert sorted(item["application_number"] for item in filtered["items"]) == ["APP-Q-1", "APP-Q-21", "APP-Q-23", "APP-Q-3", "APP-Q-5"]
+    assert sum(filtered["counts"].values()) == 5
+
+    assert client.get("/loan-applications/review-queue?status=BOGUS", headers=headers).status_code == 400
+    assert client.get("/loan-applications/review-queue?date_from=yesterday", headers=headers).status_code == 400
@@ -0,0 +1,81 @@
+from decimal import Decimal
+
+from flask_jwt_extended import create_access_token
+
+from app.extensions import db
+from app.models import AccountingJournalEntry, Customer, Loan, LoanApplication, LoanLedger, User
+from app.routes.loan_applications import STATUS_APPROVED, STATUS_DISBURSED
+
+
+def _headers(app, user):
+    with app.app_context():
+        token = create_access_token(identity=str(user.id), additional_claims={"role": user.role})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _setup(count):
+    admin = User(email="batch-admin@example.com", name="Batch Admin", role="admin"); admin.set_password("password")
+    owner = User(email="batch-customer@example.com", name="Batch Customer", role="customer"); owner.set_password("password")
+    db.session.add_all([admin, owner]); db.session.flush()
+    customer = Customer(user_id=owner.id, customer_code="BATCH-1", full_name="Batch Customer", status="Active")
+    db.session.add(customer); db.session.flush()
+    applications = [LoanApplication(application_number=f"APP-BATCH-{i}", customer_id=customer.id, loan_type="GROW_BUSINESS", status=STATUS_APPROVED,
+                                    applied_amount=Decimal("9000"), approved_amount=Decimal("9000"), tenure_months=3, loan_days=63, term_type="DAYS",
+                                    term_value=63, repayment_frequency="WEEKLY", number_of_installments=9, installment_count=9,
+                                    installment_amount=Decimal("1300.00"), total_repayment=Decimal("11700.00"), total_interest=Decimal("2700.00"),
+                                    interest_rate=Decimal("30"), interest_type="FLAT", interest_rate_basis="FLAT_TERM",
+                                    full_name="Batch Customer", nic_number="123456789V", mobile_number="0700000000")
+                    for i in range(count)]
+    db.session.add_all(applications); db.session.commit()
+    return admin, [a.id for a in applications]
+
+
+def test_batch_disbursement_creates_loans_ledgers_and_balanced_journals(app, client):
+    admin, ids = _setup(3)
+    resp = client.post("/loan-applications/disburse-batch", headers=_headers(app, admin),
+                       json={"application_ids": ids, "disbursement_date": "2026-01-05"})
+    assert resp.status_code == 201, resp.get_json()
+    body = resp.get_json()
+    assert (body["disbursed"], body["failed"]) == (3, 0)
+    assert len({item["loan_number"] for item in body["items"]}) == 3
+
+    for item in body["items"]:
+        loan = db.session.get(Loan, item["loan_id"])
+        assert loan.principal_amount == Decimal("9000.00") and loan.status == "ACTIVE"
+        assert LoanLedger.query.filter_by(loan_id=loan.id).count() == 9
+        journals = AccountingJournalEntry.query.filter_by(reference_type="LOAN_DISBURSEMENT", reference_id=loan.id).all()
+        assert len(journals) == 1
+        lines = journals[0].lines
+        assert sum(l.debit for l in lines) == sum(l.credit for l in lines) == Decimal(item["gross_principal_amount"])
+        assert item["net_disbursed_amount"] == f"{Decimal(item['gross_principal_amount']) - Decimal(item['total_disbursement_deductions']):.2f}"
+    assert {a.status for a in LoanApplication.query.filter(LoanApplication.id.in_(ids))} == {STATUS_DISBURSED}
+
+
+def test_batch_disbursement_modes(app, client):
+    admin, ids = _setup(2)
+    headers = _headers(app, admin)
+    requested = ids + [999999]
+
+    resp = client.post("/loan-applications/disburse-batch", headers=headers, json={"application_ids": requested})
+    assert resp.status_code == 422
+    assert [item["status"] for item in resp.get_json()["items"]] == ["NOT_PROCESSED", "NOT_PROCESSED", "FAILED"]
+    assert Loan.query.count() == 0
+
+    resp = client.post("/loan-applications/disburse-batch", headers=headers, json={"application_ids": requested, "mode": "best_effort"})
+    assert resp.status_code == 201
+    assert [item["status"] for item in resp.get_json()["items"]] == ["DISBURSED", "DISBURSED", "FAILED"]
+    assert Loan.query.count() == 2
+
+    again = client.post("/loan-applications/disburse-batch", headers=headers, json={"application_ids": ids, "mode": "best_effort"})
+    assert again.status_code == 422 and Loan.query.count() == 2
+
+
+def test_batch_disbursement_rejects_an_unknown_funding_account(app, client):
+    admin, ids = _setup(1)
+    resp = client.post("/loan-applications/disburse-batch", headers=_headers(app, admin), json={"application_ids": ids, "funding_account_id": 999999})
+    assert resp.status_code == 400 and resp.get_json()["message"] == "Funding account not found"
+
+    result = app.test_cli_runner().invoke(args=["disburse-applications", "--application-id", str(ids[0]), "--user-id", str(admin.id),
+                                                "--funding-account-id", "999999"])
+    assert result.exit_code != 0 and "Funding account 999999 not found" in result.output
+    assert Loan.query.count() == 0
@@ -0,0 +1,89 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from flask_jwt_extended import create_access_token
+
+from app.accounting import reverse_payment, seed_default_accounts
+from app.allocation_cursor import cursor
+from app.extensions import db
+from app.models import AccountingJournalEntry, Customer, Loan, LoanLedger, Payment, User
+from app.payment_import import import_payments
+
+START = date(2026, 1, 1)
+LEDGER_FIELDS = ("installment_no", "principal_paid", "interest_paid", "paid_amount", "status")
+
+
+def _headers(app, user):
+    with app.app_context():
+        token = create_access_token(identity=str(user.id), additional_claims={"role": user.role})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _setup():
+    seed_default_accounts()
+    admin = User(email="bulk-reverse@example.com", name="Bulk Reverse", role="admin"); admin.set_password("password")
+    db.session.add(admin); db.session.flush()
+    customer = Customer(user_id=admin.id, customer_code="BULK-REV", full_name="Reversal Customer")
+    db.session.add(customer); db.session.flush()
+    for number in ("REV-A", "REV-B"):
+        loan = Loan(loan_number=number, customer_id=customer.id, principal_amount=Decimal("4000"), interest_rate=Decimal("10"), total_days=28,
+                    payment_interval_days=7, daily_installment=Decimal("0"), total_payable=Decimal("4400"), start_date=START,
+                    end_date=START + timedelta(days=28), created_by_id=admin.id, status="ACTIVE")
+        db.session.add(loan); db.session.flush()
+        db.session.add_all([LoanLedger(loan_id=loan.id, installment_no=i, due_date=START + timedelta(days=7 * i), period_days=7, opening_balance=Decimal("4000"),
+                                       principal_amount=Decimal("1000"), interest_amount=Decimal("100"), installment_amount=Decimal("1100"),
+                                       closing_balance=Decimal("0"), status="PENDING") for i in range(1, 5)])
+    # The same three receipts on both loans.
+    rows = [{"loan_number": number, "payment_date": f"2026-01-{day:02d}", "amount": amount, "reference": f"{number}-{day}"}
+            for number in ("REV-A", "REV-B") for day, amount in ((8, "1100"), (15, "800"), (22, "1500"))]
+    import_payments(rows, admin.id)
+    db.session.commit()
+    return admin
+
+
+def _ledger(loan_number):
+    loan = Loan.query.filter_by(loan_number=loan_number).one()
+    return [tuple(getattr(r, f) for f in LEDGER_FIELDS) for r in LoanLedger.query.filter_by(loan_id=loan.id).order_by(LoanLedger.installment_no)]
+
+
+def _receipts(loan_number, days):
+    return [p for p in Payment.query.join(Loan, Loan.id == Payment.loan_id).filter(Loan.loan_number == loan_number).order_by(Payment.id) if p.collection_date.day in days]
+
+
+def test_bulk_reversal_matches_one_by_one_reversal(app, client):
+    admin = _setup()
+    for payment in _receipts("REV-A", (8, 22)):
+        reverse_payment(payment, date(2026, 1, 31), "wrong sheet", admin.id)
+    db.session.commit()
+
+    bulk = [p.id for p in _receipts("REV-B", (8, 22))]
+    resp = client.post("/admin/payments/reverse-batch", headers=_headers(app, admin),
+                       json={"payment_ids": bulk, "reason": "wrong sheet", "reversal_date": "2026-01-31"})
+    assert resp.status_code == 200, resp.get_json()
+    assert resp.get_json()["reversed"] == 2
+    db.session.expire_all()
+
+    assert _ledger("REV-B") == _ledger("REV-A")
+    assert [(p.status, p.deposit_status, bool(p.reversal_journal_id)) for p in _receipts("REV-B", (8, 22))] == [("REVERSED", "REVERSED", True)] * 2
+    for payment in _receipts("REV-B", (8, 22)):
+        original = db.session.get(AccountingJournalEntry, payment.journal_id)
+        reversal = db.session.get(AccountingJournalEntry, payment.reversal_journal_id)
+        assert original.status == "REVERSED" and reversal.is_reversal and reversal.reversal_of_id == original.id
+        assert reversal.total_debit == reversal.total_credit == original.total_debit
+    loan = Loan.query.filter_by(loan_number="REV-B").one()
+    assert cursor(loan) == (START + timedelta(days=7), 1)
+
+
+def test_bulk_reversal_is_all_or_nothing(app, client):
+    admin = _setup()
+    headers = _headers(app, admin)
+    first, second, _ = _receipts("REV-A", (8, 15, 22))
+    assert client.post("/admin/payments/reverse-batch", headers=headers, json={"payment_ids": [first.id], "reason": "dup"}).status_code == 200
+    journals = AccountingJournalEntry.query.count()
+
+    resp = client.post("/admin/payments/reverse-batch", headers=headers, json={"payment_ids": [second.id, first.id], "reason": "again"})
+    assert resp.status_code == 422 and "already reversed" in resp.get_json()["message"]
+    db.session.expire_all()
+    assert db.session.get(Payment, second.id).reversed_at is None and AccountingJournalEntry.query.count() == journals
+    assert client.post("/admin/payments/reverse-batch", headers=headers, json={"payment_ids": [999999], "reason": "x"}).status_code == 404
+    assert client.post("/admin/payments/reverse-batch", headers=headers, json={"reason": "x"}).status_code == 400
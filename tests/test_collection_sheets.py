@@ -148,3 +148,135 @@ def test_historical_clearance_command_defaults_to_preview_and_is_idempotent(app)
         assert repeated.exit_code == 0
         assert "No repair required" in repeated.output
         assert AccountingJournalEntry.query.count() == 1
+
+
+def test_generate_items_bulk_inserts_due_and_overdue_loans(app):
+    from app.collection_sheets import generate_items
+    from app.models import LoanLedger
+
+    with app.app_context():
+        collector = User(email="route@sheet.test", name="Route", role="staff", password_hash="x", is_collector=True)
+        customer_user = User(email="route-customer@sheet.test", name="Customer", role="customer", password_hash="x")
+        db.session.add_all([collector, customer_user]); db.session.flush()
+        customer = Customer(user_id=customer_user.id, customer_code="CUS-ROUTE", full_name="Route Customer")
+        db.session.add(customer); db.session.flush()
+        today = date.today(); loans = []
+        for number, status in (("LN-DUE", "ACTIVE"), ("LN-FUTURE", "ACTIVE"), ("LN-CLOSED", "SETTLED"), ("LN-OFFROUTE", "OVERDUE")):
+            loan = Loan(loan_number=number, customer_id=customer.id, principal_amount=Decimal("2000"), interest_rate=Decimal("10"),
+                        total_days=30, daily_installment=Decimal("100"), total_payable=Decimal("2200"), start_date=today - timedelta(days=20),
+                        end_date=today + timedelta(days=10), status=status, created_by_id=collector.id)
+            db.session.add(loan); db.session.flush(); loans.append(loan)
+            for no, offset in ((1, -14), (2, -7), (3, 7)):
+                due = today + timedelta(days=offset) if number != "LN-FUTURE" else today + timedelta(days=7 * no)
+                db.session.add(LoanLedger(loan_id=loan.id, installment_no=no, due_date=due, period_days=7,
+                                          opening_balance=Decimal("2000"), principal_amount=Decimal("500"), interest_amount=Decimal("50"),
+                                          installment_amount=Decimal("550"), closing_balance=Decimal("1500"),
+                                          principal_paid=Decimal("200") if no == 2 else Decimal("0"),
+                                          status="PARTIAL" if no == 2 else "PENDING"))
+        for loan in loans[:3]:
+            db.session.add(Payment(loan_id=loan.id, amount_collected=Decimal("1"), collected_by_id=collector.id, collector_id=collector.id))
+        sheet = CollectionSheet(sheet_number="CS-ROUTE", collector_id=collector.id, collection_date=today, created_by_id=collector.id)
+        db.session.add(sheet); db.session.flush()
+
+        result = generate_items(sheet)
+        assert result == {"generated": 1, "amount": "900.00"}
+        assert [(i.loan.loan_number, i.amount) for i in sheet.items] == [("LN-DUE", Decimal("900.00"))]
+        assert sheet.gross_collection == Decimal("900.00")
+
+        assert generate_items(sheet, route_only=False)["generated"] == 1  # existing lines are skipped
+        assert sorted(i.loan.loan_number for i in sheet.items) == ["LN-DUE", "LN-OFFROUTE"]
+
+
+def test_generate_items_reads_string_flags_as_booleans(app, client):
+    from flask_jwt_extended import create_access_token
+    from app.models import LoanLedger
+
+    admin = User(email="flags@sheet.test", name="Admin", role="admin", password_hash="x")
+    collector = User(email="flags-collector@sheet.test", name="Collector", role="staff", password_hash="x", is_collector=True)
+    customer_user = User(email="flags-customer@sheet.test", name="Customer", role="customer", password_hash="x")
+    db.session.add_all([admin, collector, customer_user]); db.session.flush()
+    customer = Customer(user_id=customer_user.id, customer_code="CUS-FLAGS", full_name="Flag Customer")
+    db.session.add(customer); db.session.flush()
+    today = date.today()
+    # Nobody on the collector's route has paid this loan, so only route_only=false picks it up.
+    loan = Loan(loan_number="LN-FLAGS", customer_id=customer.id, principal_amount=Decimal("500"), interest_rate=Decimal("10"), total_days=7,
+                daily_installment=Decimal("0"), total_payable=Decimal("550"), start_date=today - timedelta(days=7), end_date=today,
+                status="ACTIVE", created_by_id=admin.id)
+    db.session.add(loan); db.session.flush()
+    db.session.add(LoanLedger(loan_id=loan.id, installment_no=1, due_date=today, period_days=7, opening_balance=Decimal("500"),
+                              principal_amount=Decimal("500"), interest_amount=Decimal("50"), installment_amount=Decimal("550"),
+                              closing_balance=Decimal("0"), status="PENDING"))
+    db.session.commit()
+    headers = {"Authorization": f"Bearer {create_access_token(identity=str(admin.id), additional_claims={'role': 'admin'})}"}
+
+    created = client.post("/admin/collection-sheets", headers=headers, json={"collector_id": collector.id, "collection_date": today.isoformat(),
+                                                                              "generate_items": "false", "route_only": "false"})
+    assert created.status_code == 201 and created.get_json()["generated"] is None
+    sheet_id = created.get_json()["id"]
+    on_route = client.post(f"/admin/collection-sheets/{sheet_id}/generate-items", headers=headers, json={"route_only": "true"})
+    assert on_route.get_json()["generated"]["generated"] == 0
+    everyone = client.post(f"/admin/collection-sheets/{sheet_id}/generate-items", headers=headers, json={"route_only": "false"})
+    assert everyone.get_json()["generated"]["generated"] == 1
+
+
+def test_loan_search_uses_prefix_tokens_ranks_and_aggregates_dues(app):
+    from app.collection_sheets import search_loans
+    from app.loan_totals import loan_totals
+    from app.models import LoanSearchToken
+
+    with app.app_context():
+        officer = User(email="search@sheet.test", name="Search", role="staff", password_hash="x")
+        users = [User(email=f"search-{i}@sheet.test", name="Customer", role="customer", password_hash="x") for i in range(2)]
+        db.session.add_all([officer, *users]); db.session.flush()
+        nimal = Customer(user_id=users[0].id, customer_code="CUS-SRCH-1", full_name="Nimal Perera", nic_number="901234567V", mobile="0771234567")
+        kamal = Customer(user_id=users[1].id, customer_code="CUS-SRCH-2", full_name="Kamal Silva", mobile="0719876543")
+        db.session.add_all([nimal, kamal]); db.session.flush()
+        loans = {}
+        for number, customer, status in (("GL-1001", nimal, "ACTIVE"), ("GL-10011", kamal, "ACTIVE"), ("GL-1002", nimal, "SETTLED")):
+            loans[number] = Loan(loan_number=number, customer_id=customer.id, principal_amount=Decimal("1000"), interest_rate=Decimal("10"),
+                                 total_days=30, daily_installment=Decimal("40"), total_payable=Decimal("1100"), start_date=date.today(),
+                                 end_date=date.today() + timedelta(days=30), status=status, created_by_id=officer.id)
+        db.session.add_all(loans.values()); db.session.flush()
+        db.session.add(Payment(loan_id=loans["GL-1001"].id, amount_collected=Decimal("250"), collected_by_id=officer.id, status="POSTED"))
+        db.session.commit()
+        assert LoanSearchToken.query.filter_by(loan_id=loans["GL-1001"].id, token="gl1001").count() == 1
+
+        assert [r["loan_number"] for r in search_loans("gl-1001")] == ["GL-1001", "GL-10011"]  # exact identifier first
+        assert [r["loan_number"] for r in search_loans("nim per")] == ["GL-1001", "GL-1002"]  # eligible before settled
+        assert [r["loan_number"] for r in search_loans("771234")] == ["GL-1001", "GL-1002"]
+        assert [r["loan_number"] for r in search_loans("GL", limit=1)] == ["GL-1001"]
+        assert search_loans("  ") == [] and search_loans("zzz") == []
+        hit = search_loans("GL-1001")[0]
+        assert hit["contractual_outstanding"] == f"{loan_totals(db.session.get(Loan, hit['loan_id']))['outstanding_amount']:.2f}" == "850.00"
+
+        kamal.full_name = "Kamal Fernando"; db.session.commit()
+        assert [r["loan_number"] for r in search_loans("fern")] == ["GL-10011"]
+        assert search_loans("silva") == []
+
+
+def test_deploy_tokenizes_loans_that_predate_the_search_index(app):
+    from app.collection_sheets import search_loans
+    from app.models import LoanSearchToken
+
+    with app.app_context():
+        officer = User(email="deploy@sheet.test", name="Deploy", role="staff", password_hash="x")
+        user = User(email="deploy-c@sheet.test", name="Customer", role="customer", password_hash="x")
+        db.session.add_all([officer, user]); db.session.flush()
+        customer = Customer(user_id=user.id, customer_code="CUS-DPLY-1", full_name="Sunil Jayasuriya", mobile="0775550001")
+        db.session.add(customer); db.session.flush()
+        loans = [Loan(loan_number=number, customer_id=customer.id, principal_amount=Decimal("1000"), interest_rate=Decimal("10"),
+                      total_days=30, daily_installment=Decimal("40"), total_payable=Decimal("1100"), start_date=date.today(),
+                      end_date=date.today() + timedelta(days=30), status="ACTIVE", created_by_id=officer.id)
+                 for number in ("DP-2001", "DP-2002")]
+        db.session.add_all(loans); db.session.commit()
+        missing_id, indexed_id = loans[0].id, loans[1].id
+        before = LoanSearchToken.query.filter_by(loan_id=indexed_id).count()
+        LoanSearchToken.query.filter_by(loan_id=missing_id).delete(); db.session.commit()  # as left by migration 0054
+        assert [r["loan_number"] for r in search_loans("DP-200")] == ["DP-2002"]
+
+    result = app.test_cli_runner().invoke(args=["rebuild-loan-search-index", "--missing-only", "--batch-size", "1"])
+    assert result.exit_code == 0, result.output
+    assert "'loans': 1," in result.output
+    with app.app_context():
+        assert [r["loan_number"] for r in search_loans("DP-200")] == ["DP-2001", "DP-2002"]
+        assert LoanSearchToken.query.filter_by(loan_id=indexed_id).count() == before  # already indexed loans untouched
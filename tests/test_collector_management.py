@@ -456,3 +456,171 @@ def test_cleared_sheet_payment_is_hidden_and_cannot_be_deposited_again(app, clie
                            json=_deposit_payload(collector, account_id, bank_id, payment_id))
     assert rejected.status_code == 422
     assert "already cleared" in rejected.get_json()["message"]
+
+
+def test_collector_sync_batch_posts_once_and_replays_as_duplicates(app, client):
+    import json
+    from app.collector_sync import sign_batch
+
+    admin, collector, account_id, _bank_id, _payment_id = _deposit_setup(app, client)
+    app.config["COLLECTOR_SYNC_SECRET"] = "sync-secret"
+    source = db.session.get(Payment, _payment_id).loan
+    loan = Loan(loan_number="SYNC-LN", customer_id=source.customer_id, principal_amount=Decimal("3000"),
+                interest_rate=Decimal("0"), total_days=1, payment_interval_days=1, daily_installment=Decimal("3000"),
+                total_payable=Decimal("3000"), start_date=date.today(), end_date=date.today(), status="Active", created_by_id=admin.id)
+    db.session.add(loan); db.session.commit(); loan_id = loan.id
+    today = date.today().isoformat()
+    body = json.dumps({"batch_id": "DEVICE-1", "collector_id": collector.id, "items": [
+        {"idempotency_key": "k-1", "loan_id": loan_id, "amount_collected": "300.00", "collection_date": today},
+        {"idempotency_key": "k-2", "loan_id": loan_id, "amount_collected": "200.00", "collection_date": today},
+        {"idempotency_key": "k-2", "loan_id": loan_id, "amount_collected": "200.00", "collection_date": today},
+        {"idempotency_key": "k-3", "loan_id": 999999, "amount_collected": "10.00", "collection_date": today},
+    ]})
+    headers = {**_headers(app, admin), "Content-Type": "application/json"}
+
+    unsigned = client.post("/staff/collector-sync", headers=headers, data=body)
+    assert unsigned.status_code == 401
+
+    headers["X-Sync-Signature"] = sign_batch(body.encode(), "sync-secret")
+    first = client.post("/staff/collector-sync", headers=headers, data=body).get_json()
+    assert [i["status"] for i in first["items"]] == ["POSTED", "POSTED", "DUPLICATE", "REJECTED"]
+    assert first["items"][1]["payment_id"] == first["items"][2]["payment_id"]
+
+    replay = client.post("/staff/collector-sync", headers=headers, data=body).get_json()
+    assert replay["posted"] == 0
+    assert [i["payment_id"] for i in replay["items"][:3]] == [i["payment_id"] for i in first["items"][:3]]
+    assert Payment.query.filter(Payment.idempotency_key.like("COLLECTOR_SYNC:%")).count() == 2
+    assert Payment.query.filter_by(loan_id=loan_id).count() == 2
+    synced = Payment.query.filter_by(loan_id=loan_id).all()
+    assert {(p.collected_by_id, p.collector_id) for p in synced} == {(admin.id, collector.id)}
+
+
+def test_collector_clearing_balance_is_maintained_through_deposit_and_reversal(app, client):
+    from app.accounting import verify_collector_clearing_balances
+    from app.models import CollectorClearingBalance
+
+    admin, collector, account_id, bank_id, payment_id = _deposit_setup(app, client)
+    headers = _headers(app, admin)
+    row = db.session.get(CollectorClearingBalance, collector.id)
+    assert (row.collections, row.deposits) == (Decimal("2100.00"), Decimal("0.00"))
+
+    posted = client.post("/admin/collection-deposits", headers=headers, json=_deposit_payload(
+        collector, account_id, bank_id, payment_id, allocations=[{"payment_id": payment_id, "amount": "600.00"}]))
+    assert posted.status_code == 201
+    position = client.get(f"/admin/collectors/{collector.id}/cash-position", headers=headers).get_json()
+    assert (position["deposits"], position["closing_balance"]) == ("600.00", "1500.00")
+    assert [p["payment_id"] for p in position["undeposited_payments"]] == [payment_id]
+
+    reversed_ = client.post(f"/admin/collection-deposits/{posted.get_json()['deposit_batch_id']}/reverse",
+                            headers=headers, json={"reason": "Bank slip error"})
+    assert reversed_.status_code == 200
+    db.session.refresh(row)
+    assert row.balance == Decimal("2100.00")
+    assert verify_collector_clearing_balances()["mismatches"] == []
+
+    row.deposits = Decimal("5.00"); db.session.commit()
+    result = app.test_cli_runner().invoke(args=["reconcile-collector-clearing-balances", "--post"])
+    assert result.exit_code == 0 and "'stored_deposits': '5.00'" in result.output
+    assert db.session.get(CollectorClearingBalance, collector.id).deposits == Decimal("0.00")
+
+
+def test_multi_receipt_deposit_uses_grouped_lookups_and_one_allocation_insert(app, client):
+    admin, collector, account_id, bank_id, payment_id = _deposit_setup(app, client)
+    original = db.session.get(Payment, payment_id)
+    extra = []
+    for index in range(3):
+        payment = Payment(
+            loan_id=original.loan_id, collection_date=date.today(), amount_collected=Decimal("10.00"),
+            collected_by_id=admin.id, collection_method="CASH_COLLECTOR", collector_id=collector.id,
+            collection_account_id=account_id, receipt_number=f"BULK-DEP-{index}-{uuid4().hex}",
+            journal_id=original.journal_id, status="POSTED", deposit_status="UNDEPOSITED",
+        )
+        db.session.add(payment); extra.append(payment)
+    db.session.commit()
+    allocations = [{"payment_id": payment_id, "amount": "2100.00"}] + [{"payment_id": p.id, "amount": "10.00"} for p in extra]
+    statements = []
+
+    def record_statement(_conn, _cursor, statement, _parameters, _context, _executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", record_statement)
+    try:
+        response = client.post("/admin/collection-deposits", headers=_headers(app, admin),
+                               json=_deposit_payload(collector, account_id, bank_id, payment_id, allocations=allocations))
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record_statement)
+
+    assert response.status_code == 201
+    assert CollectionDepositAllocation.query.filter_by(deposit_batch_id=response.get_json()["deposit_batch_id"]).count() == 4
+    assert all(db.session.get(Payment, p.id).deposit_status == "DEPOSITED" for p in extra)
+    assert sum("FROM collection_deposit_allocations" in s for s in statements) == 1
+    assert sum(s.lstrip().upper().startswith("INSERT INTO COLLECTION_DEPOSIT_ALLOCATIONS") for s in statements) == 1
+
+
+def test_collector_performance_rollup_is_maintained_and_rebuilt(app, client):
+    from app.models import CollectorDailyPerformance, LoanLedger
+
+    admin, collector, account_id, bank_id, payment_id = _deposit_setup(app, client)
+    headers = _headers(app, admin)
+    row = CollectorDailyPerformance.query.filter_by(collector_id=collector.id, performance_date=date.today()).one()
+    assert (row.expected_amount, row.collected_amount, row.receipt_count, row.visit_count, row.deposited_amount) == (
+        Decimal("3000.00"), Decimal("2100.00"), 1, 1, Decimal("0.00"))
+
+    posted = client.post("/admin/collection-deposits", headers=headers, json=_deposit_payload(
+        collector, account_id, bank_id, payment_id, allocations=[{"payment_id": payment_id, "amount": "600.00"}]))
+    assert posted.status_code == 201
+    db.session.refresh(row)
+    assert row.deposited_amount == Decimal("600.00")
+
+    report = client.get("/admin/collectors/performance", headers=headers,
+                        query_string={"date_from": date.today().isoformat(), "collector_id": collector.id}).get_json()
+    assert report["pagination"]["total_items"] == 1
+    item = report["items"][0]
+    assert (item["collector_id"], item["collected_amount"], item["undeposited_amount"], item["average_deposit_lag_days"]) == (
+        collector.id, "2100.00", "1500.00", "0.00")
+    daily = client.get(f"/admin/collectors/{collector.id}/performance", headers=headers).get_json()
+    assert [d["performance_date"] for d in daily["items"]] == [date.today().isoformat()]
+    assert daily["totals"]["receipt_count"] == 1
+    assert client.get("/admin/collectors/performance?date_from=bad", headers=headers).status_code == 400
+
+    # Instalments added outside a posting path are picked up by the rebuild, which also repairs drift.
+    loan_id = db.session.get(Payment, payment_id).loan_id
+    db.session.add(LoanLedger(loan_id=loan_id, installment_no=99, due_date=date.today(), period_days=1, opening_balance=Decimal("3000.00"),
+                              principal_amount=Decimal("3000.00"), interest_amount=Decimal("0.00"), installment_amount=Decimal("3000.00"),
+                              closing_balance=Decimal("0.00"), status="PENDING"))
+    row.collected_amount = Decimal("1.00"); db.session.commit()
+    result = app.test_cli_runner().invoke(args=["rebuild-collector-performance", "--collector-id", str(collector.id)])
+    assert result.exit_code == 0 and "'rows': 1" in result.output
+    row = CollectorDailyPerformance.query.filter_by(collector_id=collector.id, performance_date=date.today()).one()
+    assert (row.expected_amount, row.collected_amount) == (Decimal("6000.00"), Decimal("2100.00"))
+
+
+def test_collector_sync_stores_only_the_installments_a_receipt_reaches_on_compact_loans(app, client):
+    import json
+    from datetime import timedelta
+    from app.collector_sync import sign_batch
+    from app.loan_ledger import generate_loan_ledger
+    from app.models import LoanLedger
+
+    admin, collector, _account_id, _bank_id, _payment_id = _deposit_setup(app, client)
+    app.config["COLLECTOR_SYNC_SECRET"] = "sync-secret"
+    source = db.session.get(Payment, _payment_id).loan
+    start = date.today() - timedelta(days=10)
+    loan = Loan(loan_number="SYNC-RULE", customer_id=source.customer_id, principal_amount=Decimal("15000.00"), interest_rate=Decimal("26"),
+                total_days=63, daily_installment=Decimal("0"), total_payable=Decimal("18900.00"), start_date=start,
+                end_date=start + timedelta(days=63), status="ACTIVE", created_by_id=admin.id, term_type="DAYS", term_value=63,
+                repayment_frequency="WEEKLY", number_of_installments=9, installment_count=9, installment_amount=Decimal("2100.00"),
+                total_interest=Decimal("3900.00"), total_repayment=Decimal("18900.00"))
+    db.session.add(loan); db.session.flush()
+    generate_loan_ledger(loan, compact=True)
+    db.session.commit(); loan_id = loan.id
+    body = json.dumps({"batch_id": "DEVICE-RULE", "collector_id": collector.id, "items": [
+        {"idempotency_key": "rule-1", "loan_id": loan_id, "amount_collected": "2100.00", "collection_date": date.today().isoformat()},
+    ]})
+    headers = {**_headers(app, admin), "Content-Type": "application/json"}
+    headers["X-Sync-Signature"] = sign_batch(body.encode(), "sync-secret")
+    result = client.post("/staff/collector-sync", headers=headers, data=body).get_json()
+    assert [i["status"] for i in result["items"]] == ["POSTED"]
+    stored = LoanLedger.query.filter_by(loan_id=loan_id).count()
+    assert 0 < stored < 9
+    assert db.session.get(Loan, loan_id).compact_schedule
@@ -0,0 +1,84 @@
+import threading
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import func
+from sqlalchemy.exc import OperationalError
+
+from app.accounting import seed_default_accounts
+from app.extensions import db
+from app.loan_locks import run_with_retry
+from app.models import Customer, Loan, LoanLedger, Payment, PaymentAllocation, User
+
+START = date(2026, 1, 1)
+
+
+def _setup(app):
+    seed_default_accounts()
+    admin = User(email="concurrent@example.com", name="Concurrent", role="admin"); admin.set_password("password")
+    db.session.add(admin); db.session.flush()
+    customer = Customer(user_id=admin.id, customer_code="CONC", full_name="Concurrent Customer")
+    db.session.add(customer); db.session.flush()
+    loan_ids = []
+    for number in ("CONC-SAME", "CONC-OTHER"):
+        loan = Loan(loan_number=number, customer_id=customer.id, principal_amount=Decimal("10000"), interest_rate=Decimal("10"), total_days=70,
+                    payment_interval_days=7, daily_installment=Decimal("0"), total_payable=Decimal("11000"), start_date=START,
+                    end_date=START + timedelta(days=70), created_by_id=admin.id, status="ACTIVE", interest_accounting_method="CASH_BASIS")
+        db.session.add(loan); db.session.flush()
+        db.session.add_all([LoanLedger(loan_id=loan.id, installment_no=i, due_date=START + timedelta(days=7 * i), period_days=7, opening_balance=Decimal("10000"),
+                                       principal_amount=Decimal("1000"), interest_amount=Decimal("100"), installment_amount=Decimal("1100"),
+                                       closing_balance=Decimal("0"), status="PENDING") for i in range(1, 11)])
+        loan_ids.append(loan.id)
+    db.session.commit()
+    token = create_access_token(identity=str(admin.id), additional_claims={"role": admin.role})
+    return {"Authorization": f"Bearer {token}"}, loan_ids
+
+
+def test_concurrent_receipts_on_one_loan_never_double_allocate(app):
+    headers, (same, other) = _setup(app)
+    targets = [same] * 8 + [other] * 4
+    start, statuses = threading.Barrier(len(targets)), []
+
+    def pay(loan_id):
+        client = app.test_client()
+        start.wait()
+        resp = client.post("/staff/payments", headers=headers, json={"loan_id": loan_id, "amount_collected": "550", "collection_date": "2026-01-08", "payment_method": "Cash"})
+        statuses.append(resp.status_code)
+
+    threads = [threading.Thread(target=pay, args=(loan_id,)) for loan_id in targets]
+    for thread in threads: thread.start()
+    for thread in threads: thread.join()
+    assert statuses == [200] * len(targets)
+
+    db.session.expire_all()
+    for loan_id, receipts in ((same, 8), (other, 4)):
+        rows = LoanLedger.query.filter_by(loan_id=loan_id).order_by(LoanLedger.installment_no).all()
+        allocated = dict(db.session.query(PaymentAllocation.ledger_id, func.sum(PaymentAllocation.amount)).filter(
+            PaymentAllocation.loan_id == loan_id).group_by(PaymentAllocation.ledger_id).all())
+        # Every allocation landed on the ledger: no receipt paid an installment another one had already paid.
+        assert all(Decimal(allocated.get(r.id, 0)) == r.paid_amount for r in rows)
+        assert sum(r.paid_amount for r in rows) == Decimal("550") * receipts
+        assert [r.status for r in rows[:receipts // 2 + 1]] == ["PAID"] * (receipts // 2) + ["PENDING"]
+        assert Payment.query.filter_by(loan_id=loan_id).count() == receipts
+
+
+def test_retry_reruns_the_transaction_on_a_serialization_failure(app):
+    attempts = []
+
+    def work():
+        attempts.append(1)
+        if len(attempts) < 3: raise OperationalError("UPDATE loans", {}, Exception("database is locked"))
+        return "done"
+
+    assert run_with_retry(work, base_delay=0) == "done" and len(attempts) == 3
+    attempts.clear()
+
+    def broken():
+        attempts.append(1)
+        raise OperationalError("SELECT 1", {}, Exception("no such table: loans"))
+
+    with pytest.raises(OperationalError):
+        run_with_retry(broken, base_delay=0)
+    assert len(attempts) == 1
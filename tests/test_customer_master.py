@@ -24,3 +24,63 @@ def test_legacy_address_backfill_is_safe_and_idempotent(app):
         assert c.current_address_line1 == "Unstructured address" and c.current_city is None
         assert c.address_backfill_review_required and not apply_backfill(c)['changes']
         assert report['warnings']
+
+def test_customer_360_loads_in_fixed_queries_and_revalidates_with_etag(app, client):
+    from decimal import Decimal
+    from flask_jwt_extended import create_access_token
+    from sqlalchemy import event
+    from app.models import Loan, Payment
+    with app.app_context():
+        c=make_customer()
+        loans=[Loan(loan_number=f"LN-360-{i}", customer_id=c.id, principal_amount=Decimal("1000"), interest_rate=Decimal("10"), total_days=30, daily_installment=Decimal("36.67"), total_payable=Decimal("1100"), start_date=date(2026,7,1), end_date=date(2026,7,30), status="ACTIVE", created_by_id=c.user_id) for i in range(4)]
+        db.session.add_all(loans); db.session.flush()
+        db.session.add_all([Payment(loan_id=loan.id, amount_collected=Decimal("100"), collected_by_id=c.user_id, collection_date=date(2026,7,2), status="POSTED") for loan in loans])
+        db.session.add(LoanApplication(customer_id=c.id, application_number="APP-360", loan_type="GROW_BUSINESS", status="SUBMITTED", applied_amount=Decimal("5000"), tenure_months=1, full_name="Master", nic_number="NIC1", mobile_number="071")); db.session.commit()
+        token=create_access_token(identity=str(c.user_id), additional_claims={"role": "staff"})
+        headers={"Authorization": f"Bearer {token}"}
+        customer_id, user_id = c.id, c.user_id
+
+        def fetch():
+            statements=[]
+            listener=lambda *args: statements.append(args[2])
+            event.listen(db.engine, "before_cursor_execute", listener)
+            try: response=client.get(f"/customers/{customer_id}/360", headers=headers)
+            finally: event.remove(db.engine, "before_cursor_execute", listener)
+            return response, len(statements)
+        first, queries=fetch()
+        assert first.status_code == 200
+        body=first.get_json()
+        assert [l["outstanding"] for l in body["loans"]] == ["1000.00"]*4 and body["totals"]["total_outstanding"] == "4000.00"
+        assert body["applications"][0]["application_number"] == "APP-360" and len(body["recent_payments"]) == 4
+        # The statement count does not grow with the number of loans.
+        db.session.add_all([Loan(loan_number=f"LN-360-X{i}", customer_id=customer_id, principal_amount=Decimal("10"), interest_rate=Decimal("0"), total_days=1, daily_installment=Decimal("10"), total_payable=Decimal("10"), start_date=date(2026,7,1), end_date=date(2026,7,1), status="ACTIVE", created_by_id=user_id) for i in range(3)]); db.session.commit()
+        first, more_loans_queries=fetch()
+        assert len(first.get_json()["loans"]) == 7 and more_loans_queries == queries
+        etag=first.headers["ETag"]
+        cached=client.get(f"/customers/{customer_id}/360", headers={**headers, "If-None-Match": etag})
+        assert cached.status_code == 304 and cached.data == b""
+        payment=Payment.query.filter_by(loan_id=loans[0].id).first(); payment.status="REVERSED"; db.session.commit()
+        changed=client.get(f"/customers/{customer_id}/360", headers={**headers, "If-None-Match": etag})
+        assert changed.status_code == 200 and changed.headers["ETag"] != etag
+        assert client.get("/customers/999999/360", headers=headers).status_code == 404
+
+def test_customer_360_etag_changes_with_application_documents_and_the_user(app, client):
+    from decimal import Decimal
+    from flask_jwt_extended import create_access_token
+    from app.models import LoanApplicationDocument
+    with app.app_context():
+        c=make_customer()
+        application=LoanApplication(customer_id=c.id, application_number="APP-360-DOC", loan_type="GROW_BUSINESS", status="SUBMITTED", applied_amount=Decimal("5000"), tenure_months=1, full_name="Master", nic_number="NIC1", mobile_number="071")
+        db.session.add(application); db.session.commit()
+        headers={"Authorization": f"Bearer {create_access_token(identity=str(c.user_id), additional_claims={'role': 'staff'})}"}
+        url=f"/customers/{c.id}/360"
+        etag=client.get(url, headers=headers).headers["ETag"]
+
+        db.session.add(LoanApplicationDocument(loan_application_id=application.id, document_type="NIC_FRONT", file_path="docs/nic.jpg")); db.session.commit()
+        response=client.get(url, headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 200 and response.get_json()["applications"][0]["documents"][0]["document_type"] == "NIC_FRONT"
+        etag=response.headers["ETag"]
+
+        c.user.email="renamed@example.test"; db.session.commit()
+        response=client.get(url, headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 200 and response.get_json()["profile"]["fields"]["email"]["value"] == "renamed@example.test"
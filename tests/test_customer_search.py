@@ -130,3 +130,103 @@ def test_customer_search_limit_is_capped(app, client):
 
     assert resp.status_code == 200
     assert len(resp.get_json()["items"]) <= 20
+
+
+def test_customer_identity_columns_serve_search_dedup_and_backfill(app, client):
+    admin = _user()
+    old_format = _customer("GROW-CUS-000020", "Old Format", "901234567v", "+94 (77) 123-4567")
+    assert (old_format.nic_canonical, old_format.mobile_e164) == ("199012304567", "+94771234567")
+
+    # Either NIC spelling and a partial number without the trunk prefix hit the normalized columns.
+    for q in ("199012304567", "90123", "771234"):
+        resp = client.get(f"/admin/customers/search?q={q}", headers=_headers(app, admin))
+        assert [item["id"] for item in resp.get_json()["items"]] == [old_format.id]
+
+    duplicate = client.post("/admin/customers", headers=_headers(app, admin), json={
+        "user": {"email": "dup-nic@example.com", "password": "password"},
+        "customer": {"customer_code": "GROW-CUS-000021", "full_name": "Same Person", "nic_number": "1990 1230 4567"}})
+    assert duplicate.status_code == 409
+    assert duplicate.get_json()["customer_id"] == old_format.id
+
+    db.session.execute(db.update(Customer).values(nic_canonical=None, mobile_e164=None)); db.session.commit()
+    result = app.test_cli_runner().invoke(args=["backfill-customer-identity", "--post"])
+    assert result.exit_code == 0 and "'changed': 1" in result.output
+    db.session.refresh(old_format)
+    assert old_format.mobile_e164 == "+94771234567"
+
+
+def test_migration_backfills_identity_columns_and_dedup_checks_rows_it_has_not_reached(app, client):
+    import importlib.util
+    from pathlib import Path
+
+    admin = _user()
+    legacy = _customer("GROW-CUS-000022", "Legacy Row", "901234567V", "077 123 4567")
+    db.session.execute(db.update(Customer).values(nic_canonical=None, mobile_e164=None, guarantor_mobile_e164=None)); db.session.commit()
+
+    def found(q):
+        resp = client.get(f"/admin/customers/search?q={q}", headers=_headers(app, admin))
+        return [item["id"] for item in resp.get_json()["items"]]
+
+    # Search only reads the normalized columns; the duplicate-NIC check also compares the raw NIC.
+    assert found("901234567v") == []
+    duplicate = client.post("/admin/customers", headers=_headers(app, admin), json={
+        "user": {"email": "dup-legacy@example.com", "password": "password"},
+        "customer": {"customer_code": "GROW-CUS-000023", "full_name": "Same Person", "nic_number": "901234567V"}})
+    assert duplicate.status_code == 409
+
+    path = Path(__file__).resolve().parents[1] / "migrations" / "versions" / "0055_customer_identity_columns.py"
+    spec = importlib.util.spec_from_file_location("customer_identity_migration", path)
+    migration = importlib.util.module_from_spec(spec); spec.loader.exec_module(migration)
+    migration._backfill(db.session.connection())
+    db.session.commit()
+    db.session.refresh(legacy)
+    assert (legacy.nic_canonical, legacy.mobile_e164) == ("199012304567", "+94771234567")
+    assert found("901234567v") == found("94771234567") == [legacy.id]
+
+
+def test_global_search_returns_ranked_typed_results_from_index(app, client):
+    from datetime import date
+    from decimal import Decimal
+
+    from app.models import Lead, Loan, SearchDocument
+
+    admin = _user()
+    customer = _customer("GROW-CUS-000030", "Nimal Perera", "901234567V", "0771112223")
+    db.session.add(Lead(name="Nimal Lead", mobile="0779998887", status="NEW"))
+    db.session.add(Loan(loan_number="GL-7788", customer_id=customer.id, principal_amount=Decimal("1000"), interest_rate=Decimal("10"),
+                        total_days=30, daily_installment=Decimal("40"), total_payable=Decimal("1100"), start_date=date.today(),
+                        end_date=date.today(), status="ACTIVE", created_by_id=admin.id))
+    db.session.commit()
+
+    def hits(query):
+        resp = client.get("/search", headers=_headers(app, admin), query_string={"q": query})
+        assert resp.status_code == 200
+        return [(item["entity_type"], item["title"]) for item in resp.get_json()["items"]]
+
+    assert sorted(hits("nimal")) == [("CUSTOMER", "Nimal Perera"), ("LEAD", "Nimal Lead"), ("LOAN", "GL-7788")]
+    assert sorted(hits("nimal per")) == [("CUSTOMER", "Nimal Perera"), ("LOAN", "GL-7788")]
+    assert hits("gl7788") == hits("GL-7788") == [("LOAN", "GL-7788")]
+    assert hits("0779998887") == [("LEAD", "Nimal Lead")]
+    typed = client.get("/search?q=nimal&types=loan", headers=_headers(app, admin)).get_json()["items"]
+    assert [(i["entity_type"], i["subtitle"]) for i in typed] == [("LOAN", "Nimal Perera")]
+    assert client.get("/search?q=nimal&types=invoice", headers=_headers(app, admin)).status_code == 400
+
+    customer.full_name = "Sunil Perera"; db.session.commit()
+    assert sorted(hits("sunil")) == [("CUSTOMER", "Sunil Perera"), ("LOAN", "GL-7788")]
+
+    SearchDocument.query.delete(); db.session.commit()
+    result = app.test_cli_runner().invoke(args=["rebuild-search-index"])
+    assert result.exit_code == 0 and "'LOAN': 1" in result.output
+    assert hits("GL-7788") == [("LOAN", "GL-7788")]
+
+
+def test_deploy_rebuild_fills_only_entity_types_missing_from_the_index(app, client):
+    from app.models import SearchDocument
+
+    _customer("GROW-CUS-000040", "Ruwan Jayasinghe", "881234567V", "0715556667")
+    SearchDocument.query.delete(); db.session.commit()
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=["rebuild-search-index", "--missing-only"])
+    assert result.exit_code == 0 and "'CUSTOMER': 1" in result.output and "LOAN" not in result.output
+    assert SearchDocument.query.filter_by(entity_type="CUSTOMER").count() == 1
+    assert runner.invoke(args=["rebuild-search-index", "--missing-only"]).output.strip() == "Search index is up to date."
@@ -59,3 +59,66 @@ def test_journal_list_rejects_invalid_date_ranges_and_ids(app, client):
     assert invalid_date.get_json() == {"error": "invalid_date_range", "message": "Date From cannot be later than Date To."}
     invalid_id = client.get("/admin/accounting/journal-entries?account_id=not-an-id", headers=headers)
     assert invalid_id.status_code == 422
+
+
+def test_journal_search_uses_maintained_index_for_lines_and_reversals(app, client):
+    admin = User(email="journal-search@example.com", name="Admin", role="admin"); admin.set_password("password")
+    customer_user = User(email="journal-search-customer@example.com", name="Customer", role="customer"); customer_user.set_password("password")
+    db.session.add_all([admin, customer_user]); db.session.flush()
+    customer = Customer(user_id=customer_user.id, customer_code="CUST-SRCH", full_name="Nimali Perera", status="Active")
+    account = AccountingAccount(account_code="1100", account_name="Loans Receivable", account_type="ASSET", normal_balance="DEBIT")
+    db.session.add_all([customer, account]); db.session.flush()
+    loan = Loan(loan_number="LN-7781", customer_id=customer.id, principal_amount=Decimal("100"), interest_rate=Decimal("1"), total_days=1, daily_installment=Decimal("100"), total_payable=Decimal("101"), start_date=date(2026, 7, 1), end_date=date(2026, 7, 2), created_by_id=admin.id)
+    db.session.add(loan); db.session.flush()
+    original = _journal("J-ORIG-1", date(2026, 7, 10), "REVERSED", account, customer, loan, "Disbursement")
+    db.session.commit()
+    reversal = _journal("J-REV-1", date(2026, 7, 11), "POSTED", account, customer, loan, "Reversal")
+    reversal.reversal_of_id = original.id
+    db.session.commit()
+    headers = _headers(app, admin)
+
+    def found(term):
+        response = client.get(f"/admin/accounting/journal-entries?search={term}", headers=headers)
+        assert response.status_code == 200
+        return sorted(item["journal_number"] for item in response.get_json()["items"])
+
+    assert found("ln7781") == ["J-ORIG-1", "J-REV-1"]
+    assert found("nimali per") == ["J-ORIG-1", "J-REV-1"]
+    # The original is found by its reversal's number and vice versa.
+    assert found("J-REV") == ["J-ORIG-1", "J-REV-1"]
+    assert found("disburse") == ["J-ORIG-1"]
+    assert found("1100") == found("loans receiv") == ["J-ORIG-1", "J-REV-1"]
+    assert db.session.get(AccountingJournalEntry, original.id).search_vector
+
+    customer.full_name = "Nimali Fernando"; db.session.commit()
+    assert found("fernando") == ["J-ORIG-1", "J-REV-1"]
+    assert found("perera") == []
+
+
+def test_migration_backfills_the_search_vector_of_existing_journals(app):
+    import importlib.util
+    from pathlib import Path
+
+    admin = User(email="journal-vector@example.com", name="Admin", role="admin"); admin.set_password("password")
+    customer_user = User(email="journal-vector-customer@example.com", name="Customer", role="customer"); customer_user.set_password("password")
+    db.session.add_all([admin, customer_user]); db.session.flush()
+    customer = Customer(user_id=customer_user.id, customer_code="CUST-VEC", full_name="Kamal Silva", status="Active")
+    account = AccountingAccount(account_code="4100", account_name="Interest Income", account_type="INCOME", normal_balance="CREDIT")
+    db.session.add_all([customer, account]); db.session.flush()
+    loan = Loan(loan_number="LN-9901", customer_id=customer.id, principal_amount=Decimal("100"), interest_rate=Decimal("1"), total_days=1, daily_installment=Decimal("100"), total_payable=Decimal("101"), start_date=date(2026, 7, 1), end_date=date(2026, 7, 2), created_by_id=admin.id)
+    db.session.add(loan); db.session.flush()
+    original = _journal("J-VEC-1", date(2026, 7, 10), "REVERSED", account, customer, loan, "Interest accrual")
+    db.session.commit()
+    reversal = _journal("J-VEC-2", date(2026, 7, 11), "POSTED", account, customer, loan, "Reversal")
+    reversal.reversal_of_id = original.id
+    db.session.commit()
+    expected = dict(db.session.query(AccountingJournalEntry.id, AccountingJournalEntry.search_vector))
+    assert "4100" in expected[original.id].split()
+
+    path = Path(__file__).resolve().parents[1] / "migrations" / "versions" / "0057_journal_search_vector.py"
+    spec = importlib.util.spec_from_file_location("journal_search_vector_migration", path)
+    migration = importlib.util.module_from_spec(spec); spec.loader.exec_module(migration)
+    db.session.execute(db.update(AccountingJournalEntry).values(search_vector=None))
+    migration._backfill(db.session.connection())
+    db.session.commit(); db.session.expire_all()
+    assert dict(db.session.query(AccountingJournalEntry.id, AccountingJournalEntry.search_vector)) == expected
@@ -0,0 +1,81 @@
+from datetime import datetime
+
+from flask_jwt_extended import create_access_token
+
+from app.extensions import db
+from app.models import Customer, Lead, User
+
+
+def _headers(app, user):
+    with app.app_context():
+        token = create_access_token(identity=str(user.id), additional_claims={"role": user.role})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _pages(client, url, headers=None):
+    seen, cursor = [], None
+    while True:
+        response = client.get(url + (f"&cursor={cursor}" if cursor else ""), headers=headers)
+        assert response.status_code == 200
+        seen.append([item["id"] for item in response.get_json()])
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor: return seen
+
+
+def test_leads_page_by_created_at_and_id_without_gaps_or_duplicates(client):
+    # Identical timestamps exercise the id tie-breaker inside the cursor.
+    stamp = datetime(2026, 7, 1, 9, 30)
+    leads = [Lead(name=f"Lead {i}", mobile=f"07700000{i:02d}", created_at=stamp if i % 2 else datetime(2026, 7, i + 1)) for i in range(7)]
+    db.session.add_all(leads); db.session.commit()
+    expected = [lead.id for lead in sorted(leads, key=lambda lead: (lead.created_at, lead.id), reverse=True)]
+
+    pages = _pages(client, "/leads?limit=3")
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert [lead_id for page in pages for lead_id in page] == expected
+
+    # The offset fallback still works and returns the same ordering.
+    assert [item["id"] for item in client.get("/leads?page=2&page_size=3").get_json()] == expected[3:6]
+    assert client.get("/leads?cursor=not-a-cursor").status_code == 422
+    assert client.get("/leads?limit=0").status_code == 422
+
+
+def test_rows_without_a_sort_key_are_paged_last_on_the_raw_column(client):
+    from sqlalchemy import event
+
+    leads = [Lead(name=f"Lead {i}", mobile=f"07710000{i:02d}", created_at=datetime(2026, 7, i + 1)) for i in range(3)]
+    db.session.add_all(leads); db.session.commit()
+    undated = [Lead(name=f"Undated {i}", mobile=f"07720000{i:02d}") for i in range(3)]
+    db.session.add_all(undated); db.session.flush()
+    db.session.execute(db.update(Lead).where(Lead.id.in_([lead.id for lead in undated])).values(created_at=None)); db.session.commit()
+    expected = [lead.id for lead in reversed(leads)] + sorted((lead.id for lead in undated), reverse=True)
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.engine, "before_cursor_execute", listener)
+    try: pages = _pages(client, "/leads?limit=2")
+    finally: event.remove(db.engine, "before_cursor_execute", listener)
+    assert [len(page) for page in pages] == [2, 2, 2]
+    assert [lead_id for page in pages for lead_id in page] == expected
+    # The sort key stays a bare column so the (created_at, id) index can order the page.
+    lists = [sql for sql in statements if "FROM leads" in sql]
+    assert lists and all("NULLS LAST" in sql and "coalesce" not in sql.lower() for sql in lists)
+
+
+def test_staff_customers_and_investor_reports_are_bounded(app, client):
+    staff = User(email="pager-staff@example.com", name="Staff", role="admin"); staff.set_password("password")
+    db.session.add(staff); db.session.flush()
+    for i in range(5):
+        user = User(email=f"pager-{i}@example.com", name=f"Customer {i}", role="customer"); user.set_password("password")
+        db.session.add(user); db.session.flush()
+        db.session.add(Customer(user_id=user.id, customer_code=f"PAGE-{i}", full_name=f"Customer {i}", status="Active"))
+    db.session.commit()
+    headers = _headers(app, staff)
+
+    pages = _pages(client, "/staff/customers?limit=2", headers)
+    assert [len(page) for page in pages] == [2, 2, 1]
+    ids = [customer_id for page in pages for customer_id in page]
+    assert ids == sorted(ids) and len(set(ids)) == 5
+
+    report = client.get("/admin/reports/investor-funding?limit=10", headers=headers)
+    assert report.status_code == 200
+    assert report.get_json() == {"items": [], "next_cursor": None, "limit": 10}
@@ -0,0 +1,50 @@
+"""The 0060 migration fills loan_list_view with the rows the app itself would build."""
+import importlib.util
+from datetime import date, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+
+from app.extensions import db
+from app.models import Customer, Loan, LoanLedger, LoanListView, Payment, User
+
+MIGRATION_PATH = Path(__file__).resolve().parents[1] / "migrations" / "versions" / "0060_loan_list_view.py"
+spec = importlib.util.spec_from_file_location("loan_list_view_migration", MIGRATION_PATH)
+migration = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(migration)
+
+COLUMNS = [c.name for c in LoanListView.__table__.columns if c.name != "refreshed_at"]
+
+
+def _rows():
+    db.session.expire_all()
+    return {r.loan_id: tuple(getattr(r, c) for c in COLUMNS) for r in LoanListView.query}
+
+
+def test_migration_populates_the_view_for_existing_loans(app):
+    user = User(email="view-migration@example.com", name="View", role="admin"); user.set_password("password")
+    db.session.add(user); db.session.flush()
+    customer = Customer(user_id=user.id, customer_code="VIEW-MIG", full_name="View Customer", mobile="0771234567")
+    db.session.add(customer); db.session.flush()
+    start = date(2026, 1, 1)
+    for n, status in ((1, "ACTIVE"), (2, "settled ")):
+        loan = Loan(loan_number=f"VIEW-{n}", customer_id=customer.id, principal_amount=Decimal("1000"), interest_rate=Decimal("10"), total_days=14,
+                    payment_interval_days=7, daily_installment=Decimal("0"), total_payable=Decimal("1100"), start_date=start,
+                    end_date=start + timedelta(days=14), created_by_id=user.id, status=status)
+        db.session.add(loan); db.session.flush()
+        db.session.add_all([LoanLedger(loan_id=loan.id, installment_no=i, due_date=start + timedelta(days=7 * i), period_days=7, opening_balance=Decimal("1000"),
+                                       principal_amount=Decimal("500"), interest_amount=Decimal("50"), installment_amount=Decimal("550"),
+                                       closing_balance=Decimal("0"), status="PAID" if n == 2 else "PENDING") for i in (1, 2)])
+        db.session.add(Payment(loan_id=loan.id, amount_collected=Decimal("1100") if n == 2 else Decimal("200"), collection_date=start + timedelta(days=3),
+                               collected_by_id=user.id, payment_method="CASH", status="POSTED"))
+    db.session.commit()
+    expected = _rows()
+    assert len(expected) == 2
+
+    db.session.query(LoanListView).delete(); db.session.commit()
+    with Operations.context(MigrationContext.configure(db.session.connection())):
+        migration._populate()
+    db.session.commit()
+    assert _rows() == expected
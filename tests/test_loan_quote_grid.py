@@ -0,0 +1,81 @@
+from datetime import date
+from decimal import Decimal
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from app.accounting import calculate_disbursement_charges, seed_disbursement_settings
+from app.extensions import db
+from app.loan_terms import calculate_flat_term_amounts, resolve_loan_term
+from app.models import Customer, DisbursementChargeType, User
+
+
+def _headers(app, user):
+    with app.app_context():
+        token = create_access_token(identity=str(user.id), additional_claims={"role": user.role})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _setup():
+    seed_disbursement_settings()
+    staff = User(email="quote-staff@example.com", name="Quote Staff", role="staff"); staff.set_password("password")
+    owner = User(email="quote-customer@example.com", name="Quote Customer", role="customer"); owner.set_password("password")
+    db.session.add_all([staff, owner]); db.session.flush()
+    customer = Customer(user_id=owner.id, customer_code="QUOTE-1", full_name="Quote Customer", status="Active")
+    doc = DisbursementChargeType.query.filter_by(code="DOC_FEE").one()
+    # Percentage and tax-inclusive rounding is where a re-implementation would drift from the scalar path.
+    service = DisbursementChargeType(code="SVC_FEE", name="Service fee", calculation_method="PERCENTAGE_OF_PRINCIPAL", default_rate=Decimal("1.3333"),
+                                     accounting_treatment="INCOME", income_account_id=doc.income_account_id, tax_method="TAX_INCLUSIVE", tax_rate=Decimal("18"))
+    db.session.add_all([customer, service]); db.session.commit()
+    return staff, customer, [{"charge_type_id": doc.id, "amount": doc.default_amount}, {"charge_type_id": service.id}]
+
+
+def test_quote_grid_matches_scalar_calculations_with_one_catalog_load(app, client):
+    staff, customer, charges = _setup()
+    amounts = ["10000", "12345.67", "15000", "20000", "25000.01", "33333.33", "50000", "75000", "99999.99", "100000"]
+    terms = [{"term_type": "DAYS", "term_value": 30}, {"term_type": "DAYS", "term_value": 63},
+             {"term_type": "MONTHS", "term_value": 6}, {"term_type": "MONTHS", "term_value": 13}]
+    payload = {"customer_id": customer.id, "loan_type": "GROW_BUSINESS", "terms": terms, "repayment_frequencies": ["DAILY", "WEEKLY", "MONTHLY"],
+               "interest_rate": "26.5", "interest_rate_basis": "FLAT_TERM", "start_date": "2026-01-31",
+               "charges": [{"charge_type_id": c["charge_type_id"], **({"amount": str(c["amount"])} if "amount" in c else {})} for c in charges]}
+
+    def quote(grid_amounts):
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, "before_cursor_execute", listener)
+        try:
+            resp = client.post("/loan-applications/quote-grid", headers=_headers(app, staff), json={**payload, "amounts": grid_amounts})
+        finally:
+            event.remove(db.engine, "before_cursor_execute", listener)
+        assert resp.status_code == 200, resp.get_json()
+        return resp.get_json(), len(statements)
+
+    quote(amounts[:1])  # the first request also warms per-process caches
+    body, full_statements = quote(amounts)
+    _, small_statements = quote(amounts[:1])
+    assert full_statements == small_statements
+    assert body["count"] == len(amounts) * 4 * 3 == len(body["quotes"])
+
+    for q in body["quotes"]:
+        resolved = resolve_loan_term(date(2026, 1, 31), q["term_type"], q["term_value"], q["repayment_frequency"])
+        total_interest, total_payable, installment = calculate_flat_term_amounts(Decimal(q["amount"]), Decimal("26.5"), resolved.installment_count)
+        deductions = calculate_disbursement_charges(Decimal(q["amount"]), charges)
+        assert (q["installment_count"], q["maturity_date"]) == (resolved.installment_count, resolved.maturity_date.isoformat())
+        assert (q["installment_amount"], q["total_interest"], q["total_repayment"]) == (f"{installment:.2f}", f"{total_interest:.2f}", f"{total_payable:.2f}")
+        assert (q["total_deductions"], q["tax_amount"], q["net_disbursement"]) == (
+            f"{deductions['total_deductions']:.2f}", f"{deductions['tax_amount']:.2f}", f"{deductions['net_disbursement']:.2f}")
+
+
+def test_quote_grid_validates_the_request(app, client):
+    staff, customer, _ = _setup()
+    base = {"customer_id": customer.id, "loan_type": "GROW_BUSINESS", "amounts": ["1000"], "terms": [{"term_type": "DAYS", "term_value": 30}],
+            "repayment_frequencies": ["WEEKLY"], "interest_rate": "10"}
+    headers = _headers(app, staff)
+    assert client.post("/loan-applications/quote-grid", headers=headers, json={**base, "customer_id": 999999}).status_code == 404
+    bad = client.post("/loan-applications/quote-grid", headers=headers, json={**base, "loan_type": "CAR", "repayment_frequencies": ["YEARLY"]})
+    assert bad.status_code == 422 and len(bad.get_json()["errors"]) == 2
+    huge = client.post("/loan-applications/quote-grid", headers=headers, json={**base, "amounts": [str(1000 + i) for i in range(1001)]})
+    assert huge.status_code == 422
+    # A principal the default charges would swallow is reported on its quotes, not as a failed grid.
+    small = client.post("/loan-applications/quote-grid", headers=headers, json={**base, "amounts": ["1", "50000"]}).get_json()
+    assert "error" in small["quotes"][0] and "net_disbursement" in small["quotes"][1]
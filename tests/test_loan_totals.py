@@ -52,3 +52,48 @@ def test_normal_cash_settlement_has_no_adjustments(app):
     totals = loan_totals(loan)
     assert totals["total_paid"] == Decimal("100.00")
     assert totals["settlement_adjustments"] == Decimal("0.00")
+
+
+def test_due_aggregates_matches_loan_totals_for_waivers_reversals_and_post_settlement_receipts(app):
+    from app.loan_search import due_aggregates
+
+    first, user = _loan()
+    customer_id = first.customer_id
+
+    def loan(number, total_payable, **waivers):
+        extra = Loan(loan_number=number, customer_id=customer_id, principal_amount=Decimal("1000"), interest_rate=Decimal("0"), total_days=30,
+                     payment_interval_days=30, daily_installment=Decimal("0"), total_payable=Decimal(total_payable), start_date=date.today(),
+                     end_date=date.today(), created_by_id=user.id, status="ACTIVE", **waivers)
+        db.session.add(extra); db.session.flush()
+        return extra
+
+    def ledger(target, **amounts):
+        db.session.add(LoanLedger(loan_id=target.id, installment_no=1, due_date=date.today(), period_days=30, opening_balance=Decimal("1000"),
+                                  principal_amount=Decimal("1000"), interest_amount=Decimal("200"), installment_amount=Decimal("1200"),
+                                  closing_balance=Decimal(), **amounts))
+
+    def pay(target, amount, **fields):
+        db.session.add(Payment(loan_id=target.id, collection_date=date.today(), amount_collected=Decimal(amount), collected_by_id=user.id,
+                               **{"status": "POSTED", **fields}))
+
+    # Ledger-level delay waiver; reversed, draft and oddly cased receipts.
+    pay(first, "30000"); pay(first, "1000.50", status=" posted "); pay(first, "700", reversed_at=datetime.utcnow()); pay(first, "900", status="DRAFT")
+    # Loan-level rebate wins over the ledger detail; a post-settlement receipt is not contractual cash.
+    rebated = loan("TOTALS-2", "1200", interest_rebate_amount=Decimal("150"))
+    ledger(rebated, waived_interest_amount=Decimal("200"), delay_interest_accrued=Decimal("40"), delay_interest_paid=Decimal("15"))
+    pay(rebated, "1050"); pay(rebated, "300", transaction_type="POST_SETTLEMENT_PAYMENT")
+    # Ledger-only penalty waiver and no receipts; loan-level delay and penalty waivers with an overpayment.
+    waived = loan("TOTALS-3", "1200")
+    ledger(waived, waived_penalty_amount=Decimal("75.25"))
+    overpaid = loan("TOTALS-4", "1200", delay_interest_waiver_amount=Decimal("20"), penalty_waiver_amount=Decimal("5"))
+    ledger(overpaid, waived_delay_interest_amount=Decimal("90"))
+    pay(overpaid, "1250")
+    db.session.commit()
+
+    loans = [first, rebated, waived, overpaid]
+    aggregates = due_aggregates([l.id for l in loans])
+    for target in loans:
+        db.session.refresh(target)
+        totals = loan_totals(target)
+        assert (aggregates[target.id]["outstanding"], aggregates[target.id]["total_paid"]) == (totals["outstanding_amount"], totals["total_paid"]), target.loan_number
+    assert aggregates[rebated.id]["delay_interest_outstanding"] == Decimal("25.00")
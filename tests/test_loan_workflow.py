@@ -1649,3 +1649,99 @@ def test_repair_backfills_missing_period_start_dates_from_schedule(app, client):
     assert starts == [date(2026, 7, 8) + timedelta(days=7 * idx) for idx in range(9)]
     assert [entry.due_date for entry in loan.ledger_entries] == [date(2026, 7, 15) + timedelta(days=7 * idx) for idx in range(9)]
     assert sum((entry.installment_amount for entry in loan.ledger_entries), Decimal("0")) == Decimal("18900.00")
+
+
+def test_monthly_ledger_uses_closed_form_dates_and_one_bulk_insert(app):
+    from sqlalchemy import event
+    from app.loan_ledger import _fixed_terms_amounts, generate_loan_ledger
+    from app.loan_terms import add_calendar_months
+
+    admin_user = _create_user("admin", "Ledger Admin", "ledger-bulk@example.com")
+    customer = _customer_profile(_create_user("customer", "Ledger Customer", "ledger-bulk-customer@example.com"), code="CUST-BULK")
+
+    def monthly_loan(number):
+        loan = Loan(loan_number=number, customer_id=customer.id, principal_amount=Decimal("100000.00"), interest_rate=Decimal("24"),
+                    total_days=1, daily_installment=Decimal("0"), total_payable=Decimal("124000.00"), start_date=date(2026, 1, 31),
+                    end_date=date(2026, 1, 31), status="ACTIVE", created_by_id=admin_user.id, term_type="MONTHS", term_value=36,
+                    repayment_frequency="MONTHLY", number_of_installments=36, installment_count=36, installment_amount=Decimal("3444.44"),
+                    total_interest=Decimal("24000.00"), total_repayment=Decimal("124000.00"))
+        db.session.add(loan); db.session.flush()
+        return loan
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    first = monthly_loan("LN-BULK-1")
+    event.listen(db.engine, "before_cursor_execute", listener)
+    try:
+        entries = generate_loan_ledger(first)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", listener)
+    assert len([s for s in statements if s.startswith("INSERT INTO loan_ledger")]) == 1
+
+    assert [e.due_date for e in entries] == [add_calendar_months(date(2026, 1, 31), n) for n in range(1, 37)]
+    assert entries[1].due_date == date(2026, 3, 31)  # no day-of-month drift after February
+    assert sum(e.principal_amount for e in entries) == Decimal("100000.00")
+    assert sum(e.installment_amount for e in entries) == Decimal("124000.00") and entries[-1].closing_balance == Decimal("0.00")
+    assert first.final_installment_due_date == date(2029, 1, 31) and first.ledger_entries == entries
+
+    hits = _fixed_terms_amounts.cache_info().hits
+    second = generate_loan_ledger(monthly_loan("LN-BULK-2"))
+    assert _fixed_terms_amounts.cache_info().hits == hits + 1
+    assert [(e.due_date, e.installment_amount) for e in second] == [(e.due_date, e.installment_amount) for e in entries]
+    db.session.commit()
+    assert LoanLedger.query.filter_by(loan_id=second[0].loan_id).count() == 36
+
+
+def test_compact_schedule_stores_a_rule_and_materializes_installments_on_demand(app, client):
+    from app.loan_ledger import generate_loan_ledger
+    from app.loan_schedule import amounts, due_count, materialize_due, period, scheduled_through
+    from app.loan_status import contractual_balances
+    from app.loan_totals import loan_totals
+
+    seed_default_accounts()
+    admin_user = _create_user("admin", "Rule Admin", "rule-admin@example.com")
+    customer = _customer_profile(_create_user("customer", "Rule Customer", "rule-customer@example.com"), code="CUST-RULE")
+
+    def weekly_loan(number, compact):
+        loan = Loan(loan_number=number, customer_id=customer.id, principal_amount=Decimal("15000.00"), interest_rate=Decimal("26"),
+                    total_days=63, daily_installment=Decimal("0"), total_payable=Decimal("18900.00"), start_date=date(2026, 1, 1),
+                    end_date=date(2026, 3, 5), status="ACTIVE", created_by_id=admin_user.id, term_type="DAYS", term_value=63,
+                    repayment_frequency="WEEKLY", number_of_installments=9, installment_count=9, installment_amount=Decimal("2100.00"),
+                    total_interest=Decimal("3900.00"), total_repayment=Decimal("18900.00"))
+        db.session.add(loan); db.session.flush()
+        generate_loan_ledger(loan, compact=compact)
+        db.session.commit()
+        return loan.id
+
+    compact_id, plain_id, idle_id = weekly_loan("LN-RULE-1", True), weekly_loan("LN-RULE-2", False), weekly_loan("LN-RULE-3", True)
+    compact, plain = Loan.query.get(compact_id), Loan.query.get(plain_id)
+    rule = compact.schedule_rule
+    assert compact.compact_schedule and LoanLedger.query.filter_by(loan_id=compact_id).count() == 0
+    assert [(e.period_start_date, e.due_date, e.period_days) for e in plain.ledger_entries] == [period(rule, n) for n in range(1, 10)]
+    assert [(e.opening_balance, e.principal_amount, e.interest_amount, e.installment_amount, e.closing_balance)
+            for e in plain.ledger_entries] == [amounts(rule, n) for n in range(1, 10)]
+    assert [due_count(rule, d) for d in (date(2026, 1, 7), date(2026, 1, 8), date(2026, 2, 26), date(2026, 3, 5))] == [0, 1, 8, 9]
+    assert scheduled_through(rule, 9)["installment"] == Decimal("18900.00") and scheduled_through(rule, 2)["installment"] == Decimal("4200.00")
+
+    headers = _auth_headers(app, admin_user)
+    for loan_id in (compact_id, plain_id):
+        for amount, paid_on in (("2100", "2026-01-20"), ("8000", "2026-01-21")):
+            resp = client.post("/staff/payments", headers=headers, json={"loan_id": loan_id, "amount_collected": amount, "collection_date": paid_on, "payment_method": "Cash"})
+            assert resp.status_code == 200, resp.get_json()
+    db.session.expire_all()
+    compact, plain = Loan.query.get(compact_id), Loan.query.get(plain_id)
+    # Two installments were due and the prepayment reaches three more; the rest stay implied by the rule.
+    assert LoanLedger.query.filter_by(loan_id=compact_id).count() == 5 and compact.compact_schedule
+    assert compact.schedule_rule.next_due_date == period(compact.schedule_rule, 6)[1]
+    assert loan_totals(compact) == loan_totals(plain) and loan_totals(compact)["outstanding_amount"] == Decimal("8800.00")
+    assert contractual_balances(compact) == contractual_balances(plain)
+    assert compact.arrears() == Decimal("8800.00")
+    paid = [(p.principal_paid, p.interest_paid) for p in Payment.query.filter_by(loan_id=compact_id).order_by(Payment.id)]
+    assert paid == [(p.principal_paid, p.interest_paid) for p in Payment.query.filter_by(loan_id=plain_id).order_by(Payment.id)]
+
+    assert materialize_due(date(2026, 1, 20), loan_id=idle_id) == 2
+    # Legacy code reading the relationship sees the full schedule.
+    assert [(e.installment_no, e.paid_amount, e.status) for e in compact.ledger_entries] == [(e.installment_no, e.paid_amount, e.status) for e in plain.ledger_entries]
+    assert not compact.compact_schedule and compact.schedule_rule.materialized_count == 9
+    db.session.commit()
+    assert LoanLedger.query.filter_by(loan_id=compact_id).count() == 9
@@ -0,0 +1,84 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from flask_jwt_extended import create_access_token
+
+from app.accounting import accrue_due_loan_interest, seed_default_accounts
+from app.extensions import db
+from app.loan_status import update_loan_settlement_status
+from app.models import Customer, Loan, LoanLedger, LoanListView, LoanStatusTransition, User
+from app.overdue_classification import classify_overdue_loans
+
+START = date(2026, 1, 1)
+AS_OF = date(2026, 1, 20)
+
+
+def _setup():
+    user = User(email="overdue@example.com", name="Overdue", role="admin"); user.set_password("password")
+    db.session.add(user); db.session.flush()
+    customer = Customer(user_id=user.id, customer_code="OVERDUE", full_name="Overdue Customer")
+    db.session.add(customer); db.session.flush()
+    loans = {}
+    # (status, installments already paid): 3 weekly installments are due by AS_OF for the first two.
+    for number, status, paid in (("LATE", "ACTIVE", 1), ("CURRENT", "ACTIVE", 2), ("CURED", "OVERDUE", 2), ("CLOSED", "SETTLED", 0)):
+        loan = Loan(loan_number=f"OD-{number}", customer_id=customer.id, principal_amount=Decimal("4000"), interest_rate=Decimal("10"), total_days=28,
+                    payment_interval_days=7, daily_installment=Decimal("0"), total_payable=Decimal("4400"), start_date=START,
+                    end_date=START + timedelta(days=28), created_by_id=user.id, status=status)
+        db.session.add(loan); db.session.flush()
+        db.session.add_all([LoanLedger(loan_id=loan.id, installment_no=i, due_date=START + timedelta(days=7 * i), period_days=7, opening_balance=Decimal("4000"),
+                                       principal_amount=Decimal("1000"), interest_amount=Decimal("100"), installment_amount=Decimal("1100"),
+                                       closing_balance=Decimal("0"), status="PAID" if i <= paid else "PENDING") for i in range(1, 5)])
+        loans[number] = loan.id
+    db.session.commit()
+    return loans
+
+
+def _status(loan_id):
+    return db.session.get(Loan, loan_id).status
+
+
+def test_classification_moves_loans_and_records_transitions(app):
+    loans = _setup()
+    summary = classify_overdue_loans(AS_OF)
+    db.session.commit()
+    assert (summary["became_overdue"], summary["recovered"], summary["max_days_past_due"]) == (1, 1, 5)
+    assert {n: _status(i) for n, i in loans.items()} == {"LATE": "OVERDUE", "CURRENT": "ACTIVE", "CURED": "ACTIVE", "CLOSED": "SETTLED"}
+    history = {t.loan_id: (t.from_status, t.to_status, t.days_past_due, t.next_due_date) for t in LoanStatusTransition.query}
+    assert history == {loans["LATE"]: ("ACTIVE", "OVERDUE", 5, START + timedelta(days=14)),
+                       loans["CURED"]: ("OVERDUE", "ACTIVE", 0, START + timedelta(days=21))}
+    assert db.session.get(LoanListView, loans["LATE"]).status == "OVERDUE"
+
+    # Receipt-time recalculation leaves OVERDUE to the job; a second run for the same date changes nothing.
+    update_loan_settlement_status(loans["LATE"])
+    db.session.commit()
+    assert _status(loans["LATE"]) == "OVERDUE"
+    assert classify_overdue_loans(AS_OF)["became_overdue"] == 0 and LoanStatusTransition.query.count() == 2
+
+
+def test_cli_is_a_dry_run_unless_applied(app):
+    loans = _setup()
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=["classify-overdue-loans", "--as-of-date", AS_OF.isoformat()])
+    assert result.exit_code == 0 and "'became_overdue': 1" in result.output
+    db.session.expire_all()
+    assert _status(loans["LATE"]) == "ACTIVE" and LoanStatusTransition.query.count() == 0
+
+    result = runner.invoke(args=["classify-overdue-loans", "--as-of-date", AS_OF.isoformat(), "--apply"])
+    assert result.exit_code == 0
+    db.session.expire_all()
+    assert _status(loans["LATE"]) == "OVERDUE" and LoanStatusTransition.query.count() == 2
+
+
+def test_overdue_loans_still_accrue_and_count_as_active(app, client):
+    seed_default_accounts()
+    loans = _setup()
+    classify_overdue_loans(AS_OF)
+    db.session.commit()
+    summary = accrue_due_loan_interest(AS_OF, loan_id=loans["LATE"], historical=True)
+    db.session.commit()
+    assert summary["processed_installments"] == 2 and not [s for s in summary["skipped"] if s["reason"] == "loan_status"]
+
+    admin = User.query.filter_by(email="overdue@example.com").one()
+    token = create_access_token(identity=str(admin.id), additional_claims={"role": admin.role})
+    resp = client.get("/admin/dashboard", headers={"Authorization": f"Bearer {token}"})
+    assert resp.status_code == 200 and resp.get_json()["active_loans"] == 3
@@ -0,0 +1,85 @@
+import csv
+from datetime import date, timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+
+from flask_jwt_extended import create_access_token
+
+from app.accounting import seed_default_accounts
+from app.extensions import db
+from app.models import AccountingJournalEntry, Customer, Loan, LoanLedger, Payment, PaymentAllocation, User
+from app.payment_import import import_payments, read_csv
+
+START = date(2026, 1, 1)
+FILE = """loan_number,payment_date,amount,reference,payment_method
+IMP-1,2026-01-08,1100,BANK-001,
+,2026-01-15,1100,IMP-2,MOBILE_TRANSFER
+IMP-1,2026-01-15,600,BANK-002,
+NOPE-9,2026-01-15,100,BANK-003,
+IMP-1,2026-01-15,600,BANK-002,
+IMP-1,2026-01-16,abc,BANK-004,
+IMP-3,2026-01-16,100,BANK-005,
+"""
+
+
+def _headers(app, user):
+    with app.app_context():
+        token = create_access_token(identity=str(user.id), additional_claims={"role": user.role})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _setup():
+    seed_default_accounts()
+    admin = User(email="import-pay@example.com", name="Import Pay", role="admin"); admin.set_password("password")
+    db.session.add(admin); db.session.flush()
+    customer = Customer(user_id=admin.id, customer_code="IMP-PAY", full_name="Import Customer")
+    db.session.add(customer); db.session.flush()
+    for n, status in ((1, "ACTIVE"), (2, "ACTIVE"), (3, "SETTLED")):
+        loan = Loan(loan_number=f"IMP-{n}", customer_id=customer.id, principal_amount=Decimal("4000"), interest_rate=Decimal("10"), total_days=28,
+                    payment_interval_days=7, daily_installment=Decimal("0"), total_payable=Decimal("4400"), start_date=START,
+                    end_date=START + timedelta(days=28), created_by_id=admin.id, status=status)
+        db.session.add(loan); db.session.flush()
+        db.session.add_all([LoanLedger(loan_id=loan.id, installment_no=i, due_date=START + timedelta(days=7 * i), period_days=7, opening_balance=Decimal("4000"),
+                                       principal_amount=Decimal("1000"), interest_amount=Decimal("100"), installment_amount=Decimal("1100"),
+                                       closing_balance=Decimal("0"), status="PENDING") for i in range(1, 5)])
+    db.session.commit()
+    return admin
+
+
+def test_import_matches_deduplicates_and_posts_in_one_batch(app):
+    admin = _setup()
+    summary, results = import_payments(read_csv(StringIO(FILE)), admin.id, first_row_no=2)
+    db.session.commit()
+    assert (summary["posted"], summary["duplicate"], summary["invalid"], summary["amount_posted"]) == (3, 1, 3, "2800.00")
+    by_row = {r["row_no"]: r for r in results}
+    assert [by_row[n]["status"] for n in range(2, 9)] == ["POSTED", "POSTED", "POSTED", "INVALID", "DUPLICATE", "INVALID", "INVALID"]
+    assert by_row[3]["loan_number"] == "IMP-2"  # matched on the reference
+    assert "No loan matches" in by_row[5]["message"] and "active loans" in by_row[8]["message"]
+
+    imp1 = Loan.query.filter_by(loan_number="IMP-1").one()
+    rows = LoanLedger.query.filter_by(loan_id=imp1.id).order_by(LoanLedger.installment_no).all()
+    assert [r.status for r in rows] == ["PAID", "PARTIAL", "PENDING", "PENDING"]
+    assert rows[1].interest_paid == Decimal("100.00") and rows[1].principal_paid == Decimal("500.00")
+    payments = Payment.query.all()
+    assert len({p.receipt_number for p in payments}) == 3 and all(p.journal_id for p in payments)
+    assert sum(a.amount for a in PaymentAllocation.query) == Decimal("2800.00")
+    journals = AccountingJournalEntry.query.filter_by(reference_type="LOAN_PAYMENT").all()
+    assert len(journals) == 3 and all(j.total_debit == j.total_credit for j in journals)
+
+    # Importing the same file again posts nothing.
+    summary, _ = import_payments(read_csv(StringIO(FILE)), admin.id, first_row_no=2)
+    assert (summary["posted"], summary["duplicate"]) == (0, 4)
+
+
+def test_import_endpoint_accepts_a_file_and_returns_the_result_file(app, client):
+    admin = _setup()
+    headers = _headers(app, admin)
+    resp = client.post("/admin/payments/import?format=csv", headers=headers, content_type="multipart/form-data",
+                       data={"file": (BytesIO(FILE.encode()), "bank.csv")})
+    assert resp.status_code == 200 and resp.mimetype == "text/csv"
+    result_rows = list(csv.DictReader(StringIO(resp.get_data(as_text=True))))
+    assert [r["status"] for r in result_rows].count("POSTED") == 3 and all(r["receipt_number"] for r in result_rows if r["status"] == "POSTED")
+
+    resp = client.post("/admin/payments/import", headers=headers, json={"payments": [{"loan_number": "IMP-2", "payment_date": "2026-01-22", "amount": "50", "reference": "MM-1"}]})
+    assert resp.status_code == 200 and resp.get_json()["posted"] == 1
+    assert client.post("/admin/payments/import", headers=headers, json={"payments": "nope"}).status_code == 400
@@ -0,0 +1,109 @@
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+
+from app.accounting import seed_default_accounts
+from app.extensions import db
+from app.models import AccountingJournalEntry, Customer, Loan, LoanLedger, Payment, PaymentAllocation, PortfolioImportBatch, User
+from app.portfolio_import import PortfolioImportError, batch_report, run_import, stage_files, validate_batch
+
+CUSTOMERS = """customer_code,full_name,nic_number,mobile
+LEG-1,Legacy One,851234567V,0771234567
+LEG-2,Legacy Two,199012345678,0712345678
+"""
+LOANS = """loan_number,customer_code,principal_amount,interest_rate,term_type,term_value,repayment_frequency,start_date
+OLD-1,LEG-1,10000,20,DAYS,28,WEEKLY,2026-01-01
+OLD-2,LEG-2,5000,10,DAYS,14,WEEKLY,2026-01-01
+OLD-3,LEG-2,3000,10,MONTHS,3,MONTHLY,2026-02-01
+"""
+# OLD-1 pays three installments, the third partly; OLD-2 is repaid in full.
+PAYMENTS = """loan_number,payment_date,amount,reference
+OLD-1,2026-01-07,3000,R1
+OLD-1,2026-01-14,3000,R2
+OLD-1,2026-01-21,1000,R3
+OLD-2,2026-01-07,2750,R4
+OLD-2,2026-01-14,2750,R5
+"""
+CUTOVER = date(2026, 3, 1)
+
+
+def _admin():
+    seed_default_accounts()
+    admin = User(email="import-admin@example.com", name="Import Admin", role="admin"); admin.set_password("password")
+    db.session.add(admin); db.session.commit()
+    return admin
+
+
+def _stage(admin, customers=CUSTOMERS, loans=LOANS, payments=PAYMENTS):
+    batch = stage_files(StringIO(customers), StringIO(loans), StringIO(payments), CUTOVER, admin.id)
+    validate_batch(batch)
+    db.session.commit()
+    return batch
+
+
+def test_import_promotes_the_portfolio_with_opening_journals(app):
+    admin = _admin()
+    batch = _stage(admin)
+    assert batch.status == "VALIDATED"
+    assert run_import(batch, batch_size=2, checkpoint=db.session.commit) == {"customers": 2, "loans": 3, "payments": 5, "journals": 2}
+
+    report = batch_report(batch)
+    assert report["status"] == "COMPLETED" and report["loans"] == {"rows": 3, "errors": 0, "promoted": 3}
+    assert Customer.query.filter_by(customer_code="LEG-1").one().nic_canonical == "198512304567"
+    old1, old2, old3 = (Loan.query.filter_by(loan_number=n).one() for n in ("OLD-1", "OLD-2", "OLD-3"))
+    assert (old1.status, old2.status, old2.settled_date) == ("ACTIVE", "SETTLED", date(2026, 1, 14))
+    rows = LoanLedger.query.filter_by(loan_id=old1.id).order_by(LoanLedger.installment_no).all()
+    assert [r.status for r in rows] == ["PAID", "PAID", "PARTIAL", "PENDING"]
+    assert rows[2].interest_paid == Decimal("500.00") and rows[2].principal_paid == Decimal("500.00")
+    assert all(r.interest_accrued for r in rows)
+    assert sum(a.amount for a in PaymentAllocation.query.filter_by(loan_id=old1.id)) == Decimal("7000.00")
+    assert {p.transaction_type for p in Payment.query} == {"LEGACY_IMPORT"}
+
+    journals = AccountingJournalEntry.query.filter_by(reference_type="PORTFOLIO_IMPORT").all()
+    assert all(j.total_debit == j.total_credit for j in journals)
+    # Outstanding principal 4500 + 3000 and interest due by the cutover 500 + 100 (OLD-3's first installment).
+    assert sum(j.total_debit for j in journals) == Decimal("8100.00")
+    assert old1.disbursement_journal_id and all(p.journal_id for p in Payment.query)
+
+    # A finished batch is not promoted twice.
+    assert run_import(batch) == {} and Loan.query.count() == 3
+
+
+def test_validation_flags_rows_and_blocks_promotion(app):
+    admin = _admin()
+    loans = LOANS + "OLD-1,LEG-1,1000,10,DAYS,7,WEEKLY,2026-01-01\nOLD-4,NOBODY,1000,10,DAYS,7,DAILY,2026-01-01\nOLD-5,LEG-1,abc,10,DAYS,7,WEEKLY,2026-04-01\n"
+    payments = PAYMENTS + "OLD-3,2026-01-15,10,R6\nOLD-2,2026-01-20,1,R7\n"
+    batch = _stage(admin, loans=loans, payments=payments)
+    errors = {(e["file"], e["row"]): e["error"] for e in batch_report(batch)["errors"]}
+    assert batch.status == "INVALID"
+    assert errors[("loans", 2)] == errors[("loans", 5)] == "loan_number is repeated in the file"
+    assert errors[("loans", 6)] == "customer_code is not in the customer file or the customer master"
+    assert "principal_amount must be a number" in errors[("loans", 7)]
+    assert errors[("payments", 7)] == "payment_date is before the loan start date"
+    assert errors[("payments", 8)] == "payments exceed the loan's total payable"
+    with pytest.raises(PortfolioImportError):
+        run_import(batch)
+    assert Loan.query.count() == 0
+
+
+def test_interrupted_import_resumes_without_duplicates(app):
+    admin = _admin()
+    batch = _stage(admin)
+    calls = []
+
+    def crash_during_loans():
+        db.session.commit(); calls.append(batch.completed_stage)
+        if batch.completed_stage == "customers" and len(calls) > 4:
+            raise RuntimeError("connection lost")
+
+    with pytest.raises(RuntimeError):
+        run_import(batch, batch_size=1, checkpoint=crash_during_loans)
+    db.session.rollback()
+    assert 0 < Loan.query.count() < 3
+
+    batch = db.session.get(PortfolioImportBatch, batch.id)
+    run_import(batch, batch_size=1, checkpoint=db.session.commit)
+    assert (Customer.query.count(), Loan.query.count(), Payment.query.count()) == (2, 3, 5)
+    assert LoanLedger.query.count() == 4 + 2 + 3
@@ -0,0 +1,92 @@
+from datetime import date
+from decimal import Decimal
+
+from flask_jwt_extended import create_access_token
+
+from app.extensions import db
+from app.models import AccountingAccount, AccountingJournalEntry, AccountingJournalLine, Customer, Loan, LoanApplication, Payment, User
+
+
+def _user(role, email):
+    user = User(email=email, name=f"{role} user", role=role)
+    user.set_password("password")
+    db.session.add(user)
+    db.session.flush()
+    return user
+
+
+def _headers(app, user):
+    with app.app_context():
+        token = create_access_token(identity=str(user.id), additional_claims={"role": user.role})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _seed():
+    admin = _user("admin", "fields-admin@example.com")
+    customer_user = _user("customer", "fields-customer@example.com")
+    customer = Customer(user_id=customer_user.id, customer_code="CUST-FIELDS", full_name="Sparse Customer", nic_number="199012345678",
+                        mobile="0771234567", status="Active", monthly_income=Decimal("45000.50"), date_of_birth=date(1990, 1, 5))
+    db.session.add(customer); db.session.flush()
+    loan = Loan(loan_number="LN-FIELDS", customer_id=customer.id, principal_amount=Decimal("1000.00"), interest_rate=Decimal("10"),
+                total_days=30, payment_interval_days=30, daily_installment=Decimal("36.67"), total_payable=Decimal("1100.00"),
+                start_date=date(2026, 7, 1), end_date=date(2026, 7, 30), status="ACTIVE", created_by_id=admin.id)
+    db.session.add(loan); db.session.flush()
+    db.session.add(Payment(loan_id=loan.id, amount_collected=Decimal("100.00"), collected_by_id=admin.id, collection_date=date(2026, 7, 2),
+                           payment_method="CASH", status="POSTED"))
+    db.session.add(LoanApplication(customer_id=customer.id, application_number="APP-FIELDS", loan_type="GROW_BUSINESS", status="SUBMITTED",
+                                   applied_amount=Decimal("5000.00"), full_name="Sparse Customer", nic_number="199012345678",
+                                   mobile_number="0771234567", tenure_months=1, term_type="DAYS", term_value=30))
+    account = AccountingAccount(account_code="1190", account_name="Fields Receivable", account_type="ASSET", normal_balance="DEBIT")
+    db.session.add(account); db.session.flush()
+    entry = AccountingJournalEntry(journal_no="J-FIELDS", journal_date=date(2026, 7, 2), description="Fields journal", status="POSTED",
+                                   total_debit=Decimal("100"), total_credit=Decimal("100"))
+    db.session.add(entry); db.session.flush()
+    db.session.add(AccountingJournalLine(journal_entry_id=entry.id, line_no=1, account_id=account.id, debit=Decimal("100"), credit=Decimal("0"),
+                                         customer_id=customer.id, loan_id=loan.id))
+    db.session.commit()
+    return admin, customer_user
+
+
+def _assert_sparse_matches_full(client, url, headers, fields, items=lambda body: body):
+    full = items(client.get(url, headers=headers).get_json())
+    separator = "&" if "?" in url else "?"
+    response = client.get(f"{url}{separator}fields={','.join(fields)}", headers=headers)
+    assert response.status_code == 200, url
+    sparse = items(response.get_json())
+    assert [set(item) for item in sparse] == [{"id", *fields}] * len(full)
+    assert sparse == [{key: item[key] for key in ("id", *fields)} for item in full]
+
+
+def test_list_endpoints_return_only_requested_fields_with_full_values(app, client):
+    admin, customer_user = _seed()
+    headers = _headers(app, admin)
+
+    _assert_sparse_matches_full(client, "/admin/loans", headers, ["loan_number", "customer_name", "outstanding_amount", "status"],
+                                lambda body: body["items"])
+    _assert_sparse_matches_full(client, "/admin/loans", headers, ["loan_number", "principal_amount_formatted"], lambda body: body["items"])
+    _assert_sparse_matches_full(client, "/customers", headers, ["full_name", "monthly_income", "date_of_birth", "created_at"])
+    _assert_sparse_matches_full(client, "/admin/customers", headers, ["customer_code", "kyc_status"])
+    _assert_sparse_matches_full(client, "/api/loan-applications", headers, ["application_number", "customer_name", "applied_amount_formatted",
+                                                                             "term_display", "available_actions"])
+    _assert_sparse_matches_full(client, "/admin/accounting/journals", headers, ["journal_number", "total_debit", "status"],
+                                lambda body: body["items"])
+    _assert_sparse_matches_full(client, "/admin/accounting/journals", headers, ["journal_number", "loan_number", "lines"],
+                                lambda body: body["items"])
+
+    customer_headers = _headers(app, customer_user)
+    loans = client.get("/customer/loans?fields=loan_number,outstanding", headers=customer_headers).get_json()
+    assert "summary" not in loans
+    assert loans["loans"] == [{"id": loans["loans"][0]["id"], "loan_number": "LN-FIELDS", "outstanding": 1000.0}]
+    full_loans = client.get("/customer/loans", headers=customer_headers).get_json()
+    assert full_loans["summary"]["total_outstanding"] == 1000.0 and full_loans["loans"][0]["arrears"] >= 0
+
+    loan_id = loans["loans"][0]["id"]
+    payments = client.get(f"/customer/loans/{loan_id}/payments?fields=amount_collected", headers=customer_headers).get_json()
+    assert set(payments) == {"payments"}
+    assert [p["amount_collected"] for p in payments["payments"]] == [100.0]
+    full_payments = client.get(f"/customer/loans/{loan_id}/payments", headers=customer_headers).get_json()
+    assert full_payments["loan"]["total_paid"] == 100.0
+
+    invalid = client.get("/admin/loans?fields=loan_number,password_hash", headers=headers)
+    assert invalid.status_code == 422
+    assert invalid.get_json()["error"] == "invalid_fields"